@@ -0,0 +1,77 @@
+import asyncio
+import threading
+from typing import Iterable
+from aiohttp import web
+from app.config import Config
+from app import db
+from app.utils.metrics import MetricsRegistry, Sample, registry
+from app.utils.rate_limit import rate_limiter
+from app.utils.resilience import bulkheads, circuit_breakers
+
+METRICS_PATH = "/metrics"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Valeur numérique de l'état des disjoncteurs
+CIRCUIT_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def collect_pool_stats() -> Iterable[Sample]:
+    """État des pools de connexions (moteur synchrone, et asyncio s'il est créé)."""
+    # Moteur lu à chaque collecte : configure_server_mode() peut l'avoir remplacé
+    engines = [("sync", db.engine), ("async", db.created_async_engine())]
+    for name, db_engine in engines:
+        if db_engine is None:
+            continue
+        for key, value in db.pool_stats(db_engine).items():
+            yield f"db_pool_{key}", f"Connection pool {key.replace('_', ' ')}.", {"engine": name}, value
+
+
+def collect_provider_protection() -> Iterable[Sample]:
+    """Disjoncteurs et bulkheads des fournisseurs."""
+    for name, breaker in circuit_breakers().items():
+        snapshot = breaker.snapshot()
+        yield ("payment_provider_circuit_state", "Circuit state (0 closed, 1 half-open, 2 open).",
+               {"provider": name}, CIRCUIT_STATE_VALUES[snapshot["state"]])
+        for key in ("calls", "failures", "slow_calls"):
+            yield (f"payment_provider_circuit_window_{key}", f"Provider {key.replace('_', ' ')} in the circuit window.",
+                   {"provider": name}, snapshot[key])
+    for name, bulkhead in bulkheads().items():
+        yield "payment_provider_calls_in_flight", "Provider calls in flight.", {"provider": name}, bulkhead.in_use
+        yield ("payment_provider_calls_rejected", "Provider calls rejected by the bulkhead since start.",
+               {"provider": name}, bulkhead.rejected)
+
+
+def collect_rate_limiter() -> Iterable[Sample]:
+    yield "rate_limit_buckets", "Token buckets held by the rate limiter.", {}, len(rate_limiter)
+
+
+registry.register_collector(collect_pool_stats)
+registry.register_collector(collect_provider_protection)
+registry.register_collector(collect_rate_limiter)
+
+
+def create_metrics_app(metrics: MetricsRegistry = registry) -> web.Application:
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(body=metrics.render().encode(), headers={"Content-Type": PROMETHEUS_CONTENT_TYPE})
+
+    app = web.Application()
+    app.router.add_get(METRICS_PATH, handle)
+    return app
+
+
+async def start_metrics_server(port: int = Config.METRICS_PORT, host: str = Config.METRICS_HOST) -> web.AppRunner:
+    """Démarre l'exposition des métriques dans la boucle courante ; arrêt par await runner.cleanup()."""
+    runner = web.AppRunner(create_metrics_app())
+    await runner.setup()
+    await web.TCPSite(runner, host=host, port=port).start()
+    print(f"Metrics are exposed on http://{host}:{port}{METRICS_PATH}")
+    return runner
+
+
+def start_metrics_server_thread(port: int = Config.METRICS_PORT, host: str = Config.METRICS_HOST) -> threading.Thread:
+    """Démarre l'exposition des métriques dans une boucle asyncio dédiée, pour le serveur gRPC 'sync'."""
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(start_metrics_server(port, host))
+    thread = threading.Thread(target=loop.run_forever, name="metrics-http", daemon=True)
+    thread.start()
+    return thread
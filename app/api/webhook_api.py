@@ -0,0 +1,92 @@
+import asyncio
+import json
+import logging
+import threading
+from typing import Optional
+from aiohttp import web
+from app.config import Config
+from app.db import get_async_session_factory
+from app.services.paypal_webhook_service import (
+    UNKNOWN_TRANSACTION, PayPalWebhookProcessor, PayPalWebhookVerifier
+)
+from app.utils.exceptions import WebhookSignatureError
+
+logger = logging.getLogger(__name__)
+
+PAYPAL_WEBHOOK_PATH = "/webhooks/paypal"
+
+
+class PayPalWebhookReceiver:
+    """Récepteur HTTP des webhooks PayPal : signature vérifiée, puis événement appliqué en base.
+
+    Réponses : 200 si l'événement est appliqué, ignoré ou déjà reçu ; 400 si la
+    signature ou le corps est invalide ; 404 si la transaction n'est pas (encore)
+    connue et 500 sur erreur, pour que PayPal renvoie l'événement plus tard.
+    """
+
+    def __init__(self,
+                 verifier: Optional[PayPalWebhookVerifier] = None,
+                 processor: Optional[PayPalWebhookProcessor] = None,
+                 session_factory=None):
+        self.verifier = verifier or PayPalWebhookVerifier()
+        self.processor = processor or PayPalWebhookProcessor()
+        self.session_factory = session_factory or get_async_session_factory()
+
+    async def _apply(self, event: dict) -> str:
+        # Une insertion différée (write-behind) doit être en base avant de chercher la transaction
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.processor.transaction_service.wait_for_pending_writes
+        )
+        async with self.session_factory() as session:
+            outcome = await session.run_sync(self.processor.process_in_session, event)
+            await session.commit()
+            return outcome
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        try:
+            await self.verifier.verify(request.headers, body)
+        except WebhookSignatureError as e:
+            logger.warning("%s", e)
+            return web.json_response({"error": "invalid signature"}, status=400)
+        try:
+            event = json.loads(body)
+            if not isinstance(event, dict) or not event.get("id"):
+                raise ValueError("event id is missing")
+        except ValueError:
+            return web.json_response({"error": "invalid event"}, status=400)
+
+        try:
+            outcome = await self._apply(event)
+        except Exception:
+            logger.exception("Failed to apply PayPal webhook event %s", event["id"])
+            return web.json_response({"error": "internal error"}, status=500)
+        if outcome == UNKNOWN_TRANSACTION:
+            logger.info("PayPal webhook event %s targets an unknown transaction", event["id"])
+            return web.json_response({"status": outcome}, status=404)
+        return web.json_response({"status": outcome})
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(PAYPAL_WEBHOOK_PATH, self.handle)
+        return app
+
+
+async def start_webhook_server(port: int = Config.PAYPAL_WEBHOOK_PORT,
+                               receiver: Optional[PayPalWebhookReceiver] = None) -> web.AppRunner:
+    """Démarre le récepteur dans la boucle courante ; arrêt par await runner.cleanup()."""
+    runner = web.AppRunner((receiver or PayPalWebhookReceiver()).create_app())
+    await runner.setup()
+    await web.TCPSite(runner, port=port).start()
+    print(f"PayPal webhook receiver is running on port {port}")
+    return runner
+
+
+def start_webhook_server_thread(port: int = Config.PAYPAL_WEBHOOK_PORT,
+                                receiver: Optional[PayPalWebhookReceiver] = None) -> threading.Thread:
+    """Démarre le récepteur dans une boucle asyncio dédiée, pour le serveur gRPC 'sync'."""
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(start_webhook_server(port, receiver))
+    thread = threading.Thread(target=loop.run_forever, name="paypal-webhooks", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,85 @@
+import math
+from typing import Dict, Iterable, Optional
+
+# Percentiles publiés dans les rapports
+REPORTED_PERCENTILES = (50.0, 75.0, 90.0, 95.0, 99.0, 99.9, 99.99)
+
+
+class LatencyHistogram:
+    """Histogramme de latences à précision relative constante, découpé comme HdrHistogram.
+
+    Les valeurs (entiers, en microsecondes) tombent dans des tranches de
+    puissances de deux, chacune divisée en cases linéaires : l'erreur de
+    mesure reste sous 10^-significant_figures quelle que soit la valeur, pour
+    une mémoire proportionnelle au nombre de cases occupées.
+    """
+
+    def __init__(self, significant_figures: int = 3):
+        if not 1 <= significant_figures <= 5:
+            raise ValueError("significant_figures must be between 1 and 5")
+        self.significant_figures = significant_figures
+        # Cases par tranche : plus petite puissance de deux couvrant 2 x 10^significant_figures
+        self._sub_bucket_bits = (2 * 10 ** significant_figures - 1).bit_length()
+        self._counts: Dict[int, int] = {}
+        self.total_count = 0
+        self.min: Optional[int] = None
+        self.max = 0
+        self._sum = 0
+
+    def _index(self, value: int) -> int:
+        bucket = max(0, value.bit_length() - self._sub_bucket_bits)
+        return (bucket << self._sub_bucket_bits) | (value >> bucket)
+
+    def _highest_equivalent(self, index: int) -> int:
+        bucket, sub_bucket = index >> self._sub_bucket_bits, index & ((1 << self._sub_bucket_bits) - 1)
+        return ((sub_bucket + 1) << bucket) - 1
+
+    def record(self, value_us: float, count: int = 1) -> None:
+        value = max(0, int(value_us))
+        index = self._index(value)
+        self._counts[index] = self._counts.get(index, 0) + count
+        self.total_count += count
+        self._sum += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        if other.significant_figures != self.significant_figures:
+            raise ValueError("Cannot merge histograms with different precisions")
+        for index, count in other._counts.items():
+            self._counts[index] = self._counts.get(index, 0) + count
+        self.total_count += other.total_count
+        self._sum += other._sum
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+
+    @property
+    def mean(self) -> float:
+        return self._sum / self.total_count if self.total_count else 0.0
+
+    def percentile(self, percentile: float) -> int:
+        """Plus petite valeur (µs) dont au moins percentile % des mesures sont inférieures ou égales."""
+        if not self.total_count:
+            return 0
+        target = max(1, math.ceil(percentile / 100 * self.total_count))
+        cumulative = 0
+        for index in sorted(self._counts):
+            cumulative += self._counts[index]
+            if cumulative >= target:
+                return min(self._highest_equivalent(index), self.max)
+        return self.max
+
+    def summary_ms(self, percentiles: Iterable[float] = REPORTED_PERCENTILES) -> Dict[str, float]:
+        """Nombre de mesures, min, moyenne, max et percentiles, en millisecondes."""
+        summary = {
+            "count": self.total_count,
+            "min": round((self.min or 0) / 1000, 3),
+            "mean": round(self.mean / 1000, 3),
+            "max": round(self.max / 1000, 3),
+        }
+        for percentile in percentiles:
+            summary[f"p{percentile:g}"] = round(self.percentile(percentile) / 1000, 3)
+        return summary
@@ -0,0 +1,515 @@
+"""Générateur de charge gRPC et mesure de latence de bout en bout.
+
+Envoie au PaymentService un mélange pondéré de RPC, en boucle fermée (N
+clients qui enchaînent les appels) ou en boucle ouverte (arrivées à débit
+fixe, indépendantes des réponses), pour chaque niveau d'un balayage, après
+une phase de chauffe non mesurée. Le rapport JSON donne le débit et les
+percentiles de latence (histogramme HDR), globalement et par RPC.
+
+Sans --target, le serveur est lancé dans un sous-processus (stub_server) sur
+une base SQLite temporaire et le fournisseur "simulated", avec une graine
+fixe : rien ne sort de la machine, deux exécutions voient les mêmes latences
+et les mêmes erreurs du fournisseur, et --server-mode sync,async compare les
+deux modes du serveur.
+
+    python -m app.benchmark.load_generator --server-mode sync,async --concurrency 1,8,32
+    python -m app.benchmark.load_generator --rate 100,200 --output bench.json --baseline previous.json
+    python -m app.benchmark.load_generator --provider-latency "create=pareto:40:2.5,*=fixed:20" \
+        --server-env SIMULATED_PROVIDER_ERROR_RATE=0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional, Tuple
+import grpc
+from protos.payment_service_pb2 import (
+    ConfirmPaymentRequest, ListTransactionsRequest, MerchantBalanceRequest, PaymentAmount, PaymentRequest,
+    TransactionStatusRequest
+)
+from protos.payment_service_pb2_grpc import PaymentServiceStub
+from app.benchmark.histogram import LatencyHistogram
+
+RPC_NAMES = ("ProcessPayment", "ConfirmPayment", "GetTransactionStatus", "ListTransactions", "GetMerchantBalance")
+DEFAULT_MIX = "ProcessPayment=40,ConfirmPayment=20,GetTransactionStatus=20,ListTransactions=10,GetMerchantBalance=10"
+
+# Paiements créés gardés pour ConfirmPayment et GetTransactionStatus
+KNOWN_PAYMENTS_LIMIT = 10000
+
+
+@dataclass(frozen=True)
+class MerchantCredentials:
+    merchant_id: str
+    api_key: str
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """"ProcessPayment=40,GetMerchantBalance=10" -> poids par RPC."""
+    mix = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, weight = item.partition("=")
+        if name not in RPC_NAMES:
+            raise ValueError(f"Unknown RPC in mix: {name} (expected one of {', '.join(RPC_NAMES)})")
+        mix[name] = float(weight or 1)
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("RPC mix must have at least one positive weight")
+    return mix
+
+
+def parse_levels(text: Optional[str], cast) -> List:
+    return [cast(level) for level in text.split(",") if level.strip()] if text else []
+
+
+class Workload:
+    """Construit les requêtes du mélange et garde les paiements créés.
+
+    ConfirmPayment consomme un paiement créé et encore en attente ;
+    GetTransactionStatus en relit un au hasard. Faute de paiement disponible,
+    ces RPC sont remplacées par un ProcessPayment (compté comme tel).
+    """
+
+    def __init__(self, stubs: List[PaymentServiceStub], merchants: List[MerchantCredentials], mix: Dict[str, float],
+                 currency: str = "USD", timeout: float = 5.0, idempotency_keys: bool = True, seed: int = 1):
+        self.stubs = stubs
+        self.merchants = merchants
+        self.currency = currency
+        self.timeout = timeout
+        self.idempotency_keys = idempotency_keys
+        self._rng = random.Random(seed)
+        self._names = list(mix)
+        self._weights = [mix[name] for name in self._names]
+        self._pending: Deque[Tuple[MerchantCredentials, str, int]] = deque(maxlen=KNOWN_PAYMENTS_LIMIT)
+        self._known: List[Tuple[MerchantCredentials, str]] = []
+        self._sequence = 0
+        self._next_stub = 0
+
+    def choose(self) -> str:
+        return self._rng.choices(self._names, self._weights)[0]
+
+    def _remember(self, merchant: MerchantCredentials, transaction_id: str, amount_minor: int) -> None:
+        self._pending.append((merchant, transaction_id, amount_minor))
+        if len(self._known) < KNOWN_PAYMENTS_LIMIT:
+            self._known.append((merchant, transaction_id))
+        else:
+            self._known[self._rng.randrange(KNOWN_PAYMENTS_LIMIT)] = (merchant, transaction_id)
+
+    async def _invoke(self, rpc: str, request, merchant: MerchantCredentials):
+        # Un stub par canal : les RPC se répartissent à tour de rôle sur les connexions
+        stub = self.stubs[self._next_stub]
+        self._next_stub = (self._next_stub + 1) % len(self.stubs)
+        return await getattr(stub, rpc)(request, timeout=self.timeout, metadata=(("x-api-key", merchant.api_key),))
+
+    async def _process_payment(self):
+        merchant = self._rng.choice(self.merchants)
+        self._sequence += 1
+        amount_minor = self._rng.randint(100, 100000)
+        request = PaymentRequest(
+            merchant_id=merchant.merchant_id,
+            api_key=merchant.api_key,
+            payment_method="PAYPAL",
+            amount=PaymentAmount(amount=amount_minor / 100, currency=self.currency, amount_minor=amount_minor),
+            order_id=f"bench-{self._sequence}",
+            metadata={"description": "Load test payment"},
+            return_url="https://benchmark.invalid/return",
+            idempotency_key=uuid.uuid4().hex if self.idempotency_keys else "",
+        )
+        response = await self._invoke("ProcessPayment", request, merchant)
+        if response.transaction_id:
+            self._remember(merchant, response.transaction_id, amount_minor)
+        return response.status
+
+    async def _confirm_payment(self, merchant: MerchantCredentials, transaction_id: str, amount_minor: int):
+        request = ConfirmPaymentRequest(
+            merchant_id=merchant.merchant_id,
+            api_key=merchant.api_key,
+            transaction_id=transaction_id,
+            amount=PaymentAmount(amount=amount_minor / 100, currency=self.currency, amount_minor=amount_minor),
+            metadata={"payer_id": "BENCHMARK-PAYER"},
+        )
+        return (await self._invoke("ConfirmPayment", request, merchant)).status
+
+    async def call(self, name: str) -> Tuple[str, str, Optional[str]]:
+        """Exécute une RPC du mélange.
+
+        Retourne la RPC réellement appelée, le code gRPC et, pour ProcessPayment
+        et ConfirmPayment, le statut du paiement (un refus du fournisseur
+        n'est pas une erreur gRPC).
+        """
+        status = None
+        if name == "ConfirmPayment" and not self._pending:
+            name = "ProcessPayment"
+        if name == "GetTransactionStatus" and not self._known:
+            name = "ProcessPayment"
+        try:
+            if name == "ProcessPayment":
+                status = await self._process_payment()
+            elif name == "ConfirmPayment":
+                status = await self._confirm_payment(*self._pending.popleft())
+            elif name == "GetTransactionStatus":
+                merchant, transaction_id = self._rng.choice(self._known)
+                request = TransactionStatusRequest(merchant_id=merchant.merchant_id, transaction_id=transaction_id)
+                await self._invoke("GetTransactionStatus", request, merchant)
+            elif name == "ListTransactions":
+                merchant = self._rng.choice(self.merchants)
+                request = ListTransactionsRequest(merchant_id=merchant.merchant_id, page_size=20)
+                await self._invoke("ListTransactions", request, merchant)
+            else:
+                merchant = self._rng.choice(self.merchants)
+                request = MerchantBalanceRequest(merchant_id=merchant.merchant_id, currency=self.currency)
+                await self._invoke("GetMerchantBalance", request, merchant)
+        except grpc.aio.AioRpcError as e:
+            return name, e.code().name, None
+        return name, "OK", status
+
+
+class RunStats:
+    """Mesures d'un niveau : latences (µs) et codes de retour, au total et par RPC."""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.rpc_latency: Dict[str, LatencyHistogram] = {}
+        self.codes: Counter = Counter()
+        self.rpc_codes: Dict[str, Counter] = {}
+        self.payment_statuses: Dict[str, Counter] = {}
+        self.dropped = 0
+
+    def record(self, name: str, code: str, status: Optional[str], seconds: float) -> None:
+        micros = seconds * 1e6
+        self.latency.record(micros)
+        histogram = self.rpc_latency.get(name)
+        if histogram is None:
+            histogram = self.rpc_latency[name] = LatencyHistogram()
+            self.rpc_codes[name] = Counter()
+        histogram.record(micros)
+        self.codes[code] += 1
+        self.rpc_codes[name][code] += 1
+        if status is not None:
+            self.payment_statuses.setdefault(name, Counter())[status] += 1
+
+    def report(self, elapsed: float) -> dict:
+        completed = self.latency.total_count
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "requests": completed,
+            "errors": completed - self.codes["OK"],
+            "dropped": self.dropped,
+            "throughput_rps": round(completed / elapsed, 2) if elapsed else 0.0,
+            "ok_rps": round(self.codes["OK"] / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": self.latency.summary_ms(),
+            "codes": dict(self.codes),
+            "rpcs": {
+                name: {
+                    "requests": histogram.total_count,
+                    "codes": dict(self.rpc_codes[name]),
+                    **({"payment_statuses": dict(self.payment_statuses[name])} if name in self.payment_statuses else {}),
+                    "latency_ms": histogram.summary_ms(),
+                }
+                for name, histogram in sorted(self.rpc_latency.items())
+            },
+        }
+
+
+async def run_closed_loop(workload: Workload, concurrency: int, duration: float) -> Tuple[RunStats, float]:
+    """concurrency clients qui enchaînent chacun leurs RPC pendant duration secondes."""
+    loop = asyncio.get_running_loop()
+    stats = RunStats()
+    started = loop.time()
+    stop_at = started + duration
+
+    async def client():
+        while loop.time() < stop_at:
+            name = workload.choose()
+            begin = loop.time()
+            name, code, status = await workload.call(name)
+            stats.record(name, code, status, loop.time() - begin)
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return stats, loop.time() - started
+
+
+async def run_open_loop(workload: Workload, rate: float, duration: float, arrival: str = "poisson",
+                        max_outstanding: int = 10000, seed: int = 1) -> Tuple[RunStats, float]:
+    """RPC lancées à rate par seconde pendant duration secondes, sans attendre les réponses.
+
+    La latence part de l'instant d'arrivée prévu et non de l'envoi effectif :
+    un générateur ou un serveur en retard allonge la latence mesurée au lieu
+    de ralentir les arrivées (omission coordonnée). Au-delà de max_outstanding
+    RPC en cours, les arrivées sont abandonnées et comptées dans dropped.
+    """
+    loop = asyncio.get_running_loop()
+    rng = random.Random(seed)
+    stats = RunStats()
+    outstanding = set()
+
+    async def one(scheduled: float):
+        name, code, status = await workload.call(workload.choose())
+        stats.record(name, code, status, loop.time() - scheduled)
+
+    started = next_arrival = loop.time()
+    stop_at = started + duration
+    while True:
+        next_arrival += rng.expovariate(rate) if arrival == "poisson" else 1 / rate
+        if next_arrival >= stop_at:
+            break
+        delay = next_arrival - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(outstanding) >= max_outstanding:
+            stats.dropped += 1
+            continue
+        task = loop.create_task(one(next_arrival))
+        outstanding.add(task)
+        task.add_done_callback(outstanding.discard)
+    if outstanding:
+        await asyncio.gather(*outstanding)
+    return stats, loop.time() - started
+
+
+class LocalServer:
+    """Serveur du banc d'essai (stub_server) dans un sous-processus, sur une base SQLite temporaire.
+
+    Le serveur tourne dans son propre processus pour que le générateur ne lui
+    dispute pas le GIL. Le fournisseur est toujours "simulated" (latence
+    provider_latency, graine provider_seed) ; environment complète (et peut
+    remplacer) la configuration par défaut du banc d'essai.
+    """
+
+    def __init__(self, mode: str, merchants: int = 4, provider_latency: str = "lognormal:20:0.5",
+                 provider_seed: int = 0, environment: Optional[Dict[str, str]] = None,
+                 startup_timeout: float = 60.0):
+        self.mode = mode
+        self.merchants = merchants
+        self.provider_latency = provider_latency
+        self.provider_seed = provider_seed
+        self.environment = environment or {}
+        self.startup_timeout = startup_timeout
+        self.address: Optional[str] = None
+        self.credentials: List[MerchantCredentials] = []
+        self._directory: Optional[str] = None
+        self._process: Optional[subprocess.Popen] = None
+        self._log = None
+
+    @staticmethod
+    def _free_port() -> int:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+            probe.bind(("127.0.0.1", 0))
+            return probe.getsockname()[1]
+
+    def _log_tail(self, lines: int = 30) -> str:
+        self._log.flush()
+        with open(self._log.name, encoding="utf-8", errors="replace") as log_file:
+            return "".join(log_file.readlines()[-lines:])
+
+    def start(self) -> "LocalServer":
+        self._directory = tempfile.mkdtemp(prefix="payment-benchmark-")
+        port = self._free_port()
+        credentials_path = os.path.join(self._directory, "credentials.json")
+        # PAYMENT_PROVIDER forcé : un environnement réglé pour PayPal ne doit pas faire sortir le banc d'essai
+        environment = dict(
+            os.environ,
+            DATABASE_URI=f"sqlite:///{os.path.join(self._directory, 'benchmark.db')}",
+            PAYMENT_PROVIDER="simulated",
+            SIMULATED_PROVIDER_LATENCY=self.provider_latency,
+            SIMULATED_PROVIDER_SEED=str(self.provider_seed),
+        )
+        environment.update(self.environment)
+        self._log = open(os.path.join(self._directory, "server.log"), "w+", encoding="utf-8")
+        self._process = subprocess.Popen(
+            [sys.executable, "-m", "app.benchmark.stub_server", "--mode", self.mode, "--port", str(port),
+             "--merchants", str(self.merchants), "--credentials", credentials_path],
+            env=environment, stdout=self._log, stderr=subprocess.STDOUT,
+        )
+        self.address = f"127.0.0.1:{port}"
+        deadline = time.monotonic() + self.startup_timeout
+        while not os.path.exists(credentials_path):
+            if self._process.poll() is not None:
+                raise RuntimeError(f"Benchmark server exited during startup:\n{self._log_tail()}")
+            if time.monotonic() > deadline:
+                self.stop()
+                raise RuntimeError("Benchmark server did not start in time")
+            time.sleep(0.1)
+        with open(credentials_path, encoding="utf-8") as credentials_file:
+            self.credentials = [MerchantCredentials(**item) for item in json.load(credentials_file)]
+        with grpc.insecure_channel(self.address) as channel:
+            grpc.channel_ready_future(channel).result(timeout=max(1.0, deadline - time.monotonic()))
+        return self
+
+    def stop(self) -> None:
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+        if self._log is not None:
+            self._log.close()
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+
+    def __enter__(self) -> "LocalServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        self.stop()
+        return False
+
+
+def _progress(message: str) -> None:
+    print(message, file=sys.stderr, flush=True)
+
+
+async def run_sweep(address: str, merchants: List[MerchantCredentials], args) -> List[dict]:
+    """Chauffe puis mesure chaque niveau (clients simultanés ou débit) ; un rapport par niveau."""
+    levels = ([("closed", level) for level in parse_levels(args.concurrency, int)]
+              + [("open", level) for level in parse_levels(args.rate, float)])
+    runs = []
+    channels = [grpc.aio.insecure_channel(address) for _ in range(args.channels)]
+    try:
+        workload = Workload([PaymentServiceStub(channel) for channel in channels], merchants, parse_mix(args.mix),
+                            args.currency, args.timeout, not args.no_idempotency_keys, args.seed)
+        for load, level in levels:
+            if args.warmup > 0:
+                _progress(f"  {load}-loop {level}: warm-up {args.warmup:g}s")
+                await _run_level(workload, load, level, args.warmup, args)
+            _progress(f"  {load}-loop {level}: measuring {args.duration:g}s")
+            stats, elapsed = await _run_level(workload, load, level, args.duration, args)
+            report = stats.report(elapsed)
+            runs.append(dict({"load": load, "concurrency" if load == "closed" else "rate": level}, **report))
+            _progress(f"    {report['throughput_rps']} rps, p50 {report['latency_ms']['p50']} ms, "
+                      f"p99 {report['latency_ms']['p99']} ms, errors {report['errors']}")
+    finally:
+        for channel in channels:
+            await channel.close()
+    return runs
+
+
+async def _run_level(workload: Workload, load: str, level, duration: float, args) -> Tuple[RunStats, float]:
+    if load == "closed":
+        return await run_closed_loop(workload, level, duration)
+    return await run_open_loop(workload, level, duration, args.arrival, args.max_outstanding, args.seed)
+
+
+def _run_key(result: dict, run: dict) -> Tuple:
+    return result.get("server_mode"), run["load"], run.get("concurrency", run.get("rate"))
+
+
+def compare_with_baseline(report: dict, baseline: dict, tolerance: float) -> List[dict]:
+    """Niveaux dont le p99 a augmenté ou le débit baissé de plus de tolerance (fraction) par rapport à baseline."""
+    previous = {_run_key(result, run): run for result in baseline.get("results", []) for run in result["runs"]}
+    regressions = []
+    for result in report["results"]:
+        for run in result["runs"]:
+            before = previous.get(_run_key(result, run))
+            if before is None:
+                continue
+            checks = (
+                ("latency_ms.p99", before["latency_ms"]["p99"], run["latency_ms"]["p99"], 1),
+                ("throughput_rps", before["throughput_rps"], run["throughput_rps"], -1),
+            )
+            for metric, old, new, worse in checks:
+                if old and (new - old) / old * worse > tolerance:
+                    regressions.append({
+                        "server_mode": result.get("server_mode"), "load": run["load"],
+                        "level": run.get("concurrency", run.get("rate")),
+                        "metric": metric, "baseline": old, "current": new,
+                    })
+    return regressions
+
+
+def _server_environment(pairs: List[str]) -> Dict[str, str]:
+    environment = {}
+    for pair in pairs:
+        key, separator, value = pair.partition("=")
+        if not separator:
+            raise ValueError(f"Expected KEY=VALUE, got {pair!r}")
+        environment[key] = value
+    return environment
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc d'essai de charge du service de paiement gRPC")
+    parser.add_argument("--target", help="Adresse host:port d'un serveur existant ; sinon un serveur local est lancé")
+    parser.add_argument("--merchant-id", help="Marchand à utiliser avec --target")
+    parser.add_argument("--api-key", help="Clé API du marchand, avec --target")
+    parser.add_argument("--server-mode", default="sync", help="Modes du serveur local à comparer, ex. sync,async")
+    parser.add_argument("--server-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Configuration du serveur local (répétable), ex. TRANSACTION_WRITE_BEHIND=true")
+    parser.add_argument("--merchants", type=int, default=4, help="Marchands créés sur le serveur local")
+    parser.add_argument("--provider-latency", default="lognormal:20:0.5",
+                        help="Loi de latence (ms) du fournisseur simulé, ex. fixed:20 ou create=pareto:40:2.5,*=fixed:20")
+    parser.add_argument("--provider-seed", type=int, default=0, help="Graine du fournisseur simulé")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Poids des RPC, ex. ProcessPayment=40,GetMerchantBalance=10")
+    parser.add_argument("--concurrency", help="Boucle fermée : clients simultanés par niveau, ex. 1,8,32")
+    parser.add_argument("--rate", help="Boucle ouverte : RPC par seconde par niveau, ex. 100,200")
+    parser.add_argument("--arrival", choices=("poisson", "uniform"), default="poisson")
+    parser.add_argument("--max-outstanding", type=int, default=10000, help="Boucle ouverte : RPC en cours max")
+    parser.add_argument("--duration", type=float, default=10.0, help="Secondes mesurées par niveau")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Secondes de chauffe avant chaque niveau")
+    parser.add_argument("--timeout", type=float, default=5.0, help="Délai de chaque RPC (secondes)")
+    parser.add_argument("--channels", type=int, default=1, help="Canaux gRPC (connexions HTTP/2) du client")
+    parser.add_argument("--currency", default="USD")
+    parser.add_argument("--no-idempotency-keys", action="store_true", help="ProcessPayment sans clé d'idempotence")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Fichier du rapport JSON ; sinon la sortie standard")
+    parser.add_argument("--baseline", help="Rapport JSON précédent à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Dégradation tolérée par rapport à --baseline (0.2 : 20 %%)")
+    args = parser.parse_args(argv)
+    if not args.concurrency and not args.rate:
+        args.concurrency = "8"
+    parse_mix(args.mix)
+    if args.target and not (args.merchant_id and args.api_key):
+        parser.error("--target requires --merchant-id and --api-key")
+
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {
+            "target": args.target, "mix": parse_mix(args.mix), "duration_s": args.duration,
+            "warmup_s": args.warmup, "timeout_s": args.timeout, "channels": args.channels,
+            "arrival": args.arrival, "seed": args.seed,
+            "provider": None if args.target else {"name": "simulated", "latency": args.provider_latency,
+                                                  "seed": args.provider_seed},
+            "server_env": _server_environment(args.server_env),
+        },
+        "results": [],
+    }
+    if args.target:
+        _progress(f"Target {args.target}")
+        merchants = [MerchantCredentials(args.merchant_id, args.api_key)]
+        report["results"].append({"server_mode": None, "runs": asyncio.run(run_sweep(args.target, merchants, args))})
+    else:
+        for mode in parse_levels(args.server_mode, str):
+            _progress(f"Server mode {mode}")
+            with LocalServer(mode, args.merchants, args.provider_latency, args.provider_seed,
+                             _server_environment(args.server_env)) as server:
+                runs = asyncio.run(run_sweep(server.address, server.credentials, args))
+            report["results"].append({"server_mode": mode, "runs": runs})
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            report["regressions"] = compare_with_baseline(report, json.load(baseline_file), args.tolerance)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
+    if report.get("regressions"):
+        _progress(f"{len(report['regressions'])} regression(s) beyond {args.tolerance:.0%} of the baseline")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
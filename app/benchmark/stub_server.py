@@ -0,0 +1,78 @@
+"""Serveur gRPC de banc d'essai, sans accès réseau.
+
+Lancé par le générateur de charge (LocalServer) dans un sous-processus : la
+base est celle de DATABASE_URI, le fournisseur est "simulated" (réglé par les
+variables SIMULATED_PROVIDER_*), et les marchands du banc d'essai sont créés
+au démarrage puis écrits, avec leurs clés API, dans le fichier --credentials.
+"""
+import argparse
+import asyncio
+import json
+import os
+import uuid
+
+# Fonctions annexes coupées : seules les RPC sont mesurées. La configuration est lue
+# à l'import de app.config, d'où les imports de l'application dans les fonctions
+BENCHMARK_ENVIRONMENT = {
+    "PAYMENT_PROVIDER": "simulated",
+    "RATE_LIMIT_ENABLED": "false",
+    "RECONCILE_ENABLED": "false",
+    "WEBHOOKS_ENABLED": "false",
+    "PAYPAL_WEBHOOK_PORT": "0",
+    "LOG_LEVEL": "WARNING",
+}
+
+
+def seed_merchants(count: int) -> list:
+    """Crée count marchands actifs avec chacun une clé API ; retourne [{merchant_id, api_key}]."""
+    from app.db import SessionLocal
+    from app.services.merchant_service import MerchantService
+    from models.models import Merchant
+
+    merchant_ids = [str(uuid.uuid4()) for _ in range(count)]
+    with SessionLocal() as session:
+        session.add_all([
+            Merchant(id=merchant_id, business_name=f"Benchmark merchant {i}",
+                     email=f"benchmark-{merchant_id}@example.com", status="active")
+            for i, merchant_id in enumerate(merchant_ids)
+        ])
+        session.commit()
+    merchant_service = MerchantService()
+    return [
+        {"merchant_id": merchant_id, "api_key": merchant_service.rotate_credentials(merchant_id).api_key}
+        for merchant_id in merchant_ids
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serveur gRPC de banc d'essai (fournisseur simulé)")
+    parser.add_argument("--mode", choices=("sync", "async"), default="sync")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--merchants", type=int, default=4)
+    parser.add_argument("--credentials", required=True, help="Fichier JSON où écrire les identifiants créés")
+    args = parser.parse_args(argv)
+    for key, value in BENCHMARK_ENVIRONMENT.items():
+        os.environ.setdefault(key, value)
+
+    from app.db import configure_server_mode, init_db
+    from app.grpc_service.grpc_server import serve, serve_async
+    from app.utils.logger import configure_logging
+
+    configure_server_mode(args.mode)
+    configure_logging()
+    init_db()
+    credentials = seed_merchants(args.merchants)
+    # Écriture atomique : le générateur attend que le fichier existe pour le lire
+    partial_path = f"{args.credentials}.partial"
+    with open(partial_path, "w", encoding="utf-8") as credentials_file:
+        json.dump(credentials, credentials_file)
+    os.replace(partial_path, args.credentials)
+
+    if args.mode == "async":
+        asyncio.run(serve_async(port=args.port))
+    else:
+        serve(port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Banc d'essai de l'écriture différée des transactions (TransactionWriter).
+
+Des threads insèrent chacun leur part de transactions, d'abord une par
+commit comme TransactionService sans écriture différée, puis par le
+TransactionWriter ; les commits et le débit de chaque mode sont comparés sur
+une base SQLite temporaire (ou --database).
+
+    python -m app.benchmark.write_behind --threads 20 --transactions 2000
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+from app.db import Base, create_db_engine
+from app.services.transaction_writer import TransactionWriter
+from models.models import PaymentStatus, Transaction
+
+
+def _values(merchant_id: str, index: int) -> dict:
+    return dict(id=str(uuid.uuid4()), merchant_id=merchant_id, amount_minor=1000 + index, currency="USD",
+                status=PaymentStatus.PENDING, provider_transaction_id=f"BENCH-{uuid.uuid4().hex}",
+                created_at=datetime.utcnow())
+
+
+def _run_threads(threads: int, per_thread: int, insert) -> float:
+    """Lance threads threads de per_thread insertions ; retourne la durée totale en secondes."""
+    start = threading.Barrier(threads + 1)
+
+    def worker(thread_index: int) -> None:
+        start.wait()
+        for index in range(per_thread):
+            insert(_values(f"bench-{thread_index}", index))
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def run(database_url: str, threads: int, transactions: int, batch_size: int, interval_ms: float) -> dict:
+    """Mesure les deux modes sur la même base ; retourne commits, durée et débit de chacun."""
+    db_engine = create_db_engine(database_url, pool_size=threads + 1)
+    Base.metadata.create_all(db_engine)
+    session_factory = sessionmaker(bind=db_engine, autoflush=False)
+    commits = [0]
+    event.listen(db_engine, "commit", lambda connection: commits.__setitem__(0, commits[0] + 1))
+    per_thread = max(1, transactions // threads)
+
+    def insert_directly(values: dict) -> None:
+        with session_factory() as session:
+            session.add(Transaction(**values))
+            session.commit()
+
+    report = {"threads": threads, "transactions": per_thread * threads}
+    commits[0] = 0
+    seconds = _run_threads(threads, per_thread, insert_directly)
+    report["direct"] = {"commits": commits[0], "seconds": round(seconds, 3),
+                        "per_second": round(per_thread * threads / seconds, 1)}
+
+    writer = TransactionWriter(session_factory=session_factory, batch_size=batch_size, interval_ms=interval_ms)
+    commits[0] = 0
+    # Durée jusqu'à la validation du dernier lot, pas seulement jusqu'à la mise en file
+    seconds = _run_threads(threads, per_thread, writer.insert)
+    flush_started = time.perf_counter()
+    writer.flush().result()
+    seconds += time.perf_counter() - flush_started
+    writer.close()
+    report["write_behind"] = {"commits": commits[0], "seconds": round(seconds, 3),
+                              "per_second": round(per_thread * threads / seconds, 1)}
+    db_engine.dispose()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Commits et débit des insertions, directes ou différées")
+    parser.add_argument("--database", help="URL SQLAlchemy (par défaut : base SQLite temporaire)")
+    parser.add_argument("--threads", type=int, default=20)
+    parser.add_argument("--transactions", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--interval-ms", type=float, default=20)
+    args = parser.parse_args(argv)
+
+    directory = None if args.database else tempfile.mkdtemp(prefix="write-behind-benchmark-")
+    try:
+        database_url = args.database or f"sqlite:///{os.path.join(directory, 'benchmark.db')}"
+        report = run(database_url, args.threads, args.transactions, args.batch_size, args.interval_ms)
+    finally:
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
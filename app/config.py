@@ -3,7 +3,174 @@ import os
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URI", "sqlite:///payment_system.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Pool de connexions à la base
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "0"))  # 0 : dimensionné sur la concurrence du serveur
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))  # Connexions temporaires au-delà du pool
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # Secondes d'attente max d'une connexion
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Secondes avant de renouveler une connexion
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"  # Détecte les connexions coupées
+    DB_POOL_WAIT_THRESHOLD_MS = float(os.getenv("DB_POOL_WAIT_THRESHOLD_MS", "1"))  # Attente comptée comme contention
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # 0 : pas de limite (PostgreSQL, MySQL)
+    DB_SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("DB_SQLITE_BUSY_TIMEOUT_MS", "5000"))  # Attente d'un verrou SQLite
     PAYPAL_CLIENT_ID = os.getenv("PAYPAL_CLIENT_ID")
     PAYPAL_CLIENT_SECRET = os.getenv("PAYPAL_CLIENT_SECRET")
     PAYPAL_API_BASE_URL = os.getenv("PAYPAL_API_BASE_URL", "https://api.sandbox.paypal.com")
+    PAYPAL_MODE = os.getenv("PAYPAL_MODE", "sandbox")
+    # Pool HTTP du provider PayPal asyncio
+    PAYPAL_HTTP_POOL_SIZE = int(os.getenv("PAYPAL_HTTP_POOL_SIZE", "100"))  # Connexions max au total
+    PAYPAL_HTTP_POOL_SIZE_PER_HOST = int(os.getenv("PAYPAL_HTTP_POOL_SIZE_PER_HOST", "50"))  # Connexions max par hôte
+    PAYPAL_HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("PAYPAL_HTTP_KEEPALIVE_TIMEOUT", "30"))  # Secondes
+    PAYPAL_HTTP_CONNECT_TIMEOUT = float(os.getenv("PAYPAL_HTTP_CONNECT_TIMEOUT", "5"))  # Secondes
+    PAYPAL_HTTP_TIMEOUT = float(os.getenv("PAYPAL_HTTP_TIMEOUT", "30"))  # Secondes, requête complète
+
+    PAYMENT_PROVIDER = os.getenv("PAYMENT_PROVIDER", "paypal")  # 'paypal' (paypalrestsdk), 'paypal_async' (aiohttp) ou 'simulated' (hors ligne)
+    PROVIDER_CONFIGS = {
+        "paypal": {
+            "client_id": PAYPAL_CLIENT_ID,
+            "client_secret": PAYPAL_CLIENT_SECRET,
+            "mode": PAYPAL_MODE,
+            "request_timeout": PAYPAL_HTTP_TIMEOUT,
+        },
+        "paypal_async": {
+            "client_id": PAYPAL_CLIENT_ID,
+            "client_secret": PAYPAL_CLIENT_SECRET,
+            "mode": PAYPAL_MODE,
+            "base_url": os.getenv("PAYPAL_API_BASE_URL"),
+            "pool_size": PAYPAL_HTTP_POOL_SIZE,
+            "pool_size_per_host": PAYPAL_HTTP_POOL_SIZE_PER_HOST,
+            "keepalive_timeout": PAYPAL_HTTP_KEEPALIVE_TIMEOUT,
+            "connect_timeout": PAYPAL_HTTP_CONNECT_TIMEOUT,
+            "request_timeout": PAYPAL_HTTP_TIMEOUT,
+        },
+        # Fournisseur simulé, sans réseau : tests de charge, de capacité et de résilience
+        "simulated": {
+            "seed": int(os.getenv("SIMULATED_PROVIDER_SEED", "0")),  # Même graine : mêmes latences, issues et identifiants
+            "latency": os.getenv("SIMULATED_PROVIDER_LATENCY", "lognormal:50:0.5"),  # ms, ex. "create=pareto:40:2.5,*=fixed:20"
+            "slow_rate": float(os.getenv("SIMULATED_PROVIDER_SLOW_RATE", "0")),  # Part des appels avec un pic de latence
+            "slow_ms": float(os.getenv("SIMULATED_PROVIDER_SLOW_MS", "2000")),  # Durée d'un pic
+            "error_rate": float(os.getenv("SIMULATED_PROVIDER_ERROR_RATE", "0")),  # Erreurs 5xx (réessayables)
+            "timeout_rate": float(os.getenv("SIMULATED_PROVIDER_TIMEOUT_RATE", "0")),  # Appels sans réponse
+            "request_timeout": float(os.getenv("SIMULATED_PROVIDER_TIMEOUT_SECONDS", str(PAYPAL_HTTP_TIMEOUT))),
+            "decline_rate": float(os.getenv("SIMULATED_PROVIDER_DECLINE_RATE", "0")),  # Refus à la création
+            "approval_rate": float(os.getenv("SIMULATED_PROVIDER_APPROVAL_RATE", "1")),  # Paiements approuvés par le payeur
+            "fee_percent": os.getenv("SIMULATED_PROVIDER_FEE_PERCENT", "2.9"),
+            "fee_fixed": os.getenv("SIMULATED_PROVIDER_FEE_FIXED", "0.30"),
+            "fee_rules": os.getenv("SIMULATED_PROVIDER_FEE_RULES", ""),  # Par devise, ex. "EUR=1.4:0.25,JPY=3.6:40"
+            "approval_ttl_seconds": float(os.getenv("SIMULATED_PROVIDER_APPROVAL_TTL_SECONDS", "10800")),
+            "max_payments": int(os.getenv("SIMULATED_PROVIDER_MAX_PAYMENTS", "100000")),  # Paiements gardés en mémoire
+        },
+    }
     ENVIRONMENT = os.getenv("ENVIRONMENT", "test")  # 'test' ou 'production'
+
+    # Idempotence
+    IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))  # Durée de rejeu des réponses
+    IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))  # Entrées max du LRU en mémoire
+
+    # Authentification des marchands
+    GRPC_AUTH_ENABLED = os.getenv("GRPC_AUTH_ENABLED", "true").lower() == "true"
+    CREDENTIAL_CACHE_TTL_SECONDS = float(os.getenv("CREDENTIAL_CACHE_TTL_SECONDS", "300"))  # Clés valides
+    CREDENTIAL_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("CREDENTIAL_CACHE_NEGATIVE_TTL_SECONDS", "30"))  # Clés inconnues
+    CREDENTIAL_CACHE_SIZE = int(os.getenv("CREDENTIAL_CACHE_SIZE", "100000"))
+
+    # Pagination de ListTransactions
+    # Clé HMAC des jetons de page, commune à toutes les instances ; obligatoire en production.
+    # Absente ailleurs : clé aléatoire propre au processus (jetons invalidés au redémarrage)
+    PAGE_TOKEN_SECRET = os.getenv("PAGE_TOKEN_SECRET", "")
+    LIST_TRANSACTIONS_DEFAULT_PAGE_SIZE = int(os.getenv("LIST_TRANSACTIONS_DEFAULT_PAGE_SIZE", "50"))
+    LIST_TRANSACTIONS_MAX_PAGE_SIZE = int(os.getenv("LIST_TRANSACTIONS_MAX_PAGE_SIZE", "500"))
+
+    # Export en flux des transactions
+    EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))  # Lignes lues par aller-retour au curseur
+    EXPORT_MAX_CONCURRENT = int(os.getenv("EXPORT_MAX_CONCURRENT", "2"))  # Exports simultanés par processus
+
+    # RPC par lots
+    BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))  # Éléments max par lot
+    BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "10"))  # Appels provider simultanés pour les lots
+
+    # Soldes marchands
+    BALANCE_SHARD_COUNT = int(os.getenv("BALANCE_SHARD_COUNT", "8"))  # Sous-lignes de solde par (marchand, devise)
+    BALANCE_CACHE_TTL_SECONDS = float(os.getenv("BALANCE_CACHE_TTL_SECONDS", "30"))  # Filet pour les écritures d'autres processus
+    BALANCE_CACHE_SIZE = int(os.getenv("BALANCE_CACHE_SIZE", "10000"))  # Réponses de solde max en cache
+
+    # Écriture différée des transactions
+    TRANSACTION_WRITE_BEHIND = os.getenv("TRANSACTION_WRITE_BEHIND", "false").lower() == "true"
+    TRANSACTION_WRITE_BEHIND_BATCH_SIZE = int(os.getenv("TRANSACTION_WRITE_BEHIND_BATCH_SIZE", "500"))  # Opérations max par commit
+    TRANSACTION_WRITE_BEHIND_INTERVAL_MS = float(os.getenv("TRANSACTION_WRITE_BEHIND_INTERVAL_MS", "20"))  # Délai max avant écriture
+    TRANSACTION_WRITE_BEHIND_MAX_PENDING = int(os.getenv("TRANSACTION_WRITE_BEHIND_MAX_PENDING", "10000"))  # Taille de la file
+
+    # Notifications webhook des marchands
+    WEBHOOKS_ENABLED = os.getenv("WEBHOOKS_ENABLED", "true").lower() == "true"
+    WEBHOOK_MAX_PENDING = int(os.getenv("WEBHOOK_MAX_PENDING", "10000"))  # Notifications en attente max (au-delà : dead letter)
+    WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "100"))  # Connexions HTTP max au total
+    WEBHOOK_MAX_CONCURRENCY_PER_HOST = int(os.getenv("WEBHOOK_MAX_CONCURRENCY_PER_HOST", "4"))  # Envois simultanés par destination
+    WEBHOOK_TIMEOUT = float(os.getenv("WEBHOOK_TIMEOUT", "10"))  # Secondes par tentative
+    WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "8"))
+    WEBHOOK_BACKOFF_BASE = float(os.getenv("WEBHOOK_BACKOFF_BASE", "1"))  # Secondes avant la 2e tentative
+    WEBHOOK_BACKOFF_MAX = float(os.getenv("WEBHOOK_BACKOFF_MAX", "300"))  # Délai max entre deux tentatives
+    WEBHOOK_SIGNING_SECRET = os.getenv("WEBHOOK_SIGNING_SECRET", "")  # Signature HMAC-SHA256 du corps si renseigné
+
+    # Webhooks PayPal entrants
+    PAYPAL_WEBHOOK_ID = os.getenv("PAYPAL_WEBHOOK_ID", "")  # Identifiant du webhook configuré chez PayPal
+    PAYPAL_WEBHOOK_PORT = int(os.getenv("PAYPAL_WEBHOOK_PORT", "0"))  # Port HTTP du récepteur ; 0 : désactivé
+    PAYPAL_WEBHOOK_CERT_CACHE_TTL = float(os.getenv("PAYPAL_WEBHOOK_CERT_CACHE_TTL", "86400"))  # Secondes
+    TRANSACTION_STATUS_FROM_DB = os.getenv("TRANSACTION_STATUS_FROM_DB", "true").lower() == "true"  # GetTransactionStatus depuis la base : statuts définitifs, ou tous avec le récepteur de webhooks
+
+    # Réconciliation des paiements en attente
+    RECONCILE_ENABLED = os.getenv("RECONCILE_ENABLED", "true").lower() == "true"
+    RECONCILE_INTERVAL_SECONDS = float(os.getenv("RECONCILE_INTERVAL_SECONDS", "30"))  # Pause quand rien n'est dû
+    RECONCILE_BATCH_SIZE = int(os.getenv("RECONCILE_BATCH_SIZE", "200"))  # Transactions par lot (un commit par lot)
+    RECONCILE_CONCURRENCY = int(os.getenv("RECONCILE_CONCURRENCY", "8"))  # Appels provider simultanés
+    RECONCILE_RATE_PER_SECOND = float(os.getenv("RECONCILE_RATE_PER_SECOND", "10"))  # Appels provider max par seconde
+    RECONCILE_FIRST_DELAY_SECONDS = float(os.getenv("RECONCILE_FIRST_DELAY_SECONDS", "300"))  # Après la création
+    RECONCILE_AGE_FACTOR = float(os.getenv("RECONCILE_AGE_FACTOR", "0.5"))  # Délai suivant = âge x facteur
+    RECONCILE_MAX_DELAY_SECONDS = float(os.getenv("RECONCILE_MAX_DELAY_SECONDS", "21600"))  # Délai max entre deux vérifications
+
+    # Protection contre les pannes fournisseur (par fournisseur)
+    PROVIDER_MAX_CONCURRENCY = int(os.getenv("PROVIDER_MAX_CONCURRENCY", "0")) or None  # Appels simultanés max (bulkhead) ; par défaut selon le mode du serveur
+    PROVIDER_BULKHEAD_WAIT_SECONDS = float(os.getenv("PROVIDER_BULKHEAD_WAIT_SECONDS", "0"))  # Attente d'une place ; 0 : échec immédiat
+    CIRCUIT_WINDOW_SIZE = int(os.getenv("CIRCUIT_WINDOW_SIZE", "50"))  # Derniers appels observés
+    CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "20"))  # Appels minimum avant de pouvoir ouvrir le circuit
+    CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))  # Taux d'échecs qui ouvre le circuit
+    CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "5"))  # Au-delà, un appel est lent
+    CIRCUIT_SLOW_CALL_RATE = float(os.getenv("CIRCUIT_SLOW_CALL_RATE", "0.8"))  # Taux d'appels lents qui ouvre le circuit
+    CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))  # Durée d'ouverture avant les appels d'essai
+    CIRCUIT_HALF_OPEN_CALLS = int(os.getenv("CIRCUIT_HALF_OPEN_CALLS", "3"))  # Appels d'essai réussis pour refermer
+
+    # Délais des RPC
+    PROVIDER_MIN_BUDGET_SECONDS = float(os.getenv("PROVIDER_MIN_BUDGET_SECONDS", "0.5"))  # Latence attendue d'un appel fournisseur
+    DB_MIN_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_MIN_STATEMENT_TIMEOUT_MS", "50"))  # Plancher du timeout SQL tiré du délai
+
+    # Limitation de débit par marchand et par RPC (surchargeable par Merchant.settings["rate_limits"])
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_DEFAULT_RATE = float(os.getenv("RATE_LIMIT_DEFAULT_RATE", "50"))  # RPC par seconde ; 0 : illimité
+    RATE_LIMIT_DEFAULT_BURST = float(os.getenv("RATE_LIMIT_DEFAULT_BURST", "100"))  # Rafale max
+    RATE_LIMIT_SHARDS = int(os.getenv("RATE_LIMIT_SHARDS", "64"))  # Verrous indépendants de la table des seaux
+    RATE_LIMIT_IDLE_SECONDS = float(os.getenv("RATE_LIMIT_IDLE_SECONDS", "300"))  # Seau inutilisé supprimé au-delà
+    RATE_LIMIT_SETTINGS_TTL_SECONDS = float(os.getenv("RATE_LIMIT_SETTINGS_TTL_SECONDS", "60"))  # Cache des réglages marchand
+    RATE_LIMIT_SETTINGS_CACHE_SIZE = int(os.getenv("RATE_LIMIT_SETTINGS_CACHE_SIZE", "100000"))
+
+    # Métriques (format Prometheus)
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # Port HTTP de /metrics ; 0 : désactivé
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")  # Interface d'écoute (locale par défaut)
+
+    # Traces (spans par étape des RPC, exportés en OTLP/JSON)
+    TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+    TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))  # Part des RPC tracées sans décision de l'appelant
+    TRACING_EXPORT_PATH = os.getenv("TRACING_EXPORT_PATH", "")  # Fichier (une ligne OTLP/JSON par lot)
+    TRACING_OTLP_ENDPOINT = os.getenv("TRACING_OTLP_ENDPOINT", "")  # Collecteur OTLP/HTTP (ex. http://localhost:4318)
+    TRACING_BATCH_SIZE = int(os.getenv("TRACING_BATCH_SIZE", "512"))  # Spans par export
+    TRACING_EXPORT_INTERVAL_SECONDS = float(os.getenv("TRACING_EXPORT_INTERVAL_SECONDS", "2"))
+    TRACING_MAX_QUEUE_SIZE = int(os.getenv("TRACING_MAX_QUEUE_SIZE", "20000"))  # Au-delà, les spans sont perdus
+    TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "payment-service")
+
+    # Journalisation (JSON, écrite par un thread dédié)
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FILE = os.getenv("LOG_FILE", "")  # Fichier des journaux ; vide : stderr
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # Au-delà, les enregistrements sont perdus
+    LOG_SUCCESS_SAMPLE_RATE = float(os.getenv("LOG_SUCCESS_SAMPLE_RATE", "0.1"))  # Part des succès journalisés
+
+    # Serveur gRPC
+    GRPC_PORT = int(os.getenv("GRPC_PORT", "50051"))
+    GRPC_SERVER_MODE = os.getenv("GRPC_SERVER_MODE", "sync")  # 'sync' (threads) ou 'async' (grpc.aio)
+    GRPC_MAX_WORKERS = int(os.getenv("GRPC_MAX_WORKERS", "10"))  # Taille du pool en mode 'sync'
+    GRPC_MAX_CONCURRENT_RPCS = int(os.getenv("GRPC_MAX_CONCURRENT_RPCS", "0")) or None  # Limite en mode 'async'
@@ -1,11 +1,358 @@
+import threading
+import time
+from typing import Optional
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.config import Config
+from app.utils.deadline import remaining_time
+from app.utils.metrics import DB_SESSION_SECONDS
+from app.utils.tracing import current_span, record_span
 
 Base = declarative_base()
-engine = create_engine(Config.SQLALCHEMY_DATABASE_URI)
+
+
+class PoolStats:
+    """Temps d'attente cumulés des emprunts de connexions au pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.waited = 0  # Emprunts ayant attendu plus de DB_POOL_WAIT_THRESHOLD_MS
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+
+    def record(self, wait_seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+            if wait_seconds * 1000 >= Config.DB_POOL_WAIT_THRESHOLD_MS:
+                self.waited += 1
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "waited": self.waited,
+                "timeouts": self.timeouts,
+                "total_wait_seconds": self.total_wait_seconds,
+                "max_wait_seconds": self.max_wait_seconds,
+            }
+
+
+class _CheckoutTimingMixin:
+    """Mesure le temps passé à attendre une connexion libre.
+
+    Le temps d'ouverture d'une nouvelle connexion est exclu : seule l'attente
+    due à un pool épuisé est comptée.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+        self._connect_time = threading.local()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            self._connect_time.seconds = time.perf_counter() - started
+
+    def _do_get(self):
+        self._connect_time.seconds = 0.0
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            self.stats.record(time.perf_counter() - started - self._connect_time.seconds, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - started - self._connect_time.seconds)
+        return connection
+
+
+class InstrumentedQueuePool(_CheckoutTimingMixin, QueuePool):
+    """QueuePool du moteur synchrone, avec mesure des attentes."""
+
+
+class InstrumentedAsyncQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    """Pool du moteur asyncio, avec mesure des attentes."""
+
+
+# Clés de Session.info : début de la transaction de session en cours (perf_counter, et time_ns si tracée)
+_SESSION_STARTED_AT = "metrics_started_at"
+_SESSION_TRACE_STARTED_NS = "trace_started_ns"
+
+
+@event.listens_for(Session, "after_begin")
+def _session_transaction_started(session, transaction, connection) -> None:
+    # Une fois par connexion liée : seul le premier début compte
+    session.info.setdefault(_SESSION_STARTED_AT, time.perf_counter())
+    if current_span() is not None:
+        session.info.setdefault(_SESSION_TRACE_STARTED_NS, time.time_ns())
+
+
+def _session_transaction_finished(session, outcome: str) -> None:
+    started = session.info.pop(_SESSION_STARTED_AT, None)
+    if started is not None:
+        DB_SESSION_SECONDS.observe(time.perf_counter() - started, outcome)
+    trace_started_ns = session.info.pop(_SESSION_TRACE_STARTED_NS, None)
+    if trace_started_ns is not None:
+        record_span("db.session", trace_started_ns, attributes={"db.outcome": outcome})
+
+
+@event.listens_for(Session, "after_commit")
+def _session_transaction_committed(session) -> None:
+    _session_transaction_finished(session, "commit")
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _session_transaction_ended(session, transaction) -> None:
+    """Transaction de session terminée sans commit (rollback, close) : durée comptée en rollback."""
+    if transaction.parent is None:
+        _session_transaction_finished(session, "rollback")
+
+
+def _statement_summary(statement: str) -> str:
+    return " ".join(statement.split())[:200]
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _trace_statement_started(conn, cursor, statement, parameters, context, executemany) -> None:
+    # Requête d'une RPC tracée : le début est noté sur son contexte d'exécution
+    if context is not None and current_span() is not None:
+        context.trace_started_ns = time.time_ns()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _trace_statement_ended(conn, cursor, statement, parameters, context, executemany) -> None:
+    started_ns = getattr(context, "trace_started_ns", None)
+    if started_ns is not None:
+        record_span("db.query", started_ns, attributes={"db.statement": _statement_summary(statement)})
+
+
+@event.listens_for(Engine, "handle_error")
+def _trace_statement_failed(exception_context) -> None:
+    started_ns = getattr(exception_context.execution_context, "trace_started_ns", None)
+    if started_ns is not None:
+        record_span("db.query", started_ns, error=type(exception_context.original_exception).__name__,
+                    attributes={"db.statement": _statement_summary(exception_context.statement or "")})
+
+
+# Mode du serveur gRPC de ce processus : GRPC_SERVER_MODE, ou --mode via configure_server_mode()
+_server_mode = Config.GRPC_SERVER_MODE
+
+
+# Pool du mode 'async' quand GRPC_MAX_CONCURRENT_RPCS ne borne pas les RPC (DB_POOL_SIZE pour l'ajuster)
+ASYNC_UNBOUNDED_POOL_SIZE = 50
+
+
+def server_concurrency() -> int:
+    """RPC et éléments de lots que le serveur de ce processus peut traiter en même temps.
+
+    En mode 'sync', un par worker gRPC et par worker des RPC par lots ; en
+    mode 'async', un par RPC en cours (au plus GRPC_MAX_CONCURRENT_RPCS) et
+    par élément d'un lot traité en parallèle.
+    """
+    if _server_mode == "async":
+        return (Config.GRPC_MAX_CONCURRENT_RPCS or ASYNC_UNBOUNDED_POOL_SIZE) + Config.BATCH_MAX_CONCURRENCY
+    return Config.GRPC_MAX_WORKERS + Config.BATCH_MAX_CONCURRENCY
+
+
+def default_pool_size() -> int:
+    """Connexions nécessaires pour qu'aucune RPC du serveur n'attende le pool.
+
+    Chaque RPC ou élément de lot en cours (server_concurrency) peut tenir une
+    connexion, les accès asyncio passant par AsyncSession et non par des
+    threads ; les exports en flux gardent la leur tout du long.
+    """
+    return server_concurrency() + Config.EXPORT_MAX_CONCURRENT
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """WAL : les lectures ne bloquent plus l'écrivain ; busy_timeout plutôt qu'un échec immédiat."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(Config.DB_SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def _deadline_statement_timeout_ms():
+    """Timeout SQL tiré du délai restant de la RPC courante (None hors RPC ou sans délai)."""
+    remaining = remaining_time()
+    if remaining is None:
+        return None
+    timeout_ms = max(int(remaining * 1000), Config.DB_MIN_STATEMENT_TIMEOUT_MS)
+    if Config.DB_STATEMENT_TIMEOUT_MS:
+        timeout_ms = min(timeout_ms, Config.DB_STATEMENT_TIMEOUT_MS)
+    return timeout_ms
+
+
+def _set_postgresql_statement_deadline(connection) -> None:
+    """Borne les requêtes de la transaction qui commence au délai restant de la RPC."""
+    timeout_ms = _deadline_statement_timeout_ms()
+    if timeout_ms is not None:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
+
+
+def _sqlite_deadline_exceeded() -> int:
+    # Une valeur non nulle interrompt la requête SQLite en cours ("interrupted")
+    remaining = remaining_time()
+    return 1 if remaining is not None and remaining * 1000 < -Config.DB_MIN_STATEMENT_TIMEOUT_MS else 0
+
+
+def _set_sqlite_deadline_handler(dbapi_connection, connection_record) -> None:
+    """SQLite n'a pas de statement_timeout : un progress handler vérifie le délai de la RPC."""
+    dbapi_connection.set_progress_handler(_sqlite_deadline_exceeded, 10000)
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def _pool_options(url, pool_size: int) -> dict:
+    """Réglages du pool et du timeout des requêtes, communs aux moteurs synchrone et asyncio."""
+    options = dict(
+        pool_size=pool_size or Config.DB_POOL_SIZE or default_pool_size(),
+        max_overflow=Config.DB_MAX_OVERFLOW,
+        pool_timeout=Config.DB_POOL_TIMEOUT,
+        pool_recycle=Config.DB_POOL_RECYCLE,
+        pool_pre_ping=Config.DB_POOL_PRE_PING,
+    )
+    backend, driver = url.get_backend_name(), url.get_driver_name()
+    if Config.DB_STATEMENT_TIMEOUT_MS:
+        if backend == "postgresql" and driver == "asyncpg":
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(Config.DB_STATEMENT_TIMEOUT_MS)}}
+        elif backend == "postgresql":
+            options["connect_args"] = {"options": f"-c statement_timeout={int(Config.DB_STATEMENT_TIMEOUT_MS)}"}
+        elif backend == "mysql":
+            options["connect_args"] = {
+                "init_command": f"SET SESSION max_execution_time={int(Config.DB_STATEMENT_TIMEOUT_MS)}"
+            }
+    return options
+
+
+def create_db_engine(url: str = Config.SQLALCHEMY_DATABASE_URI, pool_size: int = 0) -> Engine:
+    """Crée le moteur SQLAlchemy avec un pool dimensionné sur la concurrence du serveur."""
+    database_url = make_url(url)
+    if _is_memory_sqlite(database_url):
+        # Base en mémoire : une seule connexion partagée, pas de pool à régler
+        return create_engine(url)
+
+    db_engine = create_engine(url, poolclass=InstrumentedQueuePool, **_pool_options(database_url, pool_size))
+    if database_url.get_backend_name() == "sqlite":
+        event.listen(db_engine, "connect", _set_sqlite_pragmas)
+        event.listen(db_engine, "connect", _set_sqlite_deadline_handler)
+    elif database_url.get_backend_name() == "postgresql":
+        event.listen(db_engine, "begin", _set_postgresql_statement_deadline)
+    return db_engine
+
+
+# Pilotes asyncio utilisés à la place des pilotes synchrones de DATABASE_URI
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+    "mysql": "aiomysql",
+}
+
+
+def async_database_url(url: str):
+    """Même base que url, avec le pilote asyncio correspondant (sqlite -> sqlite+aiosqlite)."""
+    database_url = make_url(url)
+    backend = database_url.get_backend_name()
+    if backend not in ASYNC_DRIVERS or database_url.get_driver_name() == ASYNC_DRIVERS[backend]:
+        return database_url
+    return database_url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def create_async_db_engine(url: str = Config.SQLALCHEMY_DATABASE_URI, pool_size: int = 0) -> AsyncEngine:
+    """Crée le moteur asyncio (AsyncEngine) de la même base que le moteur synchrone."""
+    database_url = async_database_url(url)
+    if _is_memory_sqlite(database_url):
+        return create_async_engine(database_url)
+
+    db_engine = create_async_engine(
+        database_url, poolclass=InstrumentedAsyncQueuePool, **_pool_options(database_url, pool_size)
+    )
+    if database_url.get_backend_name() == "sqlite":
+        event.listen(db_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    elif database_url.get_backend_name() == "postgresql":
+        event.listen(db_engine.sync_engine, "begin", _set_postgresql_statement_deadline)
+    return db_engine
+
+
+def pool_stats(db_engine=None) -> dict:
+    """État du pool (connexions empruntées, en réserve, débordement) et temps d'attente."""
+    pool = (db_engine or engine).pool  # AsyncEngine.pool convient aussi
+    if not isinstance(pool, QueuePool):
+        return {}
+    stats = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+    }
+    if isinstance(pool, _CheckoutTimingMixin):  # Pools synchrone et asyncio
+        stats.update(pool.stats.snapshot())
+    return stats
+
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def configure_server_mode(server_mode: str) -> None:
+    """Dimensionne les pools pour le mode choisi au lancement (--mode), s'il diffère de GRPC_SERVER_MODE.
+
+    Le moteur synchrone, créé à l'import, est remplacé : à appeler avant la
+    première connexion. Le moteur asyncio, créé à la première utilisation,
+    prend directement la bonne taille.
+    """
+    global engine, _server_mode
+    if server_mode == _server_mode:
+        return
+    _server_mode = server_mode
+    previous, engine = engine, create_db_engine()
+    SessionLocal.configure(bind=engine)
+    previous.dispose()
+
+_async_session_factory = None
+_async_session_lock = threading.Lock()
+
+
+def get_async_session_factory() -> async_sessionmaker:
+    """Fabrique d'AsyncSession, créée au premier appel : le mode 'sync' n'importe aucun pilote asyncio."""
+    global _async_session_factory
+    with _async_session_lock:
+        if _async_session_factory is None:
+            _async_session_factory = async_sessionmaker(
+                create_async_db_engine(), autoflush=False, expire_on_commit=False
+            )
+        return _async_session_factory
+
+
+def created_async_engine() -> Optional[AsyncEngine]:
+    """Moteur asyncio s'il a déjà été créé (par get_async_session_factory), sans le créer."""
+    factory = _async_session_factory
+    return factory.kw["bind"] if factory is not None else None
+
 def init_db():
+    """Crée les tables manquantes puis applique les migrations ; retourne les migrations appliquées."""
+    import models.models  # noqa: F401  (enregistre les tables sur Base.metadata)
+    from app.migrations import run_migrations
     Base.metadata.create_all(bind=engine)
+    return run_migrations(engine)
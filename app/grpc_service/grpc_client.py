@@ -9,11 +9,17 @@ sys.path.insert(0, os.path.abspath(os.path.abspath(os.path.join(os.path.dirname(
 
 
 def test_process_payment():
-    channel = grpc.insecure_channel('localhost:50051')
+    # Toute RPC hors RegisterMerchant/ValidateCredentials exige le marchand et sa clé API
+    merchant_id = os.environ.get("MERCHANT_ID")
+    api_key = os.environ.get("API_KEY")
+    if not merchant_id or not api_key:
+        sys.exit("MERCHANT_ID and API_KEY environment variables are required")
+    channel = grpc.insecure_channel(os.environ.get("GRPC_TARGET", 'localhost:50051'))
     stub = PaymentServiceStub(channel)
     request = PaymentRequest(
-        merchant_id="merchant_id_example",
-        amount=PaymentAmount(amount="100.00", currency="USD"),
+        merchant_id=merchant_id,
+        api_key=api_key,
+        amount=PaymentAmount(amount_minor=10000, currency="USD"),
         return_url="http://localhost/return",
         webhook_url="http://localhost/cancel",
         metadata={"description": "Test payment"}
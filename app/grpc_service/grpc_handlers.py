@@ -1,97 +1,740 @@
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import grpc
+from datetime import datetime
+from decimal import Decimal
+from typing import Awaitable, List, Optional
+from google.protobuf.json_format import MessageToDict
 from protos.payment_service_pb2 import (
     PaymentResponse,
     ValidationResponse,
     RefundResponse,
     TransactionStatusResponse,
     MerchantBalanceResponse,
-    PaymentAmount
+    ListTransactionsResponse,
+    BatchPaymentResponse,
+    BatchPaymentResult,
+    BatchTransactionStatusResponse,
+    BatchTransactionStatusResult,
+    PaymentAmount,
+    Balance,
+    CustomerInfo,
+    Transaction as TransactionMessage
 )
 from protos.payment_service_pb2_grpc import PaymentServiceServicer
-from app.providers.paypal_provider import PayPalPaymentProvider
-from app.utils.exceptions import PaymentError, InvalidProviderConfigError
+from app.config import Config
+from app.providers.base_provider import PaymentResult, PaymentStatus
+from app.providers.main import PaymentService
+from app.repositories.balance_repository import BalanceRepository
+from app.repositories.idempotency_repository import IdempotencyRepository
+from app.repositories.transaction_repository import TransactionRepository
+from app.services.balance_service import BalanceService, BalanceSnapshot
+from app.services.transaction_service import TransactionService
+from app.services.transaction_writer import TransactionWriter
+from app.utils.exceptions import (
+    PaymentError, InvalidProviderConfigError, IdempotencyConflictError,
+    InvalidPageTokenError, PaymentValidationError, ProviderUnavailableError, DeadlineExceededError,
+    RequestCancelledError, TransactionNotFoundError, RefundExceedsCaptureError, ProviderOutcomeNotRecordedError
+)
+from app.utils.balance_cache import balance_cache
+from app.utils.deadline import without_deadline
+from app.utils.idempotency import IdempotencyStore, IdempotentResult, request_fingerprint
+from app.utils.money import from_minor_units, to_minor_units
+from app.utils.security import CredentialInfo, authenticated_credential, credential_cache
+from app.utils.tracing import start_span
+from models.models import PaymentMethod, PaymentStatus as TransactionStatus
+
+logger = logging.getLogger(__name__)
+
+
+def _merchant_id(request) -> str:
+    """Marchand de la RPC : celui de l'identifiant authentifié, jamais le seul champ fourni par le client.
+
+    Hors RPC authentifiée (authentification désactivée, éléments d'un lot
+    traités dans un autre thread et déjà rattachés au marchand du lot), le
+    merchant_id de la requête fait foi.
+    """
+    credential = authenticated_credential()
+    return credential.merchant_id if credential is not None else request.merchant_id
+
+
+def _amount_message(amount: Optional[Decimal], currency: str) -> PaymentAmount:
+    """Montant gRPC, en unités mineures exactes et en double pour les anciens clients."""
+    amount = amount or Decimal("0")
+    return PaymentAmount(amount=float(amount), currency=currency, amount_minor=to_minor_units(amount, currency))
+
+
+def _request_amount(amount: PaymentAmount) -> Decimal:
+    """Montant d'une requête : amount_minor s'il est renseigné, sinon le double historique."""
+    if amount.amount_minor:
+        return from_minor_units(amount.amount_minor, amount.currency)
+    return Decimal(str(amount.amount))
+
+
+def _payment_response(result: PaymentResult, currency: str) -> PaymentResponse:
+    """Construit la réponse gRPC d'un paiement à partir du résultat provider."""
+    details = result.payment_method_details or {}
+    return PaymentResponse(
+        transaction_id=result.provider_transaction_id or "",
+        status=result.status.value,
+        error_message=result.error_message or "",
+        amount=_amount_message(result.amount_processed, currency),
+        receipt_url=details.get("approval_url", "") if result.success else "",
+    )
+
+
+def _transaction_fields(request, result: PaymentResult, amount: Decimal) -> dict:
+    """Colonnes de la transaction enregistrée après création d'un paiement chez le provider."""
+    try:
+        payment_method = PaymentMethod(request.payment_method.lower())
+    except ValueError:
+        payment_method = PaymentMethod.PAYPAL
+    billing_address = request.billing.billing_address
+    return dict(
+        merchant_id=_merchant_id(request),
+        payment_method=payment_method,
+        amount_minor=to_minor_units(amount, request.amount.currency),
+        currency=request.amount.currency,
+        status=TransactionStatus(result.status.value),
+        provider_transaction_id=result.provider_transaction_id,
+        order_id=request.order_id or None,
+        customer_id=request.customer.customer_id or None,
+        customer_email=request.customer.email or None,
+        customer_phone=request.customer.phone or None,
+        customer_name=request.customer.name or None,
+        billing_address=MessageToDict(billing_address) if request.billing.HasField("billing_address") else None,
+        card_holder_name=request.billing.card_holder_name or None,
+        receipt_url=(result.payment_method_details or {}).get("approval_url"),
+        return_url=request.return_url or None,
+        webhook_url=request.webhook_url or None,
+        idempotency_key=request.idempotency_key or None,
+    )
+
+
+def _balance_response(balances: List[BalanceSnapshot], as_of: datetime) -> MerchantBalanceResponse:
+    """Construit la réponse gRPC des soldes d'un marchand, lus à la date as_of."""
+    response = MerchantBalanceResponse(balances=[
+        Balance(
+            currency=balance.currency,
+            available=float(from_minor_units(balance.available_minor, balance.currency)),
+            pending=float(from_minor_units(balance.pending_minor, balance.currency)),
+            available_minor=balance.available_minor,
+            pending_minor=balance.pending_minor,
+        )
+        for balance in balances
+    ])
+    response.as_of.FromDatetime(as_of)
+    return response
+
+
+def _idempotent_result(response: PaymentResponse) -> IdempotentResult:
+    """Sérialise une réponse de paiement ; les échecs ne sont pas mémorisés pour permettre un nouvel essai."""
+    return response.SerializeToString(), response.status != PaymentStatus.FAILED.value
+
+
+def _refund_response(result: PaymentResult, currency: str) -> RefundResponse:
+    """Construit la réponse gRPC d'un remboursement."""
+    return RefundResponse(
+        refund_id=result.provider_transaction_id or "",
+        status=result.status.value,
+        amount=_amount_message(result.amount_processed, currency),
+        error_message=result.error_message or "",
+    )
+
+
+def _status_response(result: PaymentResult) -> TransactionStatusResponse:
+    """Construit la réponse gRPC du statut d'une transaction."""
+    details = result.payment_method_details or {}
+    response = TransactionStatusResponse(
+        transaction_id=result.provider_transaction_id or "",
+        status=result.status.value,
+        amount=_amount_message(result.amount_processed, details.get("currency", "")),
+    )
+    response.created_at.FromDatetime(result.created_at)
+    return response
+
+
+# Statuts que le fournisseur ne fait plus évoluer : la base fait foi même sans webhooks
+FINAL_STATUSES = frozenset({
+    TransactionStatus.COMPLETED, TransactionStatus.FAILED, TransactionStatus.CANCELLED,
+    TransactionStatus.REFUNDED, TransactionStatus.PARTIALLY_REFUNDED,
+})
+
+
+def _status_known_in_db(transaction) -> bool:
+    """Vrai si le statut enregistré peut être renvoyé sans interroger le fournisseur.
+
+    Un statut en cours (PENDING, PROCESSING) n'est à jour que si le récepteur
+    de webhooks tourne ; sinon il resterait figé jusqu'à la réconciliation.
+    """
+    return transaction.status in FINAL_STATUSES or bool(Config.PAYPAL_WEBHOOK_PORT)
+
+
+def _stored_status_response(transaction) -> TransactionStatusResponse:
+    """Statut d'une transaction tel qu'enregistré en base (tenu à jour par les webhooks fournisseur)."""
+    response = TransactionStatusResponse(
+        transaction_id=transaction.provider_transaction_id or transaction.id,
+        status=transaction.status.value,
+        amount=_amount_message(from_minor_units(transaction.amount_minor, transaction.currency),
+                               transaction.currency),
+    )
+    response.created_at.FromDatetime(transaction.created_at)
+    response.updated_at.FromDatetime(transaction.updated_at or transaction.created_at)
+    return response
+
+
+def _transaction_message(transaction) -> TransactionMessage:
+    """Convertit une ligne de la table transactions en message gRPC."""
+    message = TransactionMessage(
+        transaction_id=transaction.id,
+        status=transaction.status.value if transaction.status else "",
+        amount=_amount_message(from_minor_units(transaction.amount_minor or 0, transaction.currency), transaction.currency or ""),
+        payment_method=transaction.payment_method.value if transaction.payment_method else "",
+        customer=CustomerInfo(
+            customer_id=transaction.customer_id or "",
+            email=transaction.customer_email or "",
+            phone=transaction.customer_phone or "",
+            name=transaction.customer_name or "",
+        ),
+    )
+    if transaction.created_at is not None:
+        message.created_at.FromDatetime(transaction.created_at)
+    return message
+
+
+def _transaction_filters(request) -> dict:
+    """Extrait les filtres communs à ListTransactions et ExportTransactions."""
+    return dict(
+        merchant_id=_merchant_id(request),
+        start_date=request.start_date.ToDatetime() if request.HasField("start_date") else None,
+        end_date=request.end_date.ToDatetime() if request.HasField("end_date") else None,
+        status=TransactionService.parse_status(request.status),
+    )
+
+
+def _list_transactions_args(request) -> dict:
+    """Extrait les filtres et la pagination de ListTransactionsRequest."""
+    return dict(_transaction_filters(request), page_size=request.page_size, page_token=request.page_token)
+
+
+def _error_status(error: Exception) -> grpc.StatusCode:
+    """Code gRPC correspondant à une erreur métier."""
+    if isinstance(error, (IdempotencyConflictError, RefundExceedsCaptureError)):
+        return grpc.StatusCode.FAILED_PRECONDITION
+    if isinstance(error, TransactionNotFoundError):
+        return grpc.StatusCode.NOT_FOUND
+    if isinstance(error, (PaymentValidationError, InvalidPageTokenError)):
+        return grpc.StatusCode.INVALID_ARGUMENT
+    if isinstance(error, ProviderUnavailableError):
+        return grpc.StatusCode.UNAVAILABLE
+    if isinstance(error, DeadlineExceededError):
+        return grpc.StatusCode.DEADLINE_EXCEEDED
+    if isinstance(error, RequestCancelledError):
+        return grpc.StatusCode.CANCELLED
+    return grpc.StatusCode.INTERNAL
+
+
+def _outcome_not_recorded(operation: str, provider_transaction_id: str) -> ProviderOutcomeNotRecordedError:
+    # Journalisé avec l'identifiant fournisseur : l'opération est à rapprocher à la main
+    logger.exception("Provider %s %s succeeded but could not be recorded", operation, provider_transaction_id)
+    return ProviderOutcomeNotRecordedError(operation, provider_transaction_id)
+
+
+@contextmanager
+def _recording_provider_outcome(operation: str, provider_transaction_id: str):
+    """Enregistre le résultat d'un appel fournisseur abouti, hors délai de la RPC.
+
+    L'opération a eu lieu chez le fournisseur : l'abandonner laisserait la base
+    en retard sur lui. Un échec d'écriture devient ProviderOutcomeNotRecordedError
+    (INTERNAL) au lieu d'une erreur inconnue.
+    """
+    with without_deadline():
+        try:
+            yield
+        except Exception as e:
+            raise _outcome_not_recorded(operation, provider_transaction_id) from e
+
+
+async def _persist_provider_outcome(write: Awaitable, operation: str, provider_transaction_id: str):
+    """Variante asyncio de _recording_provider_outcome, qui va au bout même si la RPC est annulée."""
+    with without_deadline():
+        try:
+            return await asyncio.shield(write)
+        except Exception as e:
+            raise _outcome_not_recorded(operation, provider_transaction_id) from e
+
+
+def _batch_size_error(size: int) -> Optional[str]:
+    """Motif du refus d'un lot trop grand, sinon None.
+
+    L'appelant interrompt la RPC avec context.abort, attendu en asyncio.
+    """
+    if size > Config.BATCH_MAX_ITEMS:
+        return f"Batch size {size} exceeds the limit of {Config.BATCH_MAX_ITEMS}"
+    return None
+
+
+def _batch_payment_item(batch, index: int, payment):
+    """Rattache un paiement au marchand du lot ; retourne un résultat d'erreur s'il en réclame un autre."""
+    merchant_id = _merchant_id(batch)
+    if payment.merchant_id and payment.merchant_id != merchant_id:
+        return None, BatchPaymentResult(
+            index=index,
+            error_code=grpc.StatusCode.PERMISSION_DENIED.name,
+            error_message="Payment merchant_id does not match the batch merchant_id",
+        )
+    item = type(payment)()
+    item.CopyFrom(payment)
+    item.merchant_id = merchant_id
+    item.api_key = batch.api_key
+    return item, None
+
+
+def _owned_transaction(transaction, transaction_id: str):
+    """Transaction du marchand appelant, vérifiée avant tout appel fournisseur.
+
+    Inconnue ou appartenant à un autre marchand (indiscernables pour
+    l'appelant) : TransactionNotFoundError, soit NOT_FOUND.
+    """
+    if transaction is None:
+        raise TransactionNotFoundError(transaction_id)
+    return transaction
+
+
+def _status_not_found(index: int) -> BatchTransactionStatusResult:
+    """Résultat d'un identifiant inconnu ou appartenant à un autre marchand (indiscernables pour l'appelant)."""
+    return BatchTransactionStatusResult(index=index, error_code=grpc.StatusCode.NOT_FOUND.name,
+                                        error_message="Transaction not found")
+
+
+def _validation_response(credential: CredentialInfo) -> ValidationResponse:
+    """Construit la réponse de validation des identifiants."""
+    if credential is None:
+        return ValidationResponse(is_valid=False)
+    response = ValidationResponse(is_valid=True)
+    if credential.expires_at is not None:
+        response.expires_at.FromDatetime(credential.expires_at)
+    return response
+
 
 class PaymentServiceHandler(PaymentServiceServicer):
     """Implémentation gRPC pour le service de paiement."""
-    
-    def __init__(self, config):
-        self.provider = PayPalPaymentProvider(
-            client_id=config["PAYPAL_CLIENT_ID"],
-            client_secret=config["PAYPAL_CLIENT_SECRET"],
-            mode=config["PAYPAL_MODE"]
+
+    def __init__(self, provider_name: str = Config.PAYMENT_PROVIDER, provider_config=None):
+        self.payment_service = PaymentService(
+            provider_name,
+            provider_config if provider_config is not None else Config.PROVIDER_CONFIGS[provider_name]
+        )
+        self.idempotency_store = IdempotencyStore()
+        self.credential_cache = credential_cache
+        self.balance_service = BalanceService()
+        self.transaction_service = TransactionService(
+            balance_service=self.balance_service,
+            writer=TransactionWriter() if Config.TRANSACTION_WRITE_BEHIND else None,
+        )
+        # Un export occupe une connexion (et, en mode synchrone, un thread) pendant toute sa durée
+        self._export_slots = threading.BoundedSemaphore(Config.EXPORT_MAX_CONCURRENT)
+        # En mode synchrone, les éléments des lots partagent ce pool : la parallélisation est bornée pour tout le processus
+        self._batch_executor = ThreadPoolExecutor(max_workers=Config.BATCH_MAX_CONCURRENCY, thread_name_prefix="batch")
+
+    def ValidateCredentials(self, request, context):
+        """Valide les identifiants d'un marchand."""
+        return _validation_response(self.credential_cache.validate(request.api_key, request.merchant_id))
+
+    def _process_payment(self, request) -> PaymentResponse:
+        with start_span("validate"):
+            amount = _request_amount(request.amount)
+        result = self.payment_service.create_payment_intent(
+            amount=amount,
+            currency=request.amount.currency,
+            payment_method_data={"return_url": request.return_url, "cancel_url": request.webhook_url},
+            metadata={"description": request.metadata.get("description", "")}
         )
+        if result.success:
+            with _recording_provider_outcome("payment", result.provider_transaction_id), start_span("persist"):
+                self.transaction_service.create_transaction(**_transaction_fields(request, result, amount))
+        with start_span("build_response"):
+            return _payment_response(result, request.amount.currency)
+
+    def _process_idempotent_payment(self, request) -> PaymentResponse:
+        if not request.idempotency_key:
+            return self._process_payment(request)
+        payload = self.idempotency_store.execute(
+            _merchant_id(request),
+            request.idempotency_key,
+            request_fingerprint(request),
+            lambda: _idempotent_result(self._process_payment(request))
+        )
+        return PaymentResponse.FromString(payload)
 
     def ProcessPayment(self, request, context):
-        """Traite un paiement."""
+        """Traite un paiement, une seule fois par clé d'idempotence."""
         try:
-            result = self.provider.create_payment_intent(
-                amount=Decimal(request.amount.amount),
-                currency=request.amount.currency,
-                payment_method_data={"return_url": request.return_url, "cancel_url": request.webhook_url},
-                metadata={"description": request.metadata.get("description", "")}
-            )
-            return PaymentResponse(
-                transaction_id=result.provider_transaction_id,
-                status=result.status.value,
-                error_message=result.error_message or "",
-                amount=PaymentAmount(amount=str(result.amount_processed or 0), currency=request.amount.currency),
-                receipt_url=result.payment_method_details.get("approval_url", "") if result.success else "",
-            )
+            return self._process_idempotent_payment(request)
         except PaymentError as e:
             context.set_details(str(e))
-            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_code(_error_status(e))
             return PaymentResponse()
 
     def ConfirmPayment(self, request, context):
-        """Confirme un paiement après approbation."""
+        """Confirme un paiement du marchand après approbation."""
         try:
-            result = self.provider.confirm_payment(
+            _owned_transaction(self.transaction_service.get_by_provider_id(_merchant_id(request), request.transaction_id),
+                               request.transaction_id)
+            result = self.payment_service.confirm_payment(
                 payment_intent_id=request.transaction_id,
                 payment_method_data={"payer_id": request.metadata.get("payer_id", "")}
             )
-            return PaymentResponse(
-                transaction_id=result.provider_transaction_id,
-                status=result.status.value,
-                error_message=result.error_message or "",
-                amount=PaymentAmount(amount=str(result.amount_processed or 0), currency=request.amount.currency),
-                receipt_url=result.payment_method_details.get("approval_url", "") if result.success else "",
-            )
+            if result.success and result.status == PaymentStatus.COMPLETED:
+                with _recording_provider_outcome("payment", result.provider_transaction_id):
+                    self.transaction_service.complete_payment(
+                        _merchant_id(request), result.provider_transaction_id,
+                        result.amount_processed, result.fee_amount, request.amount.currency
+                    )
+            return _payment_response(result, request.amount.currency)
         except PaymentError as e:
             context.set_details(str(e))
-            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_code(_error_status(e))
             return PaymentResponse()
 
     def RefundPayment(self, request, context):
         """Rembourse un paiement."""
         try:
-            result = self.provider.refund_payment(
+            amount = _request_amount(request.amount) if request.HasField("amount") else None
+            self.transaction_service.check_refund(
+                _merchant_id(request), request.transaction_id, amount, request.amount.currency
+            )
+            result = self.payment_service.refund_payment(
                 transaction_id=request.transaction_id,
-                amount=Decimal(request.amount.amount) if request.amount else None,
+                amount=amount,
                 reason=request.reason
             )
-            return RefundResponse(
-                refund_id=result.provider_transaction_id,
-                status=result.status.value,
-                amount=PaymentAmount(amount=str(result.amount_processed or 0), currency=request.amount.currency),
-                error_message=result.error_message or "",
-            )
+            if result.success:
+                with _recording_provider_outcome("refund", result.provider_transaction_id):
+                    self.transaction_service.record_refund(
+                        _merchant_id(request), request.transaction_id, result.provider_transaction_id,
+                        result.amount_processed, request.reason
+                    )
+            return _refund_response(result, request.amount.currency)
         except PaymentError as e:
             context.set_details(str(e))
-            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_code(_error_status(e))
             return RefundResponse()
 
     def GetTransactionStatus(self, request, context):
-        """Récupère le statut d'une transaction."""
-        try:
-            result = self.provider.get_payment_status(request.transaction_id)
-            return TransactionStatusResponse(
-                transaction_id=result.provider_transaction_id,
-                status=result.status.value,
-                amount=PaymentAmount(amount=str(result.amount_processed or 0), currency=result.payment_method_details.get("currency", "")),
-                created_at=result.created_at.isoformat(),
-                updated_at=result.provider_response.get("update_time", ""),
+        """Récupère le statut d'une transaction du marchand, depuis la base s'il y est à jour, sinon auprès du fournisseur."""
+        try:
+            transaction = _owned_transaction(
+                self.transaction_service.get_by_provider_id(_merchant_id(request), request.transaction_id),
+                request.transaction_id
+            )
+            if Config.TRANSACTION_STATUS_FROM_DB and _status_known_in_db(transaction):
+                return _stored_status_response(transaction)
+            result = self.payment_service.get_payment_status(request.transaction_id)
+            return _status_response(result)
+        except PaymentError as e:
+            context.set_details(str(e))
+            context.set_code(_error_status(e))
+            return TransactionStatusResponse()
+
+    def _load_balance_response(self, merchant_id: str, currency: str) -> MerchantBalanceResponse:
+        as_of = datetime.utcnow()
+        return _balance_response(self.balance_service.get_balances(merchant_id, currency), as_of)
+
+    def GetMerchantBalance(self, request, context):
+        """Récupère les soldes d'un marchand (une devise, ou toutes), depuis le cache si possible."""
+        merchant_id = _merchant_id(request)
+        return balance_cache.get_or_load(
+            merchant_id, request.currency,
+            functools.partial(self._load_balance_response, merchant_id, request.currency)
+        )
+
+    def ListTransactions(self, request, context):
+        """Liste les transactions d'un marchand, page par page."""
+        try:
+            transactions, next_page_token = self.transaction_service.list_transactions(**_list_transactions_args(request))
+            return ListTransactionsResponse(
+                transactions=[_transaction_message(t) for t in transactions],
+                next_page_token=next_page_token,
+            )
+        except (InvalidPageTokenError, PaymentValidationError) as e:
+            context.set_details(str(e))
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            return ListTransactionsResponse()
+
+    def ExportTransactions(self, request, context):
+        """Exporte les transactions d'un marchand en flux, lot par lot depuis le curseur."""
+        try:
+            filters = _transaction_filters(request)
+        except PaymentValidationError as e:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+        if not self._export_slots.acquire(blocking=False):
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "Too many exports in progress, retry later")
+        try:
+            for batch in self.transaction_service.iter_transaction_batches(**filters):
+                for row in batch:
+                    yield _transaction_message(row)
+        finally:
+            self._export_slots.release()
+
+
+    def _batch_payment(self, index: int, request) -> BatchPaymentResult:
+        try:
+            return BatchPaymentResult(index=index, response=self._process_idempotent_payment(request))
+        except Exception as e:
+            return BatchPaymentResult(index=index, error_code=_error_status(e).name, error_message=str(e))
+
+    def BatchProcessPayment(self, request, context):
+        """Traite un lot de paiements ; l'échec d'un paiement n'affecte pas les autres."""
+        error = _batch_size_error(len(request.payments))
+        if error:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, error)
+        results = {}
+        futures = {}
+        for index, payment in enumerate(request.payments):
+            item, error = _batch_payment_item(request, index, payment)
+            if error is not None:
+                results[index] = error
+            else:
+                futures[index] = self._batch_executor.submit(self._batch_payment, index, item)
+        for index, future in futures.items():
+            results[index] = future.result()
+        return BatchPaymentResponse(results=[results[i] for i in range(len(request.payments))])
+
+    def _batch_status(self, index: int, transaction_id: str) -> BatchTransactionStatusResult:
+        try:
+            result = self.payment_service.get_payment_status(transaction_id)
+            return BatchTransactionStatusResult(index=index, status=_status_response(result))
+        except Exception as e:
+            return BatchTransactionStatusResult(index=index, error_code=_error_status(e).name, error_message=str(e))
+
+    def BatchGetTransactionStatus(self, request, context):
+        """Récupère le statut d'un lot de transactions du marchand ; les autres sont en NOT_FOUND."""
+        error = _batch_size_error(len(request.transaction_ids))
+        if error:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, error)
+        owned = self.transaction_service.get_by_provider_ids(_merchant_id(request), request.transaction_ids)
+        futures = [self._batch_executor.submit(self._batch_status, index, transaction_id)
+                   if transaction_id in owned else None
+                   for index, transaction_id in enumerate(request.transaction_ids)]
+        return BatchTransactionStatusResponse(results=[
+            future.result() if future is not None else _status_not_found(index)
+            for index, future in enumerate(futures)
+        ])
+
+
+class AsyncPaymentServiceHandler(PaymentServiceHandler):
+    """Implémentation gRPC asyncio (grpc.aio) du service de paiement.
+
+    Chaque RPC est une coroutine : avec un provider asyncio ("paypal_async"),
+    l'attente du provider ne mobilise aucun thread. Les accès à la base passent
+    par les repositories asyncio (AsyncSession), sans pool de threads.
+    """
+
+    def __init__(self, provider_name: str = Config.PAYMENT_PROVIDER, provider_config=None):
+        super().__init__(provider_name, provider_config)
+        self.transaction_repository = TransactionRepository(transaction_service=self.transaction_service)
+        self.balance_repository = BalanceRepository()
+        # Les réponses idempotentes sont lues et écrites par AsyncSession, sans thread
+        idempotency_repository = IdempotencyRepository()
+        self.idempotency_store.async_loader = idempotency_repository.find
+        self.idempotency_store.async_saver = idempotency_repository.save
+
+    async def _load_balance_response_async(self, merchant_id: str, currency: str) -> MerchantBalanceResponse:
+        as_of = datetime.utcnow()
+        return _balance_response(await self.balance_repository.get_balances(merchant_id, currency), as_of)
+
+    async def ValidateCredentials(self, request, context):
+        """Valide les identifiants d'un marchand."""
+        return _validation_response(await self.credential_cache.validate_async(request.api_key, request.merchant_id))
+
+    async def _process_payment_async(self, request) -> PaymentResponse:
+        with start_span("validate"):
+            amount = _request_amount(request.amount)
+        result = await self.payment_service.create_payment_intent_async(
+            amount=amount,
+            currency=request.amount.currency,
+            payment_method_data={"return_url": request.return_url, "cancel_url": request.webhook_url},
+            metadata={"description": request.metadata.get("description", "")}
+        )
+        if result.success:
+            with start_span("persist"):
+                await _persist_provider_outcome(
+                    self.transaction_repository.save(**_transaction_fields(request, result, amount)),
+                    "payment", result.provider_transaction_id
+                )
+        with start_span("build_response"):
+            return _payment_response(result, request.amount.currency)
+
+    async def _process_idempotent_payment_async(self, request) -> PaymentResponse:
+        if not request.idempotency_key:
+            return await self._process_payment_async(request)
+
+        async def operation() -> IdempotentResult:
+            return _idempotent_result(await self._process_payment_async(request))
+
+        payload = await self.idempotency_store.execute_async(
+            _merchant_id(request),
+            request.idempotency_key,
+            request_fingerprint(request),
+            operation
+        )
+        return PaymentResponse.FromString(payload)
+
+    async def ProcessPayment(self, request, context):
+        """Traite un paiement, une seule fois par clé d'idempotence."""
+        try:
+            return await self._process_idempotent_payment_async(request)
+        except PaymentError as e:
+            context.set_details(str(e))
+            context.set_code(_error_status(e))
+            return PaymentResponse()
+
+    async def ConfirmPayment(self, request, context):
+        """Confirme un paiement du marchand après approbation."""
+        try:
+            _owned_transaction(await self.transaction_repository.find_by_provider_id(
+                _merchant_id(request), request.transaction_id
+            ), request.transaction_id)
+            result = await self.payment_service.confirm_payment_async(
+                payment_intent_id=request.transaction_id,
+                payment_method_data={"payer_id": request.metadata.get("payer_id", "")}
             )
+            if result.success and result.status == PaymentStatus.COMPLETED:
+                await _persist_provider_outcome(self.transaction_repository.complete_payment(
+                    _merchant_id(request), result.provider_transaction_id,
+                    result.amount_processed, result.fee_amount, request.amount.currency
+                ), "payment", result.provider_transaction_id)
+            return _payment_response(result, request.amount.currency)
+        except PaymentError as e:
+            context.set_details(str(e))
+            context.set_code(_error_status(e))
+            return PaymentResponse()
+
+    async def RefundPayment(self, request, context):
+        """Rembourse un paiement."""
+        try:
+            amount = _request_amount(request.amount) if request.HasField("amount") else None
+            await self.transaction_repository.check_refund(
+                _merchant_id(request), request.transaction_id, amount, request.amount.currency
+            )
+            result = await self.payment_service.refund_payment_async(
+                transaction_id=request.transaction_id,
+                amount=amount,
+                reason=request.reason
+            )
+            if result.success:
+                await _persist_provider_outcome(self.transaction_repository.record_refund(
+                    _merchant_id(request), request.transaction_id, result.provider_transaction_id,
+                    result.amount_processed, request.reason
+                ), "refund", result.provider_transaction_id)
+            return _refund_response(result, request.amount.currency)
+        except PaymentError as e:
+            context.set_details(str(e))
+            context.set_code(_error_status(e))
+            return RefundResponse()
+
+    async def GetTransactionStatus(self, request, context):
+        """Récupère le statut d'une transaction du marchand, depuis la base s'il y est à jour, sinon auprès du fournisseur."""
+        try:
+            transaction = _owned_transaction(await self.transaction_repository.find_by_provider_id(
+                _merchant_id(request), request.transaction_id
+            ), request.transaction_id)
+            if Config.TRANSACTION_STATUS_FROM_DB and _status_known_in_db(transaction):
+                return _stored_status_response(transaction)
+            result = await self.payment_service.get_payment_status_async(request.transaction_id)
+            return _status_response(result)
         except PaymentError as e:
             context.set_details(str(e))
-            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_code(_error_status(e))
             return TransactionStatusResponse()
+
+    async def GetMerchantBalance(self, request, context):
+        """Récupère les soldes d'un marchand (une devise, ou toutes), depuis le cache si possible."""
+        merchant_id = _merchant_id(request)
+        return await balance_cache.get_or_load_async(
+            merchant_id, request.currency,
+            functools.partial(self._load_balance_response_async, merchant_id, request.currency)
+        )
+
+    async def ListTransactions(self, request, context):
+        """Liste les transactions d'un marchand, page par page."""
+        try:
+            transactions, next_page_token = await self.transaction_repository.list_transactions(
+                **_list_transactions_args(request)
+            )
+            return ListTransactionsResponse(
+                transactions=[_transaction_message(t) for t in transactions],
+                next_page_token=next_page_token,
+            )
+        except (InvalidPageTokenError, PaymentValidationError) as e:
+            context.set_details(str(e))
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            return ListTransactionsResponse()
+
+    async def ExportTransactions(self, request, context):
+        """Exporte les transactions d'un marchand en flux, lot par lot depuis le curseur.
+
+        Le curseur est lu en asyncio (AsyncSession.stream) ; chaque message est
+        émis selon le contrôle de flux gRPC, sans bloquer la boucle.
+        """
+        try:
+            filters = _transaction_filters(request)
+        except PaymentValidationError as e:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+        if not self._export_slots.acquire(blocking=False):
+            await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "Too many exports in progress, retry later")
+
+        batches = self.transaction_repository.iter_transaction_batches(**filters)
+        try:
+            async for batch in batches:
+                for row in batch:
+                    yield _transaction_message(row)
+        finally:
+            await batches.aclose()
+            self._export_slots.release()
+
+    async def BatchProcessPayment(self, request, context):
+        """Traite un lot de paiements ; l'échec d'un paiement n'affecte pas les autres."""
+        error = _batch_size_error(len(request.payments))
+        if error:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, error)
+        semaphore = asyncio.Semaphore(Config.BATCH_MAX_CONCURRENCY)
+
+        async def process(index: int, payment) -> BatchPaymentResult:
+            item, error = _batch_payment_item(request, index, payment)
+            if error is not None:
+                return error
+            async with semaphore:
+                try:
+                    return BatchPaymentResult(index=index, response=await self._process_idempotent_payment_async(item))
+                except Exception as e:
+                    return BatchPaymentResult(index=index, error_code=_error_status(e).name, error_message=str(e))
+
+        results = await asyncio.gather(*(process(i, p) for i, p in enumerate(request.payments)))
+        return BatchPaymentResponse(results=results)
+
+    async def BatchGetTransactionStatus(self, request, context):
+        """Récupère le statut d'un lot de transactions du marchand ; les autres sont en NOT_FOUND."""
+        error = _batch_size_error(len(request.transaction_ids))
+        if error:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, error)
+        semaphore = asyncio.Semaphore(Config.BATCH_MAX_CONCURRENCY)
+        owned = await self.transaction_repository.find_by_provider_ids(_merchant_id(request), request.transaction_ids)
+
+        async def lookup(index: int, transaction_id: str) -> BatchTransactionStatusResult:
+            if transaction_id not in owned:
+                return _status_not_found(index)
+            async with semaphore:
+                try:
+                    result = await self.payment_service.get_payment_status_async(transaction_id)
+                    return BatchTransactionStatusResult(index=index, status=_status_response(result))
+                except Exception as e:
+                    return BatchTransactionStatusResult(index=index, error_code=_error_status(e).name, error_message=str(e))
+
+        results = await asyncio.gather(*(lookup(i, t) for i, t in enumerate(request.transaction_ids)))
+        return BatchTransactionStatusResponse(results=results)
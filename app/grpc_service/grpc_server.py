@@ -1,16 +1,105 @@
+import argparse
+import asyncio
 from concurrent import futures
 import grpc
 from protos.payment_service_pb2_grpc import add_PaymentServiceServicer_to_server
-from app.grpc_service.grpc_handlers import PaymentServiceHandler
+from app.api.metrics_api import start_metrics_server, start_metrics_server_thread
+from app.api.webhook_api import PayPalWebhookReceiver, start_webhook_server, start_webhook_server_thread
+from app.grpc_service.grpc_handlers import PaymentServiceHandler, AsyncPaymentServiceHandler
+from app.grpc_service.interceptors import (
+    AuthInterceptor, AsyncAuthInterceptor, AsyncDeadlineInterceptor, AsyncMetricsInterceptor,
+    AsyncRateLimitInterceptor, AsyncTracingInterceptor, DeadlineInterceptor, MetricsInterceptor,
+    RateLimitInterceptor, TracingInterceptor
+)
 from app.config import Config
+from app.db import configure_server_mode, init_db
+from app.repositories.merchant_repository import MerchantRepository
+from app.services.paypal_webhook_service import PayPalWebhookProcessor
+from app.services.reconciliation_service import PaymentReconciler
+from app.utils.logger import configure_logging
+from app.utils.rate_limit import merchant_rate_limits
+from app.utils.security import credential_cache
 
-def serve():
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    add_PaymentServiceServicer_to_server(PaymentServiceHandler(Config.PAYPAL_CONFIG), server)
-    server.add_insecure_port('[::]:50051')
-    print("gRPC server is running on port 50051")
+SERVER_MODES = ("sync", "async")
+
+
+def serve(port: int = Config.GRPC_PORT, max_workers: int = Config.GRPC_MAX_WORKERS):
+    """Démarre le serveur gRPC synchrone (un thread par RPC en cours)."""
+    # Métriques en tête : les RPC refusées par les intercepteurs suivants sont comptées.
+    # Authentification avant limitation : une clé invalide ne consomme pas le quota du marchand
+    interceptors = (([MetricsInterceptor()] if Config.METRICS_PORT else [])
+                    + ([TracingInterceptor()] if Config.TRACING_ENABLED else [])
+                    + [DeadlineInterceptor()]
+                    + ([AuthInterceptor()] if Config.GRPC_AUTH_ENABLED else [])
+                    + ([RateLimitInterceptor()] if Config.RATE_LIMIT_ENABLED else []))
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers), interceptors=interceptors)
+    handler = PaymentServiceHandler()
+    add_PaymentServiceServicer_to_server(handler, server)
+    server.add_insecure_port(f'[::]:{port}')
+    if Config.PAYPAL_WEBHOOK_PORT:
+        # Même TransactionService que les RPC : ses écritures différées sont vidées avant chaque événement
+        processor = PayPalWebhookProcessor(handler.transaction_service)
+        start_webhook_server_thread(Config.PAYPAL_WEBHOOK_PORT, PayPalWebhookReceiver(processor=processor))
+    if Config.RECONCILE_ENABLED:
+        PaymentReconciler(handler.payment_service, handler.transaction_service).start()
+    if Config.METRICS_PORT:
+        start_metrics_server_thread(Config.METRICS_PORT)
+    print(f"gRPC server (sync) is running on port {port}")
     server.start()
     server.wait_for_termination()
 
+
+async def serve_async(port: int = Config.GRPC_PORT,
+                      maximum_concurrent_rpcs: int = Config.GRPC_MAX_CONCURRENT_RPCS):
+    """Démarre le serveur gRPC asyncio (une coroutine par RPC en cours)."""
+    # Les clés absentes du cache sont chargées par AsyncSession, sans thread
+    merchant_repository = MerchantRepository()
+    credential_cache.async_loader = merchant_repository.find_by_api_key
+    merchant_rate_limits.async_loader = merchant_repository.find_settings
+    interceptors = (([AsyncMetricsInterceptor()] if Config.METRICS_PORT else [])
+                    + ([AsyncTracingInterceptor()] if Config.TRACING_ENABLED else [])
+                    + [AsyncDeadlineInterceptor()]
+                    + ([AsyncAuthInterceptor()] if Config.GRPC_AUTH_ENABLED else [])
+                    + ([AsyncRateLimitInterceptor()] if Config.RATE_LIMIT_ENABLED else []))
+    server = grpc.aio.server(interceptors=interceptors, maximum_concurrent_rpcs=maximum_concurrent_rpcs)
+    handler = AsyncPaymentServiceHandler()
+    add_PaymentServiceServicer_to_server(handler, server)
+    server.add_insecure_port(f'[::]:{port}')
+    webhook_runner = None
+    if Config.PAYPAL_WEBHOOK_PORT:
+        processor = PayPalWebhookProcessor(handler.transaction_service)
+        webhook_runner = await start_webhook_server(Config.PAYPAL_WEBHOOK_PORT, PayPalWebhookReceiver(processor=processor))
+    reconciler = None
+    if Config.RECONCILE_ENABLED:
+        reconciler = PaymentReconciler(handler.payment_service, handler.transaction_service).start()
+    metrics_runner = await start_metrics_server(Config.METRICS_PORT) if Config.METRICS_PORT else None
+    print(f"gRPC server (async) is running on port {port}")
+    await server.start()
+    try:
+        await server.wait_for_termination()
+    finally:
+        await server.stop(grace=5)
+        if reconciler is not None:
+            reconciler.close()
+        if webhook_runner is not None:
+            await webhook_runner.cleanup()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serveur gRPC du service de paiement")
+    parser.add_argument("--mode", choices=SERVER_MODES, default=Config.GRPC_SERVER_MODE)
+    parser.add_argument("--port", type=int, default=Config.GRPC_PORT)
+    args = parser.parse_args(argv)
+    configure_server_mode(args.mode)
+    configure_logging()
+    init_db()
+
+    if args.mode == "async":
+        asyncio.run(serve_async(port=args.port))
+    else:
+        serve(port=args.port)
+
 if __name__ == '__main__':
-    serve()
+    main()
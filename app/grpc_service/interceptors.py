@@ -0,0 +1,453 @@
+import asyncio
+import math
+import time
+import grpc
+from app.utils.deadline import deadline_scope
+from app.utils.metrics import GRPC_HANDLED, GRPC_HANDLING_SECONDS
+from app.utils.rate_limit import MerchantRateLimits, ShardedRateLimiter, merchant_rate_limits, rate_limiter
+from app.utils.security import CredentialCache, authenticated_credential, credential_cache, credential_scope
+from app.utils.tracing import TRACEPARENT_METADATA, server_span, start_span
+
+API_KEY_METADATA = "x-api-key"
+
+# RPC accessibles sans clé API
+PUBLIC_METHODS = frozenset({"RegisterMerchant", "ValidateCredentials"})
+
+
+def method_name(handler_call_details) -> str:
+    """Nom court de la RPC ("/payment.v1.PaymentService/ProcessPayment" -> "ProcessPayment")."""
+    return handler_call_details.method.rsplit("/", 1)[-1]
+
+
+def wrap_rpc_handler(handler, wrap_unary, wrap_stream):
+    """Reconstruit un RpcMethodHandler dont le comportement est enveloppé.
+
+    Les intercepteurs ont besoin du message de requête (clé API, merchant_id),
+    qui n'est visible qu'au niveau du comportement, pas de handler_call_details.
+    """
+    if handler is None:
+        return None
+    if handler.unary_unary:
+        return grpc.unary_unary_rpc_method_handler(
+            wrap_unary(handler.unary_unary),
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer,
+        )
+    if handler.unary_stream:
+        return grpc.unary_stream_rpc_method_handler(
+            wrap_stream(handler.unary_stream),
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer,
+        )
+    return handler
+
+
+def _credentials(request, context):
+    metadata = dict(context.invocation_metadata() or ())
+    api_key = getattr(request, "api_key", "") or metadata.get(API_KEY_METADATA, "")
+    return api_key, getattr(request, "merchant_id", "")
+
+
+class AuthInterceptor(grpc.ServerInterceptor):
+    """Authentifie chaque RPC via le cache d'identifiants (mode synchrone).
+
+    La clé API est lue dans le champ api_key de la requête ou, à défaut, dans
+    la métadonnée x-api-key ; elle doit appartenir au merchant_id de la requête,
+    obligatoire. L'identifiant validé est ensuite exposé par
+    authenticated_credential() pour toute la durée de la RPC.
+    """
+
+    def __init__(self, cache: CredentialCache = credential_cache, public_methods=PUBLIC_METHODS):
+        self.cache = cache
+        self.public_methods = public_methods
+
+    def _check(self, request, context):
+        api_key, merchant_id = _credentials(request, context)
+        if not merchant_id:
+            context.abort(grpc.StatusCode.UNAUTHENTICATED, "merchant_id is required")
+        with start_span("auth"):
+            credential = self.cache.validate(api_key, merchant_id)
+        if credential is None:
+            context.abort(grpc.StatusCode.UNAUTHENTICATED, "Invalid or expired API credentials")
+        return credential
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if method_name(handler_call_details) in self.public_methods:
+            return handler
+
+        def wrap_unary(behavior):
+            def authenticated(request, context):
+                with credential_scope(self._check(request, context)):
+                    return behavior(request, context)
+            return authenticated
+
+        def wrap_stream(behavior):
+            def authenticated(request, context):
+                with credential_scope(self._check(request, context)):
+                    yield from behavior(request, context)
+            return authenticated
+
+        return wrap_rpc_handler(handler, wrap_unary, wrap_stream)
+
+
+class AsyncAuthInterceptor(grpc.aio.ServerInterceptor):
+    """Variante grpc.aio de AuthInterceptor."""
+
+    def __init__(self, cache: CredentialCache = credential_cache, public_methods=PUBLIC_METHODS):
+        self.cache = cache
+        self.public_methods = public_methods
+
+    async def _check(self, request, context):
+        api_key, merchant_id = _credentials(request, context)
+        if not merchant_id:
+            await context.abort(grpc.StatusCode.UNAUTHENTICATED, "merchant_id is required")
+        with start_span("auth"):
+            credential = await self.cache.validate_async(api_key, merchant_id)
+        if credential is None:
+            await context.abort(grpc.StatusCode.UNAUTHENTICATED, "Invalid or expired API credentials")
+        return credential
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        if method_name(handler_call_details) in self.public_methods:
+            return handler
+
+        def wrap_unary(behavior):
+            async def authenticated(request, context):
+                with credential_scope(await self._check(request, context)):
+                    return await behavior(request, context)
+            return authenticated
+
+        def wrap_stream(behavior):
+            async def authenticated(request, context):
+                with credential_scope(await self._check(request, context)):
+                    async for response in behavior(request, context):
+                        yield response
+            return authenticated
+
+        return wrap_rpc_handler(handler, wrap_unary, wrap_stream)
+
+
+class DeadlineInterceptor(grpc.ServerInterceptor):
+    """Expose le délai et l'annulation de chaque RPC aux couches inférieures (mode synchrone).
+
+    Les appels fournisseur et les requêtes SQL en déduisent leur timeout ;
+    une RPC annulée par le client n'engage plus de nouvel appel fournisseur.
+    """
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+
+        def wrap_unary(behavior):
+            def with_deadline(request, context):
+                with deadline_scope(context.time_remaining()) as deadline:
+                    context.add_callback(deadline.cancel)
+                    return behavior(request, context)
+            return with_deadline
+
+        def wrap_stream(behavior):
+            def with_deadline(request, context):
+                with deadline_scope(context.time_remaining()) as deadline:
+                    context.add_callback(deadline.cancel)
+                    yield from behavior(request, context)
+            return with_deadline
+
+        return wrap_rpc_handler(handler, wrap_unary, wrap_stream)
+
+
+class AsyncDeadlineInterceptor(grpc.aio.ServerInterceptor):
+    """Variante grpc.aio de DeadlineInterceptor.
+
+    L'annulation par le client annule déjà la tâche de la RPC ; seul le délai
+    est à transmettre.
+    """
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+
+        def wrap_unary(behavior):
+            async def with_deadline(request, context):
+                with deadline_scope(context.time_remaining()):
+                    return await behavior(request, context)
+            return with_deadline
+
+        def wrap_stream(behavior):
+            async def with_deadline(request, context):
+                with deadline_scope(context.time_remaining()):
+                    async for response in behavior(request, context):
+                        yield response
+            return with_deadline
+
+        return wrap_rpc_handler(handler, wrap_unary, wrap_stream)
+
+
+def _throttled(context, retry_after: float) -> str:
+    """Annonce au client quand réessayer ; retourne le message d'erreur RESOURCE_EXHAUSTED."""
+    context.set_trailing_metadata((
+        ("retry-after", str(max(1, math.ceil(retry_after)))),
+        ("retry-after-ms", str(max(1, math.ceil(retry_after * 1000)))),
+    ))
+    return f"Rate limit exceeded, retry after {retry_after:.3f}s"
+
+
+def rate_limited_merchant(request) -> str:
+    """Marchand dont le débit est décompté : celui de la clé API authentifiée.
+
+    Sans authentification (GRPC_AUTH_ENABLED=false), le merchant_id de la
+    requête ; les requêtes qui n'en portent pas partagent le seau "".
+    """
+    credential = authenticated_credential()
+    if credential is not None:
+        return credential.merchant_id
+    return getattr(request, "merchant_id", "")
+
+
+class RateLimitInterceptor(grpc.ServerInterceptor):
+    """Limite le débit de chaque marchand, RPC par RPC (mode synchrone).
+
+    Un seau à jetons par (marchand authentifié, RPC), dimensionné par les réglages du
+    marchand (Merchant.settings["rate_limits"]) ou par RATE_LIMIT_DEFAULT_*.
+    Au-delà, la RPC échoue avec RESOURCE_EXHAUSTED et les métadonnées
+    retry-after (secondes) et retry-after-ms.
+    """
+
+    def __init__(self,
+                 limits: MerchantRateLimits = merchant_rate_limits,
+                 limiter: ShardedRateLimiter = rate_limiter,
+                 public_methods=PUBLIC_METHODS):
+        self.limits = limits
+        self.limiter = limiter
+        self.public_methods = public_methods
+
+    def _check(self, method: str, request, context):
+        merchant_id = rate_limited_merchant(request)
+        with start_span("rate_limit"):
+            limit = self.limits.get(merchant_id, method)
+            retry_after = self.limiter.acquire((merchant_id, method), limit) if limit is not None else 0.0
+        if retry_after:
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, _throttled(context, retry_after))
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        method = method_name(handler_call_details)
+        if method in self.public_methods:
+            return handler
+
+        def wrap_unary(behavior):
+            def limited(request, context):
+                self._check(method, request, context)
+                return behavior(request, context)
+            return limited
+
+        def wrap_stream(behavior):
+            def limited(request, context):
+                self._check(method, request, context)
+                yield from behavior(request, context)
+            return limited
+
+        return wrap_rpc_handler(handler, wrap_unary, wrap_stream)
+
+
+class AsyncRateLimitInterceptor(grpc.aio.ServerInterceptor):
+    """Variante grpc.aio de RateLimitInterceptor."""
+
+    def __init__(self,
+                 limits: MerchantRateLimits = merchant_rate_limits,
+                 limiter: ShardedRateLimiter = rate_limiter,
+                 public_methods=PUBLIC_METHODS):
+        self.limits = limits
+        self.limiter = limiter
+        self.public_methods = public_methods
+
+    async def _check(self, method: str, request, context):
+        merchant_id = rate_limited_merchant(request)
+        with start_span("rate_limit"):
+            limit = await self.limits.get_async(merchant_id, method)
+            retry_after = self.limiter.acquire((merchant_id, method), limit) if limit is not None else 0.0
+        if retry_after:
+            await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, _throttled(context, retry_after))
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        method = method_name(handler_call_details)
+        if method in self.public_methods:
+            return handler
+
+        def wrap_unary(behavior):
+            async def limited(request, context):
+                await self._check(method, request, context)
+                return await behavior(request, context)
+            return limited
+
+        def wrap_stream(behavior):
+            async def limited(request, context):
+                await self._check(method, request, context)
+                async for response in behavior(request, context):
+                    yield response
+            return limited
+
+        return wrap_rpc_handler(handler, wrap_unary, wrap_stream)
+
+
+def _record_rpc(method: str, context, started: float, default_code: grpc.StatusCode) -> None:
+    # default_code : code de la RPC quand le handler n'en a fixé aucun (ni set_code, ni abort)
+    code = context.code() or default_code
+    GRPC_HANDLED.inc(method, code.name)
+    GRPC_HANDLING_SECONDS.observe(time.perf_counter() - started, method)
+
+
+def _sync_code(context, code: grpc.StatusCode) -> grpc.StatusCode:
+    # Handler interrompu par l'annulation de la RPC (client parti, délai dépassé)
+    return grpc.StatusCode.CANCELLED if code != grpc.StatusCode.OK and not context.is_active() else code
+
+
+class MetricsInterceptor(grpc.ServerInterceptor):
+    """Compte chaque RPC par code de retour et mesure sa latence (mode synchrone).
+
+    À placer en tête : les RPC refusées par les autres intercepteurs
+    (authentification, limitation de débit) sont comptées aussi.
+    """
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        method = method_name(handler_call_details)
+
+        def wrap_unary(behavior):
+            def measured(request, context):
+                started, code = time.perf_counter(), grpc.StatusCode.UNKNOWN
+                try:
+                    response = behavior(request, context)
+                    code = grpc.StatusCode.OK
+                    return response
+                finally:
+                    _record_rpc(method, context, started, _sync_code(context, code))
+            return measured
+
+        def wrap_stream(behavior):
+            def measured(request, context):
+                started, code = time.perf_counter(), grpc.StatusCode.UNKNOWN
+                try:
+                    yield from behavior(request, context)
+                    code = grpc.StatusCode.OK
+                finally:
+                    _record_rpc(method, context, started, _sync_code(context, code))
+            return measured
+
+        return wrap_rpc_handler(handler, wrap_unary, wrap_stream)
+
+
+class AsyncMetricsInterceptor(grpc.aio.ServerInterceptor):
+    """Variante grpc.aio de MetricsInterceptor."""
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        method = method_name(handler_call_details)
+
+        def wrap_unary(behavior):
+            async def measured(request, context):
+                started, code = time.perf_counter(), grpc.StatusCode.UNKNOWN
+                try:
+                    response = await behavior(request, context)
+                    code = grpc.StatusCode.OK
+                    return response
+                except asyncio.CancelledError:
+                    code = grpc.StatusCode.CANCELLED
+                    raise
+                finally:
+                    _record_rpc(method, context, started, code)
+            return measured
+
+        def wrap_stream(behavior):
+            async def measured(request, context):
+                started, code = time.perf_counter(), grpc.StatusCode.UNKNOWN
+                try:
+                    async for response in behavior(request, context):
+                        yield response
+                    code = grpc.StatusCode.OK
+                except asyncio.CancelledError:
+                    code = grpc.StatusCode.CANCELLED
+                    raise
+                finally:
+                    _record_rpc(method, context, started, code)
+            return measured
+
+        return wrap_rpc_handler(handler, wrap_unary, wrap_stream)
+
+
+def _traceparent(context) -> str:
+    for key, value in context.invocation_metadata() or ():
+        if key == TRACEPARENT_METADATA:
+            return value
+    return ""
+
+
+def _end_rpc_span(span, context) -> None:
+    if span is None:
+        return
+    code = context.code()
+    if code is not None and code != grpc.StatusCode.OK:
+        span.set_attribute("rpc.grpc.status_code", code.value[0])
+        span.error = span.error or code.name
+
+
+class TracingInterceptor(grpc.ServerInterceptor):
+    """Ouvre le span racine de chaque RPC échantillonnée (mode synchrone).
+
+    La trace de l'appelant est reprise de la métadonnée traceparent (W3C) ;
+    les étapes (authentification, fournisseur, requêtes SQL…) y sont
+    rattachées par start_span().
+    """
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        method = method_name(handler_call_details)
+
+        def wrap_unary(behavior):
+            def traced(request, context):
+                with server_span(f"grpc.{method}", _traceparent(context), **{"rpc.method": method}) as span:
+                    try:
+                        return behavior(request, context)
+                    finally:
+                        _end_rpc_span(span, context)
+            return traced
+
+        def wrap_stream(behavior):
+            def traced(request, context):
+                with server_span(f"grpc.{method}", _traceparent(context), **{"rpc.method": method}) as span:
+                    try:
+                        yield from behavior(request, context)
+                    finally:
+                        _end_rpc_span(span, context)
+            return traced
+
+        return wrap_rpc_handler(handler, wrap_unary, wrap_stream)
+
+
+class AsyncTracingInterceptor(grpc.aio.ServerInterceptor):
+    """Variante grpc.aio de TracingInterceptor."""
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        method = method_name(handler_call_details)
+
+        def wrap_unary(behavior):
+            async def traced(request, context):
+                with server_span(f"grpc.{method}", _traceparent(context), **{"rpc.method": method}) as span:
+                    try:
+                        return await behavior(request, context)
+                    finally:
+                        _end_rpc_span(span, context)
+            return traced
+
+        def wrap_stream(behavior):
+            async def traced(request, context):
+                with server_span(f"grpc.{method}", _traceparent(context), **{"rpc.method": method}) as span:
+                    try:
+                        async for response in behavior(request, context):
+                            yield response
+                    finally:
+                        _end_rpc_span(span, context)
+            return traced
+
+        return wrap_rpc_handler(handler, wrap_unary, wrap_stream)
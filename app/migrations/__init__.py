@@ -0,0 +1,51 @@
+import importlib
+import pkgutil
+import re
+from datetime import datetime
+from typing import List, Tuple
+from sqlalchemy import Column, DateTime, MetaData, String, Table, insert, select
+from sqlalchemy.engine import Engine
+
+# Table de suivi des migrations appliquées, hors de Base.metadata
+migrations_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    migrations_metadata,
+    Column("version", String(64), primary_key=True),  # Nom du module de migration (ex. m0001_hot_lookup_indexes).
+    Column("applied_at", DateTime, nullable=False),
+)
+
+_MIGRATION_MODULE = re.compile(r"^m\d{4}_\w+$")
+
+
+def available_migrations() -> List[Tuple[str, object]]:
+    """Modules de migration (mNNNN_nom) du paquet, dans l'ordre de leur numéro."""
+    names = sorted(
+        module.name for module in pkgutil.iter_modules(__path__)
+        if _MIGRATION_MODULE.match(module.name)
+    )
+    return [(name, importlib.import_module(f"{__name__}.{name}")) for name in names]
+
+
+def run_migrations(db_engine: Engine = None) -> List[str]:
+    """Applique les migrations non encore appliquées, chacune dans sa transaction.
+
+    Chaque module expose upgrade(connection) et doit être rejouable sur une
+    base créée par create_all (index créés avec checkfirst, etc.).
+    Retourne les versions appliquées.
+    """
+    if db_engine is None:
+        from app.db import engine as db_engine
+    migrations_metadata.create_all(db_engine)
+    with db_engine.connect() as connection:
+        applied = set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+    newly_applied = []
+    for version, module in available_migrations():
+        if version in applied:
+            continue
+        with db_engine.begin() as connection:
+            module.upgrade(connection)
+            connection.execute(insert(schema_migrations).values(version=version, applied_at=datetime.utcnow()))
+        newly_applied.append(version)
+    return newly_applied
@@ -0,0 +1,20 @@
+import argparse
+from app.db import init_db
+from app.migrations.query_plans import verify_query_plans
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrations du schéma de la base de paiement")
+    parser.add_argument("--check-plans", action="store_true",
+                        help="Vérifie ensuite que les requêtes fréquentes utilisent un index")
+    args = parser.parse_args(argv)
+
+    for version in init_db():
+        print(f"Applied migration {version}")
+    if args.check_plans:
+        for name, plan in verify_query_plans().items():
+            print(f"{name}: {' | '.join(plan)}")
+
+
+if __name__ == '__main__':
+    main()
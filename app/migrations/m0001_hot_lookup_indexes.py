@@ -0,0 +1,55 @@
+"""Index des recherches fréquentes sur transactions et refunds.
+
+Sans eux, retrouver une transaction par provider_transaction_id (statuts,
+webhooks, remboursements), par clé d'idempotence ou par commande, et les
+remboursements d'une transaction, parcourt toute la table.
+
+Les index uniques sont des garde-fous de cohérence : une transaction du
+fournisseur n'est encaissée qu'une fois, un remboursement débité qu'une fois.
+Une base existante peut déjà contenir des doublons : ils sont signalés
+(DuplicateKeyError) avant toute création d'index plutôt que supprimés, car
+chaque ligne peut porter des remboursements et des écritures comptables.
+"""
+from sqlalchemy import Column, Index, MetaData, String, Table, func, select
+from app.utils.exceptions import DuplicateKeyError
+
+# Colonnes concernées, figées à cette version du schéma
+metadata = MetaData()
+transactions = Table(
+    "transactions", metadata,
+    Column("merchant_id", String(36)),
+    Column("provider_transaction_id", String(255)),
+    Column("order_id", String(255)),
+    Column("idempotency_key", String(255)),
+)
+refunds = Table(
+    "refunds", metadata,
+    Column("transaction_id", String(36)),
+    Column("provider_refund_id", String(255)),
+)
+
+INDEXES = [
+    Index("uq_transactions_provider_transaction_id", transactions.c.provider_transaction_id, unique=True),
+    Index("ix_transactions_merchant_idempotency_key", transactions.c.merchant_id, transactions.c.idempotency_key),
+    Index("ix_transactions_merchant_order", transactions.c.merchant_id, transactions.c.order_id),
+    Index("ix_refunds_transaction_id", refunds.c.transaction_id),
+    Index("uq_refunds_provider_refund_id", refunds.c.provider_refund_id, unique=True),
+]
+
+
+def _check_duplicates(connection, index: Index) -> None:
+    """Lève DuplicateKeyError si la colonne de l'index unique contient déjà des doublons."""
+    column = index.expressions[0]
+    duplicated = connection.execute(
+        select(column).where(column.isnot(None)).group_by(column).having(func.count() > 1).order_by(column)
+    ).scalars().all()
+    if duplicated:
+        raise DuplicateKeyError(column.table.name, column.name, duplicated)
+
+
+def upgrade(connection) -> None:
+    for index in INDEXES:
+        if index.unique:
+            _check_duplicates(connection, index)
+    for index in INDEXES:
+        index.create(connection, checkfirst=True)
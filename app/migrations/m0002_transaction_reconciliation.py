@@ -0,0 +1,38 @@
+"""Colonnes et index de la réconciliation des transactions en attente.
+
+next_reconcile_at porte la date de la prochaine vérification auprès du
+fournisseur ; l'index (status, next_reconcile_at) permet de trouver les
+transactions dues sans parcourir la table. Les transactions déjà en attente
+sont rendues dues immédiatement.
+"""
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, inspect, update
+from sqlalchemy.schema import CreateColumn
+
+# Colonnes concernées, figées à cette version du schéma
+metadata = MetaData()
+transactions = Table(
+    "transactions", metadata,
+    Column("status", String(10)),
+    Column("created_at", DateTime),
+    Column("next_reconcile_at", DateTime),
+    Column("reconcile_attempts", Integer, nullable=False, server_default="0"),
+)
+
+INDEXES = [
+    Index("ix_transactions_status_next_reconcile", transactions.c.status, transactions.c.next_reconcile_at),
+]
+
+
+def upgrade(connection) -> None:
+    existing = {column["name"] for column in inspect(connection).get_columns("transactions")}
+    for column in (transactions.c.next_reconcile_at, transactions.c.reconcile_attempts):
+        if column.name not in existing:
+            ddl = CreateColumn(column).compile(dialect=connection.dialect)
+            connection.exec_driver_sql(f"ALTER TABLE transactions ADD COLUMN {ddl}")
+    for index in INDEXES:
+        index.create(connection, checkfirst=True)
+    connection.execute(
+        update(transactions)
+        .where(transactions.c.status.in_(("PENDING", "PROCESSING")), transactions.c.next_reconcile_at.is_(None))
+        .values(next_reconcile_at=transactions.c.created_at)
+    )
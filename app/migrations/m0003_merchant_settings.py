@@ -0,0 +1,17 @@
+"""Colonne settings des marchands (réglages propres à chacun, dont les limites de débit)."""
+from sqlalchemy import JSON, Column, MetaData, Table, inspect
+from sqlalchemy.schema import CreateColumn
+
+# Colonne concernée, figée à cette version du schéma
+metadata = MetaData()
+merchants = Table(
+    "merchants", metadata,
+    Column("settings", JSON),
+)
+
+
+def upgrade(connection) -> None:
+    existing = {column["name"] for column in inspect(connection).get_columns("merchants")}
+    if "settings" not in existing:
+        ddl = CreateColumn(merchants.c.settings).compile(dialect=connection.dialect)
+        connection.exec_driver_sql(f"ALTER TABLE merchants ADD COLUMN {ddl}")
@@ -0,0 +1,102 @@
+"""Montants en unités mineures entières à la place des colonnes Float.
+
+Ajoute transactions.amount_minor et fee_minor, refunds.amount_minor,
+merchant_balances.available_minor et pending_minor, les remplit depuis les
+anciennes colonnes (amount, available, pending) converties selon l'exposant
+de la devise, puis supprime ces dernières : amount, NOT NULL, ferait échouer
+les insertions qui ne la renseignent plus.
+
+L'index ledger_entries.transaction_id sert aux remboursements, qui lisent
+les fonds encore en attente de leur transaction.
+"""
+from sqlalchemy import BigInteger, Column, Float, Index, MetaData, String, Table, bindparam, inspect, select, update
+from sqlalchemy.schema import CreateColumn
+from app.utils.money import to_minor_units
+
+# Colonnes concernées, figées à cette version du schéma
+metadata = MetaData()
+transactions = Table(
+    "transactions", metadata,
+    Column("id", String(36), primary_key=True),
+    Column("currency", String(3)),
+    Column("amount", Float),
+    Column("amount_minor", BigInteger, nullable=False, server_default="0"),
+    Column("fee_minor", BigInteger, nullable=False, server_default="0"),
+)
+refunds = Table(
+    "refunds", metadata,
+    Column("id", String(36), primary_key=True),
+    Column("transaction_id", String(36)),
+    Column("amount", Float),
+    Column("amount_minor", BigInteger, nullable=False, server_default="0"),
+)
+merchant_balances = Table(
+    "merchant_balances", metadata,
+    Column("id", String(36), primary_key=True),
+    Column("currency", String(3)),
+    Column("available", Float),
+    Column("pending", Float),
+    Column("available_minor", BigInteger, nullable=False, server_default="0"),
+    Column("pending_minor", BigInteger, nullable=False, server_default="0"),
+)
+ledger_entries = Table(
+    "ledger_entries", metadata,
+    Column("transaction_id", String(36)),
+)
+
+INDEXES = [
+    Index("ix_ledger_entries_transaction_id", ledger_entries.c.transaction_id),
+]
+
+# Anciennes colonnes Float -> nouvelles colonnes entières, par table
+CONVERTED_COLUMNS = {
+    transactions: {"amount": "amount_minor"},
+    refunds: {"amount": "amount_minor"},
+    merchant_balances: {"available": "available_minor", "pending": "pending_minor"},
+}
+NEW_COLUMNS = {
+    transactions: ("amount_minor", "fee_minor"),
+    refunds: ("amount_minor",),
+    merchant_balances: ("available_minor", "pending_minor"),
+}
+
+
+def _legacy_rows(connection, table: Table, legacy: list):
+    """(id, devise, anciennes valeurs...) ; les remboursements prennent la devise de leur transaction."""
+    if table is refunds:
+        return connection.execute(
+            select(refunds.c.id, transactions.c.currency, *(refunds.c[name] for name in legacy))
+            .select_from(refunds.outerjoin(transactions, refunds.c.transaction_id == transactions.c.id))
+        )
+    return connection.execute(select(table.c.id, table.c.currency, *(table.c[name] for name in legacy)))
+
+
+def _backfill(connection, table: Table, legacy: list) -> None:
+    columns = CONVERTED_COLUMNS[table]
+    values = [
+        dict(row_id=row[0], **{columns[name]: to_minor_units(value or 0, row[1]) for name, value in zip(legacy, row[2:])})
+        for row in _legacy_rows(connection, table, legacy)
+    ]
+    if values:
+        connection.execute(
+            update(table).where(table.c.id == bindparam("row_id"))
+            .values({columns[name]: bindparam(columns[name]) for name in legacy}),
+            values,
+        )
+
+
+def upgrade(connection) -> None:
+    for table, new_columns in NEW_COLUMNS.items():
+        existing = {column["name"] for column in inspect(connection).get_columns(table.name)}
+        for name in new_columns:
+            if name not in existing:
+                ddl = CreateColumn(table.c[name]).compile(dialect=connection.dialect)
+                connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+        legacy = [name for name in CONVERTED_COLUMNS[table] if name in existing]
+        if not legacy:
+            continue
+        _backfill(connection, table, legacy)
+        for name in legacy:
+            connection.exec_driver_sql(f"ALTER TABLE {table.name} DROP COLUMN {name}")
+    for index in INDEXES:
+        index.create(connection, checkfirst=True)
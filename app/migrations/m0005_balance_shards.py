@@ -0,0 +1,98 @@
+"""Sous-lignes (shard) des soldes marchands.
+
+Ajoute merchant_balances.shard et la clé unique (merchant_id, currency,
+shard). Les lignes existantes d'un même (marchand, devise), que rien
+n'empêchait auparavant, reçoivent des shards distincts : le solde étant la
+somme des sous-lignes, aucun montant n'est perdu.
+
+L'ancienne clé unique (merchant_id, currency), si elle existe, est supprimée :
+elle ferait échouer la création de tout shard autre que le premier. SQLite ne
+sachant pas supprimer une contrainte, la table y est reconstruite.
+"""
+from typing import Dict
+from sqlalchemy import (BigInteger, Column, DateTime, ForeignKey, Integer, MetaData, String, Table,
+                        UniqueConstraint, bindparam, insert, inspect, select, update)
+from sqlalchemy.schema import AddConstraint, CreateColumn
+
+SHARD_UNIQUE_NAME = "uq_merchant_balances_merchant_currency_shard"
+LEGACY_UNIQUE_COLUMNS = ["currency", "merchant_id"]
+
+# Tables à cette version du schéma
+metadata = MetaData()
+Table("merchants", metadata, Column("id", String(36), primary_key=True))
+
+
+def _balances_table(name: str) -> Table:
+    return Table(
+        name, metadata,
+        Column("id", String(36), primary_key=True),
+        Column("merchant_id", String(36), ForeignKey("merchants.id")),
+        Column("currency", String(3)),
+        Column("shard", Integer, nullable=False, server_default="0"),
+        Column("available_minor", BigInteger, nullable=False, server_default="0"),
+        Column("pending_minor", BigInteger, nullable=False, server_default="0"),
+        Column("updated_at", DateTime),
+        UniqueConstraint("merchant_id", "currency", "shard", name=SHARD_UNIQUE_NAME),
+    )
+
+
+merchant_balances = _balances_table("merchant_balances")
+rebuilt_balances = _balances_table("merchant_balances_rebuilt")
+
+
+def _spread_shards(rows) -> Dict[str, int]:
+    """Shard de chaque ligne (id, merchant_id, currency) : 0, 1, 2... au sein d'un même (marchand, devise)."""
+    counts = {}
+    shards = {}
+    for row_id, merchant_id, currency in rows:
+        shards[row_id] = counts.get((merchant_id, currency), 0)
+        counts[(merchant_id, currency)] = shards[row_id] + 1
+    return shards
+
+
+def _rebuild_sqlite(connection, has_shard: bool) -> None:
+    """Recrée la table avec la nouvelle clé unique et y recopie les lignes."""
+    copied = [column for column in merchant_balances.columns if has_shard or column.name != "shard"]
+    rows = [dict(row._mapping) for row in connection.execute(select(*copied).order_by(merchant_balances.c.id))]
+    if not has_shard:
+        shards = _spread_shards((row["id"], row["merchant_id"], row["currency"]) for row in rows)
+        for row in rows:
+            row["shard"] = shards[row["id"]]
+    rebuilt_balances.create(connection)
+    if rows:
+        connection.execute(insert(rebuilt_balances), rows)
+    connection.exec_driver_sql("DROP TABLE merchant_balances")
+    connection.exec_driver_sql("ALTER TABLE merchant_balances_rebuilt RENAME TO merchant_balances")
+
+
+def _drop_unique(connection, name: str) -> None:
+    keyword = "INDEX" if connection.dialect.name == "mysql" else "CONSTRAINT"
+    connection.exec_driver_sql(f"ALTER TABLE merchant_balances DROP {keyword} {name}")
+
+
+def upgrade(connection) -> None:
+    inspector = inspect(connection)
+    has_shard = any(column["name"] == "shard" for column in inspector.get_columns("merchant_balances"))
+    uniques = inspector.get_unique_constraints("merchant_balances")
+    legacy = [u["name"] for u in uniques if sorted(u["column_names"]) == LEGACY_UNIQUE_COLUMNS]
+    has_shard_unique = any(u["name"] == SHARD_UNIQUE_NAME for u in uniques)
+    if has_shard and has_shard_unique and not legacy:
+        return  # Table créée par create_all avec le modèle actuel
+    if connection.dialect.name == "sqlite":
+        _rebuild_sqlite(connection, has_shard)
+        return
+    if not has_shard:
+        ddl = CreateColumn(merchant_balances.c.shard).compile(dialect=connection.dialect)
+        connection.exec_driver_sql(f"ALTER TABLE merchant_balances ADD COLUMN {ddl}")
+        shards = _spread_shards(connection.execute(
+            select(merchant_balances.c.id, merchant_balances.c.merchant_id, merchant_balances.c.currency)
+            .order_by(merchant_balances.c.id)))
+        values = [dict(row_id=row_id, new_shard=shard) for row_id, shard in shards.items() if shard]
+        if values:
+            connection.execute(update(merchant_balances).where(merchant_balances.c.id == bindparam("row_id"))
+                               .values(shard=bindparam("new_shard")), values)
+    for name in legacy:
+        _drop_unique(connection, name)
+    if not has_shard_unique:
+        connection.execute(AddConstraint(next(c for c in merchant_balances.constraints
+                                              if c.name == SHARD_UNIQUE_NAME)))
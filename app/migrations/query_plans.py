@@ -0,0 +1,69 @@
+import re
+from datetime import datetime
+from typing import Callable, Dict, List
+from sqlalchemy import Select, func, select, text
+from sqlalchemy.engine import Engine
+from app.services.balance_service import BalanceService
+from app.services.reconciliation_service import PaymentReconciler
+from app.services.transaction_service import TransactionService
+from app.utils.exceptions import SequentialScanError
+from models.models import IdempotencyRecord, LedgerEntry, MerchantCredential, Refund, Transaction
+
+# Requêtes fréquentes qui doivent toujours passer par un index
+HOT_QUERIES: Dict[str, Callable[[], Select]] = {
+    "transaction_by_provider_id": lambda: select(Transaction).where(
+        Transaction.provider_transaction_id == "PAY-0"),
+    "transaction_by_merchant_provider_id": lambda: select(Transaction).where(
+        Transaction.merchant_id == "m", Transaction.provider_transaction_id == "PAY-0"),
+    "transactions_by_merchant_provider_ids": lambda: TransactionService.provider_ids_query("m", ["PAY-0", "PAY-1"]),
+    "transaction_by_idempotency_key": lambda: select(Transaction).where(
+        Transaction.merchant_id == "m", Transaction.idempotency_key == "k"),
+    "transaction_by_order_id": lambda: select(Transaction).where(
+        Transaction.merchant_id == "m", Transaction.order_id == "o"),
+    "transactions_page": lambda: TransactionService().page_query("m")[0],
+    "transactions_due_for_reconciliation": lambda: PaymentReconciler.due_query(datetime(2000, 1, 1), 100),
+    "refunded_amount": lambda: select(func.sum(Refund.amount_minor)).where(Refund.transaction_id == "t"),
+    "refund_by_provider_refund_id": lambda: select(Refund.id).where(Refund.provider_refund_id == "REF-0"),
+    "ledger_entries_by_transaction": lambda: select(LedgerEntry.amount_minor).where(LedgerEntry.transaction_id == "t"),
+    "merchant_balances": lambda: BalanceService.balances_query("m", "USD"),
+    "credential_by_api_key": lambda: select(MerchantCredential).where(MerchantCredential.api_key == "k"),
+    "idempotency_record": lambda: select(IdempotencyRecord).where(
+        IdempotencyRecord.merchant_id == "m", IdempotencyRecord.idempotency_key == "k"),
+}
+
+# Lignes de plan indiquant un parcours complet de table
+_SEQUENTIAL_SCAN = {
+    "sqlite": re.compile(r"^SCAN (?!.*USING (COVERING )?INDEX)"),
+    "postgresql": re.compile(r"Seq Scan on"),
+}
+
+
+def explain(connection, query: Select) -> List[str]:
+    """Plan d'exécution d'une requête, une ligne par nœud."""
+    sql = str(query.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+    if connection.dialect.name == "sqlite":
+        return [row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+    # Sur une petite table, PostgreSQL préfère un Seq Scan même avec un index : on l'en empêche
+    # pour que seul un index manquant en produise un.
+    connection.execute(text("SET LOCAL enable_seqscan = off"))
+    return [row[0] for row in connection.execute(text(f"EXPLAIN {sql}"))]
+
+
+def verify_query_plans(db_engine: Engine = None) -> Dict[str, List[str]]:
+    """Vérifie qu'aucune requête de HOT_QUERIES ne parcourt une table entière.
+
+    Retourne les plans par requête ; lève SequentialScanError sinon.
+    """
+    if db_engine is None:
+        from app.db import engine as db_engine
+    pattern = _SEQUENTIAL_SCAN.get(db_engine.dialect.name)
+    plans = {}
+    with db_engine.connect() as connection:
+        for name, build_query in HOT_QUERIES.items():
+            with connection.begin():
+                plans[name] = explain(connection, build_query())
+    if pattern is not None:
+        offending = sorted(name for name, plan in plans.items() if any(pattern.search(line) for line in plan))
+        if offending:
+            raise SequentialScanError(offending)
+    return plans
@@ -1,11 +1,16 @@
 from abc import abstractmethod,ABC
-from typing import Dict,Optional
+from typing import Callable,Dict,Optional
 from decimal import Decimal
 from dataclasses import dataclass
 from enum import Enum
 from datetime import datetime
-from utils.exceptions import PaymentError,PaymentValidationError
-from utils.validation import validate_currency,validate_amount
+import asyncio
+import contextvars
+import functools
+import inspect
+import threading
+from app.utils.exceptions import PaymentError,PaymentValidationError
+from app.utils.validation import validate_currency,validate_amount
 
 class PaymentStatus(Enum):
   PENDING = 'pending' # en attente
@@ -29,6 +34,7 @@ class PaymentResult:
   amount_processed: Optional[Decimal] = None
   fee_amount: Optional[Decimal] = None
   risk_score: Optional[int] = None
+  retryable: bool = False # échec côté fournisseur (réseau, 5xx, 429) : la même requête peut réussir plus tard
   created_at: datetime = datetime.now()
 
   def __post_init__(self):
@@ -70,4 +76,37 @@ class PaymentProvider(ABC):
     
     @abstractmethod
     def get_payment_status(self, transaction_id: str) -> PaymentResult:
-        pass
\ No newline at end of file
+        pass
+
+
+async def run_provider_call(method: Callable, *args, **kwargs):
+    """Exécute un appel provider depuis la boucle asyncio.
+
+    Les providers natifs asyncio sont attendus directement ; les providers
+    bloquants sont déportés dans l'exécuteur par défaut de la boucle.
+    """
+    if inspect.iscoroutinefunction(method):
+        return await method(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    # run_in_executor ne transmet pas les contextvars (délai de la RPC) au thread
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(None, functools.partial(context.run, method, *args, **kwargs))
+
+
+_background_loop: Optional[asyncio.AbstractEventLoop] = None
+_background_loop_lock = threading.Lock()
+
+
+def run_coroutine_sync(coro):
+    """Exécute une coroutine provider depuis du code synchrone.
+
+    Les coroutines tournent sur une boucle unique dédiée, afin que les sessions
+    HTTP des providers asyncio soient partagées par tous les threads du serveur.
+    """
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None:
+            _background_loop = asyncio.new_event_loop()
+            threading.Thread(target=_background_loop.run_forever,
+                             name="provider-event-loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop).result()
@@ -1,48 +1,195 @@
+import asyncio
+import copy
 from decimal import Decimal
 from typing import Dict, Optional
+import inspect
 import logging
-from providers.paypal_provider import PayPalPaymentProvider
-from .base_provider import PaymentResult
-from utils.exceptions import ProviderNotSupportedError, InvalidProviderConfigError
+import time
+from app.providers.paypal_provider import PayPalPaymentProvider
+from app.providers.paypal_async_provider import AsyncPayPalPaymentProvider
+from app.providers.simulated_provider import SimulatedPaymentProvider
+from .base_provider import PaymentResult, run_coroutine_sync, run_provider_call
+from app.config import Config
+from app.utils.deadline import check_deadline
+from app.utils.exceptions import (ProviderNotSupportedError, InvalidProviderConfigError, PaymentValidationError,
+                                  RequestCancelledError)
+from app.utils.logger import log_event
+from app.utils.metrics import PROVIDER_CALL_SECONDS
+from app.utils.resilience import get_bulkhead, get_circuit_breaker
+from app.utils.tracing import start_span
+
+# Libellé "operation" des métriques, par méthode du provider
+PROVIDER_OPERATIONS = {
+    "create_payment_intent": "create",
+    "confirm_payment": "execute",
+    "get_payment_status": "find",
+    "refund_payment": "refund",
+}
 
 class PaymentService:
     PROVIDERS = {
-        "paypal": PayPalPaymentProvider
+        "paypal": PayPalPaymentProvider,
+        "paypal_async": AsyncPayPalPaymentProvider,
+        "simulated": SimulatedPaymentProvider,
     }
 
     def __init__(self, provider_name: str, config: Dict[str, str]):
+        self.provider_name = provider_name
         self.provider = self._get_provider(provider_name, config)
         self.logger = logging.getLogger(__name__)
+        # Partagés par toutes les instances du même fournisseur
+        self.circuit_breaker = get_circuit_breaker(provider_name)
+        self.bulkhead = get_bulkhead(provider_name)
 
     def _get_provider(self, provider_name: str, config: Dict[str, str]):
         provider_class = self.PROVIDERS.get(provider_name)
         if not provider_class:
-            raise ProviderNotSupportedError(f"Provider '{provider_name}' is not supported")
+            raise ProviderNotSupportedError(provider_name)
         # Validation des configurations
         required_keys = getattr(provider_class, "REQUIRED_CONFIG_KEYS", [])
         missing_keys = [key for key in required_keys if key not in config]
         if missing_keys:
-            raise InvalidProviderConfigError(f"Missing required config keys: {', '.join(missing_keys)}")
+            raise InvalidProviderConfigError(provider_name, missing_keys)
         return provider_class(**config)
 
+    def with_bulkhead(self, purpose: str, max_concurrent: int, wait_seconds: float) -> "PaymentService":
+        """Même fournisseur et même disjoncteur, avec un budget d'appels simultanés distinct.
+
+        Pour les tâches de fond (réconciliation) : leurs appels ne prennent
+        aucune des places du bulkhead réservé aux RPC.
+        """
+        service = copy.copy(self)
+        service.bulkhead = get_bulkhead(f"{self.provider_name}:{purpose}", max_concurrent, wait_seconds)
+        return service
+
+    @staticmethod
+    def _is_provider_failure(result: Optional[PaymentResult], error: Optional[BaseException]) -> bool:
+        """Échec imputable au fournisseur (compté par le disjoncteur), et non à la requête."""
+        if error is not None:
+            return not isinstance(error, PaymentValidationError)
+        return not result.success and result.retryable
+
+    def _record(self, operation: str, generation: int, duration: float,
+                result: Optional[PaymentResult], error: Optional[BaseException]) -> None:
+        """Transmet l'issue d'un appel au disjoncteur et aux métriques de latence."""
+        if isinstance(error, (asyncio.CancelledError, RequestCancelledError)):
+            # Annulation par l'appelant : ni succès ni échec du fournisseur
+            self.circuit_breaker.release(generation)
+        else:
+            self.circuit_breaker.record(generation, duration, self._is_provider_failure(result, error))
+        outcome = "error" if error is not None else ("success" if result.success else "failure")
+        PROVIDER_CALL_SECONDS.observe(
+            duration, self.provider_name, PROVIDER_OPERATIONS.get(operation, operation), outcome
+        )
+
+    def _call(self, operation: str, *args) -> PaymentResult:
+        """Appelle le provider depuis un thread, qu'il soit bloquant ou asyncio.
+
+        L'appel échoue aussitôt (ProviderUnavailableError) si le bulkhead du
+        fournisseur est plein ou si son circuit est ouvert, et n'est pas tenté
+        si la RPC est annulée ou si son délai restant est inférieur à
+        PROVIDER_MIN_BUDGET_SECONDS.
+        """
+        method = getattr(self.provider, operation)
+        check_deadline(f"provider call '{operation}'", Config.PROVIDER_MIN_BUDGET_SECONDS)
+        with start_span(f"provider.{PROVIDER_OPERATIONS.get(operation, operation)}", provider=self.provider_name):
+            self.bulkhead.acquire()
+            try:
+                generation = self.circuit_breaker.before_call()
+                started = time.monotonic()
+                result = error = None
+                try:
+                    if inspect.iscoroutinefunction(method):
+                        result = run_coroutine_sync(method(*args))
+                    else:
+                        result = method(*args)
+                    return result
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    self._record(operation, generation, time.monotonic() - started, result, error)
+            finally:
+                self.bulkhead.release()
+
+    async def _call_async(self, operation: str, *args) -> PaymentResult:
+        """Appelle le provider depuis la boucle asyncio, avec les mêmes protections que _call()."""
+        check_deadline(f"provider call '{operation}'", Config.PROVIDER_MIN_BUDGET_SECONDS)
+        with start_span(f"provider.{PROVIDER_OPERATIONS.get(operation, operation)}", provider=self.provider_name):
+            await self.bulkhead.acquire_async()
+            try:
+                generation = self.circuit_breaker.before_call()
+                started = time.monotonic()
+                result = error = None
+                try:
+                    result = await run_provider_call(getattr(self.provider, operation), *args)
+                    return result
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    self._record(operation, generation, time.monotonic() - started, result, error)
+            finally:
+                self.bulkhead.release()
+
+    def _log_request(self, event: str, **fields) -> None:
+        """Appel fournisseur à fort volume : journalisé par échantillonnage (LOG_SUCCESS_SAMPLE_RATE)."""
+        log_event(self.logger, logging.INFO, event, sample_rate=Config.LOG_SUCCESS_SAMPLE_RATE,
+                  provider=self.provider_name, **fields)
+
+    def _log_created(self, result: PaymentResult) -> None:
+        if result.success:
+            self._log_request("payment_intent.created",
+                              provider_transaction_id=result.provider_transaction_id, status=result.status.value)
+        else:
+            log_event(self.logger, logging.WARNING, "payment_intent.declined", provider=self.provider_name,
+                      status=result.status.value, error_message=result.error_message, retryable=result.retryable)
+
+    def _log_create_error(self, error: Exception) -> None:
+        # L'exception est convertie en texte par le formateur, hors du thread de la requête
+        log_event(self.logger, logging.ERROR, "payment_intent.create_error", provider=self.provider_name,
+                  error_type=type(error).__name__, error=error)
+
     def create_payment_intent(self, amount: Decimal, currency: str, payment_method_data: Dict, metadata: Optional[Dict] = None) -> PaymentResult:
-        self.logger.info(f"Creating payment intent with amount: {amount}, currency: {currency}")
+        self._log_request("payment_intent.create", amount=amount, currency=currency)
         try:
-            result = self.provider.create_payment_intent(amount, currency, payment_method_data, metadata)
-            self.logger.info(f"Payment intent created successfully: {result}")
+            result = self._call("create_payment_intent", amount, currency, payment_method_data, metadata)
+            self._log_created(result)
             return result
         except Exception as e:
-            self.logger.error(f"Error creating payment intent: {e}")
+            self._log_create_error(e)
             raise
 
     def confirm_payment(self, payment_intent_id: str, payment_method_data: Optional[Dict] = None) -> PaymentResult:
-        self.logger.info(f"Confirming payment with intent ID: {payment_intent_id}")
-        return self.provider.confirm_payment(payment_intent_id, payment_method_data)
+        self._log_request("payment.confirm", payment_intent_id=payment_intent_id)
+        return self._call("confirm_payment", payment_intent_id, payment_method_data)
 
     def refund_payment(self, transaction_id: str, amount: Optional[Decimal] = None, reason: Optional[str] = None) -> PaymentResult:
-        self.logger.info(f"Refunding payment for transaction ID: {transaction_id}, amount: {amount}, reason: {reason}")
-        return self.provider.refund_payment(transaction_id, amount, reason)
+        self._log_request("payment.refund", transaction_id=transaction_id, amount=amount, reason=reason)
+        return self._call("refund_payment", transaction_id, amount, reason)
 
     def get_payment_status(self, transaction_id: str) -> PaymentResult:
-        self.logger.info(f"Fetching payment status for transaction ID: {transaction_id}")
-        return self.provider.get_payment_status(transaction_id)
+        self._log_request("payment.status", transaction_id=transaction_id)
+        return self._call("get_payment_status", transaction_id)
+
+    async def create_payment_intent_async(self, amount: Decimal, currency: str, payment_method_data: Dict, metadata: Optional[Dict] = None) -> PaymentResult:
+        self._log_request("payment_intent.create", amount=amount, currency=currency)
+        try:
+            result = await self._call_async("create_payment_intent", amount, currency, payment_method_data, metadata)
+            self._log_created(result)
+            return result
+        except Exception as e:
+            self._log_create_error(e)
+            raise
+
+    async def confirm_payment_async(self, payment_intent_id: str, payment_method_data: Optional[Dict] = None) -> PaymentResult:
+        self._log_request("payment.confirm", payment_intent_id=payment_intent_id)
+        return await self._call_async("confirm_payment", payment_intent_id, payment_method_data)
+
+    async def refund_payment_async(self, transaction_id: str, amount: Optional[Decimal] = None, reason: Optional[str] = None) -> PaymentResult:
+        self._log_request("payment.refund", transaction_id=transaction_id, amount=amount, reason=reason)
+        return await self._call_async("refund_payment", transaction_id, amount, reason)
+
+    async def get_payment_status_async(self, transaction_id: str) -> PaymentResult:
+        self._log_request("payment.status", transaction_id=transaction_id)
+        return await self._call_async("get_payment_status", transaction_id)
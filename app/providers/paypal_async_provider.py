@@ -0,0 +1,281 @@
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+from decimal import Decimal
+import logging
+import aiohttp
+from app.providers.base_provider import PaymentProvider, PaymentResult, PaymentStatus
+from app.providers.paypal_provider import PAYPAL_STATE_MAPPING
+from app.utils.deadline import deadline_timeout
+from app.utils.tracing import start_span
+
+
+logger = logging.getLogger(__name__)
+
+PAYPAL_BASE_URLS = {
+    'sandbox': 'https://api-m.sandbox.paypal.com',
+    'live': 'https://api-m.paypal.com',
+}
+
+
+class PayPalAPIError(Exception):
+    """Réponse HTTP en erreur renvoyée par l'API REST PayPal."""
+    def __init__(self, status: int, body: Dict):
+        self.status = status
+        self.body = body
+        super().__init__(f"PayPal API returned HTTP {status}: {body.get('message') or body.get('error_description') or body}")
+
+
+class AsyncPayPalPaymentProvider(PaymentProvider):
+    """Implémentation asyncio du provider PayPal sur l'API REST (aiohttp).
+
+    Toutes les requêtes partagent une même session aiohttp : les connexions
+    keep-alive sont réutilisées et plafonnées globalement et par hôte.
+    """
+
+    def __init__(self,
+                 client_id: str,
+                 client_secret: str,
+                 mode: str = 'sandbox',
+                 base_url: Optional[str] = None,
+                 pool_size: int = 100,
+                 pool_size_per_host: int = 50,
+                 keepalive_timeout: float = 30.0,
+                 connect_timeout: float = 5.0,
+                 request_timeout: float = 30.0):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.base_url = (base_url or PAYPAL_BASE_URLS.get(mode, PAYPAL_BASE_URLS['sandbox'])).rstrip('/')
+        self.pool_size = pool_size
+        self.pool_size_per_host = pool_size_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=request_timeout, connect=connect_timeout)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._access_token: Optional[str] = None
+        self._token_expires_at = 0.0
+        self._token_lock: Optional[asyncio.Lock] = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Retourne la session partagée, créée à la première utilisation."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._token_lock = asyncio.Lock()
+        return self._session
+
+    async def close(self) -> None:
+        """Ferme la session et libère les connexions du pool."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _request_timeout(self) -> aiohttp.ClientTimeout:
+        """Timeout de la requête : request_timeout, réduit au délai restant de la RPC appelante."""
+        return aiohttp.ClientTimeout(total=deadline_timeout(self.timeout.total), connect=self.timeout.connect)
+
+    async def _get_access_token(self, force_refresh: bool = False) -> str:
+        """Obtient un jeton OAuth2, mis en cache jusqu'à peu avant son expiration."""
+        session = await self._get_session()
+        async with self._token_lock:
+            if not force_refresh and self._access_token and time.monotonic() < self._token_expires_at:
+                return self._access_token
+
+            with start_span("paypal.http", **{"http.method": "POST", "http.url": f"{self.base_url}/v1/oauth2/token"}):
+                async with session.post(
+                    f"{self.base_url}/v1/oauth2/token",
+                    data={'grant_type': 'client_credentials'},
+                    auth=aiohttp.BasicAuth(self.client_id or '', self.client_secret or ''),
+                    headers={'Accept': 'application/json'},
+                    timeout=self._request_timeout(),
+                ) as response:
+                    body = await response.json(content_type=None)
+                    if response.status != 200:
+                        raise PayPalAPIError(response.status, body or {})
+
+            self._access_token = body['access_token']
+            # Marge de 60 s pour ne jamais envoyer un jeton sur le point d'expirer
+            self._token_expires_at = time.monotonic() + max(int(body.get('expires_in', 0)) - 60, 0)
+            return self._access_token
+
+    async def _request(self, method: str, path: str, payload: Optional[Dict] = None) -> Tuple[int, Dict]:
+        """Exécute un appel authentifié ; le jeton est renouvelé une fois sur 401."""
+        session = await self._get_session()
+        for attempt in range(2):
+            token = await self._get_access_token(force_refresh=attempt > 0)
+            with start_span("paypal.http", **{"http.method": method, "http.url": f"{self.base_url}{path}"}) as span:
+                async with session.request(
+                    method,
+                    f"{self.base_url}{path}",
+                    json=payload,
+                    headers={'Authorization': f'Bearer {token}', 'Accept': 'application/json'},
+                    timeout=self._request_timeout(),
+                ) as response:
+                    if span is not None:
+                        span.set_attribute("http.status_code", response.status)
+                    body = await response.json(content_type=None) or {}
+                    if response.status == 401 and attempt == 0:
+                        continue
+                    if response.status >= 400:
+                        raise PayPalAPIError(response.status, body)
+                    return response.status, body
+        raise PayPalAPIError(401, {'message': 'Unauthorized'})
+
+    def _handle_paypal_error(self, error: Exception) -> PaymentResult:
+        """Gère les erreurs PayPal de manière standardisée"""
+        logger.error("PayPal error: %s", error, exc_info=True,
+                    extra={'error_type': type(error).__name__})
+
+        # Les erreurs 4xx (hors 429) tiennent à la requête ; le reste (réseau, 5xx) au fournisseur
+        client_error = isinstance(error, PayPalAPIError) and 400 <= error.status < 500 and error.status != 429
+        return PaymentResult(
+            success=False,
+            provider_transaction_id=None,
+            status=PaymentStatus.FAILED,
+            error_message=str(error) or type(error).__name__,
+            retryable=not client_error
+        )
+
+    async def create_payment_intent(self,
+                                    amount: Decimal,
+                                    currency: str,
+                                    payment_method_data: Dict,
+                                    metadata: Optional[Dict] = None) -> PaymentResult:
+        """Crée un paiement PayPal"""
+        try:
+            payment_data = {
+                "intent": "sale",
+                "payer": {
+                    "payment_method": "paypal"
+                },
+                "transactions": [{
+                    "amount": {
+                        "total": str(amount),
+                        "currency": currency.upper()
+                    },
+                    "description": metadata.get('description') if metadata else None
+                }],
+                "redirect_urls": {
+                    "return_url": payment_method_data.get('return_url'),
+                    "cancel_url": payment_method_data.get('cancel_url')
+                }
+            }
+
+            _, payment = await self._request('POST', '/v1/payments/payment', payment_data)
+            approval_url = next(
+                link['href'] for link in payment.get('links', [])
+                if link.get('rel') == "approval_url"
+            )
+
+            return PaymentResult(
+                success=True,
+                provider_transaction_id=payment['id'],
+                status=PaymentStatus.PENDING,
+                payment_method_details={'approval_url': approval_url},
+                provider_response=payment
+            )
+
+        except Exception as e:
+            return self._handle_paypal_error(e)
+
+    async def confirm_payment(self,
+                              payment_intent_id: str,
+                              payment_method_data: Optional[Dict] = None) -> PaymentResult:
+        """Exécute un paiement PayPal après approbation"""
+        if not payment_method_data or not payment_method_data.get('payer_id'):
+            return PaymentResult(
+                success=False,
+                provider_transaction_id=payment_intent_id,
+                status=PaymentStatus.FAILED,
+                error_message="Missing payer_id"
+            )
+
+        try:
+            _, payment = await self._request(
+                'POST',
+                f'/v1/payments/payment/{payment_intent_id}/execute',
+                {'payer_id': payment_method_data['payer_id']}
+            )
+
+            # Calculer les frais
+            transaction = payment['transactions'][0]
+            fee_amount = Decimal('0')
+            for resource in transaction.get('related_resources', []):
+                sale = resource.get('sale') or {}
+                if 'transaction_fee' in sale:
+                    fee_amount = Decimal(sale['transaction_fee']['value'])
+
+            return PaymentResult(
+                success=True,
+                provider_transaction_id=payment['id'],
+                status=PaymentStatus.COMPLETED,
+                payment_method_details={'payer_id': payment_method_data['payer_id']},
+                provider_response=payment,
+                amount_processed=Decimal(transaction['amount']['total']),
+                fee_amount=fee_amount
+            )
+
+        except Exception as e:
+            return self._handle_paypal_error(e)
+
+    async def refund_payment(self,
+                             transaction_id: str,
+                             amount: Optional[Decimal] = None,
+                             reason: Optional[str] = None) -> PaymentResult:
+        """Effectue un remboursement PayPal"""
+        try:
+            _, payment = await self._request('GET', f'/v1/payments/payment/{transaction_id}')
+            sale = payment['transactions'][0]['related_resources'][0]['sale']
+
+            refund_data = {}
+            if amount:
+                refund_data['amount'] = {
+                    'total': str(amount),
+                    'currency': sale['amount']['currency']
+                }
+
+            if reason:
+                refund_data['description'] = reason
+
+            _, refund = await self._request('POST', f"/v1/payments/sale/{sale['id']}/refund", refund_data)
+
+            return PaymentResult(
+                success=True,
+                provider_transaction_id=refund['id'],
+                status=PaymentStatus.REFUNDED,
+                amount_processed=Decimal(refund['amount']['total']),
+                provider_response=refund
+            )
+
+        except Exception as e:
+            return self._handle_paypal_error(e)
+
+    async def get_payment_status(self, transaction_id: str) -> PaymentResult:
+        """Récupère le statut d'un paiement PayPal"""
+        try:
+            _, payment = await self._request('GET', f'/v1/payments/payment/{transaction_id}')
+            transaction = payment['transactions'][0]
+            amount = transaction['amount']
+            # Frais connus une fois la vente réalisée ; None sinon (et non 0)
+            fee_amount = None
+            for resource in transaction.get('related_resources', []):
+                sale = resource.get('sale') or {}
+                if 'transaction_fee' in sale:
+                    fee_amount = Decimal(sale['transaction_fee']['value'])
+
+            return PaymentResult(
+                success=True,
+                provider_transaction_id=payment['id'],
+                status=PAYPAL_STATE_MAPPING.get(payment.get('state'), PaymentStatus.PROCESSING),
+                payment_method_details={'currency': amount['currency']},
+                provider_response=payment,
+                amount_processed=Decimal(amount['total']),
+                fee_amount=fee_amount
+            )
+
+        except Exception as e:
+            return self._handle_paypal_error(e)
@@ -2,31 +2,61 @@ import paypalrestsdk
 from typing import Dict, Optional
 from decimal import Decimal
 import logging
-from providers.base_provider import PaymentProvider,PaymentResult,PaymentStatus
+from app.providers.base_provider import PaymentProvider,PaymentResult,PaymentStatus
+from app.utils.deadline import deadline_timeout
+from app.utils.tracing import start_span
 
 
 logger = logging.getLogger(__name__)
 
+# Correspondance entre les états de paiement PayPal et nos statuts
+PAYPAL_STATE_MAPPING = {
+    'created': PaymentStatus.PENDING,
+    'approved': PaymentStatus.COMPLETED,
+    'failed': PaymentStatus.FAILED,
+    'canceled': PaymentStatus.CANCELLED,
+    'expired': PaymentStatus.CANCELLED,
+}
+
+class _TimeoutApi(paypalrestsdk.Api):
+    """Api paypalrestsdk dont chaque requête HTTP est bornée (le SDK n'en borne aucune).
+
+    Le timeout est request_timeout, réduit au délai restant de la RPC appelante.
+    """
+
+    def __init__(self, options: Dict, request_timeout: float):
+        super().__init__(options)
+        self.request_timeout = request_timeout
+
+    def http_call(self, url, method, **kwargs):
+        kwargs.setdefault('timeout', deadline_timeout(self.request_timeout))
+        with start_span("paypal.http", **{"http.method": method, "http.url": url}):
+            return super().http_call(url, method, **kwargs)
+
 class PayPalPaymentProvider(PaymentProvider):
     """Implémentation du provider de paiement PayPal"""
     
-    def __init__(self, client_id: str, client_secret: str, mode: str = 'sandbox'):
-        self.api = paypalrestsdk.Api({
+    def __init__(self, client_id: str, client_secret: str, mode: str = 'sandbox', request_timeout: float = 30.0):
+        self.api = _TimeoutApi({
             'mode': mode,
             'client_id': client_id,
             'client_secret': client_secret
-        })
+        }, request_timeout)
     
     def _handle_paypal_error(self, error: Exception) -> PaymentResult:
         """Gère les erreurs PayPal de manière standardisée"""
-        logger.error(f"PayPal error: {str(error)}", exc_info=True,
+        logger.error("PayPal error: %s", error, exc_info=True,
                     extra={'error_type': type(error).__name__})
         
+        # ClientError : erreur 4xx due à la requête (sauf 429) ; le reste (réseau, 5xx) tient au fournisseur
+        client_error = (isinstance(error, paypalrestsdk.exceptions.ClientError)
+                        and getattr(error.response, 'status_code', None) != 429)
         return PaymentResult(
             success=False,
             provider_transaction_id=None,
             status=PaymentStatus.FAILED,
-            error_message=str(error)
+            error_message=str(error),
+            retryable=not client_error
         )
     
     def create_payment_intent(self,
@@ -165,4 +195,28 @@ class PayPalPaymentProvider(PaymentProvider):
                 
         except Exception as e:
             return self._handle_paypal_error(e)
-        
\ No newline at end of file
+
+    def get_payment_status(self, transaction_id: str) -> PaymentResult:
+        """Récupère le statut d'un paiement PayPal"""
+        try:
+            payment = paypalrestsdk.Payment.find(transaction_id, api=self.api)
+            transaction = payment.transactions[0]
+            amount = transaction.amount
+            # Frais connus une fois la vente réalisée ; None sinon (et non 0)
+            fee_amount = None
+            for resource in getattr(transaction, 'related_resources', None) or []:
+                if hasattr(resource, 'sale') and hasattr(resource.sale, 'transaction_fee'):
+                    fee_amount = Decimal(resource.sale.transaction_fee.value)
+
+            return PaymentResult(
+                success=True,
+                provider_transaction_id=payment.id,
+                status=PAYPAL_STATE_MAPPING.get(payment.state, PaymentStatus.PROCESSING),
+                payment_method_details={'currency': amount.currency},
+                provider_response=payment.to_dict(),
+                amount_processed=Decimal(amount.total),
+                fee_amount=fee_amount
+            )
+
+        except Exception as e:
+            return self._handle_paypal_error(e)
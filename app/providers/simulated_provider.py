@@ -0,0 +1,343 @@
+import asyncio
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_EVEN
+from typing import Dict, Optional, Tuple, Union
+from app.providers.base_provider import PaymentProvider, PaymentResult, PaymentStatus
+from app.utils.deadline import deadline_timeout
+from app.utils.money import currency_exponent
+
+# États d'un paiement simulé (calqués sur ceux de PayPal) et statuts correspondants
+SIMULATED_STATE_MAPPING = {
+    'created': PaymentStatus.PENDING,
+    'approved': PaymentStatus.COMPLETED,
+    'failed': PaymentStatus.FAILED,
+    'expired': PaymentStatus.CANCELLED,
+    'refunded': PaymentStatus.REFUNDED,
+    'partially_refunded': PaymentStatus.PARTIALLY_REFUNDED,
+}
+
+# Lois de latence (millisecondes) : nombre de paramètres et tirage
+LATENCY_DISTRIBUTIONS = {
+    'fixed': (1, lambda rng, value: value),
+    'uniform': (2, lambda rng, low, high: rng.uniform(low, high)),
+    'normal': (2, lambda rng, mean, stddev: rng.gauss(mean, stddev)),
+    'lognormal': (2, lambda rng, median, sigma: median * math.exp(rng.gauss(0.0, sigma))),
+    'exponential': (1, lambda rng, mean: rng.expovariate(1 / mean) if mean > 0 else 0.0),
+    'pareto': (2, lambda rng, scale, alpha: scale * rng.paretovariate(alpha)),  # Queue lourde
+}
+
+
+@dataclass(frozen=True)
+class LatencyDistribution:
+    """Loi de latence décrite par "loi:paramètres" en millisecondes, ex. "lognormal:80:0.5" (médiane, sigma)."""
+    kind: str
+    parameters: Tuple[float, ...]
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDistribution":
+        kind, *parameters = spec.strip().split(':')
+        if kind not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution {kind!r} (expected one of {', '.join(LATENCY_DISTRIBUTIONS)})")
+        try:
+            values = tuple(float(parameter) for parameter in parameters)
+        except ValueError:
+            raise ValueError(f"Invalid latency distribution parameters: {spec!r}") from None
+        if len(values) != LATENCY_DISTRIBUTIONS[kind][0]:
+            raise ValueError(f"Latency distribution {kind!r} expects {LATENCY_DISTRIBUTIONS[kind][0]} parameter(s)")
+        return cls(kind, values)
+
+    def sample(self, rng: random.Random) -> float:
+        """Latence tirée, en secondes."""
+        return max(0.0, LATENCY_DISTRIBUTIONS[self.kind][1](rng, *self.parameters)) / 1000
+
+
+def parse_latencies(spec: Union[str, Dict[str, str]]) -> Dict[str, LatencyDistribution]:
+    """Lois par opération (create, execute, find, refund ; "*" pour les autres).
+
+    Accepte une loi unique ("lognormal:80:0.5"), une liste
+    "create=lognormal:150:0.5,*=fixed:20" ou un dict équivalent.
+    """
+    if isinstance(spec, str):
+        items = [item.strip() for item in spec.split(',') if item.strip()]
+        spec = dict(item.split('=', 1) if '=' in item else ('*', item) for item in items)
+    return {operation.strip(): LatencyDistribution.parse(value) for operation, value in spec.items()}
+
+
+@dataclass(frozen=True)
+class FeeRule:
+    """Frais d'un paiement : percent % du montant plus fixed, arrondis à l'unité mineure de la devise."""
+    percent: Decimal
+    fixed: Decimal
+
+    def fee(self, amount: Decimal, currency: str) -> Decimal:
+        quantum = Decimal(1).scaleb(-currency_exponent(currency))
+        return (amount * self.percent / Decimal('100') + self.fixed).quantize(quantum, rounding=ROUND_HALF_EVEN)
+
+
+def parse_fee_rules(spec: Union[str, Dict[str, str]]) -> Dict[str, FeeRule]:
+    """Frais par devise : "EUR=1.4:0.25,JPY=3.6:40" (pourcentage:fixe) ou dict équivalent."""
+    if isinstance(spec, str):
+        spec = dict(item.strip().split('=', 1) for item in spec.split(',') if item.strip())
+    rules = {}
+    for currency, rule in spec.items():
+        percent, _, fixed = rule.partition(':')
+        rules[currency.strip().upper()] = FeeRule(Decimal(percent), Decimal(fixed or '0'))
+    return rules
+
+
+class _SimulatedPayment:
+    __slots__ = ('payment_id', 'sequence', 'amount', 'currency', 'payer_approves', 'state',
+                 'created_at', 'fee', 'refunded', 'refund_count', 'calls')
+
+    def __init__(self, payment_id: str, sequence: int, amount: Decimal, currency: str, payer_approves: bool):
+        self.payment_id = payment_id
+        self.sequence = sequence
+        self.amount = amount
+        self.currency = currency
+        self.payer_approves = payer_approves
+        self.state = 'created'
+        self.created_at = time.monotonic()
+        self.fee: Optional[Decimal] = None
+        self.refunded = Decimal('0')
+        self.refund_count = 0
+        self.calls: Dict[str, int] = {}
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.payment_id,
+            'state': self.state,
+            'amount': str(self.amount),
+            'currency': self.currency,
+            'fee': str(self.fee) if self.fee is not None else None,
+            'refunded': str(self.refunded),
+        }
+
+
+class SimulatedPaymentProvider(PaymentProvider):
+    """Fournisseur simulé en mémoire, sans réseau, pour les tests de charge et de capacité.
+
+    Chaque appel attend une latence tirée de la loi de son opération (plus,
+    avec la probabilité slow_rate, slow_ms de pic) et peut échouer comme un
+    vrai fournisseur : erreur 5xx (error_rate) ou timeout après
+    request_timeout secondes (timeout_rate), tous deux réessayables, et refus
+    du moyen de paiement à la création (decline_rate). Un paiement créé
+    attend d'être exécuté (confirm_payment), ce qui échoue si le payeur ne
+    l'a pas approuvé (1 - approval_rate) ou s'il a expiré
+    (approval_ttl_seconds) ; un paiement exécuté peut être remboursé, en
+    plusieurs fois. Les frais suivent fee_percent et fee_fixed, ou
+    fee_rules pour les devises qui y figurent.
+
+    Tous les tirages d'un appel viennent d'un générateur dérivé de seed, de
+    l'opération et du rang du paiement : avec la même graine, le n-ième
+    paiement créé a toujours la même latence et le même sort, quel que soit
+    l'ordre des appels concurrents.
+    """
+
+    def __init__(self,
+                 seed: int = 0,
+                 latency: Union[str, Dict[str, str]] = 'lognormal:50:0.5',
+                 slow_rate: float = 0.0,
+                 slow_ms: float = 2000.0,
+                 error_rate: float = 0.0,
+                 timeout_rate: float = 0.0,
+                 request_timeout: float = 30.0,
+                 decline_rate: float = 0.0,
+                 approval_rate: float = 1.0,
+                 fee_percent: Union[str, float] = '2.9',
+                 fee_fixed: Union[str, float] = '0.30',
+                 fee_rules: Union[str, Dict[str, str]] = '',
+                 approval_ttl_seconds: float = 3 * 3600,
+                 max_payments: int = 100000):
+        self.seed = seed
+        self.latencies = parse_latencies(latency)
+        self.slow_rate = slow_rate
+        self.slow_seconds = slow_ms / 1000
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.request_timeout = request_timeout
+        self.decline_rate = decline_rate
+        self.approval_rate = approval_rate
+        self.default_fee = FeeRule(Decimal(str(fee_percent)), Decimal(str(fee_fixed)))
+        self.fee_rules = parse_fee_rules(fee_rules)
+        self.approval_ttl_seconds = approval_ttl_seconds
+        self.max_payments = max_payments
+        # Préfixe tiré de la graine : une même graine rejoue les mêmes identifiants ; deux
+        # processus partageant une base doivent donc avoir des graines différentes
+        self._instance = f"{self._rng('instance', 0).getrandbits(32):08x}"
+        self._sequence = 0
+        # Appels sur la boucle du serveur et sur celle des appels synchrones : verrou de threads
+        self._lock = threading.Lock()
+        self._payments: "OrderedDict[str, _SimulatedPayment]" = OrderedDict()
+
+    def _rng(self, operation: str, key) -> random.Random:
+        return random.Random(f"{self.seed}:{operation}:{key}")
+
+    def _fee(self, amount: Decimal, currency: str) -> Decimal:
+        return self.fee_rules.get(currency, self.default_fee).fee(amount, currency)
+
+    @staticmethod
+    def _failure(message: str, retryable: bool = False, payment_id: Optional[str] = None,
+                 status: PaymentStatus = PaymentStatus.FAILED) -> PaymentResult:
+        return PaymentResult(
+            success=False,
+            provider_transaction_id=payment_id,
+            status=status,
+            error_message=message,
+            retryable=retryable
+        )
+
+    async def _simulate_call(self, operation: str, rng: random.Random) -> Optional[PaymentResult]:
+        """Attend la latence de l'appel ; retourne l'échec injecté s'il y en a un."""
+        latency = self.latencies.get(operation) or self.latencies.get('*')
+        delay = latency.sample(rng) if latency is not None else 0.0
+        # Tirages toujours faits, dans le même ordre : ils ne dépendent pas des taux configurés
+        slow = rng.random() < self.slow_rate
+        timed_out = rng.random() < self.timeout_rate
+        failed = rng.random() < self.error_rate
+        if timed_out:
+            timeout = deadline_timeout(self.request_timeout)
+            await asyncio.sleep(timeout)
+            return self._failure(f"Simulated provider timed out after {timeout:.3g}s", retryable=True)
+        await asyncio.sleep(delay + (self.slow_seconds if slow else 0.0))
+        if failed:
+            return self._failure("Simulated provider error (HTTP 503)", retryable=True)
+        return None
+
+    def _lookup(self, payment_id: str, operation: str) -> Tuple[Optional[_SimulatedPayment], random.Random]:
+        """Paiement (ou None) et générateur du prochain appel de operation sur ce paiement."""
+        with self._lock:
+            payment = self._payments.get(payment_id)
+            if payment is None:
+                return None, self._rng(operation, f"unknown:{payment_id}")
+            count = payment.calls.get(operation, 0)
+            payment.calls[operation] = count + 1
+        return payment, self._rng(operation, f"{payment.sequence}:{count}")
+
+    def _expire(self, payment: _SimulatedPayment) -> None:
+        if payment.state == 'created' and time.monotonic() - payment.created_at > self.approval_ttl_seconds:
+            payment.state = 'expired'
+
+    def _not_found(self, payment_id: str) -> PaymentResult:
+        return self._failure(f"Simulated payment {payment_id} not found")
+
+    async def create_payment_intent(self,
+                                    amount: Decimal,
+                                    currency: str,
+                                    payment_method_data: Dict,
+                                    metadata: Optional[Dict] = None) -> PaymentResult:
+        """Crée un paiement simulé, en attente d'approbation"""
+        currency = currency.upper()
+        self.validate_payment_data(amount, currency)
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+        rng = self._rng('create', sequence)
+        failure = await self._simulate_call('create', rng)
+        if failure is not None:
+            return failure
+        if rng.random() < self.decline_rate:
+            return self._failure("Simulated decline: payment method refused")
+        payment = _SimulatedPayment(
+            f"SIM-{self._instance}-{sequence:08d}", sequence, amount, currency, rng.random() < self.approval_rate
+        )
+        with self._lock:
+            self._payments[payment.payment_id] = payment
+            while len(self._payments) > self.max_payments:
+                self._payments.popitem(last=False)
+        return PaymentResult(
+            success=True,
+            provider_transaction_id=payment.payment_id,
+            status=PaymentStatus.PENDING,
+            payment_method_details={'approval_url': f"https://simulated.invalid/approve/{payment.payment_id}"},
+            provider_response=payment.to_dict()
+        )
+
+    async def confirm_payment(self,
+                              payment_intent_id: str,
+                              payment_method_data: Optional[Dict] = None) -> PaymentResult:
+        """Exécute un paiement simulé approuvé par le payeur"""
+        payment, rng = self._lookup(payment_intent_id, 'execute')
+        failure = await self._simulate_call('execute', rng)
+        if failure is not None:
+            return failure
+        if payment is None:
+            return self._not_found(payment_intent_id)
+        if not payment_method_data or not payment_method_data.get('payer_id'):
+            return self._failure("Missing payer_id", payment_id=payment_intent_id)
+        with self._lock:
+            self._expire(payment)
+            if payment.state != 'created':
+                return self._failure(f"Payment cannot be executed in state '{payment.state}'",
+                                     payment_id=payment_intent_id, status=SIMULATED_STATE_MAPPING[payment.state])
+            if not payment.payer_approves:
+                payment.state = 'failed'
+                return self._failure("Payer did not approve the payment", payment_id=payment_intent_id)
+            payment.state = 'approved'
+            payment.fee = self._fee(payment.amount, payment.currency)
+            response = payment.to_dict()
+        return PaymentResult(
+            success=True,
+            provider_transaction_id=payment.payment_id,
+            status=PaymentStatus.COMPLETED,
+            payment_method_details={'payer_id': payment_method_data['payer_id']},
+            provider_response=response,
+            amount_processed=payment.amount,
+            fee_amount=payment.fee
+        )
+
+    async def refund_payment(self,
+                             transaction_id: str,
+                             amount: Optional[Decimal] = None,
+                             reason: Optional[str] = None) -> PaymentResult:
+        """Rembourse tout ou partie d'un paiement simulé exécuté"""
+        payment, rng = self._lookup(transaction_id, 'refund')
+        failure = await self._simulate_call('refund', rng)
+        if failure is not None:
+            return failure
+        if payment is None:
+            return self._not_found(transaction_id)
+        with self._lock:
+            if payment.state not in ('approved', 'partially_refunded'):
+                return self._failure(f"Payment cannot be refunded in state '{payment.state}'")
+            remaining = payment.amount - payment.refunded
+            refund_amount = amount if amount is not None else remaining
+            if refund_amount <= 0 or refund_amount > remaining:
+                return self._failure(f"Refund amount {refund_amount} exceeds the refundable balance {remaining}")
+            payment.refunded += refund_amount
+            payment.refund_count += 1
+            payment.state = 'refunded' if payment.refunded == payment.amount else 'partially_refunded'
+            refund_id = f"{payment.payment_id}-R{payment.refund_count}"
+            response = dict(payment.to_dict(), refund_id=refund_id, reason=reason)
+        return PaymentResult(
+            success=True,
+            provider_transaction_id=refund_id,
+            status=SIMULATED_STATE_MAPPING[response['state']],
+            amount_processed=refund_amount,
+            provider_response=response
+        )
+
+    async def get_payment_status(self, transaction_id: str) -> PaymentResult:
+        """Récupère le statut d'un paiement simulé"""
+        payment, rng = self._lookup(transaction_id, 'find')
+        failure = await self._simulate_call('find', rng)
+        if failure is not None:
+            return failure
+        if payment is None:
+            return self._not_found(transaction_id)
+        with self._lock:
+            self._expire(payment)
+            response = payment.to_dict()
+        return PaymentResult(
+            success=True,
+            provider_transaction_id=payment.payment_id,
+            status=SIMULATED_STATE_MAPPING[response['state']],
+            payment_method_details={'currency': payment.currency},
+            provider_response=response,
+            amount_processed=payment.amount,
+            fee_amount=payment.fee
+        )
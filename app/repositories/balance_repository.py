@@ -0,0 +1,19 @@
+from typing import List, Optional
+from app.db import get_async_session_factory
+from app.services.balance_service import BalanceService, BalanceSnapshot
+
+
+class BalanceRepository:
+    """Lecture asyncio (AsyncSession) des soldes marchands matérialisés."""
+
+    def __init__(self, session_factory=None):
+        self._session_factory = session_factory
+
+    @property
+    def session_factory(self):
+        return self._session_factory or get_async_session_factory()
+
+    async def get_balances(self, merchant_id: str, currency: Optional[str] = None) -> List[BalanceSnapshot]:
+        """Variante asyncio de BalanceService.get_balances()."""
+        async with self.session_factory() as session:
+            return BalanceService.snapshots(await session.execute(BalanceService.balances_query(merchant_id, currency)))
@@ -0,0 +1,31 @@
+from typing import Optional
+from app.db import get_async_session_factory
+from app.utils.idempotency import IdempotencyStore
+from models.models import IdempotencyRecord
+
+
+class IdempotencyRepository:
+    """Accès asyncio (AsyncSession) aux réponses idempotentes mémorisées."""
+
+    def __init__(self, session_factory=None):
+        self._session_factory = session_factory
+
+    @property
+    def session_factory(self):
+        return self._session_factory or get_async_session_factory()
+
+    async def find(self, merchant_id: str, idempotency_key: str) -> Optional[IdempotencyRecord]:
+        """Réponse non expirée mémorisée pour la clé, sinon None."""
+        async with self.session_factory() as session:
+            return (await session.execute(
+                IdempotencyStore.record_query((merchant_id, idempotency_key))
+            )).scalar_one_or_none()
+
+    async def save(self, record: IdempotencyRecord) -> None:
+        """Remplace la ligne expirée de la clé par record ; IntegrityError si la clé est déjà prise."""
+        async with self.session_factory() as session:
+            await session.execute(IdempotencyStore.expired_record_query(
+                (record.merchant_id, record.idempotency_key), record.created_at
+            ))
+            session.add(record)
+            await session.commit()
@@ -0,0 +1,35 @@
+from typing import Optional
+from sqlalchemy import select
+from app.db import get_async_session_factory
+from app.utils.security import CredentialInfo, credential_from_record
+from models.models import Merchant, MerchantCredential
+
+
+class MerchantRepository:
+    """Accès asyncio (AsyncSession) aux marchands et à leurs identifiants."""
+
+    def __init__(self, session_factory=None):
+        self._session_factory = session_factory
+
+    @property
+    def session_factory(self):
+        return self._session_factory or get_async_session_factory()
+
+    async def find_by_id(self, merchant_id: str) -> Optional[Merchant]:
+        async with self.session_factory() as session:
+            return await session.get(Merchant, merchant_id)
+
+    async def find_by_api_key(self, api_key: str) -> Optional[CredentialInfo]:
+        """Identifiant actif et non expiré correspondant à la clé API, sinon None."""
+        async with self.session_factory() as session:
+            record = (await session.execute(
+                select(MerchantCredential).where(MerchantCredential.api_key == api_key)
+            )).scalar_one_or_none()
+            return credential_from_record(record, api_key)
+
+    async def find_settings(self, merchant_id: str) -> Optional[dict]:
+        """Réglages (Merchant.settings) du marchand, sans charger le reste de la ligne."""
+        async with self.session_factory() as session:
+            return (await session.execute(
+                select(Merchant.settings).where(Merchant.id == merchant_id)
+            )).scalar_one_or_none()
@@ -0,0 +1,153 @@
+import asyncio
+from datetime import datetime
+from decimal import Decimal
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select
+from app.config import Config
+from app.db import get_async_session_factory
+from app.services.transaction_service import TransactionService
+from models.models import PaymentStatus, Transaction
+
+
+class TransactionRepository:
+    """Accès asyncio (AsyncSession) aux transactions.
+
+    Les écritures au grand livre réutilisent le code synchrone de
+    TransactionService via AsyncSession.run_sync : il s'exécute dans la boucle,
+    sans thread, et les règles comptables restent écrites une seule fois.
+    """
+
+    def __init__(self, session_factory=None, transaction_service: Optional[TransactionService] = None):
+        self._session_factory = session_factory
+        self.transaction_service = transaction_service or TransactionService()
+
+    @property
+    def session_factory(self):
+        return self._session_factory or get_async_session_factory()
+
+    async def _wait_for_pending_writes(self) -> None:
+        writer = self.transaction_service.writer
+        if writer is None:
+            return
+        flushed = writer.try_flush()
+        if flushed is None:
+            # File pleine : la place est attendue dans un thread, jamais dans la boucle
+            flushed = await asyncio.get_running_loop().run_in_executor(None, writer.flush)
+        await asyncio.wrap_future(flushed)
+
+    async def save(self, **fields) -> str:
+        """Enregistre une nouvelle transaction et retourne son identifiant.
+
+        En écriture différée, la ligne est mise en file ; si la file est pleine,
+        elle est écrite directement, comme sans écriture différée.
+        """
+        writer = self.transaction_service.writer
+        if writer is not None:
+            values = self.transaction_service.new_transaction_values(**fields)
+            if writer.try_insert(values) is not None:
+                return values["id"]
+            transaction = Transaction(**values)
+        else:
+            transaction = self.transaction_service.new_transaction(**fields)
+        async with self.session_factory() as session:
+            session.add(transaction)
+            await session.commit()
+        return transaction.id
+
+    async def find_by_id(self, transaction_id: str, merchant_id: Optional[str] = None) -> Optional[Transaction]:
+        async with self.session_factory() as session:
+            transaction = await session.get(Transaction, transaction_id)
+        if transaction is None or (merchant_id and transaction.merchant_id != merchant_id):
+            return None
+        return transaction
+
+    async def find_by_provider_id(self, merchant_id: str, provider_transaction_id: str) -> Optional[Transaction]:
+        """Variante asyncio de TransactionService.get_by_provider_id()."""
+        await self._wait_for_pending_writes()
+        async with self.session_factory() as session:
+            return (await session.execute(
+                select(Transaction).where(
+                    Transaction.merchant_id == merchant_id,
+                    Transaction.provider_transaction_id == provider_transaction_id,
+                )
+            )).scalars().first()
+
+    async def find_by_provider_ids(self, merchant_id: str,
+                                   provider_transaction_ids: Iterable[str]) -> Dict[str, Transaction]:
+        """Variante asyncio de TransactionService.get_by_provider_ids()."""
+        await self._wait_for_pending_writes()
+        async with self.session_factory() as session:
+            query = self.transaction_service.provider_ids_query(merchant_id, provider_transaction_ids)
+            return {t.provider_transaction_id: t for t in (await session.execute(query)).scalars()}
+
+    async def list_transactions(self,
+                                merchant_id: str,
+                                start_date: Optional[datetime] = None,
+                                end_date: Optional[datetime] = None,
+                                status: Optional[PaymentStatus] = None,
+                                page_size: int = 0,
+                                page_token: str = "") -> Tuple[List[Transaction], str]:
+        """Variante asyncio de TransactionService.list_transactions()."""
+        query, page = self.transaction_service.page_query(
+            merchant_id, start_date, end_date, status, page_size, page_token
+        )
+        async with self.session_factory() as session:
+            return page(list((await session.execute(query)).scalars()))
+
+    async def complete_payment(self,
+                               merchant_id: str,
+                               provider_transaction_id: str,
+                               amount: Optional[Decimal],
+                               fee: Optional[Decimal],
+                               currency: str = "") -> bool:
+        """Variante asyncio de TransactionService.complete_payment()."""
+        await self._wait_for_pending_writes()
+        async with self.session_factory() as session:
+            transitioned = await session.run_sync(
+                self.transaction_service.complete_payment_in_session,
+                merchant_id, provider_transaction_id, amount, fee, currency
+            )
+            await session.commit()
+            return transitioned
+
+    async def check_refund(self,
+                           merchant_id: str,
+                           provider_transaction_id: str,
+                           amount: Optional[Decimal],
+                           currency: str = "") -> None:
+        """Variante asyncio de TransactionService.check_refund()."""
+        await self._wait_for_pending_writes()
+        async with self.session_factory() as session:
+            await session.run_sync(
+                self.transaction_service.check_refund_in_session,
+                merchant_id, provider_transaction_id, amount, currency
+            )
+
+    async def record_refund(self,
+                            merchant_id: str,
+                            provider_transaction_id: str,
+                            provider_refund_id: str,
+                            amount: Optional[Decimal],
+                            reason: Optional[str] = None) -> Optional[str]:
+        """Variante asyncio de TransactionService.record_refund()."""
+        await self._wait_for_pending_writes()
+        async with self.session_factory() as session:
+            refund_id = await session.run_sync(
+                self.transaction_service.record_refund_in_session,
+                merchant_id, provider_transaction_id, provider_refund_id, amount, reason
+            )
+            await session.commit()
+            return refund_id
+
+    async def iter_transaction_batches(self,
+                                       merchant_id: str,
+                                       start_date: Optional[datetime] = None,
+                                       end_date: Optional[datetime] = None,
+                                       status: Optional[PaymentStatus] = None,
+                                       chunk_size: int = Config.EXPORT_CHUNK_SIZE) -> AsyncIterator[list]:
+        """Variante asyncio de TransactionService.iter_transaction_batches(), sur un curseur serveur."""
+        query = self.transaction_service.export_query(merchant_id, start_date, end_date, status)
+        async with self.session_factory() as session:
+            result = await session.stream(query.execution_options(yield_per=chunk_size))
+            async for batch in result.partitions(chunk_size):
+                yield batch
@@ -0,0 +1,208 @@
+import random
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import Select, event, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.config import Config
+from app.db import SessionLocal
+from app.utils.balance_cache import balance_cache
+from app.utils.exceptions import LedgerImbalanceError
+from models.models import LedgerEntry, MerchantBalance
+
+# Comptes du grand livre
+MERCHANT_AVAILABLE = "merchant_available"  # Fonds du marchand disponibles au versement.
+MERCHANT_PENDING = "merchant_pending"  # Fonds du marchand en attente de règlement.
+PROVIDER_CLEARING = "provider_clearing"  # Fonds encaissés chez le fournisseur de paiement.
+PROVIDER_FEES = "provider_fees"  # Frais prélevés par le fournisseur de paiement.
+
+# Comptes du marchand matérialisés dans merchant_balances
+BALANCE_COLUMNS = {
+    MERCHANT_AVAILABLE: "available_minor",
+    MERCHANT_PENDING: "pending_minor",
+}
+
+# Clé de Session.info listant les marchands dont le solde a changé dans la transaction
+_CHANGED_BALANCES = "changed_balance_merchants"
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_balances(session) -> None:
+    """Invalide le cache des soldes une fois les écritures validées, jamais avant."""
+    for merchant_id in session.info.pop(_CHANGED_BALANCES, ()):
+        balance_cache.invalidate(merchant_id)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_rolled_back_balances(session, transaction) -> None:
+    """Oublie les soldes d'une transaction annulée ; l'annulation d'un savepoint ne compte pas."""
+    if transaction.parent is None:
+        session.info.pop(_CHANGED_BALANCES, None)
+
+
+@dataclass(frozen=True)
+class LedgerLine:
+    """Ligne d'une écriture : montant signé en unités mineures sur un compte."""
+    account: str
+    amount_minor: int
+
+
+@dataclass(frozen=True)
+class BalanceSnapshot:
+    """Solde d'un marchand dans une devise."""
+    currency: str
+    available_minor: int
+    pending_minor: int
+    updated_at: Optional[datetime]
+
+
+class BalanceService:
+    """Grand livre en partie double et soldes marchands matérialisés.
+
+    Chaque écriture insère ses lignes dans ledger_entries et applique, dans la
+    même transaction SQL, le delta entier des comptes marchands à
+    merchant_balances : lire un solde somme quelques sous-lignes, sans
+    parcourir le grand livre.
+
+    Le delta est appliqué à une sous-ligne tirée au hasard parmi shard_count :
+    les paiements simultanés d'un même marchand verrouillent des lignes
+    différentes au lieu de se sérialiser sur une seule. Une sous-ligne peut
+    devenir négative ; seule la somme a un sens.
+    """
+
+    def __init__(self, session_factory=SessionLocal, shard_count: int = Config.BALANCE_SHARD_COUNT):
+        self.session_factory = session_factory
+        self.shard_count = max(1, shard_count)
+
+    def post_journal(self,
+                     session,
+                     merchant_id: str,
+                     currency: str,
+                     entry_type: str,
+                     lines: Sequence[LedgerLine],
+                     transaction_id: Optional[str] = None,
+                     refund_id: Optional[str] = None) -> str:
+        """Enregistre une écriture équilibrée dans la session de l'appelant (sans commit)."""
+        if sum(line.amount_minor for line in lines) != 0:
+            raise LedgerImbalanceError(entry_type, sum(line.amount_minor for line in lines))
+
+        journal_id = str(uuid.uuid4())
+        now = datetime.utcnow()
+        session.execute(insert(LedgerEntry), [
+            dict(
+                journal_id=journal_id,
+                merchant_id=merchant_id,
+                account=line.account,
+                currency=currency,
+                amount_minor=line.amount_minor,
+                entry_type=entry_type,
+                transaction_id=transaction_id,
+                refund_id=refund_id,
+                created_at=now,
+            )
+            for line in lines if line.amount_minor
+        ])
+
+        deltas: Dict[str, int] = {}
+        for line in lines:
+            column = BALANCE_COLUMNS.get(line.account)
+            if column is not None:
+                deltas[column] = deltas.get(column, 0) + line.amount_minor
+        if any(deltas.values()):
+            self._apply_balance_delta(session, merchant_id, currency, deltas, now)
+            session.info.setdefault(_CHANGED_BALANCES, set()).add(merchant_id)
+        return journal_id
+
+    def _apply_balance_delta(self, session, merchant_id: str, currency: str,
+                             deltas: Dict[str, int], now: datetime) -> None:
+        """Incrémente une sous-ligne du solde ; la crée à son premier mouvement."""
+        shard = random.randrange(self.shard_count)
+        values = {column: getattr(MerchantBalance, column) + delta for column, delta in deltas.items()}
+        statement = (
+            update(MerchantBalance)
+            .where(
+                MerchantBalance.merchant_id == merchant_id,
+                MerchantBalance.currency == currency,
+                MerchantBalance.shard == shard,
+            )
+            .values(updated_at=now, **values)
+        )
+        if session.execute(statement).rowcount:
+            return
+        try:
+            with session.begin_nested():
+                session.execute(insert(MerchantBalance).values(
+                    id=str(uuid.uuid4()),
+                    merchant_id=merchant_id,
+                    currency=currency,
+                    shard=shard,
+                    available_minor=deltas.get("available_minor", 0),
+                    pending_minor=deltas.get("pending_minor", 0),
+                    updated_at=now,
+                ))
+        except IntegrityError:
+            # Une autre transaction a créé la ligne entre-temps
+            session.execute(statement)
+
+    def record_payment_captured(self, session, merchant_id: str, currency: str, amount_minor: int,
+                                fee_minor: int, transaction_id: str) -> str:
+        """Paiement encaissé : le net (montant - frais) est crédité en attente."""
+        return self.post_journal(session, merchant_id, currency, "payment_captured", [
+            LedgerLine(PROVIDER_CLEARING, -amount_minor),
+            LedgerLine(PROVIDER_FEES, fee_minor),
+            LedgerLine(MERCHANT_PENDING, amount_minor - fee_minor),
+        ], transaction_id=transaction_id)
+
+    def record_settlement(self, session, merchant_id: str, currency: str, amount_minor: int,
+                          transaction_id: Optional[str] = None) -> str:
+        """Règlement : des fonds en attente deviennent disponibles."""
+        return self.post_journal(session, merchant_id, currency, "settlement", [
+            LedgerLine(MERCHANT_PENDING, -amount_minor),
+            LedgerLine(MERCHANT_AVAILABLE, amount_minor),
+        ], transaction_id=transaction_id)
+
+    @staticmethod
+    def transaction_pending_minor(session, transaction_id: str) -> int:
+        """Fonds d'une transaction encore en attente (encaissés, ni réglés ni remboursés)."""
+        return session.execute(
+            select(func.coalesce(func.sum(LedgerEntry.amount_minor), 0)).where(
+                LedgerEntry.transaction_id == transaction_id,
+                LedgerEntry.account == MERCHANT_PENDING,
+            )
+        ).scalar_one()
+
+    def record_refund(self, session, merchant_id: str, currency: str, amount_minor: int,
+                      transaction_id: str, refund_id: str) -> str:
+        """Remboursement : débité des fonds encore en attente de la transaction, puis du solde disponible."""
+        from_pending = min(amount_minor, max(0, self.transaction_pending_minor(session, transaction_id)))
+        return self.post_journal(session, merchant_id, currency, "refund", [
+            LedgerLine(MERCHANT_PENDING, -from_pending),
+            LedgerLine(MERCHANT_AVAILABLE, from_pending - amount_minor),
+            LedgerLine(PROVIDER_CLEARING, amount_minor),
+        ], transaction_id=transaction_id, refund_id=refund_id)
+
+    def get_balances(self, merchant_id: str, currency: Optional[str] = None) -> List[BalanceSnapshot]:
+        """Lit les soldes matérialisés d'un marchand (toutes devises, ou une seule) en sommant les sous-lignes."""
+        with self.session_factory() as session:
+            return self.snapshots(session.execute(self.balances_query(merchant_id, currency)))
+
+    @staticmethod
+    def balances_query(merchant_id: str, currency: Optional[str] = None) -> Select:
+        query = select(
+            MerchantBalance.currency,
+            func.sum(MerchantBalance.available_minor),
+            func.sum(MerchantBalance.pending_minor),
+            func.max(MerchantBalance.updated_at),
+        ).where(MerchantBalance.merchant_id == merchant_id)
+        if currency:
+            query = query.where(MerchantBalance.currency == currency.upper())
+        return query.group_by(MerchantBalance.currency).order_by(MerchantBalance.currency)
+
+    @staticmethod
+    def snapshots(rows) -> List[BalanceSnapshot]:
+        return [
+            BalanceSnapshot(currency, int(available), int(pending), updated_at)
+            for currency, available, pending, updated_at in rows
+        ]
@@ -0,0 +1,56 @@
+import secrets
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import update
+from app.db import SessionLocal
+from app.utils.security import CredentialCache, credential_cache
+from models.models import MerchantCredential
+
+
+class MerchantService:
+    """Opérations sur les marchands et leurs identifiants."""
+
+    def __init__(self, session_factory=SessionLocal, cache: CredentialCache = credential_cache):
+        self.session_factory = session_factory
+        self.cache = cache
+
+    def rotate_credentials(self, merchant_id: str, environment=None,
+                           expires_in: Optional[timedelta] = None) -> MerchantCredential:
+        """Désactive les identifiants actifs du marchand et en émet de nouveaux.
+
+        Le cache local est invalidé immédiatement ; les autres processus
+        cessent d'accepter les anciennes clés au plus tard après le TTL du cache.
+        """
+        now = datetime.utcnow()
+        with self.session_factory() as session:
+            session.execute(
+                update(MerchantCredential)
+                .where(MerchantCredential.merchant_id == merchant_id, MerchantCredential.is_active.is_(True))
+                .values(is_active=False)
+            )
+            credential = MerchantCredential(
+                id=str(uuid.uuid4()),
+                merchant_id=merchant_id,
+                api_key=secrets.token_urlsafe(32),
+                api_secret=secrets.token_urlsafe(48),
+                environment=environment,
+                is_active=True,
+                created_at=now,
+                expires_at=now + expires_in if expires_in else None,
+            )
+            session.add(credential)
+            session.commit()
+            session.refresh(credential)
+            session.expunge(credential)
+        self.cache.invalidate(merchant_id=merchant_id)
+        return credential
+
+    def revoke_credential(self, api_key: str) -> None:
+        """Révoque une clé API et l'évince du cache."""
+        with self.session_factory() as session:
+            session.execute(
+                update(MerchantCredential).where(MerchantCredential.api_key == api_key).values(is_active=False)
+            )
+            session.commit()
+        self.cache.invalidate(api_key=api_key)
@@ -0,0 +1,196 @@
+import asyncio
+import base64
+import logging
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from typing import Awaitable, Callable, Dict, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+import aiohttp
+from cryptography import x509
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+from sqlalchemy.exc import IntegrityError
+from app.config import Config
+from app.services.transaction_service import TransactionService
+from app.utils.exceptions import WebhookSignatureError
+from models.models import PaymentStatus, ProviderEvent
+
+logger = logging.getLogger(__name__)
+
+PROVIDER = "paypal"
+
+# Seul algorithme de signature employé par PayPal pour ses webhooks
+SIGNATURE_ALGORITHM = "SHA256withRSA"
+
+# Résultats de PayPalWebhookProcessor.process_in_session()
+PROCESSED = "processed"
+DUPLICATE = "duplicate"
+IGNORED = "ignored"  # Type d'événement sans effet ici ; enregistré quand même
+UNKNOWN_TRANSACTION = "unknown_transaction"  # Non enregistré : PayPal le renverra
+
+# Événements de vente (API Payments v1) qui ne font que changer le statut
+STATUS_EVENTS = {
+    "PAYMENT.SALE.PENDING": PaymentStatus.PROCESSING,
+    "PAYMENT.SALE.DENIED": PaymentStatus.FAILED,
+}
+COMPLETED_EVENT = "PAYMENT.SALE.COMPLETED"
+REFUND_EVENTS = {"PAYMENT.SALE.REFUNDED", "PAYMENT.SALE.REVERSED"}
+
+
+def _is_paypal_cert_url(url: str) -> bool:
+    """N'accepte que des certificats servis en HTTPS par un domaine PayPal."""
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    return parts.scheme == "https" and (host == "paypal.com" or host.endswith(".paypal.com"))
+
+
+class PayPalWebhookVerifier:
+    """Vérification locale des signatures des webhooks PayPal.
+
+    PayPal signe "transmission_id|transmission_time|webhook_id|crc32(corps)"
+    avec la clé du certificat désigné par l'en-tête PAYPAL-CERT-URL. Les
+    certificats sont gardés en cache (au plus ttl_seconds, et jamais au-delà
+    de leur expiration) : on évite ainsi un appel à l'API verify-webhook-signature
+    par événement. Les téléchargements simultanés d'un même certificat sont
+    regroupés en un seul.
+    """
+
+    def __init__(self,
+                 webhook_id: str = Config.PAYPAL_WEBHOOK_ID,
+                 ttl_seconds: float = Config.PAYPAL_WEBHOOK_CERT_CACHE_TTL,
+                 fetch_certificate: Optional[Callable[[str], Awaitable[bytes]]] = None):
+        self.webhook_id = webhook_id
+        self.ttl_seconds = ttl_seconds
+        self.fetch_certificate = fetch_certificate or self._download
+        self._certificates: Dict[str, Tuple[x509.Certificate, float]] = {}
+        self._downloads: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    async def _download(url: str) -> bytes:
+        timeout = aiohttp.ClientTimeout(total=Config.PAYPAL_HTTP_TIMEOUT, connect=Config.PAYPAL_HTTP_CONNECT_TIMEOUT)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.get(url) as response:
+                response.raise_for_status()
+                return await response.read()
+
+    async def _certificate(self, url: str) -> x509.Certificate:
+        cached = self._certificates.get(url)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+        download = self._downloads.get(url)
+        if download is None:
+            download = asyncio.ensure_future(self._load_certificate(url))
+            self._downloads[url] = download
+            download.add_done_callback(lambda _: self._downloads.pop(url, None))
+        return await asyncio.shield(download)
+
+    async def _load_certificate(self, url: str) -> x509.Certificate:
+        certificate = x509.load_pem_x509_certificate(await self.fetch_certificate(url))
+        remaining = (certificate.not_valid_after_utc - datetime.now(timezone.utc)).total_seconds()
+        if remaining <= 0:
+            raise WebhookSignatureError(PROVIDER, "signing certificate has expired")
+        self._certificates[url] = (certificate, time.monotonic() + min(self.ttl_seconds, remaining))
+        return certificate
+
+    async def verify(self, headers: Mapping[str, str], body: bytes) -> None:
+        """Lève WebhookSignatureError si la requête n'est pas signée par PayPal pour ce webhook."""
+        transmission_id = headers.get("PAYPAL-TRANSMISSION-ID")
+        transmission_time = headers.get("PAYPAL-TRANSMISSION-TIME")
+        signature = headers.get("PAYPAL-TRANSMISSION-SIG")
+        cert_url = headers.get("PAYPAL-CERT-URL")
+        if not (transmission_id and transmission_time and signature and cert_url):
+            raise WebhookSignatureError(PROVIDER, "missing transmission headers")
+        if not self.webhook_id:
+            raise WebhookSignatureError(PROVIDER, "PAYPAL_WEBHOOK_ID is not configured")
+        if headers.get("PAYPAL-AUTH-ALGO", SIGNATURE_ALGORITHM) != SIGNATURE_ALGORITHM:
+            raise WebhookSignatureError(PROVIDER, "unsupported signature algorithm")
+        if not _is_paypal_cert_url(cert_url):
+            raise WebhookSignatureError(PROVIDER, "certificate URL is not a PayPal URL")
+
+        try:
+            certificate = await self._certificate(cert_url)
+        except WebhookSignatureError:
+            raise
+        except Exception as e:
+            raise WebhookSignatureError(PROVIDER, f"could not load signing certificate ({e})")
+
+        message = f"{transmission_id}|{transmission_time}|{self.webhook_id}|{zlib.crc32(body)}"
+        try:
+            certificate.public_key().verify(
+                base64.b64decode(signature), message.encode("utf-8"), padding.PKCS1v15(), hashes.SHA256()
+            )
+        except (InvalidSignature, ValueError):
+            raise WebhookSignatureError(PROVIDER, "signature does not match")
+
+
+def _decimal(value) -> Optional[Decimal]:
+    try:
+        return abs(Decimal(str(value))) if value not in (None, "") else None
+    except InvalidOperation:
+        return None
+
+
+class PayPalWebhookProcessor:
+    """Applique les événements webhook PayPal aux transactions et au grand livre.
+
+    Chaque événement est enregistré (provider_events) dans la même transaction
+    SQL que ses effets : un événement renvoyé par PayPal n'est appliqué qu'une
+    fois, et un traitement interrompu sera rejoué en entier.
+    """
+
+    def __init__(self, transaction_service: Optional[TransactionService] = None):
+        self.transaction_service = transaction_service or TransactionService()
+
+    @staticmethod
+    def _record_event(session, event: dict, resource_id: Optional[str], outcome: str) -> bool:
+        """Enregistre l'événement ; False s'il l'était déjà."""
+        try:
+            with session.begin_nested():
+                session.add(ProviderEvent(
+                    id=str(uuid.uuid4()),
+                    provider=PROVIDER,
+                    event_id=event["id"],
+                    event_type=event.get("event_type", ""),
+                    resource_id=resource_id,
+                    outcome=outcome,
+                ))
+        except IntegrityError:
+            return False
+        return True
+
+    def process_in_session(self, session, event: dict) -> str:
+        """Traite un événement dans la session de l'appelant, sans commit (aussi via AsyncSession.run_sync)."""
+        event_type = event.get("event_type", "")
+        resource = event.get("resource") or {}
+        handled = event_type == COMPLETED_EVENT or event_type in STATUS_EVENTS or event_type in REFUND_EVENTS
+        if not handled:
+            return IGNORED if self._record_event(session, event, resource.get("id"), IGNORED) else DUPLICATE
+
+        # Ventes et remboursements v1 désignent le paiement (PAY-...) par parent_payment
+        provider_transaction_id = resource.get("parent_payment")
+        transaction = (self.transaction_service.find_by_provider_transaction_id(session, provider_transaction_id)
+                       if provider_transaction_id else None)
+        if transaction is None:
+            return UNKNOWN_TRANSACTION
+        if not self._record_event(session, event, resource.get("id"), PROCESSED):
+            return DUPLICATE
+
+        amount = resource.get("amount") or {}
+        if event_type == COMPLETED_EVENT:
+            self.transaction_service.complete_payment_in_session(
+                session, transaction.merchant_id, provider_transaction_id,
+                _decimal(amount.get("total")), _decimal((resource.get("transaction_fee") or {}).get("value")),
+                amount.get("currency", ""),
+            )
+        elif event_type in REFUND_EVENTS:
+            self.transaction_service.record_refund_in_session(
+                session, transaction.merchant_id, provider_transaction_id, resource.get("id"),
+                _decimal(amount.get("total")), resource.get("reason_code") or event_type.lower(),
+            )
+        else:
+            self.transaction_service.mark_status_in_session(session, transaction, STATUS_EVENTS[event_type])
+        return PROCESSED
@@ -0,0 +1,171 @@
+import atexit
+import logging
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import Select, select, update
+from app.config import Config
+from app.db import SessionLocal
+from app.providers.base_provider import PaymentResult
+from app.services.transaction_service import IN_PROGRESS_STATUSES, TransactionService
+from app.utils.rate_limit import TokenBucket
+from models.models import PaymentStatus, Transaction
+
+logger = logging.getLogger(__name__)
+
+# Statuts fournisseur qui terminent une transaction sans encaissement
+TERMINAL_FAILURE_STATUSES = (PaymentStatus.FAILED, PaymentStatus.CANCELLED)
+
+# Délai pendant lequel une transaction prise par un réconciliateur n'est pas reprise par un autre
+CLAIM_SECONDS = 300
+
+
+def next_reconcile_delay(age_seconds: float,
+                         factor: float = Config.RECONCILE_AGE_FACTOR,
+                         minimum: float = Config.RECONCILE_FIRST_DELAY_SECONDS,
+                         maximum: float = Config.RECONCILE_MAX_DELAY_SECONDS) -> float:
+    """Délai avant la prochaine vérification : proportionnel à l'âge de la transaction, borné, avec jitter.
+
+    Une transaction récente est revérifiée souvent ; un paiement abandonné
+    depuis des jours ne l'est plus qu'à quelques heures d'intervalle.
+    """
+    delay = min(maximum, max(minimum, age_seconds * factor))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class PaymentReconciler:
+    """Réconciliation des transactions restées en attente (PENDING, PROCESSING).
+
+    Un thread dédié ("payment-reconciler") prend par lots les transactions dont
+    next_reconcile_at est échu, interroge le fournisseur (au plus concurrency
+    appels simultanés et rate_per_second par seconde), puis applique les
+    résultats du lot dans une seule transaction SQL : encaissement, échec, ou
+    report de la prochaine vérification selon l'âge de la transaction.
+
+    Ses appels ont leur propre bulkhead ("<fournisseur>:reconcile") : ils ne
+    prennent aucune place aux RPC, mais partagent leur disjoncteur.
+    """
+
+    def __init__(self,
+                 payment_service,
+                 transaction_service: Optional[TransactionService] = None,
+                 session_factory=SessionLocal,
+                 batch_size: int = Config.RECONCILE_BATCH_SIZE,
+                 concurrency: int = Config.RECONCILE_CONCURRENCY,
+                 rate_per_second: float = Config.RECONCILE_RATE_PER_SECOND,
+                 interval_seconds: float = Config.RECONCILE_INTERVAL_SECONDS):
+        # Autant de places que de threads de réconciliation : aucune attente
+        self.payment_service = payment_service.with_bulkhead("reconcile", concurrency, 0)
+        self.transaction_service = transaction_service or TransactionService()
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self.rate_limiter = TokenBucket(rate_per_second)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="reconcile")
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def due_query(now: datetime, limit: int) -> Select:
+        """Transactions en attente dont la vérification est échue, les plus en retard d'abord."""
+        return (
+            select(Transaction.id, Transaction.merchant_id, Transaction.provider_transaction_id,
+                   Transaction.created_at, Transaction.reconcile_attempts)
+            .where(Transaction.status.in_(IN_PROGRESS_STATUSES),
+                   Transaction.next_reconcile_at <= now,
+                   Transaction.provider_transaction_id.is_not(None))
+            .order_by(Transaction.next_reconcile_at)
+            .limit(limit)
+        )
+
+    def _claim_due(self, now: datetime) -> list:
+        """Sélectionne un lot et le réserve (next_reconcile_at repoussé) pour les autres instances."""
+        with self.session_factory() as session:
+            rows = session.execute(
+                self.due_query(now, self.batch_size).with_for_update(skip_locked=True)
+            ).all()
+            if rows:
+                session.execute(
+                    update(Transaction)
+                    .where(Transaction.id.in_([row.id for row in rows]))
+                    .values(next_reconcile_at=now + timedelta(seconds=CLAIM_SECONDS))
+                )
+                session.commit()
+            return rows
+
+    def _poll(self, provider_transaction_id: str) -> Optional[PaymentResult]:
+        self.rate_limiter.acquire()
+        try:
+            return self.payment_service.get_payment_status(provider_transaction_id)
+        except Exception:
+            logger.exception("Reconciliation status check failed for %s", provider_transaction_id)
+            return None
+
+    def _apply(self, rows: list, results: List[Optional[PaymentResult]], now: datetime) -> dict:
+        counts = {"completed": 0, "failed": 0, "rescheduled": 0}
+        reschedules = []
+        with self.session_factory() as session:
+            for row, result in zip(rows, results):
+                # Statut fournisseur (app.providers) converti en statut de transaction
+                status = PaymentStatus(result.status.value) if result is not None and result.success else None
+                if status == PaymentStatus.COMPLETED:
+                    details = result.payment_method_details or {}
+                    self.transaction_service.complete_payment_in_session(
+                        session, row.merchant_id, row.provider_transaction_id,
+                        result.amount_processed, result.fee_amount, details.get("currency", ""),
+                    )
+                    counts["completed"] += 1
+                elif status in TERMINAL_FAILURE_STATUSES:
+                    transaction = session.get(Transaction, row.id)
+                    self.transaction_service.mark_status_in_session(session, transaction, status)
+                    counts["failed"] += 1
+                else:
+                    age_seconds = (now - row.created_at).total_seconds() if row.created_at else 0
+                    reschedules.append({
+                        "id": row.id,
+                        "reconcile_attempts": row.reconcile_attempts + 1,
+                        "next_reconcile_at": now + timedelta(seconds=next_reconcile_delay(age_seconds)),
+                    })
+            if reschedules:
+                # Mise à jour groupée par clé primaire (executemany)
+                session.execute(update(Transaction), reschedules)
+                counts["rescheduled"] = len(reschedules)
+            session.commit()
+        return counts
+
+    def run_once(self, now: Optional[datetime] = None) -> int:
+        """Réconcilie un lot de transactions dues ; retourne le nombre de transactions traitées."""
+        now = now or datetime.utcnow()
+        rows = self._claim_due(now)
+        if not rows:
+            return 0
+        results = list(self._executor.map(self._poll, [row.provider_transaction_id for row in rows]))
+        counts = self._apply(rows, results, datetime.utcnow())
+        logger.info("Reconciled %d pending transactions: %s", len(rows), counts)
+        return len(rows)
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                processed = self.run_once()
+            except Exception:
+                logger.exception("Reconciliation batch failed")
+                processed = 0
+            # Lot incomplet : plus rien d'échu pour l'instant
+            if processed < self.batch_size:
+                self._stopped.wait(self.interval_seconds)
+
+    def start(self) -> "PaymentReconciler":
+        self._thread = threading.Thread(target=self._run, name="payment-reconciler", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        return self
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Arrête le thread après le lot en cours."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._executor.shutdown(wait=False)
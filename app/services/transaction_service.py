@@ -0,0 +1,497 @@
+import base64
+import functools
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import uuid
+from concurrent.futures import Future
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import Select, and_, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from app.config import Config
+from app.db import SessionLocal
+from app.services.balance_service import BalanceService
+from app.services.transaction_writer import TransactionWriter
+from app.services.webhook_dispatcher import queue_transaction_webhook
+from app.utils.exceptions import (
+    InvalidPageTokenError, PaymentConfigError, PaymentValidationError, RefundExceedsCaptureError,
+    TransactionNotFoundError
+)
+from app.utils.money import to_minor_units
+from models.models import PaymentStatus, Refund, Transaction
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=None)
+def _process_page_token_secret() -> str:
+    """Clé des jetons de page quand PAGE_TOKEN_SECRET n'est pas configurée (hors production), une par processus."""
+    logger.warning("PAGE_TOKEN_SECRET is not set, page tokens are only valid within this process")
+    return secrets.token_urlsafe(32)
+
+
+# Statuts d'une transaction pas encore terminée
+IN_PROGRESS_STATUSES = (PaymentStatus.PENDING, PaymentStatus.PROCESSING)
+
+# Statuts d'une transaction encaissée dont il reste un montant à rembourser
+REFUNDABLE_STATUSES = (PaymentStatus.COMPLETED, PaymentStatus.PARTIALLY_REFUNDED)
+
+# Colonnes nécessaires à la construction des messages gRPC Transaction
+EXPORT_COLUMNS = (
+    Transaction.id,
+    Transaction.status,
+    Transaction.amount_minor,
+    Transaction.currency,
+    Transaction.payment_method,
+    Transaction.customer_id,
+    Transaction.customer_email,
+    Transaction.customer_phone,
+    Transaction.customer_name,
+    Transaction.created_at,
+)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class PageTokenCodec:
+    """Jetons de page opaques et signés encodant le curseur (created_at, id).
+
+    Le jeton est lié aux filtres de la requête : le rejouer avec d'autres
+    filtres, ou le modifier, le rend invalide.
+    """
+
+    def __init__(self, secret: str = Config.PAGE_TOKEN_SECRET):
+        if not secret:
+            if Config.ENVIRONMENT == "production":
+                raise PaymentConfigError(["PAGE_TOKEN_SECRET"])
+            secret = _process_page_token_secret()
+        self._secret = secret.encode("utf-8")
+
+    def _sign(self, payload: bytes) -> bytes:
+        return hmac.new(self._secret, payload, hashlib.sha256).digest()[:16]
+
+    def encode(self, created_at: datetime, transaction_id: str, scope: str) -> str:
+        payload = json.dumps([created_at.isoformat(), transaction_id, scope], separators=(",", ":")).encode("utf-8")
+        return f"{_b64encode(payload)}.{_b64encode(self._sign(payload))}"
+
+    def decode(self, token: str, scope: str) -> Tuple[datetime, str]:
+        try:
+            encoded_payload, encoded_signature = token.split(".", 1)
+            payload = _b64decode(encoded_payload)
+            signature = _b64decode(encoded_signature)
+        except ValueError:
+            raise InvalidPageTokenError()
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            raise InvalidPageTokenError("signature mismatch")
+        created_at, transaction_id, token_scope = json.loads(payload)
+        if token_scope != scope:
+            raise InvalidPageTokenError("filters changed since the token was issued")
+        return datetime.fromisoformat(created_at), transaction_id
+
+
+class TransactionService:
+    """Lecture et écriture des transactions."""
+
+    def __init__(self,
+                 session_factory=SessionLocal,
+                 page_token_codec: Optional[PageTokenCodec] = None,
+                 balance_service: Optional[BalanceService] = None,
+                 writer: Optional[TransactionWriter] = None):
+        self.session_factory = session_factory
+        self.page_token_codec = page_token_codec or PageTokenCodec()
+        self.balance_service = balance_service or BalanceService(session_factory)
+        # Écriture différée des insertions et statuts (TRANSACTION_WRITE_BEHIND) ; None : écriture immédiate
+        self.writer = writer
+
+    @staticmethod
+    def new_transaction(**fields) -> Transaction:
+        return Transaction(id=str(uuid.uuid4()), created_at=datetime.utcnow(), **fields)
+
+    @staticmethod
+    def new_transaction_values(**fields) -> dict:
+        return dict(fields, id=str(uuid.uuid4()), created_at=datetime.utcnow())
+
+    def create_transaction(self, **fields) -> str:
+        """Enregistre une nouvelle transaction et retourne son identifiant.
+
+        En écriture différée, la ligne est mise en file et l'identifiant
+        retourné sans attendre le commit.
+        """
+        if self.writer is not None:
+            values = self.new_transaction_values(**fields)
+            self.writer.insert(values)
+            return values["id"]
+        transaction = self.new_transaction(**fields)
+        transaction_id = transaction.id
+        with self.session_factory() as session:
+            session.add(transaction)
+            session.commit()
+        return transaction_id
+
+    def update_status(self, transaction_id: str, status: PaymentStatus) -> Future:
+        """Change le statut d'une transaction ; le Future est résolu une fois le changement durable."""
+        if self.writer is not None:
+            return self.writer.update(transaction_id, status=status, updated_at=datetime.utcnow())
+        with self.session_factory() as session:
+            session.execute(
+                update(Transaction)
+                .where(Transaction.id == transaction_id)
+                .values(status=status, updated_at=datetime.utcnow())
+            )
+            session.commit()
+        done = Future()
+        done.set_result(True)
+        return done
+
+    def wait_for_pending_writes(self) -> None:
+        """Attend l'écriture des opérations différées, avant une transition lue en base."""
+        if self.writer is not None:
+            self.writer.flush().result()
+
+    @staticmethod
+    def _find_by_provider_id(session, merchant_id: str, provider_transaction_id: str) -> Optional[Transaction]:
+        return session.execute(
+            select(Transaction).where(
+                Transaction.merchant_id == merchant_id,
+                Transaction.provider_transaction_id == provider_transaction_id,
+            )
+        ).scalars().first()
+
+    @staticmethod
+    def find_by_provider_transaction_id(session, provider_transaction_id: str) -> Optional[Transaction]:
+        """Transaction d'un identifiant fournisseur, tous marchands confondus (webhooks entrants)."""
+        return session.execute(
+            select(Transaction).where(Transaction.provider_transaction_id == provider_transaction_id)
+        ).scalar_one_or_none()
+
+    def get_by_provider_id(self, merchant_id: str, provider_transaction_id: str) -> Optional[Transaction]:
+        """Transaction d'un marchand, par identifiant fournisseur ; None si elle est inconnue ou à un autre marchand."""
+        self.wait_for_pending_writes()
+        with self.session_factory() as session:
+            return self._find_by_provider_id(session, merchant_id, provider_transaction_id)
+
+    @staticmethod
+    def provider_ids_query(merchant_id: str, provider_transaction_ids: Iterable[str]) -> Select:
+        """Transactions d'un marchand parmi des identifiants fournisseur ; celles des autres marchands sont exclues."""
+        return select(Transaction).where(
+            Transaction.merchant_id == merchant_id,
+            Transaction.provider_transaction_id.in_(set(provider_transaction_ids)),
+        )
+
+    def get_by_provider_ids(self, merchant_id: str, provider_transaction_ids: Iterable[str]) -> Dict[str, Transaction]:
+        """Transactions d'un marchand par identifiant fournisseur, en une requête (lots de statuts)."""
+        self.wait_for_pending_writes()
+        with self.session_factory() as session:
+            query = self.provider_ids_query(merchant_id, provider_transaction_ids)
+            return {t.provider_transaction_id: t for t in session.execute(query).scalars()}
+
+    def mark_status_in_session(self, session, transaction: Transaction, status: PaymentStatus) -> bool:
+        """Fait passer une transaction encore en cours (PENDING, PROCESSING) à status, sans commit.
+
+        Les événements pouvant arriver dans le désordre, une transaction déjà
+        terminée (COMPLETED, REFUNDED...) n'est jamais ramenée en arrière.
+        """
+        transitioned = session.execute(
+            update(Transaction)
+            .where(Transaction.id == transaction.id,
+                   Transaction.status.in_(IN_PROGRESS_STATUSES),
+                   Transaction.status != status)
+            .values(status=status, updated_at=datetime.utcnow())
+        ).rowcount
+        if transitioned:
+            queue_transaction_webhook(session, transaction, f"payment.{status.value}", status=status)
+        return bool(transitioned)
+
+    @staticmethod
+    def _find_refund_id(session, provider_refund_id: str) -> Optional[str]:
+        return session.execute(
+            select(Refund.id).where(Refund.provider_refund_id == provider_refund_id)
+        ).scalar_one_or_none()
+
+    def complete_payment(self,
+                         merchant_id: str,
+                         provider_transaction_id: str,
+                         amount: Optional[Decimal],
+                         fee: Optional[Decimal],
+                         currency: str = "") -> bool:
+        """Passe une transaction à COMPLETED et inscrit l'encaissement et son règlement au grand livre.
+
+        La transition ne part que d'une transaction en cours (PENDING,
+        PROCESSING) : une confirmation rejouée, ou arrivée après un
+        remboursement ou un échec, n'écrit pas une seconde fois au grand livre.
+        Retourne True si la transition a eu lieu.
+        """
+        self.wait_for_pending_writes()
+        with self.session_factory() as session:
+            transitioned = self.complete_payment_in_session(
+                session, merchant_id, provider_transaction_id, amount, fee, currency
+            )
+            session.commit()
+            return transitioned
+
+    def complete_payment_in_session(self,
+                                    session,
+                                    merchant_id: str,
+                                    provider_transaction_id: str,
+                                    amount: Optional[Decimal],
+                                    fee: Optional[Decimal],
+                                    currency: str = "") -> bool:
+        """complete_payment() dans la session de l'appelant, sans commit (aussi via AsyncSession.run_sync)."""
+        transaction = self._find_by_provider_id(session, merchant_id, provider_transaction_id)
+        if transaction is None:
+            if amount is None or not currency:
+                return False
+            transaction = self.new_transaction(
+                merchant_id=merchant_id,
+                provider_transaction_id=provider_transaction_id,
+                amount_minor=to_minor_units(amount, currency),
+                currency=currency,
+                status=PaymentStatus.PENDING,
+            )
+            try:
+                with session.begin_nested():
+                    session.add(transaction)
+            except IntegrityError:
+                # Créée entre-temps par une confirmation concurrente (provider_transaction_id est unique)
+                transaction = self._find_by_provider_id(session, merchant_id, provider_transaction_id)
+                if transaction is None:
+                    return False
+
+        currency = transaction.currency
+        amount_minor = to_minor_units(amount, currency) if amount is not None else transaction.amount_minor
+        # Frais inconnus (statut lu sans le détail de la vente) : ceux déjà enregistrés sont conservés
+        fee_minor = to_minor_units(fee, currency) if fee is not None else transaction.fee_minor
+        transitioned = session.execute(
+            update(Transaction)
+            .where(Transaction.id == transaction.id, Transaction.status.in_(IN_PROGRESS_STATUSES))
+            .values(status=PaymentStatus.COMPLETED, amount_minor=amount_minor, fee_minor=fee_minor,
+                    updated_at=datetime.utcnow())
+        ).rowcount
+        if transitioned:
+            self.balance_service.record_payment_captured(
+                session, merchant_id, currency, amount_minor, fee_minor, transaction.id
+            )
+            # Un paiement COMPLETED est crédité sur le compte du marchand chez le fournisseur : le net est disponible
+            self.balance_service.record_settlement(
+                session, merchant_id, currency, amount_minor - fee_minor, transaction.id
+            )
+            queue_transaction_webhook(session, transaction, "payment.completed",
+                                      status=PaymentStatus.COMPLETED, amount_minor=amount_minor)
+        return bool(transitioned)
+
+    @staticmethod
+    def _refunded_minor(session, transaction_id: str) -> int:
+        return session.execute(
+            select(func.coalesce(func.sum(Refund.amount_minor), 0)).where(Refund.transaction_id == transaction_id)
+        ).scalar_one()
+
+    def check_refund(self,
+                     merchant_id: str,
+                     provider_transaction_id: str,
+                     amount: Optional[Decimal],
+                     currency: str = "") -> None:
+        """Refuse un remboursement avant l'appel au fournisseur, une fois l'argent rendu il serait trop tard."""
+        self.wait_for_pending_writes()
+        with self.session_factory() as session:
+            self.check_refund_in_session(session, merchant_id, provider_transaction_id, amount, currency)
+
+    def check_refund_in_session(self,
+                                session,
+                                merchant_id: str,
+                                provider_transaction_id: str,
+                                amount: Optional[Decimal],
+                                currency: str = "") -> None:
+        """check_refund() dans la session de l'appelant (aussi via AsyncSession.run_sync).
+
+        La transaction doit appartenir au marchand et être encaissée, et le
+        total remboursé ne doit pas dépasser le montant encaissé.
+        """
+        transaction = self._find_by_provider_id(session, merchant_id, provider_transaction_id)
+        if transaction is None:
+            raise TransactionNotFoundError(provider_transaction_id)
+        if transaction.status not in REFUNDABLE_STATUSES:
+            raise PaymentValidationError("transaction_id", f"a {transaction.status.value} payment cannot be refunded")
+        if amount is not None and currency and currency.upper() != transaction.currency:
+            raise PaymentValidationError("currency", f"the payment was captured in {transaction.currency}")
+        refundable_minor = transaction.amount_minor - self._refunded_minor(session, transaction.id)
+        if amount is None:
+            return
+        requested_minor = to_minor_units(amount, transaction.currency)
+        if requested_minor <= 0:
+            raise PaymentValidationError("amount", "must be positive")
+        if requested_minor > refundable_minor:
+            raise RefundExceedsCaptureError(provider_transaction_id, requested_minor, max(0, refundable_minor))
+
+    def record_refund(self,
+                      merchant_id: str,
+                      provider_transaction_id: str,
+                      provider_refund_id: str,
+                      amount: Optional[Decimal],
+                      reason: Optional[str] = None) -> Optional[str]:
+        """Enregistre un remboursement abouti et le débite du solde du marchand."""
+        self.wait_for_pending_writes()
+        with self.session_factory() as session:
+            refund_id = self.record_refund_in_session(
+                session, merchant_id, provider_transaction_id, provider_refund_id, amount, reason
+            )
+            session.commit()
+            return refund_id
+
+    def record_refund_in_session(self,
+                                 session,
+                                 merchant_id: str,
+                                 provider_transaction_id: str,
+                                 provider_refund_id: str,
+                                 amount: Optional[Decimal],
+                                 reason: Optional[str] = None) -> Optional[str]:
+        """record_refund() dans la session de l'appelant, sans commit (aussi via AsyncSession.run_sync)."""
+        transaction = self._find_by_provider_id(session, merchant_id, provider_transaction_id)
+        if transaction is None:
+            return None
+        if provider_refund_id:
+            existing_id = self._find_refund_id(session, provider_refund_id)
+            if existing_id is not None:
+                return existing_id  # Remboursement rejoué : déjà débité
+        amount_minor = to_minor_units(amount, transaction.currency) if amount is not None else transaction.amount_minor
+        refund = Refund(
+            id=str(uuid.uuid4()),
+            transaction_id=transaction.id,
+            amount_minor=amount_minor,
+            reason=reason,
+            status=PaymentStatus.REFUNDED.value,
+            provider_refund_id=provider_refund_id,
+            created_at=datetime.utcnow(),
+        )
+        refund_id = refund.id
+        try:
+            with session.begin_nested():
+                session.add(refund)
+        except IntegrityError:
+            # Enregistré entre-temps par un appel concurrent (provider_refund_id est unique)
+            return self._find_refund_id(session, provider_refund_id)
+        self.balance_service.record_refund(
+            session, merchant_id, transaction.currency, amount_minor, transaction.id, refund_id
+        )
+        refunded_minor = self._refunded_minor(session, transaction.id)
+        transaction.status = (PaymentStatus.REFUNDED if refunded_minor >= transaction.amount_minor
+                              else PaymentStatus.PARTIALLY_REFUNDED)
+        queue_transaction_webhook(session, transaction, "payment.refunded")
+        return refund_id
+
+    @staticmethod
+    def _filters_scope(merchant_id: str,
+                       start_date: Optional[datetime],
+                       end_date: Optional[datetime],
+                       status: Optional[PaymentStatus]) -> str:
+        raw = "|".join([
+            merchant_id,
+            start_date.isoformat() if start_date else "",
+            end_date.isoformat() if end_date else "",
+            status.value if status else "",
+        ])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def parse_status(status: str) -> Optional[PaymentStatus]:
+        """Convertit un filtre de statut gRPC ("COMPLETED") en PaymentStatus."""
+        if not status:
+            return None
+        try:
+            return PaymentStatus(status.lower())
+        except ValueError:
+            raise PaymentValidationError("status", f"unknown status '{status}'")
+
+    @staticmethod
+    def _filter(query, merchant_id: str, start_date: Optional[datetime],
+                end_date: Optional[datetime], status: Optional[PaymentStatus]):
+        query = query.where(Transaction.merchant_id == merchant_id)
+        if status is not None:
+            query = query.where(Transaction.status == status)
+        if start_date is not None:
+            query = query.where(Transaction.created_at >= start_date)
+        if end_date is not None:
+            query = query.where(Transaction.created_at < end_date)
+        return query
+
+    def list_transactions(self,
+                          merchant_id: str,
+                          start_date: Optional[datetime] = None,
+                          end_date: Optional[datetime] = None,
+                          status: Optional[PaymentStatus] = None,
+                          page_size: int = 0,
+                          page_token: str = "") -> Tuple[List[Transaction], str]:
+        """Retourne une page de transactions (plus récentes d'abord) et le jeton de la page suivante.
+
+        La pagination par curseur parcourt l'index (merchant_id[, status], created_at, id) :
+        la page N coûte autant que la première, contrairement à un OFFSET.
+        """
+        query, page = self.page_query(merchant_id, start_date, end_date, status, page_size, page_token)
+        with self.session_factory() as session:
+            return page(list(session.execute(query).scalars()))
+
+    def page_query(self,
+                   merchant_id: str,
+                   start_date: Optional[datetime] = None,
+                   end_date: Optional[datetime] = None,
+                   status: Optional[PaymentStatus] = None,
+                   page_size: int = 0,
+                   page_token: str = "") -> Tuple[Select, Callable[[List[Transaction]], Tuple[List[Transaction], str]]]:
+        """Requête d'une page de list_transactions() et fonction qui découpe son résultat en (page, jeton suivant)."""
+        if page_size < 0:
+            raise PaymentValidationError("page_size", f"must not be negative, got {page_size}")
+        page_size = min(page_size or Config.LIST_TRANSACTIONS_DEFAULT_PAGE_SIZE, Config.LIST_TRANSACTIONS_MAX_PAGE_SIZE)
+        scope = self._filters_scope(merchant_id, start_date, end_date, status)
+
+        query = self._filter(select(Transaction), merchant_id, start_date, end_date, status)
+        if page_token:
+            cursor_created_at, cursor_id = self.page_token_codec.decode(page_token, scope)
+            query = query.where(or_(
+                Transaction.created_at < cursor_created_at,
+                and_(Transaction.created_at == cursor_created_at, Transaction.id < cursor_id),
+            ))
+        query = query.order_by(Transaction.created_at.desc(), Transaction.id.desc()).limit(page_size + 1)
+
+        def page(rows: List[Transaction]) -> Tuple[List[Transaction], str]:
+            if len(rows) <= page_size:
+                return rows, ""
+            rows = rows[:page_size]
+            return rows, self.page_token_codec.encode(rows[-1].created_at, rows[-1].id, scope)
+
+        return query, page
+
+    def export_query(self,
+                     merchant_id: str,
+                     start_date: Optional[datetime] = None,
+                     end_date: Optional[datetime] = None,
+                     status: Optional[PaymentStatus] = None) -> Select:
+        """Colonnes exportées, dans l'ordre (created_at, id) de l'index."""
+        query = self._filter(select(*EXPORT_COLUMNS), merchant_id, start_date, end_date, status)
+        return query.order_by(Transaction.created_at, Transaction.id)
+
+    def iter_transaction_batches(self,
+                                 merchant_id: str,
+                                 start_date: Optional[datetime] = None,
+                                 end_date: Optional[datetime] = None,
+                                 status: Optional[PaymentStatus] = None,
+                                 chunk_size: int = Config.EXPORT_CHUNK_SIZE) -> Iterator[list]:
+        """Parcourt les transactions par lots depuis un curseur serveur.
+
+        Seuls chunk_size lignes sont en mémoire à la fois, quelle que soit la taille
+        de l'historique. Le générateur garde sa connexion ouverte jusqu'à épuisement
+        ou fermeture, et doit être consommé depuis un seul thread.
+        """
+        query = self.export_query(merchant_id, start_date, end_date, status)
+        with self.session_factory() as session:
+            result = session.execute(query.execution_options(stream_results=True, yield_per=chunk_size))
+            for batch in result.partitions(chunk_size):
+                yield batch
@@ -0,0 +1,156 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import List, Optional
+from sqlalchemy import insert, update
+from app.config import Config
+from app.db import SessionLocal
+from app.utils.metrics import WRITE_BEHIND_OVERFLOWS
+from models.models import Transaction
+
+logger = logging.getLogger(__name__)
+
+# Types d'opérations en file
+INSERT = "insert"
+UPDATE = "update"
+FLUSH = "flush"
+STOP = "stop"
+
+
+@dataclass
+class _Operation:
+    kind: str
+    values: Optional[dict] = None
+    future: Future = field(default_factory=Future)
+
+
+class TransactionWriter:
+    """Écriture différée (write-behind) des transactions, par lots.
+
+    Les insertions et mises à jour de statut sont mises en file et écrites par
+    un thread dédié toutes les batch_size opérations ou interval_ms
+    millisecondes, en un seul INSERT multi-lignes et un seul UPDATE par lot,
+    dans une seule transaction SQL.
+
+    Chaque opération retourne un Future résolu une fois son lot validé :
+    l'appelant qui a besoin de durabilité l'attend (les attentes simultanées
+    partagent le même commit), les autres l'ignorent.
+
+    File pleine : insert(), update() et flush() attendent une place (les
+    threads du serveur synchrone ralentissent) ; try_insert() et try_flush(),
+    pour la boucle asyncio qui ne doit jamais bloquer, retournent None et
+    l'appelant écrit lui-même ou attend hors de la boucle.
+    """
+
+    def __init__(self,
+                 session_factory=SessionLocal,
+                 batch_size: int = Config.TRANSACTION_WRITE_BEHIND_BATCH_SIZE,
+                 interval_ms: float = Config.TRANSACTION_WRITE_BEHIND_INTERVAL_MS,
+                 max_pending: int = Config.TRANSACTION_WRITE_BEHIND_MAX_PENDING):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.interval_seconds = interval_ms / 1000
+        # File bornée : si la base ne suit pas, les appelants ralentissent au lieu de saturer la mémoire
+        self._queue: "queue.Queue[_Operation]" = queue.Queue(maxsize=max_pending)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="transaction-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _submit(self, operation: _Operation, block: bool = True) -> Optional[Future]:
+        if self._closed:
+            raise RuntimeError("TransactionWriter is closed")
+        if block:
+            self._queue.put(operation)
+            return operation.future
+        try:
+            self._queue.put_nowait(operation)
+        except queue.Full:
+            WRITE_BEHIND_OVERFLOWS.inc(operation.kind)
+            return None
+        return operation.future
+
+    def insert(self, values: dict) -> Future:
+        """Met en file l'insertion d'une transaction (values doit contenir id)."""
+        return self._submit(_Operation(INSERT, values))
+
+    def try_insert(self, values: dict) -> Optional[Future]:
+        """Comme insert(), sans attendre : None si la file est pleine."""
+        return self._submit(_Operation(INSERT, values), block=False)
+
+    def update(self, transaction_id: str, **values) -> Future:
+        """Met en file la mise à jour d'une transaction (ex. status=PaymentStatus.FAILED)."""
+        return self._submit(_Operation(UPDATE, dict(values, id=transaction_id)))
+
+    def flush(self) -> Future:
+        """Écrit sans attendre le délai ; résolu quand tout ce qui précède est validé."""
+        return self._submit(_Operation(FLUSH))
+
+    def try_flush(self) -> Optional[Future]:
+        """Comme flush(), sans attendre : None si la file est pleine."""
+        return self._submit(_Operation(FLUSH), block=False)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Écrit les opérations en attente puis arrête le thread d'écriture."""
+        if self._closed:
+            return
+        self._queue.put(_Operation(STOP))
+        self._closed = True
+        self._thread.join(timeout)
+
+    def _collect(self) -> List[_Operation]:
+        """Attend une opération, puis regroupe les suivantes jusqu'à batch_size, interval ou un flush."""
+        operations = [self._queue.get()]
+        deadline = time.monotonic() + self.interval_seconds
+        while len(operations) < self.batch_size and operations[-1].kind not in (FLUSH, STOP):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                operations.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return operations
+
+    def _run(self) -> None:
+        while True:
+            operations = self._collect()
+            self._write(operations)
+            if operations[-1].kind == STOP:
+                return
+
+    def _execute(self, operations: List[_Operation]) -> None:
+        inserts = [op.values for op in operations if op.kind == INSERT]
+        updates = [op.values for op in operations if op.kind == UPDATE]
+        with self.session_factory() as session:
+            # Les insertions d'abord : une mise à jour peut viser une ligne du même lot
+            if inserts:
+                session.execute(insert(Transaction), inserts)
+            if updates:
+                session.execute(update(Transaction), updates)
+            session.commit()
+
+    def _write(self, operations: List[_Operation]) -> None:
+        writes = [op for op in operations if op.kind in (INSERT, UPDATE)]
+        try:
+            if writes:
+                self._execute(writes)
+        except Exception:
+            logger.exception("Batched write of %d transaction operations failed, retrying one by one", len(writes))
+            for op in writes:
+                try:
+                    self._execute([op])
+                except Exception as e:
+                    op.future.set_exception(e)
+                else:
+                    op.future.set_result(True)
+        else:
+            for op in writes:
+                op.future.set_result(True)
+        for op in operations:
+            if op.kind in (FLUSH, STOP):
+                op.future.set_result(True)
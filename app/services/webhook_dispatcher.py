@@ -0,0 +1,327 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Deque, Dict, List, Optional
+from urllib.parse import urlsplit
+import aiohttp
+from sqlalchemy import delete, event, select
+from sqlalchemy.orm import Session
+from app.config import Config
+from app.db import SessionLocal
+from app.utils.money import from_minor_units
+from models.models import WebhookDeadLetter
+
+logger = logging.getLogger(__name__)
+
+# Codes HTTP pour lesquels une nouvelle tentative a un sens (en plus des 5xx et erreurs réseau)
+RETRYABLE_STATUS_CODES = {408, 425, 429}
+
+
+@dataclass
+class WebhookDelivery:
+    """Notification à livrer à l'URL webhook d'un marchand."""
+    url: str
+    event_type: str
+    payload: Dict
+    merchant_id: Optional[str] = None
+    transaction_id: Optional[str] = None
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    attempts: int = 0
+    last_status_code: Optional[int] = None
+    last_error: Optional[str] = None
+
+    @property
+    def host(self) -> str:
+        return urlsplit(self.url).netloc.lower()
+
+
+def backoff_delay(attempts: int,
+                  base: float = Config.WEBHOOK_BACKOFF_BASE,
+                  maximum: float = Config.WEBHOOK_BACKOFF_MAX) -> float:
+    """Délai avant la tentative suivante : exponentiel, plafonné, avec jitter (« equal jitter »)."""
+    delay = min(maximum, base * (2 ** max(attempts - 1, 0)))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class WebhookDispatcher:
+    """Livraison des webhooks en arrière-plan, hors du chemin des RPC.
+
+    enqueue() ne fait que confier la notification à une boucle asyncio dédiée
+    (thread "webhook-dispatcher") et retourne aussitôt. Chaque destination a
+    sa propre file et au plus max_concurrency_per_host envois simultanés : un
+    marchand lent n'occupe que ses propres créneaux et n'en retarde aucun
+    autre. Les connexions HTTP keep-alive sont mutualisées par hôte.
+
+    Une livraison en échec est replanifiée avec un backoff exponentiel ; les
+    tentatives en attente ne mobilisent ni créneau ni connexion. Après
+    max_attempts, ou si plus de max_pending notifications sont en attente,
+    la notification part dans webhook_dead_letters.
+    """
+
+    def __init__(self,
+                 session_factory=SessionLocal,
+                 max_pending: int = Config.WEBHOOK_MAX_PENDING,
+                 max_connections: int = Config.WEBHOOK_MAX_CONNECTIONS,
+                 max_concurrency_per_host: int = Config.WEBHOOK_MAX_CONCURRENCY_PER_HOST,
+                 timeout: float = Config.WEBHOOK_TIMEOUT,
+                 max_attempts: int = Config.WEBHOOK_MAX_ATTEMPTS,
+                 signing_secret: str = Config.WEBHOOK_SIGNING_SECRET):
+        self.session_factory = session_factory
+        self.max_pending = max_pending
+        self.max_connections = max_connections
+        self.max_concurrency_per_host = max_concurrency_per_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_attempts = max_attempts
+        self._signing_secret = signing_secret.encode("utf-8") if signing_secret else None
+
+        # État manipulé uniquement depuis la boucle du dispatcher
+        self._queues: Dict[str, Deque[WebhookDelivery]] = {}
+        self._active: Dict[str, int] = {}
+        self._pending = 0
+        self._idle: Optional[asyncio.Event] = None
+        self._http: Optional[aiohttp.ClientSession] = None
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="webhook-dispatcher", daemon=True)
+        self._thread.start()
+
+    # --- API appelable depuis n'importe quel thread -------------------------
+
+    def enqueue(self, delivery: WebhookDelivery) -> None:
+        """Confie une notification au dispatcher, sans attendre."""
+        self._loop.call_soon_threadsafe(self._accept, delivery)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Attend que plus aucune notification ne soit en attente (arrêt propre, tests)."""
+        async def idle():
+            if self._pending:
+                self._idle = self._idle or asyncio.Event()
+                await self._idle.wait()
+        try:
+            asyncio.run_coroutine_threadsafe(asyncio.wait_for(idle(), timeout), self._loop).result()
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def close(self) -> None:
+        """Ferme la session HTTP et arrête la boucle ; les notifications en attente sont perdues."""
+        async def shutdown():
+            if self._http is not None:
+                await self._http.close()
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def pending(self) -> int:
+        return self._pending
+
+    # --- Boucle du dispatcher -----------------------------------------------
+
+    def _accept(self, delivery: WebhookDelivery) -> None:
+        if self._pending >= self.max_pending:
+            delivery.last_error = "dispatcher queue full"
+            self._dead_letter(delivery)
+            return
+        self._pending += 1
+        self._route(delivery)
+
+    def _route(self, delivery: WebhookDelivery) -> None:
+        self._queues.setdefault(delivery.host, deque()).append(delivery)
+        self._pump(delivery.host)
+
+    def _pump(self, host: str) -> None:
+        """Lance des envois vers host tant qu'il reste des créneaux et des notifications."""
+        queue = self._queues.get(host)
+        while queue and self._active.get(host, 0) < self.max_concurrency_per_host:
+            self._active[host] = self._active.get(host, 0) + 1
+            self._loop.create_task(self._send(queue.popleft()))
+        if not queue:
+            self._queues.pop(host, None)
+
+    def _done(self) -> None:
+        self._pending -= 1
+        if self._pending == 0 and self._idle is not None:
+            self._idle.set()
+            self._idle = None
+
+    def _http_session(self) -> aiohttp.ClientSession:
+        if self._http is None or self._http.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections,
+                                             limit_per_host=self.max_concurrency_per_host)
+            self._http = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._http
+
+    def _headers(self, delivery: WebhookDelivery, body: bytes) -> Dict[str, str]:
+        timestamp = str(int(time.time()))
+        headers = {
+            "Content-Type": "application/json",
+            "X-Webhook-Id": delivery.id,
+            "X-Webhook-Event": delivery.event_type,
+            "X-Webhook-Timestamp": timestamp,
+        }
+        if self._signing_secret:
+            signed = timestamp.encode("ascii") + b"." + body
+            headers["X-Webhook-Signature"] = "sha256=" + hmac.new(self._signing_secret, signed, hashlib.sha256).hexdigest()
+        return headers
+
+    async def _send(self, delivery: WebhookDelivery) -> None:
+        host = delivery.host
+        body = json.dumps(delivery.payload, separators=(",", ":"), default=str).encode("utf-8")
+        delivery.attempts += 1
+        retryable = True
+        try:
+            async with self._http_session().post(delivery.url, data=body,
+                                                 headers=self._headers(delivery, body)) as response:
+                delivery.last_status_code = response.status
+                if 200 <= response.status < 300:
+                    self._done()
+                    return
+                delivery.last_error = f"HTTP {response.status}"
+                retryable = response.status >= 500 or response.status in RETRYABLE_STATUS_CODES
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            delivery.last_error = f"{type(e).__name__}: {e}"[:500]
+        except Exception as e:
+            logger.exception("Unexpected error delivering webhook %s to %s", delivery.id, host)
+            delivery.last_error = f"{type(e).__name__}: {e}"[:500]
+        finally:
+            self._active[host] -= 1
+            if not self._active[host]:
+                del self._active[host]
+            self._pump(host)
+
+        if retryable and delivery.attempts < self.max_attempts:
+            self._loop.call_later(backoff_delay(delivery.attempts), self._route, delivery)
+            return
+        logger.warning("Webhook %s to %s abandoned after %d attempts: %s",
+                       delivery.id, host, delivery.attempts, delivery.last_error)
+        self._dead_letter(delivery)
+        self._done()
+
+    def _dead_letter(self, delivery: WebhookDelivery) -> None:
+        self._loop.run_in_executor(None, self._save_dead_letter, delivery)
+
+    def _save_dead_letter(self, delivery: WebhookDelivery) -> None:
+        try:
+            with self.session_factory() as session:
+                session.merge(WebhookDeadLetter(
+                    id=delivery.id,
+                    merchant_id=delivery.merchant_id,
+                    transaction_id=delivery.transaction_id,
+                    url=delivery.url,
+                    event_type=delivery.event_type,
+                    payload=delivery.payload,
+                    attempts=delivery.attempts,
+                    last_status_code=delivery.last_status_code,
+                    last_error=delivery.last_error,
+                    created_at=delivery.created_at,
+                    dead_at=datetime.utcnow(),
+                ))
+                session.commit()
+        except Exception:
+            logger.exception("Could not store dead-lettered webhook %s", delivery.id)
+
+    def redeliver_dead_letters(self, limit: int = 100) -> int:
+        """Remet en livraison (tentatives remises à zéro) les plus anciennes notifications abandonnées."""
+        with self.session_factory() as session:
+            records = session.execute(
+                select(WebhookDeadLetter).order_by(WebhookDeadLetter.dead_at).limit(limit)
+            ).scalars().all()
+            deliveries = [
+                WebhookDelivery(url=r.url, event_type=r.event_type, payload=r.payload, merchant_id=r.merchant_id,
+                                transaction_id=r.transaction_id, id=r.id, created_at=r.created_at)
+                for r in records
+            ]
+            session.execute(delete(WebhookDeadLetter).where(WebhookDeadLetter.id.in_([d.id for d in deliveries])))
+            session.commit()
+        for delivery in deliveries:
+            self.enqueue(delivery)
+        return len(deliveries)
+
+
+_dispatcher: Optional[WebhookDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_webhook_dispatcher() -> WebhookDispatcher:
+    """Dispatcher du processus, démarré à la première notification."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = WebhookDispatcher()
+        return _dispatcher
+
+
+# Clé de Session.info listant les notifications à envoyer une fois la transaction validée
+_PENDING_WEBHOOKS = "pending_webhooks"
+
+
+def queue_transaction_webhook(session, transaction, event_type: str, **changes) -> None:
+    """Prépare la notification d'un événement de transaction ; envoyée seulement après commit.
+
+    changes surcharge status, amount_minor ou currency quand l'objet n'est pas encore à jour.
+    """
+    if not Config.WEBHOOKS_ENABLED or not transaction.webhook_url:
+        return
+    values = {
+        "status": transaction.status,
+        "amount_minor": transaction.amount_minor,
+        "currency": transaction.currency,
+        **changes,
+    }
+    status = values["status"]
+    delivery_id = str(uuid.uuid4())
+    created_at = datetime.utcnow()
+    delivery = WebhookDelivery(
+        url=transaction.webhook_url,
+        event_type=event_type,
+        payload={
+            "id": delivery_id,
+            "type": event_type,
+            "created_at": created_at.isoformat() + "Z",
+            "data": {
+                "transaction_id": transaction.id,
+                "provider_transaction_id": transaction.provider_transaction_id,
+                "merchant_id": transaction.merchant_id,
+                "order_id": transaction.order_id,
+                "status": status.value if hasattr(status, "value") else status,
+                "amount_minor": values["amount_minor"],
+                "amount": str(from_minor_units(values["amount_minor"], values["currency"])),
+                "currency": values["currency"],
+            },
+        },
+        merchant_id=transaction.merchant_id,
+        transaction_id=transaction.id,
+        id=delivery_id,
+        created_at=created_at,
+    )
+    session.info.setdefault(_PENDING_WEBHOOKS, []).append(delivery)
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_committed_webhooks(session) -> None:
+    deliveries: List[WebhookDelivery] = session.info.pop(_PENDING_WEBHOOKS, [])
+    if deliveries:
+        dispatcher = get_webhook_dispatcher()
+        for delivery in deliveries:
+            dispatcher.enqueue(delivery)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_rolled_back_webhooks(session, transaction) -> None:
+    """Oublie les webhooks d'une transaction annulée (après un commit, la liste est déjà vidée).
+
+    Seule la fin de la transaction racine compte : l'annulation d'un savepoint
+    (begin_nested) ne défait pas les écritures faites hors de lui.
+    """
+    if transaction.parent is None:
+        session.info.pop(_PENDING_WEBHOOKS, None)
@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from app.config import Config
+
+BalanceKey = Tuple[str, str]
+
+
+class _MerchantBalances:
+    """Réponses en cache d'un marchand, par devise, et génération de son solde."""
+    __slots__ = ("generation", "entries")
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.entries: Dict[str, Tuple[Any, float]] = {}
+
+
+class BalanceCache:
+    """Cache par processus des réponses GetMerchantBalance, indexé par (merchant_id, devise).
+
+    Les entrées sont invalidées à chaque écriture au grand livre du marchand
+    (voir BalanceService) ; ttl_seconds ne sert que de filet pour les écritures
+    faites par d'autres processus.
+
+    Les entrées sont rangées par marchand : invalider un marchand ne touche
+    que ses entrées. Chaque marchand porte un numéro de génération, tiré d'un
+    compteur commun à l'invalidation : une lecture commencée avant une
+    écriture ne peut pas remettre en cache l'ancien solde une fois l'écriture
+    validée. Les marchands évincés (LRU, au plus max_entries) emportent leur
+    génération ; _retired_generation, la plus haute génération évincée, sert
+    à ceux qui n'en ont plus, ce qui borne la mémoire sans rouvrir la course.
+    """
+
+    def __init__(self,
+                 ttl_seconds: float = Config.BALANCE_CACHE_TTL_SECONDS,
+                 max_entries: int = Config.BALANCE_CACHE_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._merchants: "OrderedDict[str, _MerchantBalances]" = OrderedDict()
+        self._entry_count = 0
+        self._last_generation = 0
+        self._retired_generation = 0
+
+    @staticmethod
+    def _key(merchant_id: str, currency: str) -> BalanceKey:
+        return merchant_id, (currency or "").upper()
+
+    def _generation(self, merchant_id: str) -> int:
+        balances = self._merchants.get(merchant_id)
+        return balances.generation if balances is not None else self._retired_generation
+
+    def _evict(self) -> None:
+        while self._merchants and (self._entry_count > self.max_entries or len(self._merchants) > self.max_entries):
+            _, balances = self._merchants.popitem(last=False)
+            self._entry_count -= len(balances.entries)
+            self._retired_generation = max(self._retired_generation, balances.generation)
+
+    def _get(self, key: BalanceKey) -> Tuple[bool, Any, int]:
+        merchant_id, currency = key
+        with self._lock:
+            balances = self._merchants.get(merchant_id)
+            if balances is None:
+                return False, None, self._retired_generation
+            entry = balances.entries.get(currency)
+            if entry is None:
+                return False, None, balances.generation
+            value, cached_until = entry
+            if cached_until <= time.monotonic():
+                del balances.entries[currency]
+                self._entry_count -= 1
+                return False, None, balances.generation
+            self._merchants.move_to_end(merchant_id)
+            return True, value, balances.generation
+
+    def _put(self, key: BalanceKey, value: Any, generation: int) -> None:
+        merchant_id, currency = key
+        with self._lock:
+            if self._generation(merchant_id) != generation:
+                return  # Solde modifié pendant la lecture
+            balances = self._merchants.get(merchant_id)
+            if balances is None:
+                balances = self._merchants[merchant_id] = _MerchantBalances(generation)
+            if currency not in balances.entries:
+                self._entry_count += 1
+            balances.entries[currency] = (value, time.monotonic() + self.ttl_seconds)
+            self._merchants.move_to_end(merchant_id)
+            self._evict()
+
+    def get_or_load(self, merchant_id: str, currency: str, loader: Callable[[], Any]) -> Any:
+        """Retourne la réponse en cache, ou l'obtient via loader() et la met en cache."""
+        key = self._key(merchant_id, currency)
+        found, value, generation = self._get(key)
+        if not found:
+            value = loader()
+            self._put(key, value, generation)
+        return value
+
+    async def get_or_load_async(self, merchant_id: str, currency: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Variante asyncio de get_or_load(), avec une coroutine pour charger les absents."""
+        key = self._key(merchant_id, currency)
+        found, value, generation = self._get(key)
+        if not found:
+            value = await loader()
+            self._put(key, value, generation)
+        return value
+
+    def invalidate(self, merchant_id: str) -> None:
+        """Invalide tous les soldes en cache d'un marchand (toutes devises)."""
+        with self._lock:
+            self._last_generation += 1
+            balances = self._merchants.get(merchant_id)
+            if balances is None:
+                balances = self._merchants[merchant_id] = _MerchantBalances(self._last_generation)
+            else:
+                self._entry_count -= len(balances.entries)
+                balances.entries.clear()
+                balances.generation = self._last_generation
+            self._merchants.move_to_end(merchant_id)
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._retired_generation = self._last_generation
+            self._merchants.clear()
+            self._entry_count = 0
+
+
+balance_cache = BalanceCache()
@@ -0,0 +1,80 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+from app.utils.exceptions import DeadlineExceededError, RequestCancelledError
+
+
+class Deadline:
+    """Délai et état d'annulation de la RPC en cours."""
+
+    def __init__(self, time_remaining: Optional[float]):
+        self.expires_at = time.monotonic() + time_remaining if time_remaining is not None else None
+        self.cancelled = False
+
+    def remaining(self) -> Optional[float]:
+        """Secondes restantes ; None si le client n'a pas fixé de délai."""
+        return self.expires_at - time.monotonic() if self.expires_at is not None else None
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+# Délai de la RPC servie par le thread ou la tâche asyncio courante (posé par DeadlineInterceptor)
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("current_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def remaining_time() -> Optional[float]:
+    """Secondes restantes avant le délai de la RPC courante ; None sans délai."""
+    deadline = _current_deadline.get()
+    return deadline.remaining() if deadline is not None else None
+
+
+def deadline_timeout(default: Optional[float]) -> Optional[float]:
+    """Timeout à appliquer à une opération : default, réduit au délai restant de la RPC."""
+    remaining = remaining_time()
+    if remaining is None:
+        return default
+    remaining = max(remaining, 0.001)
+    return remaining if default is None else min(default, remaining)
+
+
+def check_deadline(operation: str, required_seconds: float = 0.0) -> None:
+    """Lève une erreur si la RPC a été annulée ou s'il reste moins de required_seconds.
+
+    À appeler avant une opération coûteuse (appel fournisseur) : inutile de la
+    commencer si le client n'en attendra pas le résultat.
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return
+    if deadline.cancelled:
+        raise RequestCancelledError(operation)
+    remaining = deadline.remaining()
+    if remaining is not None and remaining < required_seconds:
+        raise DeadlineExceededError(operation, remaining)
+
+
+@contextmanager
+def deadline_scope(time_remaining: Optional[float]) -> Iterator[Deadline]:
+    """Rend le délai d'une RPC visible des couches inférieures (fournisseur, base)."""
+    deadline = Deadline(time_remaining)
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+@contextmanager
+def without_deadline() -> Iterator[None]:
+    """Suspend le délai : pour les écritures qui doivent aboutir une fois l'appel fournisseur fait."""
+    token = _current_deadline.set(None)
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
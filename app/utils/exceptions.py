@@ -43,3 +43,79 @@ class ProviderNotSupportedError(PaymentError):
     def __init__(self, provider_name: str):
         message = f"The payment provider '{provider_name}' is not supported by the system."
         super().__init__(message)
+
+class IdempotencyConflictError(PaymentError):
+    """Exception levée lorsqu'une clé d'idempotence est réutilisée avec une requête différente."""
+    def __init__(self, idempotency_key: str):
+        message = f"Idempotency key '{idempotency_key}' was already used with a different request."
+        super().__init__(message)
+
+class InvalidPageTokenError(PaymentError):
+    """Exception levée lorsqu'un jeton de pagination est invalide ou a été altéré."""
+    def __init__(self, reason: str = "malformed"):
+        message = f"Invalid page token: {reason}."
+        super().__init__(message)
+
+class LedgerImbalanceError(PaymentError):
+    """Exception levée lorsqu'une écriture comptable ne s'équilibre pas à zéro."""
+    def __init__(self, entry_type: str, imbalance_minor: int):
+        message = f"Ledger journal '{entry_type}' is unbalanced by {imbalance_minor} minor units."
+        super().__init__(message)
+
+class SequentialScanError(PaymentError):
+    """Exception levée lorsqu'une requête fréquente parcourt une table entière au lieu d'un index."""
+    def __init__(self, queries: list):
+        message = f"Hot queries fall back to a full table scan: {', '.join(queries)}."
+        super().__init__(message)
+
+class DuplicateKeyError(PaymentError):
+    """Exception levée lorsqu'une migration ne peut créer un index unique à cause de doublons existants."""
+    def __init__(self, table: str, column: str, values: list):
+        shown = ', '.join(str(value) for value in values[:10])
+        more = f" and {len(values) - 10} more" if len(values) > 10 else ""
+        message = (f"Cannot add a unique index on {table}.{column}: duplicated values {shown}{more}. "
+                   f"Resolve the duplicate rows, then run the migrations again.")
+        super().__init__(message)
+
+class WebhookSignatureError(PaymentError):
+    """Exception levée lorsqu'un webhook entrant n'a pas pu être authentifié auprès du fournisseur."""
+    def __init__(self, provider_name: str, reason: str):
+        message = f"Rejected '{provider_name}' webhook: {reason}."
+        super().__init__(message)
+
+class ProviderUnavailableError(PaymentError):
+    """Exception levée lorsqu'un fournisseur est écarté (circuit ouvert ou trop d'appels en cours)."""
+    def __init__(self, provider_name: str, reason: str):
+        message = f"The payment provider '{provider_name}' is temporarily unavailable: {reason}."
+        super().__init__(message)
+
+class DeadlineExceededError(PaymentError):
+    """Exception levée lorsque le délai restant de la RPC ne suffit pas pour continuer."""
+    def __init__(self, operation: str, remaining_seconds: float):
+        message = f"Deadline too short for {operation}: {max(remaining_seconds, 0):.3f}s remaining."
+        super().__init__(message)
+
+class RequestCancelledError(PaymentError):
+    """Exception levée lorsque le client a annulé la RPC en cours."""
+    def __init__(self, operation: str):
+        message = f"Request cancelled by the client before {operation}."
+        super().__init__(message)
+
+class TransactionNotFoundError(PaymentError):
+    """Exception levée lorsqu'une transaction est inconnue ou appartient à un autre marchand."""
+    def __init__(self, transaction_id: str):
+        message = f"Transaction '{transaction_id}' not found."
+        super().__init__(message)
+
+class RefundExceedsCaptureError(PaymentError):
+    """Exception levée lorsqu'un remboursement porterait le total remboursé au-delà du montant encaissé."""
+    def __init__(self, transaction_id: str, requested_minor: int, refundable_minor: int):
+        message = (f"Refund of {requested_minor} minor units exceeds the {refundable_minor} minor units "
+                   f"still refundable on transaction '{transaction_id}'.")
+        super().__init__(message)
+
+class ProviderOutcomeNotRecordedError(PaymentError):
+    """Exception levée lorsqu'une opération aboutie chez le fournisseur n'a pas pu être enregistrée en base."""
+    def __init__(self, operation: str, provider_transaction_id: str):
+        message = f"The provider {operation} '{provider_transaction_id}' succeeded but could not be recorded."
+        super().__init__(message)
@@ -0,0 +1,266 @@
+import asyncio
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from sqlalchemy import Delete, Select, delete, select
+from sqlalchemy.exc import IntegrityError
+from app.config import Config
+from app.db import SessionLocal
+from app.utils.deadline import without_deadline
+from app.utils.exceptions import IdempotencyConflictError
+from app.utils.tracing import start_span
+from models.models import IdempotencyRecord
+
+# Une opération idempotente renvoie la réponse sérialisée et indique si elle doit être mémorisée
+# (les échecs transitoires ne le sont pas, pour que le client puisse réessayer).
+IdempotentResult = Tuple[bytes, bool]
+
+
+def request_fingerprint(request) -> str:
+    """Empreinte stable d'une requête protobuf, pour détecter la réutilisation d'une clé."""
+    return hashlib.sha256(request.SerializeToString(deterministic=True)).hexdigest()
+
+
+class IdempotencyStore:
+    """Stockage des réponses idempotentes par (merchant_id, idempotency_key).
+
+    Un LRU borné en mémoire sert les rejeux fréquents sans requête SQL ; la table
+    idempotency_records garantit le rejeu entre processus et redémarrages. Les
+    requêtes concurrentes portant la même clé attendent l'appel en cours et
+    partagent son résultat au lieu d'appeler le provider à leur tour.
+
+    async_loader et async_saver (ex. IdempotencyRepository.find et .save)
+    lisent et écrivent la table par AsyncSession pour execute_async ; sans
+    eux, les méthodes synchrones sont exécutées dans un thread.
+    """
+
+    def __init__(self,
+                 session_factory=SessionLocal,
+                 ttl_seconds: int = Config.IDEMPOTENCY_TTL_SECONDS,
+                 max_entries: int = Config.IDEMPOTENCY_CACHE_SIZE,
+                 async_loader: Optional[Callable[[str, str], Awaitable[Optional[IdempotencyRecord]]]] = None,
+                 async_saver: Optional[Callable[[IdempotencyRecord], Awaitable[None]]] = None):
+        self.session_factory = session_factory
+        self.async_loader = async_loader
+        self.async_saver = async_saver
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[str, str], Tuple[str, bytes, datetime]]" = OrderedDict()
+        self._in_flight: Dict[Tuple[str, str], Tuple[str, Future]] = {}
+
+    # --- Cache mémoire -------------------------------------------------
+
+    def _cache_get(self, key: Tuple[str, str]) -> Optional[Tuple[str, bytes]]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            fingerprint, response, expires_at = entry
+            if expires_at <= datetime.utcnow():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return fingerprint, response
+
+    def _cache_put(self, key: Tuple[str, str], fingerprint: str, response: bytes, expires_at: datetime) -> None:
+        with self._lock:
+            self._cache[key] = (fingerprint, response, expires_at)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    # --- Persistance ---------------------------------------------------
+
+    @staticmethod
+    def record_query(key: Tuple[str, str]) -> Select:
+        """Réponse non expirée mémorisée pour la clé."""
+        merchant_id, idempotency_key = key
+        return select(IdempotencyRecord).where(
+            IdempotencyRecord.merchant_id == merchant_id,
+            IdempotencyRecord.idempotency_key == idempotency_key,
+            IdempotencyRecord.expires_at > datetime.utcnow(),
+        )
+
+    @staticmethod
+    def expired_record_query(key: Tuple[str, str], now: datetime) -> Delete:
+        """Suppression de la ligne expirée de la clé, que la nouvelle réponse remplace."""
+        merchant_id, idempotency_key = key
+        return delete(IdempotencyRecord).where(
+            IdempotencyRecord.merchant_id == merchant_id,
+            IdempotencyRecord.idempotency_key == idempotency_key,
+            IdempotencyRecord.expires_at <= now,
+        )
+
+    def _new_record(self, key: Tuple[str, str], fingerprint: str, response: bytes) -> IdempotencyRecord:
+        merchant_id, idempotency_key = key
+        now = datetime.utcnow()
+        return IdempotencyRecord(
+            id=str(uuid.uuid4()),
+            merchant_id=merchant_id,
+            idempotency_key=idempotency_key,
+            request_fingerprint=fingerprint,
+            response=response,
+            created_at=now,
+            expires_at=now + self.ttl,
+        )
+
+    def _remember(self, key: Tuple[str, str], record: Optional[IdempotencyRecord]) -> Optional[Tuple[str, bytes]]:
+        """Remonte une réponse lue en base dans le LRU."""
+        if record is None:
+            return None
+        self._cache_put(key, record.request_fingerprint, record.response, record.expires_at)
+        return record.request_fingerprint, record.response
+
+    def _load(self, key: Tuple[str, str]) -> Optional[Tuple[str, bytes]]:
+        """Lit une réponse non expirée en base et la remonte dans le LRU."""
+        with self.session_factory() as session:
+            return self._remember(key, session.execute(self.record_query(key)).scalar_one_or_none())
+
+    async def _load_async(self, key: Tuple[str, str]) -> Optional[Tuple[str, bytes]]:
+        """Variante asyncio de _load()."""
+        if self.async_loader is None:
+            return await asyncio.get_running_loop().run_in_executor(None, self._load, key)
+        return self._remember(key, await self.async_loader(*key))
+
+    def _save(self, key: Tuple[str, str], fingerprint: str, response: bytes) -> Tuple[str, bytes]:
+        """Persiste une réponse ; si un autre processus a gagné la course, sa réponse prévaut."""
+        record = self._new_record(key, fingerprint, response)
+        expires_at = record.expires_at
+        with self.session_factory() as session:
+            session.execute(self.expired_record_query(key, record.created_at))
+            session.add(record)
+            try:
+                session.commit()
+            except IntegrityError:
+                session.rollback()
+                existing = self._load(key)
+                if existing is not None:
+                    return existing
+                raise
+        self._cache_put(key, fingerprint, response, expires_at)
+        return fingerprint, response
+
+    async def _save_async(self, key: Tuple[str, str], fingerprint: str, response: bytes) -> Tuple[str, bytes]:
+        """Variante asyncio de _save()."""
+        if self.async_saver is None:
+            return await asyncio.get_running_loop().run_in_executor(None, self._save, key, fingerprint, response)
+        record = self._new_record(key, fingerprint, response)
+        expires_at = record.expires_at
+        try:
+            await self.async_saver(record)
+        except IntegrityError:
+            existing = await self._load_async(key)
+            if existing is not None:
+                return existing
+            raise
+        self._cache_put(key, fingerprint, response, expires_at)
+        return fingerprint, response
+
+    def purge_expired(self) -> int:
+        """Supprime les réponses expirées de la base ; retourne le nombre de lignes supprimées."""
+        with self.session_factory() as session:
+            result = session.execute(
+                delete(IdempotencyRecord).where(IdempotencyRecord.expires_at <= datetime.utcnow())
+            )
+            session.commit()
+            return result.rowcount
+
+    # --- Exécution -----------------------------------------------------
+
+    @staticmethod
+    def _check(key: Tuple[str, str], fingerprint: str, stored: Tuple[str, bytes]) -> bytes:
+        stored_fingerprint, response = stored
+        if stored_fingerprint != fingerprint:
+            raise IdempotencyConflictError(key[1])
+        return response
+
+    def _claim(self, key: Tuple[str, str], fingerprint: str) -> Tuple[Future, bool]:
+        """Retourne le futur de l'appel en cours pour cette clé, et True si l'appelant en est le propriétaire."""
+        with self._lock:
+            in_flight = self._in_flight.get(key)
+            if in_flight is not None:
+                in_flight_fingerprint, future = in_flight
+                if in_flight_fingerprint != fingerprint:
+                    raise IdempotencyConflictError(key[1])
+                return future, False
+            future = Future()
+            self._in_flight[key] = (fingerprint, future)
+            return future, True
+
+    def _release(self, key: Tuple[str, str]) -> None:
+        with self._lock:
+            self._in_flight.pop(key, None)
+
+    def execute(self,
+                merchant_id: str,
+                idempotency_key: str,
+                fingerprint: str,
+                operation: Callable[[], IdempotentResult]) -> bytes:
+        """Exécute l'opération une seule fois par clé et retourne sa réponse sérialisée."""
+        key = (merchant_id, idempotency_key)
+        stored = self._cache_get(key)
+        if stored is not None:
+            return self._check(key, fingerprint, stored)
+
+        future, owner = self._claim(key, fingerprint)
+        if not owner:
+            return future.result()
+
+        try:
+            stored = self._load(key)
+            if stored is not None:
+                response = self._check(key, fingerprint, stored)
+            else:
+                response, store = operation()
+                if store:
+                    # Le fournisseur a été appelé : la réponse est mémorisée même si le délai de la RPC est écoulé
+                    with without_deadline():
+                        saved = self._save(key, fingerprint, response)
+                    response = self._check(key, fingerprint, saved)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._release(key)
+
+    async def execute_async(self,
+                            merchant_id: str,
+                            idempotency_key: str,
+                            fingerprint: str,
+                            operation: Callable[[], Awaitable[IdempotentResult]]) -> bytes:
+        """Variante asyncio de execute() : l'attente d'un appel concurrent ne bloque pas la boucle."""
+        key = (merchant_id, idempotency_key)
+        stored = self._cache_get(key)
+        if stored is not None:
+            return self._check(key, fingerprint, stored)
+
+        future, owner = self._claim(key, fingerprint)
+        if not owner:
+            return await asyncio.wrap_future(future)
+
+        try:
+            with start_span("idempotency.load"):
+                stored = await self._load_async(key)
+            if stored is not None:
+                response = self._check(key, fingerprint, stored)
+            else:
+                response, store = await operation()
+                if store:
+                    # Mémorisée hors délai, et jusqu'au bout même si la RPC est annulée pendant l'écriture
+                    with start_span("idempotency.save"), without_deadline():
+                        saved = await asyncio.shield(self._save_async(key, fingerprint, response))
+                    response = self._check(key, fingerprint, saved)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._release(key)
@@ -0,0 +1,135 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from app.config import Config
+from app.utils.tracing import current_span
+
+# Attributs propres à tout LogRecord : le reste vient de extra= et part dans les champs JSON
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def _field_value(value):
+    # Champ paresseux : un callable n'est évalué qu'au formatage, dans le thread du listener
+    return value() if callable(value) and not isinstance(value, type) else value
+
+
+class JsonFormatter(logging.Formatter):
+    """Un objet JSON par ligne : horodatage, niveau, logger, message, champs structurés, trace."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        event = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                try:
+                    event[key] = _field_value(value)
+                except Exception as e:
+                    event[key] = f"<unavailable: {type(e).__name__}>"
+        if record.exc_info:
+            event["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            event["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(event, default=str, ensure_ascii=False)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler qui ne formate rien dans le thread appelant et ne bloque jamais.
+
+    Le QueueHandler standard formate le message (et l'exception) avant de
+    l'enfiler ; ici l'enregistrement est enfilé tel quel, avec seulement les
+    identifiants du span courant, que le thread du listener ne voit pas. File
+    pleine : l'enregistrement est perdu et compté dans dropped.
+    """
+
+    def __init__(self, log_queue: queue.SimpleQueue, max_size: int):
+        super().__init__(log_queue)
+        self.max_size = max_size
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        span = current_span()
+        if span is not None:
+            record.trace_id = f"{span.trace_id:032x}"
+            record.span_id = f"{span.span_id:016x}"
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # SimpleQueue (en C, sans verrou Python) : la borne est vérifiée sans garantie stricte
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+            return
+        self.queue.put_nowait(record)
+
+
+_configure_lock = threading.Lock()
+_listener: Optional[QueueListener] = None
+queue_handler: Optional[NonBlockingQueueHandler] = None
+
+
+def configure_logging(level: str = Config.LOG_LEVEL,
+                      log_file: str = Config.LOG_FILE,
+                      queue_size: int = Config.LOG_QUEUE_SIZE) -> NonBlockingQueueHandler:
+    """Journalisation JSON du processus : les threads appelants ne font qu'enfiler.
+
+    Le formatage et l'écriture (log_file, sinon stderr) se font dans le thread
+    du QueueListener. Sans effet si elle est déjà configurée.
+    """
+    global _listener, queue_handler
+    with _configure_lock:
+        if queue_handler is not None:
+            return queue_handler
+        output = logging.FileHandler(log_file, encoding="utf-8") if log_file else logging.StreamHandler(sys.stderr)
+        output.setFormatter(JsonFormatter())
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        queue_handler = NonBlockingQueueHandler(log_queue, queue_size)
+        # Champs absents du JSON : inutile de les calculer pour chaque enregistrement
+        logging.logProcesses = False
+        logging.logMultiprocessing = False
+        root = logging.getLogger()
+        root.handlers = [queue_handler]
+        root.setLevel(level.upper())
+        _listener = QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+        return queue_handler
+
+
+def stop_logging() -> None:
+    """Écrit les enregistrements encore en file puis arrête le thread du listener."""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def log_event(logger: logging.Logger, level: int, event: str,
+              sample_rate: float = 1.0, exc_info=None, **fields) -> None:
+    """Événement structuré : event devient le message, fields des champs JSON.
+
+    Rien n'est construit si le niveau est désactivé ou si l'événement n'est pas
+    retenu par l'échantillonnage (sample_rate, pour les succès à fort volume).
+    Un champ callable (ex. lambda: str(result)) n'est évalué qu'au formatage,
+    hors du thread de la requête.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    if sample_rate < 1 and random.random() >= sample_rate:
+        return
+    if sample_rate < 1:
+        fields["sample_rate"] = sample_rate
+    if exc_info is True:
+        exc_info = sys.exc_info()
+    # Enregistrement construit directement : pas de recherche du fichier et de la ligne appelants (findCaller)
+    logger.handle(logger.makeRecord(logger.name, level, "(unknown file)", 0, event, (), exc_info, extra=fields))
@@ -0,0 +1,206 @@
+import math
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Bornes (secondes) des histogrammes de latence, de 1 ms à 30 s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Échantillon d'un collecteur : (nom, aide, labels, valeur)
+Sample = Tuple[str, str, Dict[str, str], float]
+
+
+class _ThreadShardedMetric:
+    """Métrique dont chaque thread écrit dans sa propre partition, sans verrou.
+
+    Les partitions ne sont lues qu'à l'export, qui les additionne. Celles des
+    threads terminés sont fusionnées dans _retired puis oubliées, pour que les
+    threads éphémères ne fassent pas grossir la liste.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List[Tuple[threading.Thread, dict]] = []
+        self._retired: dict = {}
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "values", None)
+        if shard is None:
+            shard = self._local.values = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _merge(self, into: dict, values: dict) -> None:
+        raise NotImplementedError
+
+    def _collect(self) -> dict:
+        totals: dict = {}
+        with self._lock:
+            alive = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, shard))
+                else:
+                    self._merge(self._retired, shard)
+            self._shards = alive
+            self._merge(totals, self._retired)
+            shards = [shard for _, shard in alive]
+        for shard in shards:
+            # list() copie la partition d'un bloc (sous le GIL) malgré les écritures concurrentes
+            self._merge(totals, dict(list(shard.items())))
+        return totals
+
+    def _labels(self, values: Tuple[str, ...], extra: Optional[Dict[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, values)) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in pairs) + "}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in sorted(self._collect().items()):
+            lines.extend(self._render_series(labels, value))
+        return lines
+
+    def _render_series(self, labels: Tuple[str, ...], value) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_ThreadShardedMetric):
+    """Compteur monotone par jeu de labels."""
+
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0.0) + amount
+
+    def _merge(self, into: dict, values: dict) -> None:
+        for labels, value in values.items():
+            into[labels] = into.get(labels, 0.0) + value
+
+    def _render_series(self, labels, value) -> List[str]:
+        return [f"{self.name}{self._labels(labels)} {_format(value)}"]
+
+
+class _HistogramCell:
+    __slots__ = ("counts", "total")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size  # Une case par borne, plus +Inf
+        self.total = 0.0
+
+
+class Histogram(_ThreadShardedMetric):
+    """Histogramme à bornes fixes (p50/p99 via histogram_quantile côté Prometheus)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self._shard()
+        cell = shard.get(labels)
+        if cell is None:
+            cell = shard[labels] = _HistogramCell(len(self.buckets) + 1)
+        cell.counts[bisect_left(self.buckets, value)] += 1
+        cell.total += value
+
+    def _merge(self, into: dict, values: dict) -> None:
+        for labels, cell in values.items():
+            merged = into.get(labels)
+            if merged is None:
+                merged = into[labels] = _HistogramCell(len(self.buckets) + 1)
+            merged.counts = [a + b for a, b in zip(merged.counts, cell.counts)]
+            merged.total += cell.total
+
+    def _render_series(self, labels, cell: _HistogramCell) -> List[str]:
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (math.inf,), cell.counts):
+            cumulative += count
+            le = "+Inf" if bound == math.inf else _format(bound)
+            lines.append(f"{self.name}_bucket{self._labels(labels, {'le': le})} {cumulative}")
+        lines.append(f"{self.name}_sum{self._labels(labels)} {_format(cell.total)}")
+        lines.append(f"{self.name}_count{self._labels(labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Métriques du processus et collecteurs de jauges lus à l'export (pool, disjoncteurs…)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _ThreadShardedMetric] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def _register(self, metric: _ThreadShardedMetric) -> _ThreadShardedMetric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """collector() retourne des jauges (nom, aide, labels, valeur), évaluées à chaque export."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Toutes les métriques au format texte Prometheus (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        gauges: Dict[str, Tuple[str, List[Tuple[Dict[str, str], float]]]] = {}
+        for collector in collectors:
+            for name, documentation, labels, value in collector():
+                gauges.setdefault(name, (documentation, []))[1].append((labels, value))
+        for name, (documentation, samples) in gauges.items():
+            lines.extend((f"# HELP {name} {documentation}", f"# TYPE {name} gauge"))
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels.items())
+                lines.append(f"{name}{{{label_text}}} {_format(value)}" if label_text else f"{name} {_format(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+registry = MetricsRegistry()
+
+GRPC_HANDLED = registry.counter(
+    "grpc_server_handled_total", "RPCs completed, by method and status code.", ("method", "code"))
+GRPC_HANDLING_SECONDS = registry.histogram(
+    "grpc_server_handling_seconds", "RPC latency in seconds, by method.", ("method",))
+PROVIDER_CALL_SECONDS = registry.histogram(
+    "payment_provider_call_seconds", "Payment provider call latency in seconds.",
+    ("provider", "operation", "outcome"))
+DB_SESSION_SECONDS = registry.histogram(
+    "db_session_seconds", "Time from first statement to commit or rollback of a DB session transaction.",
+    ("outcome",))
+WRITE_BEHIND_OVERFLOWS = registry.counter(
+    "transaction_write_behind_overflow_total",
+    "Write-behind operations not queued because the queue was full, by operation.", ("operation",))
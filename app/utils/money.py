@@ -0,0 +1,28 @@
+from decimal import Decimal, ROUND_HALF_EVEN
+from typing import Union
+
+# Nombre de décimales des devises (ISO 4217) ; 2 par défaut
+CURRENCY_EXPONENTS = {
+    "BIF": 0, "CLP": 0, "DJF": 0, "GNF": 0, "ISK": 0, "JPY": 0, "KMF": 0, "KRW": 0,
+    "PYG": 0, "RWF": 0, "UGX": 0, "VND": 0, "VUV": 0, "XAF": 0, "XOF": 0, "XPF": 0,
+    "BHD": 3, "IQD": 3, "JOD": 3, "KWD": 3, "LYD": 3, "OMR": 3, "TND": 3,
+}
+
+
+def currency_exponent(currency: str) -> int:
+    return CURRENCY_EXPONENTS.get((currency or "").upper(), 2)
+
+
+def to_minor_units(amount: Union[Decimal, str, float, int], currency: str) -> int:
+    """Convertit un montant en unités mineures entières (ex. 12.34 USD -> 1234).
+
+    Les flottants passent par leur représentation décimale la plus courte,
+    ce qui évite 0.1 + 0.2 = 0.30000000000000004 centimes.
+    """
+    value = amount if isinstance(amount, Decimal) else Decimal(str(amount))
+    return int(value.scaleb(currency_exponent(currency)).quantize(Decimal(1), rounding=ROUND_HALF_EVEN))
+
+
+def from_minor_units(amount_minor: int, currency: str) -> Decimal:
+    """Convertit des unités mineures en montant décimal (ex. 1234 USD -> Decimal('12.34'))."""
+    return Decimal(int(amount_minor)).scaleb(-currency_exponent(currency))
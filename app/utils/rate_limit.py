@@ -0,0 +1,199 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+from sqlalchemy import select
+from app.config import Config
+from app.db import SessionLocal
+from models.models import Merchant
+
+
+class TokenBucket:
+    """Seau à jetons : rate jetons par seconde, au plus capacity en réserve (rafales).
+
+    Partageable entre threads.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Prend tokens jetons, quitte à s'endetter ; retourne l'attente (secondes) avant de pouvoir agir."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Prend tokens jetons s'ils sont disponibles, sans attendre."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens < tokens:
+                return False
+            self._tokens -= tokens
+            return True
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Prend tokens jetons, en attendant (bloquant) qu'ils soient disponibles."""
+        delay = self.reserve(tokens)
+        if delay:
+            time.sleep(delay)
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Limite d'un seau : rate jetons par seconde, burst jetons au plus."""
+    rate: float
+    burst: float
+
+
+def parse_rate_limits(settings: Optional[dict]) -> Dict[str, Optional[RateLimit]]:
+    """Limites par RPC de settings["rate_limits"] ; la clé "*" s'applique aux autres RPC.
+
+    Une limite dont rate vaut 0 (ou null) désactive la limitation de cette RPC.
+    """
+    limits = {}
+    for method, limit in ((settings or {}).get("rate_limits") or {}).items():
+        rate = float((limit or {}).get("rate") or 0)
+        limits[method] = RateLimit(rate, float(limit.get("burst") or rate)) if rate > 0 else None
+    return limits
+
+
+DEFAULT_RATE_LIMITS = parse_rate_limits({"rate_limits": {
+    "*": {"rate": Config.RATE_LIMIT_DEFAULT_RATE, "burst": Config.RATE_LIMIT_DEFAULT_BURST},
+}})
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class ShardedRateLimiter:
+    """Seaux à jetons indexés par clé (ex. (merchant_id, RPC)), répartis sur shard_count verrous.
+
+    Chaque vérification ne verrouille que la partition de sa clé et coûte O(1) :
+    les partitions sont des OrderedDict tenus dans l'ordre des accès, et les
+    seaux inutilisés depuis idle_seconds sont retirés par le début au fil des
+    vérifications.
+    """
+
+    def __init__(self,
+                 shard_count: int = Config.RATE_LIMIT_SHARDS,
+                 idle_seconds: float = Config.RATE_LIMIT_IDLE_SECONDS):
+        self.idle_seconds = idle_seconds
+        self._shards: List[Tuple[threading.Lock, "OrderedDict[Hashable, _Bucket]"]] = [
+            (threading.Lock(), OrderedDict()) for _ in range(shard_count)
+        ]
+
+    def acquire(self, key: Hashable, limit: RateLimit) -> float:
+        """Prend un jeton du seau de key ; retourne 0, ou l'attente (secondes) avant le prochain jeton."""
+        lock, buckets = self._shards[hash(key) % len(self._shards)]
+        now = time.monotonic()
+        with lock:
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = _Bucket(limit.burst, now)
+            else:
+                buckets.move_to_end(key)
+                bucket.tokens = min(limit.burst, bucket.tokens + (now - bucket.updated) * limit.rate)
+                bucket.updated = now
+            # Le plus ancien accès est en tête : on s'arrête au premier seau encore actif
+            while buckets:
+                oldest_key, oldest = next(iter(buckets.items()))
+                if now - oldest.updated < self.idle_seconds:
+                    break
+                del buckets[oldest_key]
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                return 0.0
+            return (1 - bucket.tokens) / limit.rate
+
+    def __len__(self) -> int:
+        return sum(len(buckets) for _, buckets in self._shards)
+
+
+class MerchantRateLimits:
+    """Limites de débit de chaque marchand, lues dans Merchant.settings et gardées ttl_seconds.
+
+    Les limites du marchand complètent celles de la configuration
+    (RATE_LIMIT_DEFAULT_*). async_loader (ex. MerchantRepository.find_settings)
+    charge les réglages absents du cache sans passer par un thread.
+    """
+
+    def __init__(self,
+                 session_factory=SessionLocal,
+                 ttl_seconds: float = Config.RATE_LIMIT_SETTINGS_TTL_SECONDS,
+                 max_entries: int = Config.RATE_LIMIT_SETTINGS_CACHE_SIZE,
+                 async_loader: Optional[Callable[[str], Awaitable[Optional[dict]]]] = None):
+        self.session_factory = session_factory
+        self.async_loader = async_loader
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Optional[RateLimit]], float]]" = OrderedDict()
+
+    def _get(self, merchant_id: str) -> Optional[Dict[str, Optional[RateLimit]]]:
+        with self._lock:
+            entry = self._entries.get(merchant_id)
+            if entry is None or entry[1] <= time.monotonic():
+                return None
+            self._entries.move_to_end(merchant_id)
+            return entry[0]
+
+    def _put(self, merchant_id: str, settings: Optional[dict]) -> Dict[str, Optional[RateLimit]]:
+        limits = dict(DEFAULT_RATE_LIMITS, **parse_rate_limits(settings))
+        with self._lock:
+            self._entries[merchant_id] = (limits, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(merchant_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return limits
+
+    def _load(self, merchant_id: str) -> Optional[dict]:
+        with self.session_factory() as session:
+            return session.execute(select(Merchant.settings).where(Merchant.id == merchant_id)).scalar_one_or_none()
+
+    @staticmethod
+    def _for_method(limits: Dict[str, Optional[RateLimit]], method: str) -> Optional[RateLimit]:
+        return limits[method] if method in limits else limits.get("*")
+
+    def get(self, merchant_id: str, method: str) -> Optional[RateLimit]:
+        """Limite de la RPC method pour ce marchand ; None si elle n'est pas limitée."""
+        limits = self._get(merchant_id)
+        if limits is None:
+            limits = self._put(merchant_id, self._load(merchant_id))
+        return self._for_method(limits, method)
+
+    async def get_async(self, merchant_id: str, method: str) -> Optional[RateLimit]:
+        """Variante asyncio de get() : seul un échec de cache sort de la boucle."""
+        limits = self._get(merchant_id)
+        if limits is None:
+            if self.async_loader is not None:
+                settings = await self.async_loader(merchant_id)
+            else:
+                settings = await asyncio.get_running_loop().run_in_executor(None, self._load, merchant_id)
+            limits = self._put(merchant_id, settings)
+        return self._for_method(limits, method)
+
+    def invalidate(self, merchant_id: str) -> None:
+        """À appeler après une modification des réglages d'un marchand."""
+        with self._lock:
+            self._entries.pop(merchant_id, None)
+
+
+rate_limiter = ShardedRateLimiter()
+merchant_rate_limits = MerchantRateLimits()
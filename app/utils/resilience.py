@@ -0,0 +1,211 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+from app import db
+from app.config import Config
+from app.utils.exceptions import ProviderUnavailableError
+
+# États d'un disjoncteur
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Disjoncteur d'un fournisseur : taux d'échecs et d'appels lents sur les window_size derniers appels.
+
+    Au-delà de failure_rate ou de slow_call_rate (dès min_calls appels
+    observés), le circuit s'ouvre : les appels échouent aussitôt pendant
+    open_seconds. Il passe ensuite en semi-ouvert et laisse passer
+    half_open_calls appels d'essai ; s'ils réussissent tous il se referme,
+    au premier échec il se rouvre.
+
+    before_call() retourne la génération du circuit : les résultats d'appels
+    admis avant un changement d'état sont ignorés.
+    """
+
+    def __init__(self,
+                 name: str,
+                 window_size: int = Config.CIRCUIT_WINDOW_SIZE,
+                 min_calls: int = Config.CIRCUIT_MIN_CALLS,
+                 failure_rate: float = Config.CIRCUIT_FAILURE_RATE,
+                 slow_call_seconds: float = Config.CIRCUIT_SLOW_CALL_SECONDS,
+                 slow_call_rate: float = Config.CIRCUIT_SLOW_CALL_RATE,
+                 open_seconds: float = Config.CIRCUIT_OPEN_SECONDS,
+                 half_open_calls: int = Config.CIRCUIT_HALF_OPEN_CALLS):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self._lock = threading.Lock()
+        self._calls: Deque[Tuple[bool, bool]] = deque(maxlen=window_size)  # (échec, lent)
+        self._state = CLOSED
+        self._generation = 0
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._probes_succeeded = 0
+
+    def _transition(self, state: str) -> None:
+        self._state = state
+        self._generation += 1
+        self._calls.clear()
+        self._probes_started = self._probes_succeeded = 0
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN)
+            return self._state
+
+    def before_call(self) -> int:
+        """Admet un appel ou lève ProviderUnavailableError ; retourne la génération à passer à record()."""
+        state = self.state
+        with self._lock:
+            if state == OPEN:
+                raise ProviderUnavailableError(self.name, "circuit open")
+            if state == HALF_OPEN:
+                if self._probes_started >= self.half_open_calls:
+                    raise ProviderUnavailableError(self.name, "circuit half-open, probes in flight")
+                self._probes_started += 1
+            return self._generation
+
+    def record(self, generation: int, duration_seconds: float, failed: bool) -> None:
+        """Enregistre le résultat d'un appel admis par before_call()."""
+        slow = duration_seconds >= self.slow_call_seconds
+        with self._lock:
+            if generation != self._generation:
+                return
+            if self._state == HALF_OPEN:
+                if failed or slow:
+                    self._transition(OPEN)
+                else:
+                    self._probes_succeeded += 1
+                    if self._probes_succeeded >= self.half_open_calls:
+                        self._transition(CLOSED)
+                return
+            self._calls.append((failed, slow))
+            calls = len(self._calls)
+            if calls < self.min_calls:
+                return
+            failures = sum(1 for call_failed, _ in self._calls if call_failed)
+            slow_calls = sum(1 for _, call_slow in self._calls if call_slow)
+            if failures / calls >= self.failure_rate or slow_calls / calls >= self.slow_call_rate:
+                self._transition(OPEN)
+
+    def release(self, generation: int) -> None:
+        """Libère un appel admis par before_call() sans compter son issue (appel annulé par l'appelant).
+
+        En semi-ouvert, la place d'essai est rendue : l'annulation ne prouve
+        ni que le fournisseur est rétabli, ni qu'il est en panne.
+        """
+        with self._lock:
+            if generation == self._generation and self._state == HALF_OPEN:
+                self._probes_started -= 1
+
+    def snapshot(self) -> dict:
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "calls": len(self._calls),
+                "failures": sum(1 for call_failed, _ in self._calls if call_failed),
+                "slow_calls": sum(1 for _, call_slow in self._calls if call_slow),
+            }
+
+
+class Bulkhead:
+    """Budget d'appels simultanés d'un fournisseur, pour qu'il ne puisse pas occuper tous les threads.
+
+    Au-delà de max_concurrent, un appel attend au plus wait_seconds une place
+    libre puis échoue avec ProviderUnavailableError. Par défaut
+    (PROVIDER_MAX_CONCURRENCY non renseigné), max_concurrent suit le mode du
+    serveur comme le pool de connexions (db.server_concurrency) : un lot de
+    BATCH_MAX_CONCURRENCY éléments n'est jamais refusé faute de place.
+    """
+
+    def __init__(self,
+                 name: str,
+                 max_concurrent: Optional[int] = None,
+                 wait_seconds: float = Config.PROVIDER_BULKHEAD_WAIT_SECONDS):
+        self.name = name
+        self.max_concurrent = max_concurrent or Config.PROVIDER_MAX_CONCURRENCY or db.server_concurrency()
+        self.wait_seconds = wait_seconds
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.rejected = 0
+
+    def _entered(self, acquired: bool) -> None:
+        with self._lock:
+            if acquired:
+                self.in_use += 1
+            else:
+                self.rejected += 1
+        if not acquired:
+            raise ProviderUnavailableError(self.name, f"more than {self.max_concurrent} calls in flight")
+
+    def acquire(self) -> None:
+        """Prend une place (bloquant au plus wait_seconds)."""
+        acquired = (self._semaphore.acquire(timeout=self.wait_seconds) if self.wait_seconds > 0
+                    else self._semaphore.acquire(blocking=False))
+        self._entered(acquired)
+
+    async def acquire_async(self) -> None:
+        """Variante asyncio d'acquire(), sans bloquer la boucle."""
+        deadline = time.monotonic() + self.wait_seconds
+        acquired = self._semaphore.acquire(blocking=False)
+        while not acquired and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+            acquired = self._semaphore.acquire(blocking=False)
+        self._entered(acquired)
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_use -= 1
+        self._semaphore.release()
+
+
+_registry_lock = threading.Lock()
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+_bulkheads: Dict[str, Bulkhead] = {}
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Disjoncteur du fournisseur name, partagé par tout le processus."""
+    with _registry_lock:
+        if name not in _circuit_breakers:
+            _circuit_breakers[name] = CircuitBreaker(name)
+        return _circuit_breakers[name]
+
+
+def get_bulkhead(name: str,
+                 max_concurrent: Optional[int] = None,
+                 wait_seconds: float = Config.PROVIDER_BULKHEAD_WAIT_SECONDS) -> Bulkhead:
+    """Budget d'appels simultanés name, partagé par tout le processus.
+
+    max_concurrent et wait_seconds ne servent qu'à sa création.
+    """
+    with _registry_lock:
+        if name not in _bulkheads:
+            _bulkheads[name] = Bulkhead(name, max_concurrent, wait_seconds)
+        return _bulkheads[name]
+
+
+def circuit_breakers() -> Dict[str, CircuitBreaker]:
+    """Disjoncteurs créés jusqu'ici, par fournisseur (pour les métriques)."""
+    with _registry_lock:
+        return dict(_circuit_breakers)
+
+
+def bulkheads() -> Dict[str, Bulkhead]:
+    """Budgets d'appels simultanés créés jusqu'ici, par fournisseur (pour les métriques)."""
+    with _registry_lock:
+        return dict(_bulkheads)
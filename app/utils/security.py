@@ -0,0 +1,172 @@
+import asyncio
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, Iterator, Optional, Tuple
+from sqlalchemy import select
+from app.config import Config
+from app.db import SessionLocal
+from models.models import MerchantCredential
+
+
+def hash_api_key(api_key: str) -> str:
+    """Empreinte SHA-256 d'une clé API : la clé en clair n'est jamais gardée en mémoire."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class CredentialInfo:
+    """Identifiants validés d'un marchand, tels que mis en cache."""
+    credential_id: str
+    merchant_id: str
+    environment: Optional[str]
+    expires_at: Optional[datetime]
+
+    def is_expired(self, now: Optional[datetime] = None) -> bool:
+        return self.expires_at is not None and self.expires_at <= (now or datetime.utcnow())
+
+
+def credential_from_record(record: Optional[MerchantCredential], api_key: str) -> Optional[CredentialInfo]:
+    """CredentialInfo d'un identifiant actif et non expiré correspondant à api_key, sinon None."""
+    if record is None or not hmac.compare_digest(record.api_key or "", api_key):
+        return None
+    credential = CredentialInfo(
+        credential_id=record.id,
+        merchant_id=record.merchant_id,
+        environment=record.environment.value if record.environment else None,
+        expires_at=record.expires_at,
+    )
+    if not record.is_active or credential.is_expired():
+        return None
+    return credential
+
+
+class CredentialCache:
+    """Cache des identifiants marchands indexé par l'empreinte de la clé API.
+
+    Les clés valides sont gardées ttl_seconds (jamais au-delà de leur expires_at),
+    les clés inconnues ou inactives negative_ttl_seconds, de sorte qu'une clé
+    invalide martelée par un client ne coûte pas une requête SQL par appel.
+
+    async_loader (ex. MerchantRepository.find_by_api_key) charge les clés
+    absentes du cache dans validate_async() sans passer par un thread.
+    """
+
+    def __init__(self,
+                 session_factory=SessionLocal,
+                 ttl_seconds: float = Config.CREDENTIAL_CACHE_TTL_SECONDS,
+                 negative_ttl_seconds: float = Config.CREDENTIAL_CACHE_NEGATIVE_TTL_SECONDS,
+                 max_entries: int = Config.CREDENTIAL_CACHE_SIZE,
+                 async_loader: Optional[Callable[[str], Awaitable[Optional[CredentialInfo]]]] = None):
+        self.session_factory = session_factory
+        self.async_loader = async_loader
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[Optional[CredentialInfo], float]]" = OrderedDict()
+
+    def _get(self, key_hash: str) -> Tuple[bool, Optional[CredentialInfo]]:
+        with self._lock:
+            entry = self._entries.get(key_hash)
+            if entry is None:
+                return False, None
+            credential, cached_until = entry
+            if cached_until <= time.monotonic():
+                del self._entries[key_hash]
+                return False, None
+            self._entries.move_to_end(key_hash)
+            return True, credential
+
+    def _put(self, key_hash: str, credential: Optional[CredentialInfo]) -> None:
+        ttl = self.ttl_seconds if credential is not None else self.negative_ttl_seconds
+        if credential is not None and credential.expires_at is not None:
+            ttl = min(ttl, max((credential.expires_at - datetime.utcnow()).total_seconds(), 0))
+        with self._lock:
+            self._entries[key_hash] = (credential, time.monotonic() + ttl)
+            self._entries.move_to_end(key_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _load(self, api_key: str) -> Optional[CredentialInfo]:
+        """Charge un identifiant actif et non expiré depuis la base."""
+        with self.session_factory() as session:
+            record = session.execute(
+                select(MerchantCredential).where(MerchantCredential.api_key == api_key)
+            ).scalar_one_or_none()
+            return credential_from_record(record, api_key)
+
+    @staticmethod
+    def _authorize(credential: Optional[CredentialInfo], merchant_id: str) -> Optional[CredentialInfo]:
+        # Sans merchant_id, aucune clé n'est acceptée : le marchand n'est jamais déduit de la seule clé
+        if credential is None or credential.is_expired() or not merchant_id:
+            return None
+        if not hmac.compare_digest(credential.merchant_id, merchant_id):
+            return None
+        return credential
+
+    def validate(self, api_key: str, merchant_id: str) -> Optional[CredentialInfo]:
+        """Retourne l'identifiant si la clé est valide et appartient au marchand indiqué, sinon None."""
+        if not api_key:
+            return None
+        key_hash = hash_api_key(api_key)
+        found, credential = self._get(key_hash)
+        if not found:
+            credential = self._load(api_key)
+            self._put(key_hash, credential)
+        return self._authorize(credential, merchant_id)
+
+    async def validate_async(self, api_key: str, merchant_id: str) -> Optional[CredentialInfo]:
+        """Variante asyncio de validate() : seul un échec de cache sort de la boucle."""
+        if not api_key:
+            return None
+        key_hash = hash_api_key(api_key)
+        found, credential = self._get(key_hash)
+        if not found:
+            if self.async_loader is not None:
+                credential = await self.async_loader(api_key)
+            else:
+                credential = await asyncio.get_running_loop().run_in_executor(None, self._load, api_key)
+            self._put(key_hash, credential)
+        return self._authorize(credential, merchant_id)
+
+    def invalidate(self, api_key: Optional[str] = None, merchant_id: Optional[str] = None) -> None:
+        """Invalide une clé, ou toutes les clés d'un marchand (rotation des identifiants)."""
+        with self._lock:
+            if api_key:
+                self._entries.pop(hash_api_key(api_key), None)
+            if merchant_id:
+                for key_hash in [k for k, (credential, _) in self._entries.items()
+                                 if credential is not None and credential.merchant_id == merchant_id]:
+                    del self._entries[key_hash]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+credential_cache = CredentialCache()
+
+# Identifiant authentifié de la RPC servie par le thread ou la tâche asyncio courante (posé par AuthInterceptor)
+_authenticated_credential: ContextVar[Optional[CredentialInfo]] = ContextVar("authenticated_credential", default=None)
+
+
+def authenticated_credential() -> Optional[CredentialInfo]:
+    """Identifiant validé de la RPC courante ; None si l'authentification est désactivée."""
+    return _authenticated_credential.get()
+
+
+@contextmanager
+def credential_scope(credential: CredentialInfo) -> Iterator[CredentialInfo]:
+    """Rend l'identifiant authentifié visible des handlers et des intercepteurs suivants."""
+    token = _authenticated_credential.set(credential)
+    try:
+        yield credential
+    finally:
+        _authenticated_credential.reset(token)
@@ -0,0 +1,261 @@
+import atexit
+import json
+import logging
+import random
+import threading
+import time
+import urllib.request
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Dict, List, Optional, Tuple
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+# En-tête W3C Trace Context, lu dans les métadonnées gRPC
+TRACEPARENT_METADATA = "traceparent"
+
+# Codes de statut OTLP
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+class Span:
+    """Étape chronométrée d'une RPC (identifiants et horodatages au format OTLP).
+
+    Utilisé comme gestionnaire de contexte, le span devient le span courant
+    jusqu'à sa fin.
+    """
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "error", "_token")
+
+    def __init__(self, trace_id: int, parent_id: Optional[int], name: str,
+                 attributes: Optional[dict] = None, start_ns: Optional[int] = None):
+        self.trace_id = trace_id
+        self.span_id = random.getrandbits(64) or 1
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.end()
+        return False
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def end(self, error: Optional[str] = None, end_ns: Optional[int] = None) -> None:
+        self.end_ns = end_ns if end_ns is not None else time.time_ns()
+        if error is not None:
+            self.error = error
+        exporter.submit(self)
+
+    def to_otlp_json(self) -> str:
+        """Span au format OTLP/JSON, écrit directement (plusieurs fois plus rapide que json.dumps d'un dict)."""
+        parent = ',"parentSpanId":"%016x"' % self.parent_id if self.parent_id is not None else ""
+        status = '{"code":%d,"message":%s}' % (STATUS_ERROR, _json(self.error)) if self.error else '{"code":%d}' % STATUS_OK
+        return (
+            '{"traceId":"%032x","spanId":"%016x"%s,"name":%s,"kind":%d,"startTimeUnixNano":"%d",'
+            '"endTimeUnixNano":"%d","attributes":[%s],"status":%s}'
+        ) % (
+            self.trace_id, self.span_id, parent, _json(self.name),
+            2 if self.parent_id is None else 1,  # SERVER pour la racine, INTERNAL sinon
+            self.start_ns, self.end_ns,
+            ",".join([_otlp_attribute(key, value) for key, value in self.attributes.items()]), status,
+        )
+
+
+_json = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def _otlp_attribute(key: str, value) -> str:
+    if isinstance(value, bool):
+        typed = '{"boolValue":%s}' % ("true" if value else "false")
+    elif isinstance(value, int):
+        typed = '{"intValue":"%d"}' % value
+    elif isinstance(value, float):
+        typed = '{"doubleValue":%s}' % _json(value)
+    else:
+        typed = '{"stringValue":%s}' % _json(str(value))
+    return '{"key":%s,"value":%s}' % (_json(key), typed)
+
+
+class SpanExporter:
+    """Exporte les spans terminés par lots, depuis un thread dédié ("trace-exporter").
+
+    submit() ne fait qu'ajouter à une file bornée (sans verrou) : la
+    sérialisation et l'écriture se font hors des RPC. Les lots sont écrits en
+    OTLP/JSON, une ligne par lot dans export_path et/ou envoyés en HTTP à
+    otlp_endpoint (/v1/traces). File pleine : les nouveaux spans sont perdus
+    et comptés dans dropped.
+    """
+
+    def __init__(self,
+                 export_path: str = Config.TRACING_EXPORT_PATH,
+                 otlp_endpoint: str = Config.TRACING_OTLP_ENDPOINT,
+                 batch_size: int = Config.TRACING_BATCH_SIZE,
+                 interval_seconds: float = Config.TRACING_EXPORT_INTERVAL_SECONDS,
+                 max_queue_size: int = Config.TRACING_MAX_QUEUE_SIZE,
+                 service_name: str = Config.TRACING_SERVICE_NAME):
+        self.export_path = export_path
+        self.otlp_endpoint = otlp_endpoint.rstrip("/")
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self.max_queue_size = max_queue_size
+        self.service_name = service_name
+        self.dropped = 0
+        self._queue: Deque[Span] = deque()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, span: Span) -> None:
+        if len(self._queue) >= self.max_queue_size:
+            self.dropped += 1
+            return
+        self._queue.append(span)
+        if self._thread is None:
+            self._start()
+        elif len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _drain(self) -> List[Span]:
+        batch = []
+        while self._queue and len(batch) < self.batch_size:
+            batch.append(self._queue.popleft())
+        return batch
+
+    def _payload(self, spans: List[Span]) -> bytes:
+        return (
+            '{"resourceSpans":[{"resource":{"attributes":[%s]},"scopeSpans":[{"scope":{"name":"app"},"spans":[%s]}]}]}'
+            % (_otlp_attribute("service.name", self.service_name), ",".join([span.to_otlp_json() for span in spans]))
+        ).encode()
+
+    def export(self, spans: List[Span]) -> None:
+        payload = self._payload(spans)
+        if self.export_path:
+            with open(self.export_path, "ab") as export_file:
+                export_file.write(payload + b"\n")
+        if self.otlp_endpoint:
+            request = urllib.request.Request(
+                f"{self.otlp_endpoint}/v1/traces", data=payload, headers={"Content-Type": "application/json"}
+            )
+            with urllib.request.urlopen(request, timeout=10):
+                pass
+
+    def flush(self) -> None:
+        """Exporte tout ce qui est en file (appelé par le thread d'export et à l'arrêt)."""
+        while self._queue:
+            batch = self._drain()
+            try:
+                self.export(batch)
+            except Exception:
+                logger.exception("Failed to export %d spans", len(batch))
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.interval_seconds)
+            self._wakeup.clear()
+            self.flush()
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+
+exporter = SpanExporter()
+
+# Span courant du thread ou de la tâche asyncio (posé par TracingInterceptor puis start_span)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def parse_traceparent(value: str) -> Optional[Tuple[int, int, bool]]:
+    """(trace_id, span_id parent, échantillonné) d'un en-tête traceparent ; None s'il est invalide."""
+    parts = value.strip().split("-")
+    if len(parts) < 4 or len(parts[0]) != 2 or len(parts[1]) != 32 or len(parts[2]) != 16 or parts[0] == "ff":
+        return None
+    try:
+        trace_id, parent_id, flags = int(parts[1], 16), int(parts[2], 16), int(parts[3][:2], 16)
+    except ValueError:
+        return None
+    if not trace_id or not parent_id:
+        return None
+    return trace_id, parent_id, bool(flags & 0x01)
+
+
+def format_traceparent(span: Span) -> str:
+    return f"00-{span.trace_id:032x}-{span.span_id:016x}-01"
+
+
+class _NoopScope:
+    """Portée d'une étape non tracée : ne crée rien et vaut None."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        return False
+
+
+_NOOP_SCOPE = _NoopScope()
+
+
+def server_span(name: str, traceparent: Optional[str] = None,
+                sample_rate: float = Config.TRACING_SAMPLE_RATE, **attributes):
+    """Span racine d'une RPC, rattaché à la trace de l'appelant si traceparent est fourni.
+
+    Décision d'échantillonnage : celle de l'appelant s'il en a pris une, sinon
+    sample_rate. Une RPC non échantillonnée ne crée aucun span (None).
+    """
+    parent = parse_traceparent(traceparent) if traceparent else None
+    if parent is not None:
+        trace_id, parent_id, sampled = parent
+    else:
+        trace_id, parent_id = random.getrandbits(128) or 1, None
+        sampled = sample_rate >= 1 or random.random() < sample_rate
+    if not sampled:
+        return _NOOP_SCOPE
+    return Span(trace_id, parent_id, name, attributes)
+
+
+def start_span(name: str, **attributes):
+    """Span enfant du span courant ; sans span courant (RPC non échantillonnée), ne fait rien."""
+    parent = _current_span.get()
+    if parent is None:
+        return _NOOP_SCOPE
+    return Span(parent.trace_id, parent.span_id, name, attributes)
+
+
+def record_span(name: str, start_ns: int, end_ns: Optional[int] = None,
+                error: Optional[str] = None, attributes: Optional[Dict] = None) -> None:
+    """Enregistre après coup un span enfant du span courant (ex. depuis un événement SQLAlchemy)."""
+    parent = _current_span.get()
+    if parent is not None:
+        Span(parent.trace_id, parent.span_id, name, attributes, start_ns).end(error, end_ns)
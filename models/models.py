@@ -1,12 +1,12 @@
 from sqlalchemy import (
-    Column, String, DateTime, ForeignKey, Float, Boolean, Enum, JSON
+    Column, String, DateTime, ForeignKey, Boolean, Enum, JSON, LargeBinary, UniqueConstraint, Index,
+    BigInteger, Integer
 )
 from sqlalchemy.orm import relationship
-from sqlalchemy.ext.declarative import declarative_base
 import enum
-from datetime import datetime
-
-Base = declarative_base()
+from datetime import datetime, timedelta
+from app.config import Config
+from app.db import Base
 
 class Environment(enum.Enum):
     """Environnements possibles pour les marchands."""
@@ -16,10 +16,12 @@ class Environment(enum.Enum):
 class PaymentStatus(enum.Enum):
     """Statuts possibles pour une transaction."""
     PENDING = "pending"
+    PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
     CANCELLED = "cancelled"
     REFUNDED = "refunded"
+    PARTIALLY_REFUNDED = "partially_refunded"
 
 class PaymentMethod(enum.Enum):
     """Méthodes de paiement disponibles."""
@@ -64,6 +66,9 @@ class Merchant(Base):
     state = Column(String(100))  # Région/État.
     postal_code = Column(String(20))  # Code postal.
     country = Column(String(100))  # Pays.
+
+    # Réglages propres au marchand, ex. {"rate_limits": {"ProcessPayment": {"rate": 20, "burst": 40}}}
+    settings = Column(JSON)
     
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, onupdate=datetime.utcnow)
@@ -75,26 +80,50 @@ class Merchant(Base):
     balances = relationship("MerchantBalance", back_populates="merchant")
 
 class MerchantBalance(Base):
-    """Table des soldes par devise pour chaque marchand."""
+    """Table des soldes par devise pour chaque marchand, matérialisés depuis le grand livre.
+
+    Le solde d'une devise est réparti sur plusieurs sous-lignes (shard) : le
+    solde réel est leur somme.
+    """
     __tablename__ = 'merchant_balances'
+    __table_args__ = (
+        UniqueConstraint('merchant_id', 'currency', 'shard', name='uq_merchant_balances_merchant_currency_shard'),
+    )
     
     id = Column(String(36), primary_key=True)
     merchant_id = Column(String(36), ForeignKey('merchants.id'))
     currency = Column(String(3))  # Devise (ex. USD, EUR).
-    available = Column(Float, default=0.0)  # Solde disponible.
-    pending = Column(Float, default=0.0)  # Solde en attente.
+    shard = Column(Integer, nullable=False, default=0)  # Sous-ligne du compteur de solde.
+    available_minor = Column(BigInteger, nullable=False, default=0)  # Solde disponible, en unités mineures.
+    pending_minor = Column(BigInteger, nullable=False, default=0)  # Solde en attente, en unités mineures.
     updated_at = Column(DateTime, default=datetime.utcnow)
     
     merchant = relationship("Merchant", back_populates="balances")
 
+def _first_reconcile_at() -> datetime:
+    """Première réconciliation d'une transaction, RECONCILE_FIRST_DELAY_SECONDS après sa création."""
+    return datetime.utcnow() + timedelta(seconds=Config.RECONCILE_FIRST_DELAY_SECONDS)
+
 class Transaction(Base):
     """Table des transactions effectuées par les marchands."""
     __tablename__ = 'transactions'
+    __table_args__ = (
+        # Pagination par curseur (created_at, id) de ListTransactions, avec ou sans filtre de statut.
+        Index('ix_transactions_merchant_created', 'merchant_id', 'created_at', 'id'),
+        Index('ix_transactions_merchant_status_created', 'merchant_id', 'status', 'created_at', 'id'),
+        # Statuts, webhooks et remboursements ; unique pour ne jamais encaisser deux fois la même transaction.
+        Index('uq_transactions_provider_transaction_id', 'provider_transaction_id', unique=True),
+        Index('ix_transactions_merchant_idempotency_key', 'merchant_id', 'idempotency_key'),
+        Index('ix_transactions_merchant_order', 'merchant_id', 'order_id'),
+        # Transactions en attente dues pour une réconciliation auprès du fournisseur.
+        Index('ix_transactions_status_next_reconcile', 'status', 'next_reconcile_at'),
+    )
     
     id = Column(String(36), primary_key=True)
     merchant_id = Column(String(36), ForeignKey('merchants.id'))
     payment_method = Column(Enum(PaymentMethod))  # Méthode de paiement.
-    amount = Column(Float, nullable=False)  # Montant de la transaction.
+    amount_minor = Column(BigInteger, nullable=False)  # Montant de la transaction, en unités mineures.
+    fee_minor = Column(BigInteger, nullable=False, default=0)  # Frais du fournisseur, en unités mineures.
     currency = Column(String(3), nullable=False)  # Devise.
     status = Column(Enum(PaymentStatus), default=PaymentStatus.PENDING)  # Statut.
     provider_transaction_id = Column(String(255))  # ID du fournisseur de paiement.
@@ -114,6 +143,10 @@ class Transaction(Base):
     return_url = Column(String(500))  # URL de redirection après paiement.
     webhook_url = Column(String(500))  # URL pour les notifications.
     idempotency_key = Column(String(255))  # Clé pour garantir l'idempotence.
+
+    # Réconciliation tant que la transaction est en attente (voir PaymentReconciler)
+    next_reconcile_at = Column(DateTime, default=_first_reconcile_at)  # Prochaine vérification auprès du fournisseur.
+    reconcile_attempts = Column(Integer, nullable=False, default=0)  # Vérifications déjà faites.
     
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, onupdate=datetime.utcnow)
@@ -139,13 +172,82 @@ class MerchantCredential(Base):
 class Refund(Base):
     """Table des remboursements liés aux transactions."""
     __tablename__ = 'refunds'
+    __table_args__ = (
+        Index('ix_refunds_transaction_id', 'transaction_id'),
+        # Unique : un remboursement rejoué n'est pas débité deux fois.
+        Index('uq_refunds_provider_refund_id', 'provider_refund_id', unique=True),
+    )
     
     id = Column(String(36), primary_key=True)
     transaction_id = Column(String(36), ForeignKey('transactions.id'))
-    amount = Column(Float, nullable=False)  # Montant remboursé.
+    amount_minor = Column(BigInteger, nullable=False)  # Montant remboursé, en unités mineures.
     reason = Column(String(500))  # Raison du remboursement.
     status = Column(String(50))  # Statut du remboursement (ex. validé, en attente).
     provider_refund_id = Column(String(255))  # ID du remboursement chez le fournisseur.
     created_at = Column(DateTime, default=datetime.utcnow)
     
     transaction = relationship("Transaction", back_populates="refunds")
+
+class LedgerEntry(Base):
+    """Grand livre en partie double, en ajout seul : chaque écriture équilibre ses montants à zéro."""
+    __tablename__ = 'ledger_entries'
+    __table_args__ = (
+        Index('ix_ledger_entries_merchant_currency_created', 'merchant_id', 'currency', 'created_at'),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    journal_id = Column(String(36), nullable=False, index=True)  # Regroupe les lignes d'une même écriture.
+    merchant_id = Column(String(36), ForeignKey('merchants.id'), nullable=False)
+    account = Column(String(50), nullable=False)  # Compte mouvementé (ex. merchant_available, provider_clearing).
+    currency = Column(String(3), nullable=False)  # Devise.
+    amount_minor = Column(BigInteger, nullable=False)  # Montant signé, en unités mineures.
+    entry_type = Column(String(50), nullable=False)  # Événement d'origine (payment_captured, settlement, refund).
+    transaction_id = Column(String(36), ForeignKey('transactions.id'), nullable=True, index=True)
+    refund_id = Column(String(36), ForeignKey('refunds.id'), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class IdempotencyRecord(Base):
+    """Réponses mémorisées des requêtes idempotentes, rejouées jusqu'à expiration."""
+    __tablename__ = 'idempotency_records'
+    __table_args__ = (
+        UniqueConstraint('merchant_id', 'idempotency_key', name='uq_idempotency_records_merchant_key'),
+    )
+
+    id = Column(String(36), primary_key=True)
+    merchant_id = Column(String(36), nullable=False)
+    idempotency_key = Column(String(255), nullable=False)  # Clé fournie par le client.
+    request_fingerprint = Column(String(64), nullable=False)  # Empreinte SHA-256 de la requête d'origine.
+    response = Column(LargeBinary, nullable=False)  # Réponse protobuf sérialisée, rejouée telle quelle.
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)  # Date d'expiration de la réponse mémorisée.
+
+class WebhookDeadLetter(Base):
+    """Notifications webhook abandonnées après épuisement des tentatives, à rejouer manuellement."""
+    __tablename__ = 'webhook_dead_letters'
+
+    id = Column(String(36), primary_key=True)  # Identifiant de la notification (en-tête X-Webhook-Id).
+    merchant_id = Column(String(36), nullable=True, index=True)
+    transaction_id = Column(String(36), nullable=True)
+    url = Column(String(500), nullable=False)  # URL de destination du marchand.
+    event_type = Column(String(100), nullable=False)  # Type d'événement (ex. payment.completed).
+    payload = Column(JSON, nullable=False)  # Corps JSON de la notification.
+    attempts = Column(Integer, nullable=False, default=0)  # Tentatives de livraison effectuées.
+    last_status_code = Column(Integer, nullable=True)  # Dernier code HTTP reçu, si une réponse a été reçue.
+    last_error = Column(String(500), nullable=True)  # Dernière erreur de livraison.
+    created_at = Column(DateTime, default=datetime.utcnow)  # Date de l'événement.
+    dead_at = Column(DateTime, default=datetime.utcnow)  # Date de l'abandon.
+
+class ProviderEvent(Base):
+    """Événements webhook reçus des fournisseurs de paiement, pour ne traiter chacun qu'une fois."""
+    __tablename__ = 'provider_events'
+    __table_args__ = (
+        UniqueConstraint('provider', 'event_id', name='uq_provider_events_provider_event'),
+    )
+
+    id = Column(String(36), primary_key=True)
+    provider = Column(String(50), nullable=False)  # Fournisseur émetteur (ex. paypal).
+    event_id = Column(String(255), nullable=False)  # Identifiant de l'événement chez le fournisseur.
+    event_type = Column(String(100), nullable=False)  # Type d'événement (ex. PAYMENT.SALE.COMPLETED).
+    resource_id = Column(String(255), nullable=True)  # Ressource concernée (vente, remboursement).
+    outcome = Column(String(50), nullable=False)  # Résultat du traitement (processed, ignored, unknown_transaction).
+    received_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,7 @@
+import sys
+
+from . import payment_service_pb2
+
+# Le code généré par grpc_tools importe "payment_service_pb2" en absolu :
+# on l'aliase sur le module du paquet pour ne charger qu'une seule fois les messages.
+sys.modules.setdefault("payment_service_pb2", payment_service_pb2)
@@ -26,7 +26,7 @@ from google.protobuf import timestamp_pb2 as google_dot_protobuf_dot_timestamp__
 from google.protobuf import empty_pb2 as google_dot_protobuf_dot_empty__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x15payment_service.proto\x12\npayment.v1\x1a\x1fgoogle/protobuf/timestamp.proto\x1a\x1bgoogle/protobuf/empty.proto\"\x89\x02\n\x14MerchantRegistration\x12\x15\n\rbusiness_name\x18\x01 \x01(\t\x12\r\n\x05\x65mail\x18\x02 \x01(\t\x12\x0f\n\x07website\x18\x03 \x01(\t\x12\x15\n\rbusiness_type\x18\x04 \x01(\t\x12\x0e\n\x06tax_id\x18\x05 \x01(\t\x12-\n\x10\x62usiness_address\x18\x06 \x01(\x0b\x32\x13.payment.v1.Address\x12\x14\n\x0cphone_number\x18\x07 \x01(\t\x12 \n\x18\x61\x63\x63\x65pted_payment_methods\x18\x08 \x03(\t\x12,\n\x08kyc_info\x18\t \x01(\x0b\x32\x1a.payment.v1.KYCInformation\"x\n\x07\x41\x64\x64ress\x12\x14\n\x0cstreet_line1\x18\x01 \x01(\t\x12\x14\n\x0cstreet_line2\x18\x02 \x01(\t\x12\x0c\n\x04\x63ity\x18\x03 \x01(\t\x12\r\n\x05state\x18\x04 \x01(\t\x12\x13\n\x0bpostal_code\x18\x05 \x01(\t\x12\x0f\n\x07\x63ountry\x18\x06 \x01(\t\"\xbd\x01\n\x0eKYCInformation\x12\x19\n\x11legal_entity_type\x18\x01 \x01(\t\x12\x1b\n\x13registration_number\x18\x02 \x01(\t\x12\x34\n\x16verification_documents\x18\x03 \x03(\x0b\x32\x14.payment.v1.Document\x12\x1b\n\x13representative_name\x18\x04 \x01(\t\x12 \n\x18representative_id_number\x18\x05 \x01(\t\":\n\x08\x44ocument\x12\x0c\n\x04type\x18\x01 \x01(\t\x12\x10\n\x08\x66ile_url\x18\x02 \x01(\t\x12\x0e\n\x06status\x18\x03 \x01(\t\"\xd9\x01\n\x13MerchantCredentials\x12\x13\n\x0bmerchant_id\x18\x01 \x01(\t\x12\x0f\n\x07\x61pi_key\x18\x02 \x01(\t\x12\x12\n\napi_secret\x18\x03 \x01(\t\x12\x13\n\x0b\x65nvironment\x18\x04 \x01(\t\x12.\n\ncreated_at\x18\x05 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12.\n\nexpires_at\x18\x06 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12\x13\n\x0bpermissions\x18\x07 \x03(\t\"\x90\x03\n\x0ePaymentRequest\x12\x13\n\x0bmerchant_id\x18\x01 \x01(\t\x12\x0f\n\x07\x61pi_key\x18\x02 \x01(\t\x12\x16\n\x0epayment_method\x18\x03 \x01(\t\x12)\n\x06\x61mount\x18\x04 \x01(\x0b\x32\x19.payment.v1.PaymentAmount\x12\x10\n\x08order_id\x18\x05 \x01(\t\x12:\n\x08metadata\x18\x06 \x03(\x0b\x32(.payment.v1.PaymentRequest.MetadataEntry\x12*\n\x08\x63ustomer\x18\x07 \x01(\x0b\x32\x18.payment.v1.CustomerInfo\x12(\n\x07\x62illing\x18\x08 \x01(\x0b\x32\x17.payment.v1.BillingInfo\x12\x12\n\nreturn_url\x18\t \x01(\t\x12\x13\n\x0bwebhook_url\x18\n \x01(\t\x12\x17\n\x0fidempotency_key\x18\x0b \x01(\t\x1a/\n\rMetadataEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"1\n\rPaymentAmount\x12\x0e\n\x06\x61mount\x18\x01 \x01(\x01\x12\x10\n\x08\x63urrency\x18\x02 \x01(\t\"O\n\x0c\x43ustomerInfo\x12\x13\n\x0b\x63ustomer_id\x18\x01 \x01(\t\x12\r\n\x05\x65mail\x18\x02 \x01(\t\x12\r\n\x05phone\x18\x03 \x01(\t\x12\x0c\n\x04name\x18\x04 \x01(\t\"U\n\x0b\x42illingInfo\x12,\n\x0f\x62illing_address\x18\x01 \x01(\x0b\x32\x13.payment.v1.Address\x12\x18\n\x10\x63\x61rd_holder_name\x18\x02 \x01(\t\"\xf6\x01\n\x0fPaymentResponse\x12\x16\n\x0etransaction_id\x18\x01 \x01(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x12\n\nerror_code\x18\x03 \x01(\t\x12\x15\n\rerror_message\x18\x04 \x01(\t\x12)\n\x06\x61mount\x18\x05 \x01(\x0b\x32\x19.payment.v1.PaymentAmount\x12\x30\n\x0cprocessed_at\x18\x06 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12\x1e\n\x16payment_method_details\x18\x07 \x01(\t\x12\x13\n\x0breceipt_url\x18\x08 \x01(\t\"G\n\x18TransactionStatusRequest\x12\x13\n\x0bmerchant_id\x18\x01 \x01(\t\x12\x16\n\x0etransaction_id\x18\x02 \x01(\t\"\xce\x01\n\x19TransactionStatusResponse\x12\x16\n\x0etransaction_id\x18\x01 \x01(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\x12)\n\x06\x61mount\x18\x03 \x01(\x0b\x32\x19.payment.v1.PaymentAmount\x12.\n\ncreated_at\x18\x04 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12.\n\nupdated_at\x18\x05 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\"w\n\rRefundRequest\x12\x13\n\x0bmerchant_id\x18\x01 \x01(\t\x12\x16\n\x0etransaction_id\x18\x02 \x01(\t\x12)\n\x06\x61mount\x18\x03 \x01(\x0b\x32\x19.payment.v1.PaymentAmount\x12\x0e\n\x06reason\x18\x04 \x01(\t\"\x90\x01\n\x0eRefundResponse\x12\x11\n\trefund_id\x18\x01 \x01(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\x12)\n\x06\x61mount\x18\x03 \x01(\x0b\x32\x19.payment.v1.PaymentAmount\x12\x30\n\x0cprocessed_at\x18\x04 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\"?\n\x16MerchantBalanceRequest\x12\x13\n\x0bmerchant_id\x18\x01 \x01(\t\x12\x10\n\x08\x63urrency\x18\x02 \x01(\t\"k\n\x17MerchantBalanceResponse\x12%\n\x08\x62\x61lances\x18\x01 \x03(\x0b\x32\x13.payment.v1.Balance\x12)\n\x05\x61s_of\x18\x02 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\"?\n\x07\x42\x61lance\x12\x10\n\x08\x63urrency\x18\x01 \x01(\t\x12\x11\n\tavailable\x18\x02 \x01(\x01\x12\x0f\n\x07pending\x18\x03 \x01(\x01\"Z\n\x15UpdateMerchantRequest\x12\x13\n\x0bmerchant_id\x18\x01 \x01(\t\x12,\n\x07profile\x18\x02 \x01(\x0b\x32\x1b.payment.v1.MerchantProfile\"\x9d\x02\n\x0fMerchantProfile\x12\x15\n\rbusiness_name\x18\x01 \x01(\t\x12\r\n\x05\x65mail\x18\x02 \x01(\t\x12\x0f\n\x07website\x18\x03 \x01(\t\x12-\n\x10\x62usiness_address\x18\x04 \x01(\x0b\x32\x13.payment.v1.Address\x12\x14\n\x0cphone_number\x18\x05 \x01(\t\x12 \n\x18\x61\x63\x63\x65pted_payment_methods\x18\x06 \x03(\t\x12;\n\x08settings\x18\x07 \x03(\x0b\x32).payment.v1.MerchantProfile.SettingsEntry\x1a/\n\rSettingsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\xc3\x01\n\x17ListTransactionsRequest\x12\x13\n\x0bmerchant_id\x18\x01 \x01(\t\x12.\n\nstart_date\x18\x02 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12,\n\x08\x65nd_date\x18\x03 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12\x0e\n\x06status\x18\x04 \x01(\t\x12\x11\n\tpage_size\x18\x05 \x01(\x05\x12\x12\n\npage_token\x18\x06 \x01(\t\"w\n\x18ListTransactionsResponse\x12-\n\x0ctransactions\x18\x01 \x03(\x0b\x32\x17.payment.v1.Transaction\x12\x17\n\x0fnext_page_token\x18\x02 \x01(\t\x12\x13\n\x0btotal_count\x18\x03 \x01(\x05\"\xbe\x02\n\x0bTransaction\x12\x16\n\x0etransaction_id\x18\x01 \x01(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\x12)\n\x06\x61mount\x18\x03 \x01(\x0b\x32\x19.payment.v1.PaymentAmount\x12\x16\n\x0epayment_method\x18\x04 \x01(\t\x12.\n\ncreated_at\x18\x05 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12*\n\x08\x63ustomer\x18\x06 \x01(\x0b\x32\x18.payment.v1.CustomerInfo\x12\x37\n\x08metadata\x18\x07 \x03(\x0b\x32%.payment.v1.Transaction.MetadataEntry\x1a/\n\rMetadataEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"=\n\x15\x43redentialsValidation\x12\x13\n\x0bmerchant_id\x18\x01 \x01(\t\x12\x0f\n\x07\x61pi_key\x18\x02 \x01(\t\"k\n\x12ValidationResponse\x12\x10\n\x08is_valid\x18\x01 \x01(\x08\x12\x13\n\x0bpermissions\x18\x02 \x03(\t\x12.\n\nexpires_at\x18\x03 \x01(\x0b\x32\x1a.google.protobuf.Timestamp2\xd0\x05\n\x0ePaymentService\x12U\n\x10RegisterMerchant\x12 .payment.v1.MerchantRegistration\x1a\x1f.payment.v1.MerchantCredentials\x12I\n\x0eProcessPayment\x12\x1a.payment.v1.PaymentRequest\x1a\x1b.payment.v1.PaymentResponse\x12X\n\x13ValidateCredentials\x12!.payment.v1.CredentialsValidation\x1a\x1e.payment.v1.ValidationResponse\x12\x63\n\x14GetTransactionStatus\x12$.payment.v1.TransactionStatusRequest\x1a%.payment.v1.TransactionStatusResponse\x12\x46\n\rRefundPayment\x12\x19.payment.v1.RefundRequest\x1a\x1a.payment.v1.RefundResponse\x12]\n\x12GetMerchantBalance\x12\".payment.v1.MerchantBalanceRequest\x1a#.payment.v1.MerchantBalanceResponse\x12W\n\x15UpdateMerchantProfile\x12!.payment.v1.UpdateMerchantRequest\x1a\x1b.payment.v1.MerchantProfile\x12]\n\x10ListTransactions\x12#.payment.v1.ListTransactionsRequest\x1a$.payment.v1.ListTransactionsResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x15payment_service.proto\x12\npayment.v1\x1a\x1fgoogle/protobuf/timestamp.proto\x1a\x1bgoogle/protobuf/empty.proto\"\x89\x02\n\x14MerchantRegistration\x12\x15\n\rbusiness_name\x18\x01 \x01(\t\x12\r\n\x05\x65mail\x18\x02 \x01(\t\x12\x0f\n\x07website\x18\x03 \x01(\t\x12\x15\n\rbusiness_type\x18\x04 \x01(\t\x12\x0e\n\x06tax_id\x18\x05 \x01(\t\x12-\n\x10\x62usiness_address\x18\x06 \x01(\x0b\x32\x13.payment.v1.Address\x12\x14\n\x0cphone_number\x18\x07 \x01(\t\x12 \n\x18\x61\x63\x63\x65pted_payment_methods\x18\x08 \x03(\t\x12,\n\x08kyc_info\x18\t \x01(\x0b\x32\x1a.payment.v1.KYCInformation\"x\n\x07\x41\x64\x64ress\x12\x14\n\x0cstreet_line1\x18\x01 \x01(\t\x12\x14\n\x0cstreet_line2\x18\x02 \x01(\t\x12\x0c\n\x04\x63ity\x18\x03 \x01(\t\x12\r\n\x05state\x18\x04 \x01(\t\x12\x13\n\x0bpostal_code\x18\x05 \x01(\t\x12\x0f\n\x07\x63ountry\x18\x06 \x01(\t\"\xbd\x01\n\x0eKYCInformation\x12\x19\n\x11legal_entity_type\x18\x01 \x01(\t\x12\x1b\n\x13registration_number\x18\x02 \x01(\t\x12\x34\n\x16verification_documents\x18\x03 \x03(\x0b\x32\x14.payment.v1.Document\x12\x1b\n\x13representative_name\x18\x04 \x01(\t\x12 \n\x18representative_id_number\x18\x05 \x01(\t\":\n\x08\x44ocument\x12\x0c\n\x04type\x18\x01 \x01(\t\x12\x10\n\x08\x66ile_url\x18\x02 \x01(\t\x12\x0e\n\x06status\x18\x03 \x01(\t\"\xd9\x01\n\x13MerchantCredentials\x12\x13\n\x0bmerchant_id\x18\x01 \x01(\t\x12\x0f\n\x07\x61pi_key\x18\x02 \x01(\t\x12\x12\n\napi_secret\x18\x03 \x01(\t\x12\x13\n\x0b\x65nvironment\x18\x04 \x01(\t\x12.\n\ncreated_at\x18\x05 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12.\n\nexpires_at\x18\x06 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12\x13\n\x0bpermissions\x18\x07 \x03(\t\"\x90\x03\n\x0ePaymentRequest\x12\x13\n\x0bmerchant_id\x18\x01 \x01(\t\x12\x0f\n\x07\x61pi_key\x18\x02 \x01(\t\x12\x16\n\x0epayment_method\x18\x03 \x01(\t\x12)\n\x06\x61mount\x18\x04 \x01(\x0b\x32\x19.payment.v1.PaymentAmount\x12\x10\n\x08order_id\x18\x05 \x01(\t\x12:\n\x08metadata\x18\x06 \x03(\x0b\x32(.payment.v1.PaymentRequest.MetadataEntry\x12*\n\x08\x63ustomer\x18\x07 \x01(\x0b\x32\x18.payment.v1.CustomerInfo\x12(\n\x07\x62illing\x18\x08 \x01(\x0b\x32\x17.payment.v1.BillingInfo\x12\x12\n\nreturn_url\x18\t \x01(\t\x12\x13\n\x0bwebhook_url\x18\n \x01(\t\x12\x17\n\x0fidempotency_key\x18\x0b \x01(\t\x1a/\n\rMetadataEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\xf4\x01\n\x15\x43onfirmPaymentRequest\x12\x13\n\x0bmerchant_id\x18\x01 \x01(\t\x12\x0f\n\x07\x61pi_key\x18\x02 \x01(\t\x12\x16\n\x0etransaction_id\x18\x03 \x01(\t\x12)\n\x06\x61mount\x18\x04 \x01(\x0b\x32\x19.payment.v1.PaymentAmount\x12\x41\n\x08metadata\x18\x05 \x03(\x0b\x32/.payment.v1.ConfirmPaymentRequest.MetadataEntry\x1a/\n\rMetadataEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"G\n\rPaymentAmount\x12\x0e\n\x06\x61mount\x18\x01 \x01(\x01\x12\x10\n\x08\x63urrency\x18\x02 \x01(\t\x12\x14\n\x0c\x61mount_minor\x18\x03 \x01(\x03\"O\n\x0c\x43ustomerInfo\x12\x13\n\x0b\x63ustomer_id\x18\x01 \x01(\t\x12\r\n\x05\x65mail\x18\x02 \x01(\t\x12\r\n\x05phone\x18\x03 \x01(\t\x12\x0c\n\x04name\x18\x04 \x01(\t\"U\n\x0b\x42illingInfo\x12,\n\x0f\x62illing_address\x18\x01 \x01(\x0b\x32\x13.payment.v1.Address\x12\x18\n\x10\x63\x61rd_holder_name\x18\x02 \x01(\t\"\xf6\x01\n\x0fPaymentResponse\x12\x16\n\x0etransaction_id\x18\x01 \x01(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x12\n\nerror_code\x18\x03 \x01(\t\x12\x15\n\rerror_message\x18\x04 \x01(\t\x12)\n\x06\x61mount\x18\x05 \x01(\x0b\x32\x19.payment.v1.PaymentAmount\x12\x30\n\x0cprocessed_at\x18\x06 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12\x1e\n\x16payment_method_details\x18\x07 \x01(\t\x12\x13\n\x0breceipt_url\x18\x08 \x01(\t\"G\n\x18TransactionStatusRequest\x12\x13\n\x0bmerchant_id\x18\x01 \x01(\t\x12\x16\n\x0etransaction_id\x18\x02 \x01(\t\"\xce\x01\n\x19TransactionStatusResponse\x12\x16\n\x0etransaction_id\x18\x01 \x01(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\x12)\n\x06\x61mount\x18\x03 \x01(\x0b\x32\x19.payment.v1.PaymentAmount\x12.\n\ncreated_at\x18\x04 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12.\n\nupdated_at\x18\x05 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\"i\n\x13\x42\x61tchPaymentRequest\x12\x13\n\x0bmerchant_id\x18\x01 \x01(\t\x12\x0f\n\x07\x61pi_key\x18\x02 \x01(\t\x12,\n\x08payments\x18\x03 \x03(\x0b\x32\x1a.payment.v1.PaymentRequest\"}\n\x12\x42\x61tchPaymentResult\x12\r\n\x05index\x18\x01 \x01(\x05\x12-\n\x08response\x18\x02 \x01(\x0b\x32\x1b.payment.v1.PaymentResponse\x12\x12\n\nerror_code\x18\x03 \x01(\t\x12\x15\n\rerror_message\x18\x04 \x01(\t\"G\n\x14\x42\x61tchPaymentResponse\x12/\n\x07results\x18\x01 \x03(\x0b\x32\x1e.payment.v1.BatchPaymentResult\"M\n\x1d\x42\x61tchTransactionStatusRequest\x12\x13\n\x0bmerchant_id\x18\x01 \x01(\t\x12\x17\n\x0ftransaction_ids\x18\x02 \x03(\t\"\x8f\x01\n\x1c\x42\x61tchTransactionStatusResult\x12\r\n\x05index\x18\x01 \x01(\x05\x12\x35\n\x06status\x18\x02 \x01(\x0b\x32%.payment.v1.TransactionStatusResponse\x12\x12\n\nerror_code\x18\x03 \x01(\t\x12\x15\n\rerror_message\x18\x04 \x01(\t\"[\n\x1e\x42\x61tchTransactionStatusResponse\x12\x39\n\x07results\x18\x01 \x03(\x0b\x32(.payment.v1.BatchTransactionStatusResult\"w\n\rRefundRequest\x12\x13\n\x0bmerchant_id\x18\x01 \x01(\t\x12\x16\n\x0etransaction_id\x18\x02 \x01(\t\x12)\n\x06\x61mount\x18\x03 \x01(\x0b\x32\x19.payment.v1.PaymentAmount\x12\x0e\n\x06reason\x18\x04 \x01(\t\"\xa7\x01\n\x0eRefundResponse\x12\x11\n\trefund_id\x18\x01 \x01(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\x12)\n\x06\x61mount\x18\x03 \x01(\x0b\x32\x19.payment.v1.PaymentAmount\x12\x30\n\x0cprocessed_at\x18\x04 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12\x15\n\rerror_message\x18\x05 \x01(\t\"?\n\x16MerchantBalanceRequest\x12\x13\n\x0bmerchant_id\x18\x01 \x01(\t\x12\x10\n\x08\x63urrency\x18\x02 \x01(\t\"k\n\x17MerchantBalanceResponse\x12%\n\x08\x62\x61lances\x18\x01 \x03(\x0b\x32\x13.payment.v1.Balance\x12)\n\x05\x61s_of\x18\x02 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\"o\n\x07\x42\x61lance\x12\x10\n\x08\x63urrency\x18\x01 \x01(\t\x12\x11\n\tavailable\x18\x02 \x01(\x01\x12\x0f\n\x07pending\x18\x03 \x01(\x01\x12\x17\n\x0f\x61vailable_minor\x18\x04 \x01(\x03\x12\x15\n\rpending_minor\x18\x05 \x01(\x03\"Z\n\x15UpdateMerchantRequest\x12\x13\n\x0bmerchant_id\x18\x01 \x01(\t\x12,\n\x07profile\x18\x02 \x01(\x0b\x32\x1b.payment.v1.MerchantProfile\"\x9d\x02\n\x0fMerchantProfile\x12\x15\n\rbusiness_name\x18\x01 \x01(\t\x12\r\n\x05\x65mail\x18\x02 \x01(\t\x12\x0f\n\x07website\x18\x03 \x01(\t\x12-\n\x10\x62usiness_address\x18\x04 \x01(\x0b\x32\x13.payment.v1.Address\x12\x14\n\x0cphone_number\x18\x05 \x01(\t\x12 \n\x18\x61\x63\x63\x65pted_payment_methods\x18\x06 \x03(\t\x12;\n\x08settings\x18\x07 \x03(\x0b\x32).payment.v1.MerchantProfile.SettingsEntry\x1a/\n\rSettingsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\xc3\x01\n\x17ListTransactionsRequest\x12\x13\n\x0bmerchant_id\x18\x01 \x01(\t\x12.\n\nstart_date\x18\x02 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12,\n\x08\x65nd_date\x18\x03 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12\x0e\n\x06status\x18\x04 \x01(\t\x12\x11\n\tpage_size\x18\x05 \x01(\x05\x12\x12\n\npage_token\x18\x06 \x01(\t\"\x9e\x01\n\x19\x45xportTransactionsRequest\x12\x13\n\x0bmerchant_id\x18\x01 \x01(\t\x12.\n\nstart_date\x18\x02 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12,\n\x08\x65nd_date\x18\x03 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12\x0e\n\x06status\x18\x04 \x01(\t\"w\n\x18ListTransactionsResponse\x12-\n\x0ctransactions\x18\x01 \x03(\x0b\x32\x17.payment.v1.Transaction\x12\x17\n\x0fnext_page_token\x18\x02 \x01(\t\x12\x13\n\x0btotal_count\x18\x03 \x01(\x05\"\xbe\x02\n\x0bTransaction\x12\x16\n\x0etransaction_id\x18\x01 \x01(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\x12)\n\x06\x61mount\x18\x03 \x01(\x0b\x32\x19.payment.v1.PaymentAmount\x12\x16\n\x0epayment_method\x18\x04 \x01(\t\x12.\n\ncreated_at\x18\x05 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12*\n\x08\x63ustomer\x18\x06 \x01(\x0b\x32\x18.payment.v1.CustomerInfo\x12\x37\n\x08metadata\x18\x07 \x03(\x0b\x32%.payment.v1.Transaction.MetadataEntry\x1a/\n\rMetadataEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"=\n\x15\x43redentialsValidation\x12\x13\n\x0bmerchant_id\x18\x01 \x01(\t\x12\x0f\n\x07\x61pi_key\x18\x02 \x01(\t\"k\n\x12ValidationResponse\x12\x10\n\x08is_valid\x18\x01 \x01(\x08\x12\x13\n\x0bpermissions\x18\x02 \x03(\t\x12.\n\nexpires_at\x18\x03 \x01(\x0b\x32\x1a.google.protobuf.Timestamp2\xc8\x08\n\x0ePaymentService\x12U\n\x10RegisterMerchant\x12 .payment.v1.MerchantRegistration\x1a\x1f.payment.v1.MerchantCredentials\x12I\n\x0eProcessPayment\x12\x1a.payment.v1.PaymentRequest\x1a\x1b.payment.v1.PaymentResponse\x12P\n\x0e\x43onfirmPayment\x12!.payment.v1.ConfirmPaymentRequest\x1a\x1b.payment.v1.PaymentResponse\x12X\n\x13\x42\x61tchProcessPayment\x12\x1f.payment.v1.BatchPaymentRequest\x1a .payment.v1.BatchPaymentResponse\x12X\n\x13ValidateCredentials\x12!.payment.v1.CredentialsValidation\x1a\x1e.payment.v1.ValidationResponse\x12\x63\n\x14GetTransactionStatus\x12$.payment.v1.TransactionStatusRequest\x1a%.payment.v1.TransactionStatusResponse\x12r\n\x19\x42\x61tchGetTransactionStatus\x12).payment.v1.BatchTransactionStatusRequest\x1a*.payment.v1.BatchTransactionStatusResponse\x12\x46\n\rRefundPayment\x12\x19.payment.v1.RefundRequest\x1a\x1a.payment.v1.RefundResponse\x12]\n\x12GetMerchantBalance\x12\".payment.v1.MerchantBalanceRequest\x1a#.payment.v1.MerchantBalanceResponse\x12W\n\x15UpdateMerchantProfile\x12!.payment.v1.UpdateMerchantRequest\x1a\x1b.payment.v1.MerchantProfile\x12]\n\x10ListTransactions\x12#.payment.v1.ListTransactionsRequest\x1a$.payment.v1.ListTransactionsResponse\x12V\n\x12\x45xportTransactions\x12%.payment.v1.ExportTransactionsRequest\x1a\x17.payment.v1.Transaction0\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -35,6 +35,8 @@ if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
   _globals['_PAYMENTREQUEST_METADATAENTRY']._loaded_options = None
   _globals['_PAYMENTREQUEST_METADATAENTRY']._serialized_options = b'8\001'
+  _globals['_CONFIRMPAYMENTREQUEST_METADATAENTRY']._loaded_options = None
+  _globals['_CONFIRMPAYMENTREQUEST_METADATAENTRY']._serialized_options = b'8\001'
   _globals['_MERCHANTPROFILE_SETTINGSENTRY']._loaded_options = None
   _globals['_MERCHANTPROFILE_SETTINGSENTRY']._serialized_options = b'8\001'
   _globals['_TRANSACTION_METADATAENTRY']._loaded_options = None
@@ -53,46 +55,64 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_PAYMENTREQUEST']._serialized_end=1362
   _globals['_PAYMENTREQUEST_METADATAENTRY']._serialized_start=1315
   _globals['_PAYMENTREQUEST_METADATAENTRY']._serialized_end=1362
-  _globals['_PAYMENTAMOUNT']._serialized_start=1364
-  _globals['_PAYMENTAMOUNT']._serialized_end=1413
-  _globals['_CUSTOMERINFO']._serialized_start=1415
-  _globals['_CUSTOMERINFO']._serialized_end=1494
-  _globals['_BILLINGINFO']._serialized_start=1496
-  _globals['_BILLINGINFO']._serialized_end=1581
-  _globals['_PAYMENTRESPONSE']._serialized_start=1584
-  _globals['_PAYMENTRESPONSE']._serialized_end=1830
-  _globals['_TRANSACTIONSTATUSREQUEST']._serialized_start=1832
-  _globals['_TRANSACTIONSTATUSREQUEST']._serialized_end=1903
-  _globals['_TRANSACTIONSTATUSRESPONSE']._serialized_start=1906
-  _globals['_TRANSACTIONSTATUSRESPONSE']._serialized_end=2112
-  _globals['_REFUNDREQUEST']._serialized_start=2114
-  _globals['_REFUNDREQUEST']._serialized_end=2233
-  _globals['_REFUNDRESPONSE']._serialized_start=2236
-  _globals['_REFUNDRESPONSE']._serialized_end=2380
-  _globals['_MERCHANTBALANCEREQUEST']._serialized_start=2382
-  _globals['_MERCHANTBALANCEREQUEST']._serialized_end=2445
-  _globals['_MERCHANTBALANCERESPONSE']._serialized_start=2447
-  _globals['_MERCHANTBALANCERESPONSE']._serialized_end=2554
-  _globals['_BALANCE']._serialized_start=2556
-  _globals['_BALANCE']._serialized_end=2619
-  _globals['_UPDATEMERCHANTREQUEST']._serialized_start=2621
-  _globals['_UPDATEMERCHANTREQUEST']._serialized_end=2711
-  _globals['_MERCHANTPROFILE']._serialized_start=2714
-  _globals['_MERCHANTPROFILE']._serialized_end=2999
-  _globals['_MERCHANTPROFILE_SETTINGSENTRY']._serialized_start=2952
-  _globals['_MERCHANTPROFILE_SETTINGSENTRY']._serialized_end=2999
-  _globals['_LISTTRANSACTIONSREQUEST']._serialized_start=3002
-  _globals['_LISTTRANSACTIONSREQUEST']._serialized_end=3197
-  _globals['_LISTTRANSACTIONSRESPONSE']._serialized_start=3199
-  _globals['_LISTTRANSACTIONSRESPONSE']._serialized_end=3318
-  _globals['_TRANSACTION']._serialized_start=3321
-  _globals['_TRANSACTION']._serialized_end=3639
+  _globals['_CONFIRMPAYMENTREQUEST']._serialized_start=1365
+  _globals['_CONFIRMPAYMENTREQUEST']._serialized_end=1609
+  _globals['_CONFIRMPAYMENTREQUEST_METADATAENTRY']._serialized_start=1315
+  _globals['_CONFIRMPAYMENTREQUEST_METADATAENTRY']._serialized_end=1362
+  _globals['_PAYMENTAMOUNT']._serialized_start=1611
+  _globals['_PAYMENTAMOUNT']._serialized_end=1682
+  _globals['_CUSTOMERINFO']._serialized_start=1684
+  _globals['_CUSTOMERINFO']._serialized_end=1763
+  _globals['_BILLINGINFO']._serialized_start=1765
+  _globals['_BILLINGINFO']._serialized_end=1850
+  _globals['_PAYMENTRESPONSE']._serialized_start=1853
+  _globals['_PAYMENTRESPONSE']._serialized_end=2099
+  _globals['_TRANSACTIONSTATUSREQUEST']._serialized_start=2101
+  _globals['_TRANSACTIONSTATUSREQUEST']._serialized_end=2172
+  _globals['_TRANSACTIONSTATUSRESPONSE']._serialized_start=2175
+  _globals['_TRANSACTIONSTATUSRESPONSE']._serialized_end=2381
+  _globals['_BATCHPAYMENTREQUEST']._serialized_start=2383
+  _globals['_BATCHPAYMENTREQUEST']._serialized_end=2488
+  _globals['_BATCHPAYMENTRESULT']._serialized_start=2490
+  _globals['_BATCHPAYMENTRESULT']._serialized_end=2615
+  _globals['_BATCHPAYMENTRESPONSE']._serialized_start=2617
+  _globals['_BATCHPAYMENTRESPONSE']._serialized_end=2688
+  _globals['_BATCHTRANSACTIONSTATUSREQUEST']._serialized_start=2690
+  _globals['_BATCHTRANSACTIONSTATUSREQUEST']._serialized_end=2767
+  _globals['_BATCHTRANSACTIONSTATUSRESULT']._serialized_start=2770
+  _globals['_BATCHTRANSACTIONSTATUSRESULT']._serialized_end=2913
+  _globals['_BATCHTRANSACTIONSTATUSRESPONSE']._serialized_start=2915
+  _globals['_BATCHTRANSACTIONSTATUSRESPONSE']._serialized_end=3006
+  _globals['_REFUNDREQUEST']._serialized_start=3008
+  _globals['_REFUNDREQUEST']._serialized_end=3127
+  _globals['_REFUNDRESPONSE']._serialized_start=3130
+  _globals['_REFUNDRESPONSE']._serialized_end=3297
+  _globals['_MERCHANTBALANCEREQUEST']._serialized_start=3299
+  _globals['_MERCHANTBALANCEREQUEST']._serialized_end=3362
+  _globals['_MERCHANTBALANCERESPONSE']._serialized_start=3364
+  _globals['_MERCHANTBALANCERESPONSE']._serialized_end=3471
+  _globals['_BALANCE']._serialized_start=3473
+  _globals['_BALANCE']._serialized_end=3584
+  _globals['_UPDATEMERCHANTREQUEST']._serialized_start=3586
+  _globals['_UPDATEMERCHANTREQUEST']._serialized_end=3676
+  _globals['_MERCHANTPROFILE']._serialized_start=3679
+  _globals['_MERCHANTPROFILE']._serialized_end=3964
+  _globals['_MERCHANTPROFILE_SETTINGSENTRY']._serialized_start=3917
+  _globals['_MERCHANTPROFILE_SETTINGSENTRY']._serialized_end=3964
+  _globals['_LISTTRANSACTIONSREQUEST']._serialized_start=3967
+  _globals['_LISTTRANSACTIONSREQUEST']._serialized_end=4162
+  _globals['_EXPORTTRANSACTIONSREQUEST']._serialized_start=4165
+  _globals['_EXPORTTRANSACTIONSREQUEST']._serialized_end=4323
+  _globals['_LISTTRANSACTIONSRESPONSE']._serialized_start=4325
+  _globals['_LISTTRANSACTIONSRESPONSE']._serialized_end=4444
+  _globals['_TRANSACTION']._serialized_start=4447
+  _globals['_TRANSACTION']._serialized_end=4765
   _globals['_TRANSACTION_METADATAENTRY']._serialized_start=1315
   _globals['_TRANSACTION_METADATAENTRY']._serialized_end=1362
-  _globals['_CREDENTIALSVALIDATION']._serialized_start=3641
-  _globals['_CREDENTIALSVALIDATION']._serialized_end=3702
-  _globals['_VALIDATIONRESPONSE']._serialized_start=3704
-  _globals['_VALIDATIONRESPONSE']._serialized_end=3811
-  _globals['_PAYMENTSERVICE']._serialized_start=3814
-  _globals['_PAYMENTSERVICE']._serialized_end=4534
+  _globals['_CREDENTIALSVALIDATION']._serialized_start=4767
+  _globals['_CREDENTIALSVALIDATION']._serialized_end=4828
+  _globals['_VALIDATIONRESPONSE']._serialized_start=4830
+  _globals['_VALIDATIONRESPONSE']._serialized_end=4937
+  _globals['_PAYMENTSERVICE']._serialized_start=4940
+  _globals['_PAYMENTSERVICE']._serialized_end=6036
 # @@protoc_insertion_point(module_scope)
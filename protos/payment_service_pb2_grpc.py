@@ -46,6 +46,16 @@ class PaymentServiceStub(object):
                 request_serializer=payment__service__pb2.PaymentRequest.SerializeToString,
                 response_deserializer=payment__service__pb2.PaymentResponse.FromString,
                 _registered_method=True)
+        self.ConfirmPayment = channel.unary_unary(
+                '/payment.v1.PaymentService/ConfirmPayment',
+                request_serializer=payment__service__pb2.ConfirmPaymentRequest.SerializeToString,
+                response_deserializer=payment__service__pb2.PaymentResponse.FromString,
+                _registered_method=True)
+        self.BatchProcessPayment = channel.unary_unary(
+                '/payment.v1.PaymentService/BatchProcessPayment',
+                request_serializer=payment__service__pb2.BatchPaymentRequest.SerializeToString,
+                response_deserializer=payment__service__pb2.BatchPaymentResponse.FromString,
+                _registered_method=True)
         self.ValidateCredentials = channel.unary_unary(
                 '/payment.v1.PaymentService/ValidateCredentials',
                 request_serializer=payment__service__pb2.CredentialsValidation.SerializeToString,
@@ -56,6 +66,11 @@ class PaymentServiceStub(object):
                 request_serializer=payment__service__pb2.TransactionStatusRequest.SerializeToString,
                 response_deserializer=payment__service__pb2.TransactionStatusResponse.FromString,
                 _registered_method=True)
+        self.BatchGetTransactionStatus = channel.unary_unary(
+                '/payment.v1.PaymentService/BatchGetTransactionStatus',
+                request_serializer=payment__service__pb2.BatchTransactionStatusRequest.SerializeToString,
+                response_deserializer=payment__service__pb2.BatchTransactionStatusResponse.FromString,
+                _registered_method=True)
         self.RefundPayment = channel.unary_unary(
                 '/payment.v1.PaymentService/RefundPayment',
                 request_serializer=payment__service__pb2.RefundRequest.SerializeToString,
@@ -76,6 +91,11 @@ class PaymentServiceStub(object):
                 request_serializer=payment__service__pb2.ListTransactionsRequest.SerializeToString,
                 response_deserializer=payment__service__pb2.ListTransactionsResponse.FromString,
                 _registered_method=True)
+        self.ExportTransactions = channel.unary_stream(
+                '/payment.v1.PaymentService/ExportTransactions',
+                request_serializer=payment__service__pb2.ExportTransactionsRequest.SerializeToString,
+                response_deserializer=payment__service__pb2.Transaction.FromString,
+                _registered_method=True)
 
 
 class PaymentServiceServicer(object):
@@ -103,6 +123,26 @@ class PaymentServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def ConfirmPayment(self, request, context):
+        """*
+        Confirme un paiement après approbation par le payeur.
+        @param ConfirmPaymentRequest : Identifiant de la transaction et données du payeur.
+        @return PaymentResponse : Statut et détails du paiement confirmé.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def BatchProcessPayment(self, request, context):
+        """*
+        Traite plusieurs paiements d'un même marchand en un seul appel.
+        @param BatchPaymentRequest : Paiements à traiter (authentifiés une seule fois).
+        @return BatchPaymentResponse : Résultat individuel de chaque paiement.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def ValidateCredentials(self, request, context):
         """*
         Valide les identifiants d'un marchand.
@@ -123,6 +163,16 @@ class PaymentServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def BatchGetTransactionStatus(self, request, context):
+        """*
+        Récupère le statut de plusieurs transactions en un seul appel.
+        @param BatchTransactionStatusRequest : Identifiants des transactions et marchand associé.
+        @return BatchTransactionStatusResponse : Statut individuel de chaque transaction.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def RefundPayment(self, request, context):
         """*
         Rembourse une transaction.
@@ -163,6 +213,16 @@ class PaymentServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def ExportTransactions(self, request, context):
+        """*
+        Exporte l'historique complet des transactions d'un marchand en flux.
+        @param ExportTransactionsRequest : Filtres tels que dates et statut.
+        @return stream Transaction : Transactions, des plus anciennes aux plus récentes.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_PaymentServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -176,6 +236,16 @@ def add_PaymentServiceServicer_to_server(servicer, server):
                     request_deserializer=payment__service__pb2.PaymentRequest.FromString,
                     response_serializer=payment__service__pb2.PaymentResponse.SerializeToString,
             ),
+            'ConfirmPayment': grpc.unary_unary_rpc_method_handler(
+                    servicer.ConfirmPayment,
+                    request_deserializer=payment__service__pb2.ConfirmPaymentRequest.FromString,
+                    response_serializer=payment__service__pb2.PaymentResponse.SerializeToString,
+            ),
+            'BatchProcessPayment': grpc.unary_unary_rpc_method_handler(
+                    servicer.BatchProcessPayment,
+                    request_deserializer=payment__service__pb2.BatchPaymentRequest.FromString,
+                    response_serializer=payment__service__pb2.BatchPaymentResponse.SerializeToString,
+            ),
             'ValidateCredentials': grpc.unary_unary_rpc_method_handler(
                     servicer.ValidateCredentials,
                     request_deserializer=payment__service__pb2.CredentialsValidation.FromString,
@@ -186,6 +256,11 @@ def add_PaymentServiceServicer_to_server(servicer, server):
                     request_deserializer=payment__service__pb2.TransactionStatusRequest.FromString,
                     response_serializer=payment__service__pb2.TransactionStatusResponse.SerializeToString,
             ),
+            'BatchGetTransactionStatus': grpc.unary_unary_rpc_method_handler(
+                    servicer.BatchGetTransactionStatus,
+                    request_deserializer=payment__service__pb2.BatchTransactionStatusRequest.FromString,
+                    response_serializer=payment__service__pb2.BatchTransactionStatusResponse.SerializeToString,
+            ),
             'RefundPayment': grpc.unary_unary_rpc_method_handler(
                     servicer.RefundPayment,
                     request_deserializer=payment__service__pb2.RefundRequest.FromString,
@@ -206,6 +281,11 @@ def add_PaymentServiceServicer_to_server(servicer, server):
                     request_deserializer=payment__service__pb2.ListTransactionsRequest.FromString,
                     response_serializer=payment__service__pb2.ListTransactionsResponse.SerializeToString,
             ),
+            'ExportTransactions': grpc.unary_stream_rpc_method_handler(
+                    servicer.ExportTransactions,
+                    request_deserializer=payment__service__pb2.ExportTransactionsRequest.FromString,
+                    response_serializer=payment__service__pb2.Transaction.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'payment.v1.PaymentService', rpc_method_handlers)
@@ -273,6 +353,60 @@ class PaymentService(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def ConfirmPayment(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/payment.v1.PaymentService/ConfirmPayment',
+            payment__service__pb2.ConfirmPaymentRequest.SerializeToString,
+            payment__service__pb2.PaymentResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def BatchProcessPayment(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/payment.v1.PaymentService/BatchProcessPayment',
+            payment__service__pb2.BatchPaymentRequest.SerializeToString,
+            payment__service__pb2.BatchPaymentResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def ValidateCredentials(request,
             target,
@@ -327,6 +461,33 @@ class PaymentService(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def BatchGetTransactionStatus(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/payment.v1.PaymentService/BatchGetTransactionStatus',
+            payment__service__pb2.BatchTransactionStatusRequest.SerializeToString,
+            payment__service__pb2.BatchTransactionStatusResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def RefundPayment(request,
             target,
@@ -434,3 +595,30 @@ class PaymentService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def ExportTransactions(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/payment.v1.PaymentService/ExportTransactions',
+            payment__service__pb2.ExportTransactionsRequest.SerializeToString,
+            payment__service__pb2.Transaction.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# app.config lit l'environnement à l'import : base et fonctions annexes des tests réglées avant
+os.environ.setdefault("DATABASE_URI", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='payment-tests-'), 'tests.db')}")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
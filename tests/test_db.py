@@ -0,0 +1,28 @@
+import asyncio
+from sqlalchemy import text
+from app.db import create_async_db_engine, create_db_engine, pool_stats
+
+
+def test_sync_pool_stats_include_checkout_waits(tmp_path):
+    db_engine = create_db_engine(f"sqlite:///{tmp_path / 'pool.db'}", pool_size=2)
+    with db_engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        assert pool_stats(db_engine)["checked_out"] == 1
+    assert pool_stats(db_engine)["checkouts"] == 1
+    db_engine.dispose()
+
+
+def test_async_pool_stats_include_checkout_waits(tmp_path):
+    async def run():
+        db_engine = create_async_db_engine(f"sqlite:///{tmp_path / 'pool.db'}", pool_size=2)
+        async with db_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+            checked_out = pool_stats(db_engine)["checked_out"]
+        stats = pool_stats(db_engine)
+        await db_engine.dispose()
+        return checked_out, stats
+
+    checked_out, stats = asyncio.run(run())
+    assert checked_out == 1
+    assert stats["size"] == 2
+    assert stats["checkouts"] == 1
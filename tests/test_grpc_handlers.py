@@ -0,0 +1,180 @@
+import asyncio
+from types import SimpleNamespace
+import grpc
+import pytest
+from app.config import Config
+from app.db import init_db
+from app.grpc_service import grpc_handlers
+from app.grpc_service.grpc_handlers import AsyncPaymentServiceHandler, PaymentServiceHandler
+from app.utils.exceptions import TransactionNotFoundError
+from app.utils.security import CredentialInfo, credential_scope
+from models.models import PaymentStatus
+from protos.payment_service_pb2 import (BatchPaymentRequest, BatchTransactionStatusRequest, ConfirmPaymentRequest,
+                                        PaymentAmount, PaymentRequest, TransactionStatusRequest)
+
+def _provider_config(seed: int) -> dict:
+    # Une graine par test : les identifiants simulés ne se répètent pas dans la base partagée
+    return {"latency": "fixed:0", "seed": seed}
+
+
+class _Context:
+    def __init__(self):
+        self.code = grpc.StatusCode.OK
+        self.details = ""
+
+    def set_code(self, code):
+        self.code = code
+
+    def set_details(self, details):
+        self.details = details
+
+    def abort(self, code, details):
+        # Comme grpc : la RPC s'interrompt sur une exception
+        self.set_code(code)
+        self.set_details(details)
+        raise _Aborted(details)
+
+
+class _AsyncContext(_Context):
+    async def abort(self, code, details):
+        super().abort(code, details)
+
+
+class _Aborted(Exception):
+    pass
+
+
+def _as_merchant(merchant_id: str):
+    return credential_scope(CredentialInfo(credential_id=f"cred-{merchant_id}", merchant_id=merchant_id,
+                                           environment=None, expires_at=None))
+
+
+def _payment_request(merchant_id: str) -> PaymentRequest:
+    return PaymentRequest(merchant_id=merchant_id, amount=PaymentAmount(amount_minor=1000, currency="USD"),
+                          payment_method="paypal")
+
+
+def _confirm_request(merchant_id: str, transaction_id: str) -> ConfirmPaymentRequest:
+    return ConfirmPaymentRequest(merchant_id=merchant_id, transaction_id=transaction_id,
+                                 amount=PaymentAmount(amount_minor=1000, currency="USD"), metadata={"payer_id": "P"})
+
+
+@pytest.fixture(scope="module", autouse=True)
+def database():
+    init_db()
+
+
+@pytest.mark.parametrize("status, webhook_port, expected", [
+    (PaymentStatus.COMPLETED, 0, True),
+    (PaymentStatus.FAILED, 0, True),
+    (PaymentStatus.PENDING, 0, False),
+    (PaymentStatus.PROCESSING, 0, False),
+    (PaymentStatus.PENDING, 8081, True),
+])
+def test_stored_status_used_only_when_up_to_date(monkeypatch, status, webhook_port, expected):
+    monkeypatch.setattr(Config, "PAYPAL_WEBHOOK_PORT", webhook_port)
+    assert grpc_handlers._status_known_in_db(SimpleNamespace(status=status)) is expected
+
+
+def test_unknown_transaction_is_not_found():
+    with pytest.raises(TransactionNotFoundError):
+        grpc_handlers._owned_transaction(None, "PAY-0")
+
+
+def test_other_merchants_payment_is_not_found():
+    handler = PaymentServiceHandler("simulated", _provider_config(1))
+    with _as_merchant("owner"):
+        transaction_id = handler.ProcessPayment(_payment_request("owner"), _Context()).transaction_id
+
+    with _as_merchant("intruder"):
+        for call, request in ((handler.GetTransactionStatus, TransactionStatusRequest(transaction_id=transaction_id)),
+                              (handler.ConfirmPayment, _confirm_request("intruder", transaction_id))):
+            context = _Context()
+            call(request, context)
+            assert context.code == grpc.StatusCode.NOT_FOUND
+
+    with _as_merchant("owner"):
+        context = _Context()
+        # Toujours en attente chez le fournisseur : la confirmation refusée ne l'a pas exécuté
+        assert handler.ConfirmPayment(_confirm_request("owner", transaction_id), context).status == "completed"
+        assert context.code == grpc.StatusCode.OK
+
+
+def test_other_merchants_payment_is_not_found_async():
+    async def scenario():
+        handler = AsyncPaymentServiceHandler("simulated", _provider_config(2))
+        with _as_merchant("owner"):
+            transaction_id = (await handler.ProcessPayment(_payment_request("owner"), _Context())).transaction_id
+        codes = []
+        with _as_merchant("intruder"):
+            for call, request in ((handler.GetTransactionStatus, TransactionStatusRequest(transaction_id=transaction_id)),
+                                  (handler.ConfirmPayment, _confirm_request("intruder", transaction_id))):
+                context = _Context()
+                await call(request, context)
+                codes.append(context.code)
+        with _as_merchant("owner"):
+            context = _Context()
+            status = (await handler.GetTransactionStatus(TransactionStatusRequest(transaction_id=transaction_id),
+                                                         context)).status
+            codes.append(context.code)
+        return codes, status
+
+    codes, status = asyncio.run(scenario())
+    assert codes == [grpc.StatusCode.NOT_FOUND, grpc.StatusCode.NOT_FOUND, grpc.StatusCode.OK]
+    assert status == "pending"
+
+
+def test_full_batch_fits_in_the_provider_bulkhead():
+    # Latence fixe : les BATCH_MAX_CONCURRENCY appels du lot sont simultanés
+    handler = PaymentServiceHandler("simulated", {"latency": "fixed:50", "seed": 3})
+    request = BatchPaymentRequest(merchant_id="batcher",
+                                  payments=[_payment_request("batcher")] * Config.BATCH_MAX_CONCURRENCY)
+    with _as_merchant("batcher"):
+        response = handler.BatchProcessPayment(request, _Context())
+    assert [result.error_code for result in response.results] == [""] * Config.BATCH_MAX_CONCURRENCY
+
+
+def test_reused_idempotency_key_is_a_failed_precondition():
+    handler = PaymentServiceHandler("simulated", _provider_config(4))
+    request = _payment_request("reuser")
+    request.idempotency_key = "order-1"
+    with _as_merchant("reuser"):
+        handler.ProcessPayment(request, _Context())
+        request.amount.amount_minor += 1
+        context = _Context()
+        handler.ProcessPayment(request, context)
+    assert context.code == grpc.StatusCode.FAILED_PRECONDITION
+
+
+def test_reused_idempotency_key_is_a_failed_precondition_async():
+    async def scenario():
+        handler = AsyncPaymentServiceHandler("simulated", _provider_config(5))
+        request = _payment_request("reuser")
+        request.idempotency_key = "order-1"
+        with _as_merchant("reuser"):
+            await handler.ProcessPayment(request, _Context())
+            request.amount.amount_minor += 1
+            context = _Context()
+            await handler.ProcessPayment(request, context)
+        return context.code
+
+    assert asyncio.run(scenario()) == grpc.StatusCode.FAILED_PRECONDITION
+
+
+def test_oversized_batches_are_rejected(monkeypatch):
+    monkeypatch.setattr(Config, "BATCH_MAX_ITEMS", 1)
+    handler = PaymentServiceHandler("simulated", _provider_config(6))
+    async_handler = AsyncPaymentServiceHandler("simulated", _provider_config(7))
+    requests = ((BatchPaymentRequest(merchant_id="batcher", payments=[_payment_request("batcher")] * 2),
+                 handler.BatchProcessPayment, async_handler.BatchProcessPayment),
+                (BatchTransactionStatusRequest(merchant_id="batcher", transaction_ids=["PAY-1", "PAY-2"]),
+                 handler.BatchGetTransactionStatus, async_handler.BatchGetTransactionStatus))
+    with _as_merchant("batcher"):
+        for request, call, async_call in requests:
+            context, async_context = _Context(), _AsyncContext()
+            with pytest.raises(_Aborted):
+                call(request, context)
+            with pytest.raises(_Aborted):
+                asyncio.run(async_call(request, async_context))
+            assert context.code == async_context.code == grpc.StatusCode.INVALID_ARGUMENT
+            assert context.details == async_context.details == "Batch size 2 exceeds the limit of 1"
@@ -0,0 +1,102 @@
+import asyncio
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from app.db import Base, create_async_db_engine, create_db_engine
+from app.repositories.idempotency_repository import IdempotencyRepository
+from app.utils.deadline import deadline_scope, remaining_time
+from app.utils.exceptions import IdempotencyConflictError
+from app.utils.idempotency import IdempotencyStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    db_engine = create_db_engine(f"sqlite:///{tmp_path / 'idempotency.db'}")
+    Base.metadata.create_all(db_engine)
+    store = IdempotencyStore(session_factory=sessionmaker(bind=db_engine))
+    yield store
+    db_engine.dispose()
+
+
+@pytest.fixture
+def async_store(store, tmp_path):
+    async_engine = create_async_db_engine(f"sqlite:///{tmp_path / 'idempotency.db'}")
+    repository = IdempotencyRepository(async_sessionmaker(async_engine, expire_on_commit=False))
+    store.async_loader = repository.find
+    store.async_saver = repository.save
+
+    def no_thread(*args):
+        raise AssertionError("execute_async must not use the synchronous session")
+    store._load, store._save = no_thread, no_thread
+    yield store
+    asyncio.run(async_engine.dispose())
+
+
+def _observe_save_deadline(store, seen: list) -> None:
+    save = store._save
+
+    def recording_save(*args):
+        seen.append(remaining_time())
+        return save(*args)
+    store._save = recording_save
+
+
+def test_response_replayed_and_key_reuse_rejected(store):
+    calls = []
+    operation = lambda: (calls.append(1) or b"response", True)
+    assert store.execute("m1", "key", "fp", operation) == b"response"
+    assert store.execute("m1", "key", "fp", operation) == b"response"
+    assert len(calls) == 1
+    with pytest.raises(IdempotencyConflictError):
+        store.execute("m1", "key", "other-fp", operation)
+
+
+def test_save_runs_outside_the_rpc_deadline(store):
+    seen = []
+    _observe_save_deadline(store, seen)
+    with deadline_scope(-1):
+        assert store.execute("m1", "key", "fp", lambda: (b"response", True)) == b"response"
+    assert seen == [None]
+    assert store._load(("m1", "key")) == ("fp", b"response")
+
+
+def test_async_save_runs_outside_the_rpc_deadline(store):
+    seen = []
+    _observe_save_deadline(store, seen)
+
+    async def operation():
+        return b"response", True
+
+    async def run():
+        with deadline_scope(-1):
+            return await store.execute_async("m1", "key", "fp", operation)
+
+    assert asyncio.run(run()) == b"response"
+    assert seen == [None]
+
+
+def test_async_store_uses_async_session(async_store):
+    calls = []
+
+    async def operation():
+        calls.append(1)
+        return b"response", True
+
+    async def run():
+        first = await async_store.execute_async("m1", "key", "fp", operation)
+        async_store._cache.clear()  # rejeu relu en base
+        return first, await async_store.execute_async("m1", "key", "fp", operation)
+
+    assert asyncio.run(run()) == (b"response", b"response")
+    assert len(calls) == 1
+    with pytest.raises(IdempotencyConflictError):
+        asyncio.run(async_store.execute_async("m1", "key", "other-fp", operation))
+
+
+def test_async_save_race_keeps_the_first_response(async_store):
+    async def run():
+        await async_store._save_async(("m1", "key"), "fp", b"first")
+        async_store._cache.clear()
+        return await async_store._save_async(("m1", "key"), "other-fp", b"second")
+
+    assert asyncio.run(run()) == ("fp", b"first")
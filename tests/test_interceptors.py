@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+import grpc
+import pytest
+from app.grpc_service.interceptors import RateLimitInterceptor
+from app.utils.rate_limit import RateLimit, ShardedRateLimiter
+from app.utils.security import CredentialInfo, credential_scope
+
+
+class _Limits:
+    def get(self, merchant_id, method):
+        return RateLimit(rate=1, burst=1)
+
+
+class _Aborted(Exception):
+    pass
+
+
+class _Context:
+    def __init__(self):
+        self.code = None
+
+    def set_trailing_metadata(self, metadata):
+        pass
+
+    def abort(self, code, details):
+        self.code = code
+        raise _Aborted(details)
+
+
+def _credential(merchant_id: str) -> CredentialInfo:
+    return CredentialInfo(credential_id=f"cred-{merchant_id}", merchant_id=merchant_id, environment=None,
+                          expires_at=None)
+
+
+@pytest.fixture
+def interceptor():
+    return RateLimitInterceptor(limits=_Limits(), limiter=ShardedRateLimiter())
+
+
+def test_bucket_is_the_authenticated_merchant(interceptor):
+    context = _Context()
+    with credential_scope(_credential("m1")):
+        interceptor._check("ProcessPayment", SimpleNamespace(merchant_id="m1"), context)
+        # Un autre merchant_id dans la requête ne donne pas un nouveau seau
+        with pytest.raises(_Aborted):
+            interceptor._check("ProcessPayment", SimpleNamespace(merchant_id="m2"), context)
+    assert context.code == grpc.StatusCode.RESOURCE_EXHAUSTED
+
+
+def test_requests_without_merchant_id_are_limited(interceptor):
+    context = _Context()
+    with credential_scope(_credential("m1")):
+        interceptor._check("GetMerchantBalance", SimpleNamespace(), context)
+        with pytest.raises(_Aborted):
+            interceptor._check("GetMerchantBalance", SimpleNamespace(), context)
+
+
+def test_without_authentication_the_request_merchant_is_used(interceptor):
+    interceptor._check("ProcessPayment", SimpleNamespace(merchant_id="m1"), _Context())
+    interceptor._check("ProcessPayment", SimpleNamespace(merchant_id="m2"), _Context())
+    with pytest.raises(_Aborted):
+        interceptor._check("ProcessPayment", SimpleNamespace(merchant_id="m1"), _Context())
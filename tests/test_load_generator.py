@@ -0,0 +1,62 @@
+import pytest
+from app.benchmark.histogram import LatencyHistogram
+from app.benchmark.load_generator import RunStats, compare_with_baseline, parse_levels, parse_mix
+
+
+def test_parse_mix():
+    assert parse_mix("ProcessPayment=40, GetMerchantBalance") == {"ProcessPayment": 40.0, "GetMerchantBalance": 1.0}
+    with pytest.raises(ValueError, match="Unknown RPC"):
+        parse_mix("RefundPayment=1")
+    with pytest.raises(ValueError, match="positive weight"):
+        parse_mix("ProcessPayment=0")
+
+
+def test_parse_levels():
+    assert parse_levels("1, 8,,32", int) == [1, 8, 32]
+    assert parse_levels("12.5", float) == [12.5]
+    assert parse_levels(None, int) == []
+
+
+def test_histogram_percentiles_within_precision():
+    histogram = LatencyHistogram(significant_figures=3)
+    for value in range(1, 100001):
+        histogram.record(value)
+    assert histogram.total_count == 100000
+    assert (histogram.min, histogram.max) == (1, 100000)
+    for percentile in (50, 90, 99, 99.9):
+        expected = percentile / 100 * 100000
+        assert abs(histogram.percentile(percentile) - expected) <= expected * 1e-3
+    assert histogram.percentile(100) == 100000
+
+
+def test_histogram_merge_and_summary():
+    first, second = LatencyHistogram(), LatencyHistogram()
+    first.record(1000, count=3)
+    second.record(5000)
+    first.merge(second)
+    summary = first.summary_ms(percentiles=(50, 99))
+    assert summary == {"count": 4, "min": 1.0, "mean": 2.0, "max": 5.0, "p50": 1.0, "p99": 5.0}
+    with pytest.raises(ValueError):
+        first.merge(LatencyHistogram(significant_figures=2))
+
+
+def test_run_stats_report():
+    stats = RunStats()
+    stats.record("ProcessPayment", "OK", "pending", 0.002)
+    stats.record("ProcessPayment", "UNAVAILABLE", None, 0.004)
+    report = stats.report(elapsed=2.0)
+    assert (report["requests"], report["errors"], report["throughput_rps"], report["ok_rps"]) == (2, 1, 1.0, 0.5)
+    assert report["rpcs"]["ProcessPayment"]["payment_statuses"] == {"pending": 1}
+
+
+def _report(p99: float, throughput: float) -> dict:
+    run = {"load": "closed", "concurrency": 8, "latency_ms": {"p99": p99}, "throughput_rps": throughput}
+    return {"results": [{"server_mode": "sync", "runs": [run]}]}
+
+
+def test_compare_with_baseline():
+    baseline = _report(p99=10.0, throughput=100.0)
+    assert compare_with_baseline(_report(p99=10.5, throughput=96.0), baseline, tolerance=0.1) == []
+    regressions = compare_with_baseline(_report(p99=12.0, throughput=80.0), baseline, tolerance=0.1)
+    assert [regression["metric"] for regression in regressions] == ["latency_ms.p99", "throughput_rps"]
+    assert regressions[0]["level"] == 8
@@ -0,0 +1,112 @@
+import pytest
+from sqlalchemy import BigInteger, Column, DateTime, MetaData, String, Table, UniqueConstraint, inspect, insert, select, text
+from app.db import Base, create_db_engine
+from app.migrations import m0001_hot_lookup_indexes, m0005_balance_shards, run_migrations
+from app.migrations.query_plans import HOT_QUERIES, verify_query_plans
+from app.utils.exceptions import DuplicateKeyError, SequentialScanError
+
+
+@pytest.fixture
+def engine(tmp_path):
+    db_engine = create_db_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield db_engine
+    db_engine.dispose()
+
+
+@pytest.fixture
+def migrated_engine(engine):
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    return engine
+
+
+def test_hot_queries_use_an_index(migrated_engine):
+    plans = verify_query_plans(migrated_engine)
+    assert set(plans) == set(HOT_QUERIES)
+
+
+def test_missing_index_is_reported(migrated_engine):
+    with migrated_engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_refunds_transaction_id"))
+    with pytest.raises(SequentialScanError, match="refunded_amount"):
+        verify_query_plans(migrated_engine)
+
+
+def test_migrations_run_once(migrated_engine):
+    assert run_migrations(migrated_engine) == []
+
+
+def _legacy_lookup_tables(engine):
+    metadata = MetaData()
+    transactions = Table("transactions", metadata, Column("id", String(36), primary_key=True),
+                         Column("merchant_id", String(36)), Column("provider_transaction_id", String(255)),
+                         Column("order_id", String(255)), Column("idempotency_key", String(255)))
+    Table("refunds", metadata, Column("id", String(36), primary_key=True),
+          Column("transaction_id", String(36)), Column("provider_refund_id", String(255)))
+    metadata.create_all(engine)
+    return transactions
+
+
+def test_duplicate_provider_ids_are_reported_before_indexing(engine):
+    transactions = _legacy_lookup_tables(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(transactions), [
+            dict(id="t1", provider_transaction_id="PAY-1"), dict(id="t2", provider_transaction_id="PAY-1"),
+            dict(id="t3", provider_transaction_id=None), dict(id="t4", provider_transaction_id=None),
+        ])
+    with pytest.raises(DuplicateKeyError, match=r"transactions\.provider_transaction_id: duplicated values PAY-1\."):
+        with engine.begin() as connection:
+            m0001_hot_lookup_indexes.upgrade(connection)
+    assert not inspect(engine).get_indexes("transactions")
+
+
+def test_lookup_indexes_allow_missing_provider_ids(engine):
+    transactions = _legacy_lookup_tables(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(transactions), [dict(id="t1"), dict(id="t2")])
+        m0001_hot_lookup_indexes.upgrade(connection)
+    assert "uq_transactions_provider_transaction_id" in {i["name"] for i in inspect(engine).get_indexes("transactions")}
+
+
+def _legacy_balances(engine, unique: bool):
+    metadata = MetaData()
+    Table("merchants", metadata, Column("id", String(36), primary_key=True))
+    balances = Table(
+        "merchant_balances", metadata,
+        Column("id", String(36), primary_key=True), Column("merchant_id", String(36)),
+        Column("currency", String(3)), Column("available_minor", BigInteger), Column("pending_minor", BigInteger),
+        Column("updated_at", DateTime),
+        *([UniqueConstraint("merchant_id", "currency", name="uq_merchant_balances_merchant_currency")] if unique else []),
+    )
+    metadata.create_all(engine)
+    return balances
+
+
+@pytest.mark.parametrize("unique", [True, False])
+def test_balance_shards_added_to_legacy_table(engine, unique):
+    balances = _legacy_balances(engine, unique)
+    rows = [dict(id="b1", merchant_id="m1", currency="USD", available_minor=100, pending_minor=5),
+            dict(id="b3", merchant_id="m2", currency="USD", available_minor=7, pending_minor=0)]
+    if not unique:
+        rows.append(dict(id="b2", merchant_id="m1", currency="USD", available_minor=20, pending_minor=0))
+    with engine.begin() as connection:
+        connection.execute(insert(balances), rows)
+        m0005_balance_shards.upgrade(connection)
+
+    shard_table = m0005_balance_shards.merchant_balances
+    with engine.begin() as connection:
+        stored = connection.execute(select(shard_table.c.id, shard_table.c.shard, shard_table.c.available_minor)
+                                    .order_by(shard_table.c.id)).all()
+        # Nouveau shard d'un (marchand, devise) déjà présent : l'ancienne clé unique ne l'empêche plus
+        connection.execute(insert(shard_table).values(id="b4", merchant_id="m2", currency="USD", shard=3))
+    expected = [("b1", 0, 100), ("b3", 0, 7)]
+    if not unique:
+        expected.insert(1, ("b2", 1, 20))
+    assert stored == expected
+    uniques = inspect(engine).get_unique_constraints("merchant_balances")
+    assert [sorted(u["column_names"]) for u in uniques] == [["currency", "merchant_id", "shard"]]
+
+
+def test_balance_shards_noop_on_current_schema(migrated_engine):
+    uniques = inspect(migrated_engine).get_unique_constraints("merchant_balances")
+    assert [u["name"] for u in uniques] == ["uq_merchant_balances_merchant_currency_shard"]
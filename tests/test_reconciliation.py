@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app.db import Base, create_db_engine
+from app.providers.base_provider import PaymentResult, PaymentStatus as ProviderStatus
+from app.providers.main import PaymentService
+from app.services.reconciliation_service import PaymentReconciler
+from app.services.transaction_service import TransactionService
+from models.models import Merchant, PaymentStatus, Transaction
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    db_engine = create_db_engine(f"sqlite:///{tmp_path / 'reconciliation.db'}")
+    Base.metadata.create_all(db_engine)
+    yield sessionmaker(bind=db_engine, autoflush=False)
+    db_engine.dispose()
+
+
+@pytest.fixture
+def reconciler(session_factory):
+    transaction_service = TransactionService(session_factory=session_factory)
+    reconciler = PaymentReconciler(PaymentService("simulated", {}), transaction_service, session_factory,
+                                   concurrency=2)
+    yield reconciler
+    reconciler.close()
+
+
+def _pending_transaction(session_factory, fee_minor: int) -> None:
+    with session_factory() as session:
+        session.add(Merchant(id="m1", business_name="Merchant", email="m1@example.com", status="active"))
+        session.add(Transaction(id="t1", merchant_id="m1", amount_minor=1000, fee_minor=fee_minor, currency="USD",
+                                status=PaymentStatus.PENDING, provider_transaction_id="PAY-1",
+                                created_at=datetime.utcnow() - timedelta(hours=1),
+                                next_reconcile_at=datetime.utcnow() - timedelta(minutes=1)))
+        session.commit()
+
+
+def _completed(fee_amount):
+    return PaymentResult(success=True, provider_transaction_id="PAY-1", status=ProviderStatus.COMPLETED,
+                         payment_method_details={"currency": "USD"}, amount_processed=Decimal("10.00"),
+                         fee_amount=fee_amount)
+
+
+@pytest.mark.parametrize("fee_amount, expected_fee_minor", [(None, 30), (Decimal("0.45"), 45)])
+def test_completion_keeps_the_stored_fee_unless_the_provider_reports_one(
+        session_factory, reconciler, fee_amount, expected_fee_minor):
+    _pending_transaction(session_factory, fee_minor=30)
+    now = datetime.utcnow()
+    rows = reconciler._claim_due(now)
+    assert reconciler._apply(rows, [_completed(fee_amount)], now)["completed"] == 1
+
+    with session_factory() as session:
+        transaction = session.get(Transaction, "t1")
+        assert (transaction.status, transaction.fee_minor) == (PaymentStatus.COMPLETED, expected_fee_minor)
+    [balance] = reconciler.transaction_service.balance_service.get_balances("m1", "USD")
+    assert balance.available_minor == 1000 - expected_fee_minor
+
+
+def test_polls_use_their_own_bulkhead(reconciler):
+    assert reconciler.payment_service.bulkhead.name == "simulated:reconcile"
+    assert reconciler.payment_service.bulkhead.max_concurrent == 2
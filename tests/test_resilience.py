@@ -0,0 +1,67 @@
+import asyncio
+import pytest
+from app import db
+from app.config import Config
+from app.providers.main import PaymentService
+from app.utils.exceptions import ProviderUnavailableError
+from app.utils.resilience import CLOSED, HALF_OPEN, OPEN, Bulkhead, CircuitBreaker
+
+
+def _half_open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker("test", window_size=4, min_calls=2, failure_rate=0.5, open_seconds=0, half_open_calls=1)
+    for _ in range(2):
+        breaker.record(breaker.before_call(), 0.0, failed=True)
+    assert breaker.state == HALF_OPEN
+    return breaker
+
+
+def test_failures_open_the_circuit():
+    breaker = CircuitBreaker("test", window_size=4, min_calls=2, failure_rate=0.5, open_seconds=60)
+    for _ in range(2):
+        breaker.record(breaker.before_call(), 0.0, failed=True)
+    assert breaker.state == OPEN
+    with pytest.raises(ProviderUnavailableError):
+        breaker.before_call()
+
+
+def test_cancelled_probe_releases_its_slot_without_closing():
+    breaker = _half_open_breaker()
+    generation = breaker.before_call()
+    with pytest.raises(ProviderUnavailableError):
+        breaker.before_call()
+    breaker.release(generation)
+    assert breaker.state == HALF_OPEN
+    breaker.record(breaker.before_call(), 0.0, failed=False)
+    assert breaker.state == CLOSED
+
+
+def test_cancelled_provider_call_is_neutral():
+    service = PaymentService("simulated", {})
+    breaker = service.circuit_breaker = _half_open_breaker()
+    service._record("get_payment_status", breaker.before_call(), 0.0, None, asyncio.CancelledError())
+    assert breaker.state == HALF_OPEN
+    assert breaker.before_call() == breaker._generation
+
+
+def test_background_bulkhead_is_separate():
+    service = PaymentService("simulated", {})
+    background = service.with_bulkhead("test-background", max_concurrent=2, wait_seconds=1)
+    assert background.bulkhead is not service.bulkhead
+    assert background.bulkhead.max_concurrent == 2
+    assert background.circuit_breaker is service.circuit_breaker
+    assert background.provider is service.provider
+
+
+@pytest.mark.parametrize("server_mode", ["sync", "async"])
+def test_default_bulkhead_covers_a_full_batch(monkeypatch, server_mode):
+    monkeypatch.setattr(Config, "PROVIDER_MAX_CONCURRENCY", None)
+    monkeypatch.setattr(db, "_server_mode", server_mode)
+    bulkhead = Bulkhead("test")
+    assert bulkhead.max_concurrent == db.server_concurrency()
+    assert bulkhead.max_concurrent >= Config.BATCH_MAX_CONCURRENCY
+
+
+def test_configured_bulkhead_size_wins(monkeypatch):
+    monkeypatch.setattr(Config, "PROVIDER_MAX_CONCURRENCY", 3)
+    assert Bulkhead("test").max_concurrent == 3
+    assert Bulkhead("test", max_concurrent=2).max_concurrent == 2
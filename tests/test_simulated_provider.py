@@ -0,0 +1,84 @@
+import asyncio
+import random
+from decimal import Decimal
+import pytest
+from app.providers.base_provider import PaymentStatus
+from app.providers.simulated_provider import LatencyDistribution, SimulatedPaymentProvider, parse_fee_rules, parse_latencies
+
+
+def _provider(**options) -> SimulatedPaymentProvider:
+    return SimulatedPaymentProvider(**dict(dict(latency="fixed:0"), **options))
+
+
+def _create(provider, amount="10.00", currency="USD"):
+    return asyncio.run(provider.create_payment_intent(Decimal(amount), currency, {}))
+
+
+def _outcomes(provider, count: int = 20) -> list:
+    return [(result.success, result.provider_transaction_id) for result in (_create(provider) for _ in range(count))]
+
+
+def test_same_seed_replays_ids_and_outcomes():
+    options = dict(seed=7, decline_rate=0.5, approval_rate=0.5)
+    first, second = _provider(**options), _provider(**options)
+    outcomes = _outcomes(first)
+    assert outcomes == _outcomes(second)
+    assert {success for success, _ in outcomes} == {True, False}
+    assert [p.payer_approves for p in first._payments.values()] == [p.payer_approves for p in second._payments.values()]
+
+
+def test_other_seed_gives_other_ids():
+    [(_, first_id)] = _outcomes(_provider(seed=1), 1)
+    [(_, other_id)] = _outcomes(_provider(seed=2), 1)
+    assert first_id != other_id
+
+
+def test_latency_draws_depend_on_the_seed_only():
+    distribution = LatencyDistribution.parse("lognormal:50:0.5")
+    assert distribution.sample(random.Random("1:create:1")) == distribution.sample(random.Random("1:create:1"))
+    assert parse_latencies("create=fixed:40,*=uniform:1:2")["create"].sample(random.Random(0)) == 0.04
+    with pytest.raises(ValueError):
+        LatencyDistribution.parse("gamma:1")
+
+
+def test_fees_follow_the_currency_rules():
+    provider = _provider(fee_percent="2.9", fee_fixed="0.30", fee_rules="JPY=3.6:40")
+    assert provider._fee(Decimal("10.00"), "USD") == Decimal("0.59")
+    assert provider._fee(Decimal("1000"), "JPY") == Decimal("76")
+    assert parse_fee_rules("eur=1.4")["EUR"].fixed == Decimal("0")
+
+
+def test_payment_lifecycle():
+    provider = _provider()
+    payment_id = _create(provider).provider_transaction_id
+    run = asyncio.run
+
+    assert not run(provider.confirm_payment(payment_id, {})).success
+    confirmed = run(provider.confirm_payment(payment_id, {"payer_id": "P"}))
+    assert (confirmed.status, confirmed.fee_amount) == (PaymentStatus.COMPLETED, Decimal("0.59"))
+    assert not run(provider.confirm_payment(payment_id, {"payer_id": "P"})).success
+
+    partial = run(provider.refund_payment(payment_id, Decimal("4.00")))
+    assert (partial.status, partial.provider_transaction_id) == (PaymentStatus.PARTIALLY_REFUNDED, f"{payment_id}-R1")
+    assert not run(provider.refund_payment(payment_id, Decimal("7.00"))).success
+    assert run(provider.refund_payment(payment_id)).status == PaymentStatus.REFUNDED
+
+    status = run(provider.get_payment_status(payment_id))
+    assert (status.status, status.fee_amount) == (PaymentStatus.REFUNDED, Decimal("0.59"))
+    assert not run(provider.get_payment_status("SIM-unknown")).success
+
+
+def test_unapproved_and_expired_payments_cannot_be_executed():
+    refused = _provider(approval_rate=0.0)
+    payment_id = _create(refused).provider_transaction_id
+    assert asyncio.run(refused.confirm_payment(payment_id, {"payer_id": "P"})).error_message == \
+        "Payer did not approve the payment"
+
+    expiring = _provider(approval_ttl_seconds=-1)
+    payment_id = _create(expiring).provider_transaction_id
+    assert asyncio.run(expiring.confirm_payment(payment_id, {"payer_id": "P"})).status == PaymentStatus.CANCELLED
+
+
+def test_injected_errors_are_retryable():
+    result = _create(_provider(error_rate=1.0))
+    assert not result.success and result.retryable
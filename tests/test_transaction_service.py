@@ -0,0 +1,79 @@
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app.config import Config
+from app.db import Base, create_db_engine
+from app.services import balance_service, webhook_dispatcher
+from app.services.transaction_service import TransactionService
+from models.models import Merchant, PaymentStatus, Transaction
+
+
+@pytest.fixture
+def service(tmp_path):
+    db_engine = create_db_engine(f"sqlite:///{tmp_path / 'transactions.db'}")
+    Base.metadata.create_all(db_engine)
+    session_factory = sessionmaker(bind=db_engine, autoflush=False)
+    with session_factory() as session:
+        session.add(Merchant(id="m1", business_name="Merchant", email="m1@example.com", status="active"))
+        session.add(Transaction(id="t1", merchant_id="m1", amount_minor=1000, currency="USD",
+                                status=PaymentStatus.PENDING, provider_transaction_id="PAY-1",
+                                created_at=datetime.utcnow()))
+        session.commit()
+    yield TransactionService(session_factory=session_factory)
+    db_engine.dispose()
+
+
+def _status(service) -> PaymentStatus:
+    with service.session_factory() as session:
+        return session.get(Transaction, "t1").status
+
+
+def _available(service) -> int:
+    return sum(balance.available_minor for balance in service.balance_service.get_balances("m1", "USD"))
+
+
+@pytest.mark.parametrize("final_status", [PaymentStatus.FAILED, PaymentStatus.CANCELLED])
+def test_failed_payment_is_not_completed_later(service, final_status):
+    with service.session_factory() as session:
+        service.mark_status_in_session(session, session.get(Transaction, "t1"), final_status)
+        session.commit()
+    assert not service.complete_payment("m1", "PAY-1", Decimal("10.00"), Decimal("0"))
+    assert (_status(service), _available(service)) == (final_status, 0)
+
+
+def test_completion_after_refund_is_ignored(service):
+    assert service.complete_payment("m1", "PAY-1", Decimal("10.00"), Decimal("0"))
+    assert not service.complete_payment("m1", "PAY-1", Decimal("10.00"), Decimal("0"))
+    service.record_refund("m1", "PAY-1", "REF-1", Decimal("10.00"))
+    assert _status(service) == PaymentStatus.REFUNDED
+
+    assert not service.complete_payment("m1", "PAY-1", Decimal("10.00"), Decimal("0"))
+    assert (_status(service), _available(service)) == (PaymentStatus.REFUNDED, 0)
+
+
+def test_savepoint_rollback_keeps_pending_notifications(service, monkeypatch):
+    sent = []
+    monkeypatch.setattr(Config, "WEBHOOKS_ENABLED", True)
+    monkeypatch.setattr(webhook_dispatcher, "get_webhook_dispatcher", lambda: SimpleNamespace(enqueue=sent.append))
+    with service.session_factory() as session:
+        transaction = session.get(Transaction, "t1")
+        transaction.webhook_url = "https://merchant.example/hooks"
+        webhook_dispatcher.queue_transaction_webhook(session, transaction, "payment.completed")
+        session.info.setdefault(balance_service._CHANGED_BALANCES, set()).add("m1")
+        session.begin_nested().rollback()
+        assert session.info[balance_service._CHANGED_BALANCES] == {"m1"}
+        session.commit()
+    assert [delivery.event_type for delivery in sent] == ["payment.completed"]
+
+
+def test_root_rollback_drops_pending_notifications(service, monkeypatch):
+    monkeypatch.setattr(Config, "WEBHOOKS_ENABLED", True)
+    with service.session_factory() as session:
+        transaction = session.get(Transaction, "t1")
+        transaction.webhook_url = "https://merchant.example/hooks"
+        webhook_dispatcher.queue_transaction_webhook(session, transaction, "payment.completed")
+        session.info.setdefault(balance_service._CHANGED_BALANCES, set()).add("m1")
+        session.rollback()
+        assert not session.info